@@ -1,7 +1,35 @@
-from typing import Dict, Optional, List
-from sqlalchemy.orm import Session
-from models import Event, Odd
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, List, Tuple
+import itertools
+import os
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, selectinload
+from models import Event, Odd, BestLine
+from best_lines import (
+    linhas_por_casa, melhor_excluindo, melhor_par,
+    scraped_at_da_linha, sincronizadas, top2_confiavel
+)
+from db_stats import contar_statements
+from versioning import obter_versao, incrementar_versao
+from cache import cache_arbitragem
+from datetime import datetime, timedelta, timezone
+
+# Frescor das odds (em minutos, pelo scraped_at): idade máxima de cada perna
+# e diferença máxima entre as duas pernas de uma oportunidade. 0 desativa.
+MAX_IDADE_ODD_MINUTOS = float(os.getenv("ODDS_MAX_AGE_MINUTES", "120"))
+MAX_DIFERENCA_PERNAS_MINUTOS = float(os.getenv("ODDS_MAX_SKEW_MINUTES", "30"))
+
+# Cenários (valores x pares de odds) aceitos por chamada de /api/hedge/batch
+MAX_CENARIOS_HEDGE = int(os.getenv("HEDGE_BATCH_MAX_SCENARIOS", "10000"))
+
+class ResultadoScan(list):
+    """
+    Lista de oportunidades com o número de statements SQL usados na busca
+    e de eventos avaliados.
+    """
+    sql_statements: int = 0
+    eventos_avaliados: int = 0
+
 
 def calcular_hedge(
     aposta_usuario: float,
@@ -35,12 +63,7 @@ def calcular_hedge(
     lucro_percentual = (lucro / total_investido) * 100
     
     # Determinar tipo de oportunidade
-    if lucro > 0:
-        tipo = "profit"
-    elif abs(lucro) < 0.01:  # Breakeven (margem de erro)
-        tipo = "breakeven"
-    else:
-        tipo = "loss-minimize"
+    tipo = _tipo_resultado(lucro)
     
     return {
         "aposta_oposta": round(aposta_oposta, 2),
@@ -52,20 +75,140 @@ def calcular_hedge(
     }
 
 
+def _tipo_resultado(lucro: float) -> str:
+    if lucro > 0:
+        return "profit"
+    elif abs(lucro) < 0.01:  # Breakeven (margem de erro)
+        return "breakeven"
+    return "loss-minimize"
+
+
+def calcular_hedge_lote(
+    apostas_usuario,
+    odds_usuario,
+    odds_opostas,
+    incremento: Optional[float] = None,
+    bookmakers_usuario=None,
+    bookmakers_opostos=None,
+    limites: Optional[Dict[str, float]] = None
+) -> List[Dict]:
+    """
+    Versão em lote de calcular_hedge: calcula vários cenários de uma vez.
+    Os argumentos seguem o broadcasting do NumPy (ex.: uma lista de valores
+    com um par de odds fixo, ou valores[None, :] x odds[:, None]).
+    
+    Args:
+        apostas_usuario: Valores que o usuário quer apostar
+        odds_usuario: Odds do time escolhido pelo usuário
+        odds_opostas: Odds do Double Chance oposto
+        incremento: Arredonda as apostas para múltiplos deste valor (ex.: 0.50)
+        bookmakers_usuario: Casa de cada aposta do usuário (para os limites)
+        bookmakers_opostos: Casa de cada aposta oposta (para os limites)
+        limites: Aposta máxima por casa; se alguma perna passar do limite,
+            as duas apostas são reduzidas na mesma proporção
+    
+    Returns:
+        Lista (na ordem achatada do broadcasting) de dicts com as mesmas
+        chaves de calcular_hedge, mais "aposta_usuario" e "limitado"
+    
+    Raises:
+        ValueError: Valores ou odds não positivos, incremento ou limites
+            não positivos, ou valores grandes demais para um resultado finito
+    """
+    apostas, odd_u, odd_o = np.broadcast_arrays(
+        np.asarray(apostas_usuario, dtype=float),
+        np.asarray(odds_usuario, dtype=float),
+        np.asarray(odds_opostas, dtype=float)
+    )
+    # Comparações com NaN são falsas: "not (x > 0)" também recusa NaN
+    if not (odd_u > 0).all() or not (odd_o > 0).all():
+        raise ValueError("As odds devem ser maiores que zero")
+    if not (apostas > 0).all():
+        raise ValueError("Os valores apostados devem ser maiores que zero")
+    if incremento is not None and not incremento > 0:
+        raise ValueError("O incremento deve ser maior que zero")
+    if limites and not all(limite > 0 for limite in limites.values()):
+        raise ValueError("Os limites por casa devem ser maiores que zero")
+    
+    apostas = apostas.astype(float)
+    with np.errstate(over="ignore"):
+        apostas_opostas = (apostas * odd_u) / odd_o
+    limitado = np.zeros(apostas.shape, dtype=bool)
+    
+    # Limite por casa: reduz as duas pernas na mesma proporção
+    if limites:
+        fator = np.ones(apostas.shape)
+        for casas, valores in ((bookmakers_usuario, apostas), (bookmakers_opostos, apostas_opostas)):
+            if casas is None:
+                continue
+            casas = np.broadcast_to(np.asarray(casas, dtype=object), apostas.shape)
+            limite = np.vectorize(lambda casa: limites.get(casa, np.inf), otypes=[float])(casas)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fator = np.minimum(fator, np.where(valores > limite, limite / valores, 1.0))
+        limitado = fator < 1.0
+        apostas = apostas * fator
+        apostas_opostas = apostas_opostas * fator
+    
+    if incremento is not None:
+        # Pernas limitadas arredondam para baixo para não passar do limite
+        arredondar = lambda valores: np.where(
+            limitado,
+            np.floor(valores / incremento + 1e-9) * incremento,
+            np.round(valores / incremento) * incremento
+        )
+        apostas = arredondar(apostas)
+        apostas_opostas = arredondar(apostas_opostas)
+    
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        total_investido = apostas + apostas_opostas
+        retorno_garantido = np.minimum(apostas * odd_u, apostas_opostas * odd_o)
+        lucro = retorno_garantido - total_investido
+        lucro_percentual = np.where(total_investido > 0, (lucro / total_investido) * 100, 0.0)
+    if not all(np.isfinite(valores).all() for valores in (total_investido, retorno_garantido, lucro_percentual)):
+        raise ValueError("Valores ou odds grandes demais para o cálculo")
+    
+    colunas = zip(
+        apostas.ravel().tolist(),
+        apostas_opostas.ravel().tolist(),
+        total_investido.ravel().tolist(),
+        retorno_garantido.ravel().tolist(),
+        lucro.ravel().tolist(),
+        lucro_percentual.ravel().tolist(),
+        limitado.ravel().tolist()
+    )
+    
+    resultados = []
+    for aposta, oposta, total, retorno, lucro_cenario, percentual, foi_limitado in colunas:
+        resultados.append({
+            "aposta_usuario": round(aposta, 2),
+            "aposta_oposta": round(oposta, 2),
+            "total_investido": round(total, 2),
+            "retorno_garantido": round(retorno, 2),
+            "lucro": round(lucro_cenario, 2),
+            "lucro_percentual": round(percentual, 2),
+            "tipo": _tipo_resultado(lucro_cenario),
+            "limitado": foi_limitado
+        })
+    
+    return resultados
+
+
 def encontrar_melhor_odd_double_chance(
     db: Session,
     event_id: str,
     time_usuario: str,
-    bookmaker_usuario: str
+    bookmaker_usuario: str,
+    max_idade_minutos: Optional[float] = None
 ) -> Optional[Dict]:
     """
-    Busca a melhor odd de Double Chance oposta.
+    Busca a melhor odd de Double Chance oposta (só odds ativas e frescas).
     
     Args:
         db: Sessão do banco de dados
         event_id: ID do evento
         time_usuario: Time escolhido pelo usuário ('home' ou 'away')
         bookmaker_usuario: Casa de apostas escolhida pelo usuário
+        max_idade_minutos: Idade máxima da odd (default: ODDS_MAX_AGE_MINUTES)
     
     Returns:
         Dict com a melhor odd Double Chance encontrada ou None
@@ -75,40 +218,50 @@ def encontrar_melhor_odd_double_chance(
     if not event:
         return None
     
-    # Busca todas as odds desse evento (exceto a casa do usuário)
-    odds = db.query(Odd).filter(
-        Odd.event_id == event_id,
-        Odd.bookmaker != bookmaker_usuario
-    ).all()
-    
-    if not odds:
-        return None
-    
-    # Determina qual odd Double Chance procurar
+    # Mercado Double Chance oposto ao time do usuário
     if time_usuario == "home":
         # Se usuário apostou no mandante, procura melhor odd de "Visitante ou Empate"
-        odds_validas = [o for o in odds if o.away_or_draw_odd is not None]
-        if not odds_validas:
-            return None
-        melhor_odd = max(odds_validas, key=lambda x: float(x.away_or_draw_odd))
-        return {
-            "bookmaker": melhor_odd.bookmaker,
-            "market": "Double Chance",
-            "description": f"{event.away_team} ou Empate",
-            "odd": float(melhor_odd.away_or_draw_odd)
-        }
+        mercado = "away_or_draw_odd"
+        descricao = f"{event.away_team} ou Empate"
     else:
         # Se usuário apostou no visitante, procura melhor odd de "Mandante ou Empate"
-        odds_validas = [o for o in odds if o.home_or_draw_odd is not None]
-        if not odds_validas:
+        mercado = "home_or_draw_odd"
+        descricao = f"{event.home_team} ou Empate"
+    
+    agora = datetime.utcnow()
+    min_scraped_at = _min_scraped_at(agora, max_idade_minutos)
+    
+    # Usa a tabela de best lines quando o evento já tem uma e o top 2 não
+    # tem odd velha (senão ela pode esconder uma fresca abaixo)
+    best_line = db.query(BestLine).filter(BestLine.event_id == event_id).first()
+    if best_line is not None and top2_confiavel(best_line.lines, (mercado,), min_scraped_at):
+        melhor = melhor_excluindo(best_line.lines, mercado, bookmaker_usuario, min_scraped_at)
+        if not melhor:
             return None
-        melhor_odd = max(odds_validas, key=lambda x: float(x.home_or_draw_odd))
         return {
-            "bookmaker": melhor_odd.bookmaker,
+            "bookmaker": melhor["bookmaker"],
             "market": "Double Chance",
-            "description": f"{event.home_team} ou Empate",
-            "odd": float(melhor_odd.home_or_draw_odd)
+            "description": descricao,
+            "odd": melhor["odd"]
         }
+    
+    # Busca as odds ativas e frescas desse evento (exceto a casa do usuário)
+    odds = db.query(Odd).filter(
+        Odd.event_id == event_id,
+        Odd.bookmaker != bookmaker_usuario,
+        criterio_odds_validas(agora, max_idade_minutos)
+    ).all()
+    
+    odds_validas = [o for o in odds if getattr(o, mercado) is not None]
+    if not odds_validas:
+        return None
+    melhor_odd = max(odds_validas, key=lambda x: float(getattr(x, mercado)))
+    return {
+        "bookmaker": melhor_odd.bookmaker,
+        "market": "Double Chance",
+        "description": descricao,
+        "odd": float(getattr(melhor_odd, mercado))
+    }
 
 
 def processar_arbitragem(
@@ -136,10 +289,11 @@ def processar_arbitragem(
     if not event:
         return None
     
-    # Busca a odd do usuário
+    # Busca a odd do usuário (ativa e fresca, como a oposta)
     odd_usuario_db = db.query(Odd).filter(
         Odd.event_id == event_id,
-        Odd.bookmaker == bookmaker_usuario
+        Odd.bookmaker == bookmaker_usuario,
+        criterio_odds_validas(datetime.utcnow())
     ).first()
     
     if not odd_usuario_db:
@@ -194,144 +348,726 @@ def processar_arbitragem(
     }
 
 
-def buscar_oportunidades_automaticas(
-    db: Session,
-    valor_base: float = 100.0,
-    min_profit_percent: float = 1.0
-) -> List[Dict]:
+def _idade_segundos(scraped_at: Optional[datetime], agora: datetime) -> Optional[float]:
+    """Idade da odd em segundos (None se não tiver scraped_at)."""
+    if scraped_at is None:
+        return None
+    if scraped_at.tzinfo is not None:
+        scraped_at = scraped_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return (agora - scraped_at).total_seconds()
+
+
+def _arredondar_idade(idade: Optional[float]) -> Optional[int]:
+    return round(idade) if idade is not None else None
+
+
+def criterio_odds_validas(agora: datetime, max_idade_minutos: Optional[float] = None):
     """
-    Busca oportunidades de arbitragem automaticamente usando Double Chance.
-    Filtra apenas eventos ativos (upcoming ou live) e recentes.
-    
-    Args:
-        db: Sessão do banco
-        valor_base: Valor base para calcular (default: R$ 100)
-        min_profit_percent: Lucro mínimo em % (default: 1%)
+    Filtro SQL das odds usadas na varredura: ativas e, se configurado,
+    coletadas há no máximo max_idade_minutos (índice parcial idx_odds_active_event_scraped).
+    """
+    if max_idade_minutos is None:
+        max_idade_minutos = MAX_IDADE_ODD_MINUTOS
     
-    Returns:
-        Lista de oportunidades encontradas
+    # "is_active = true" casa com o predicado do índice parcial (WHERE is_active)
+    criterio = Odd.is_active == True
+    if max_idade_minutos > 0:
+        criterio = and_(criterio, Odd.scraped_at >= agora - timedelta(minutes=max_idade_minutos))
+    return criterio
+
+
+def _montar_oportunidade(
+    event: Event,
+    time_usuario: str,
+    bookmaker_aposta: str,
+    odd_aposta: float,
+    bookmaker_dc: str,
+    odd_dc: float,
+    valor_base: float,
+    resultado: Dict,
+    idade_aposta: Optional[float] = None,
+    idade_dc: Optional[float] = None
+) -> Dict:
+    """
+    Monta o dict de uma oportunidade (aposta no time + Double Chance oposta).
+    """
+    if time_usuario == "home":
+        descricao_aposta = event.home_team
+        descricao_dc = f"{event.away_team} ou Empate"
+    else:
+        descricao_aposta = event.away_team
+        descricao_dc = f"{event.home_team} ou Empate"
+
+    return {
+        "event": {
+            "id": event.id,
+            "home_team": event.home_team,
+            "away_team": event.away_team,
+            "league": event.league
+        },
+        "bet1": {
+            "description": descricao_aposta,
+            "bookmaker": bookmaker_aposta,
+            "market": "Resultado Final",
+            "odd": odd_aposta,
+            "amount": valor_base,
+            "age_seconds": _arredondar_idade(idade_aposta)
+        },
+        "bet2": {
+            "description": descricao_dc,
+            "bookmaker": bookmaker_dc,
+            "market": "Double Chance",
+            "odd": odd_dc,
+            "amount": resultado["aposta_oposta"],
+            "age_seconds": _arredondar_idade(idade_dc)
+        },
+        "profit": resultado["lucro"],
+        "profit_percent": resultado["lucro_percentual"]
+    }
+
+
+def _e_oportunidade(resultado: Dict, min_profit_percent: float) -> bool:
+    return resultado["tipo"] == "profit" and resultado["lucro_percentual"] >= min_profit_percent
+
+
+def _pernas_sincronizadas(idade_a: Optional[float], idade_b: Optional[float], max_diferenca_segundos: float) -> bool:
+    """As duas pernas foram coletadas com no máximo max_diferenca_segundos de diferença."""
+    if max_diferenca_segundos <= 0:
+        return True
+    if idade_a is None or idade_b is None:
+        return False
+    return abs(idade_a - idade_b) <= max_diferenca_segundos
+
+
+def _varrer_loop(
+    eventos_odds: List[Tuple[Event, List[Odd]]],
+    valor_base: float,
+    min_profit_percent: float,
+    agora: datetime,
+    max_diferenca_segundos: float = 0
+) -> List[Dict]:
+    """
+    Varredura original: testa cada par de casas com loops Python.
     """
     oportunidades = []
-    
-    # NOVO: Busca eventos upcoming OU live que ainda não expiraram
-    now = datetime.utcnow()
-    cutoff_time = now - timedelta(hours=3)  # Ignora jogos de mais de 3h atrás
-    
-    events = db.query(Event).filter(
-        Event.status.in_(["upcoming", "live"]),
-        Event.event_date > cutoff_time
-    ).all()
-    
-    for event in events:
-        # Busca todas as odds desse evento
-        odds = db.query(Odd).filter(Odd.event_id == event.id).all()
-        
+
+    for event, odds in eventos_odds:
         if len(odds) < 2:
             continue
-        
+        idades = {id(odd): _idade_segundos(odd.scraped_at, agora) for odd in odds}
+
         # Testa combinações: Mandante vs Double Chance (Visitante ou Empate)
         for odd_mandante in odds:
             if odd_mandante.home_odd is None:
                 continue
-            
+
             for odd_dc in odds:
                 if odd_dc.bookmaker == odd_mandante.bookmaker:
                     continue
                 if odd_dc.away_or_draw_odd is None:
                     continue
-                
+                if not _pernas_sincronizadas(idades[id(odd_mandante)], idades[id(odd_dc)], max_diferenca_segundos):
+                    continue
+
                 resultado = calcular_hedge(
                     valor_base,
                     float(odd_mandante.home_odd),
                     float(odd_dc.away_or_draw_odd)
                 )
-                
-                if resultado["tipo"] == "profit" and resultado["lucro_percentual"] >= min_profit_percent:
-                    oportunidades.append({
-                        "event": {
-                            "home_team": event.home_team,
-                            "away_team": event.away_team,
-                            "league": event.league
-                        },
-                        "bet1": {
-                            "description": event.home_team,
-                            "bookmaker": odd_mandante.bookmaker,
-                            "market": "Resultado Final",
-                            "odd": float(odd_mandante.home_odd),
-                            "amount": valor_base
-                        },
-                        "bet2": {
-                            "description": f"{event.away_team} ou Empate",
-                            "bookmaker": odd_dc.bookmaker,
-                            "market": "Double Chance",
-                            "odd": float(odd_dc.away_or_draw_odd),
-                            "amount": resultado["aposta_oposta"]
-                        },
-                        "profit": resultado["lucro"],
-                        "profit_percent": resultado["lucro_percentual"]
-                    })
-        
+
+                if _e_oportunidade(resultado, min_profit_percent):
+                    oportunidades.append(
+                        _montar_oportunidade(
+                            event, "home",
+                            odd_mandante.bookmaker, float(odd_mandante.home_odd),
+                            odd_dc.bookmaker, float(odd_dc.away_or_draw_odd),
+                            valor_base, resultado,
+                            idades[id(odd_mandante)], idades[id(odd_dc)]
+                        )
+                    )
+
         # Testa combinações: Visitante vs Double Chance (Mandante ou Empate)
         for odd_visitante in odds:
             if odd_visitante.away_odd is None:
                 continue
-            
+
             for odd_dc in odds:
                 if odd_dc.bookmaker == odd_visitante.bookmaker:
                     continue
                 if odd_dc.home_or_draw_odd is None:
                     continue
-                
+                if not _pernas_sincronizadas(idades[id(odd_visitante)], idades[id(odd_dc)], max_diferenca_segundos):
+                    continue
+
                 resultado = calcular_hedge(
                     valor_base,
                     float(odd_visitante.away_odd),
                     float(odd_dc.home_or_draw_odd)
                 )
-                
-                if resultado["tipo"] == "profit" and resultado["lucro_percentual"] >= min_profit_percent:
-                    oportunidades.append({
-                        "event": {
-                            "home_team": event.home_team,
-                            "away_team": event.away_team,
-                            "league": event.league
-                        },
-                        "bet1": {
-                            "description": event.away_team,
-                            "bookmaker": odd_visitante.bookmaker,
-                            "market": "Resultado Final",
-                            "odd": float(odd_visitante.away_odd),
-                            "amount": valor_base
-                        },
-                        "bet2": {
-                            "description": f"{event.home_team} ou Empate",
-                            "bookmaker": odd_dc.bookmaker,
-                            "market": "Double Chance",
-                            "odd": float(odd_dc.home_or_draw_odd),
-                            "amount": resultado["aposta_oposta"]
-                        },
-                        "profit": resultado["lucro"],
-                        "profit_percent": resultado["lucro_percentual"]
-                    })
+
+                if _e_oportunidade(resultado, min_profit_percent):
+                    oportunidades.append(
+                        _montar_oportunidade(
+                            event, "away",
+                            odd_visitante.bookmaker, float(odd_visitante.away_odd),
+                            odd_dc.bookmaker, float(odd_dc.home_or_draw_odd),
+                            valor_base, resultado,
+                            idades[id(odd_visitante)], idades[id(odd_dc)]
+                        )
+                    )
+
+    return oportunidades
+
+
+def _para_float(valor) -> float:
+    return float(valor) if valor is not None else np.nan
+
+
+def _varrer_vetorizado(
+    eventos_odds: List[Tuple[Event, List[Odd]]],
+    valor_base: float,
+    min_profit_percent: float,
+    agora: datetime,
+    max_diferenca_segundos: float = 0
+) -> List[Dict]:
+    """
+    Varredura com NumPy: monta matrizes (eventos x linhas de odds) e avalia
+    todos os pares de casas de uma vez. Só os pares que passam no filtro
+    viram dict (via calcular_hedge, para manter o arredondamento idêntico).
+    """
+    eventos_odds = [(event, odds) for event, odds in eventos_odds if len(odds) >= 2]
+    if not eventos_odds:
+        return []
+
+    formato = (len(eventos_odds), max(len(odds) for _, odds in eventos_odds))
+    home = np.full(formato, np.nan)
+    away = np.full(formato, np.nan)
+    home_or_draw = np.full(formato, np.nan)
+    away_or_draw = np.full(formato, np.nan)
+    idades = np.full(formato, np.nan)
+    casas = np.full(formato, -1, dtype=np.int64)
+    ids_casas = {}
+
+    for i, (_, odds) in enumerate(eventos_odds):
+        for j, odd in enumerate(odds):
+            home[i, j] = _para_float(odd.home_odd)
+            away[i, j] = _para_float(odd.away_odd)
+            home_or_draw[i, j] = _para_float(odd.home_or_draw_odd)
+            away_or_draw[i, j] = _para_float(odd.away_or_draw_odd)
+            idades[i, j] = _para_float(_idade_segundos(odd.scraped_at, agora))
+            casas[i, j] = ids_casas.setdefault(odd.bookmaker, len(ids_casas))
+
+    # [evento, linha da aposta, linha da Double Chance]
+    pares_validos = casas[:, :, None] != casas[:, None, :]
+    if max_diferenca_segundos > 0:
+        # NaN (sem scraped_at) falha a comparação, como em _pernas_sincronizadas
+        pares_validos &= np.abs(idades[:, :, None] - idades[:, None, :]) <= max_diferenca_segundos
+
+    # Mesma conta de calcular_hedge; a margem cobre o arredondamento do
+    # lucro_percentual, a decisão final é feita por calcular_hedge abaixo
+    candidatos = []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for n_lado, (odd_time, odd_dc) in enumerate(((home, away_or_draw), (away, home_or_draw))):
+            a = odd_time[:, :, None]
+            b = odd_dc[:, None, :]
+            aposta_oposta = (valor_base * a) / b
+            total_investido = valor_base + aposta_oposta
+            retorno = np.minimum(valor_base * a, aposta_oposta * b)
+            lucro = retorno - total_investido
+            lucro_percentual = (lucro / total_investido) * 100
+
+            mascara = pares_validos & (lucro > 0) & (lucro_percentual >= min_profit_percent - 0.01)
+            for i, j, k in zip(*np.nonzero(mascara)):
+                candidatos.append((int(i), n_lado, int(j), int(k)))
+
+    # Mesma ordem de inserção da varredura em loop (evento, lado, aposta, DC)
+    candidatos.sort()
+
+    oportunidades = []
+    for i, n_lado, j, k in candidatos:
+        event, odds = eventos_odds[i]
+        if n_lado == 0:
+            time_usuario, odd_time, odd_dc = "home", home[i, j], away_or_draw[i, k]
+        else:
+            time_usuario, odd_time, odd_dc = "away", away[i, j], home_or_draw[i, k]
+
+        resultado = calcular_hedge(valor_base, float(odd_time), float(odd_dc))
+        if _e_oportunidade(resultado, min_profit_percent):
+            oportunidades.append(
+                _montar_oportunidade(
+                    event, time_usuario,
+                    odds[j].bookmaker, float(odd_time),
+                    odds[k].bookmaker, float(odd_dc),
+                    valor_base, resultado,
+                    _idade_segundos(odds[j].scraped_at, agora),
+                    _idade_segundos(odds[k].scraped_at, agora)
+                )
+            )
+
+    return oportunidades
+
+
+def avaliar_eventos(
+    events: List[Event],
+    valor_base: float = 100.0,
+    min_profit_percent: float = 1.0,
+    vetorizado: bool = True,
+    agora: Optional[datetime] = None,
+    max_diferenca_minutos: Optional[float] = None
+) -> List[Dict]:
+    """
+    Avalia os eventos informados usando as odds já carregadas em event.odds
+    (que devem vir filtradas por criterio_odds_validas). Não ordena o resultado.
+    """
+    if agora is None:
+        agora = datetime.utcnow()
+    if max_diferenca_minutos is None:
+        max_diferenca_minutos = MAX_DIFERENCA_PERNAS_MINUTOS
+    
+    eventos_odds = [(event, list(event.odds)) for event in events]
+    varrer = _varrer_vetorizado if vetorizado else _varrer_loop
+    return varrer(eventos_odds, valor_base, min_profit_percent, agora, max_diferenca_minutos * 60)
+
+
+def buscar_oportunidades_automaticas(
+    db: Session,
+    valor_base: float = 100.0,
+    min_profit_percent: float = 1.0,
+    vetorizado: bool = True,
+    max_idade_minutos: Optional[float] = None,
+    max_diferenca_minutos: Optional[float] = None
+) -> List[Dict]:
+    """
+    Busca oportunidades de arbitragem automaticamente usando Double Chance.
+    Filtra apenas eventos ativos (upcoming ou live) e recentes, e odds
+    ativas e frescas.
+    
+    Args:
+        db: Sessão do banco
+        valor_base: Valor base para calcular (default: R$ 100)
+        min_profit_percent: Lucro mínimo em % (default: 1%)
+        vetorizado: Usa a varredura com NumPy (default) ou os loops Python
+        max_idade_minutos: Idade máxima de cada perna (default: ODDS_MAX_AGE_MINUTES)
+        max_diferenca_minutos: Diferença máxima entre o scraped_at das duas
+            pernas (default: ODDS_MAX_SKEW_MINUTES)
+    
+    Returns:
+        Lista de oportunidades encontradas (ResultadoScan, com sql_statements)
+    """
+    # NOVO: Busca eventos upcoming OU live que ainda não expiraram
+    now = datetime.utcnow()
+    cutoff_time = now - timedelta(hours=3)  # Ignora jogos de mais de 3h atrás
+    
+    with contar_statements(db) as contador:
+        # Eventos + odds ativas e frescas em duas queries (sem uma query por evento)
+        events = db.query(Event).options(
+            selectinload(Event.odds.and_(criterio_odds_validas(now, max_idade_minutos)))
+        ).filter(
+            Event.status.in_(["upcoming", "live"]),
+            Event.event_date > cutoff_time
+        ).all()
+        
+        oportunidades = avaliar_eventos(
+            events, valor_base, min_profit_percent, vetorizado, now, max_diferenca_minutos
+        )
     
     # Ordena por lucro percentual (melhor primeiro)
     oportunidades.sort(key=lambda x: x["profit_percent"], reverse=True)
     
+    resultado = ResultadoScan(oportunidades)
+    resultado.sql_statements = contador.total
+    resultado.eventos_avaliados = len(events)
+    return resultado
+
+
+def processar_arbitragem_em_cache(
+    db: Session,
+    event_id: str,
+    time_usuario: str,
+    bookmaker_usuario: str,
+    aposta_usuario: float
+) -> Optional[Dict]:
+    """
+    processar_arbitragem servido do cache enquanto a versão das odds não muda.
+    """
+    return cache_arbitragem.obter_ou_calcular(
+        ("quote", event_id, time_usuario, bookmaker_usuario, aposta_usuario),
+        obter_versao(db),
+        lambda: processar_arbitragem(db, event_id, time_usuario, bookmaker_usuario, aposta_usuario)
+    )
+
+
+def buscar_oportunidades_em_cache(
+    db: Session,
+    valor_base: float = 100.0,
+    min_profit_percent: float = 1.0
+) -> List[Dict]:
+    """
+    buscar_oportunidades_automaticas servida do cache enquanto a versão das
+    odds não muda (ou até o TTL do cache).
+    """
+    return cache_arbitragem.obter_ou_calcular(
+        ("scan", valor_base, min_profit_percent),
+        obter_versao(db),
+        lambda: buscar_oportunidades_automaticas(db, valor_base, min_profit_percent)
+    )
+
+
+def _min_scraped_at(agora: datetime, max_idade_minutos: Optional[float]) -> Optional[datetime]:
+    if max_idade_minutos is None:
+        max_idade_minutos = MAX_IDADE_ODD_MINUTOS
+    return agora - timedelta(minutes=max_idade_minutos) if max_idade_minutos > 0 else None
+
+
+def _idade_da_linha(linha: Dict, agora: datetime) -> Optional[float]:
+    return _idade_segundos(scraped_at_da_linha(linha), agora)
+
+
+LADOS = (
+    ("home", "home_odd", "away_or_draw_odd"),
+    ("away", "away_odd", "home_or_draw_odd"),
+)
+
+
+def _carregar_odds_validas(db: Session, event_ids: List[str], agora: datetime, max_idade_minutos: Optional[float]) -> List[Event]:
+    """Eventos com as odds ativas e frescas (recarregadas mesmo se já estavam na sessão)."""
+    return db.query(Event).options(
+        selectinload(Event.odds.and_(criterio_odds_validas(agora, max_idade_minutos)))
+    ).filter(Event.id.in_(event_ids)).execution_options(populate_existing=True).all()
+
+
+def _melhores_do_evento(
+    event: Event,
+    linhas: Dict[str, List[Dict]],
+    valor_base: float,
+    min_profit_percent: float,
+    agora: datetime,
+    min_scraped_at: Optional[datetime],
+    max_diferenca_segundos: float
+) -> List[Dict]:
+    oportunidades = []
+    for time_usuario, mercado_aposta, mercado_dc in LADOS:
+        par = melhor_par(linhas, mercado_aposta, mercado_dc, min_scraped_at, max_diferenca_segundos)
+        if par is None:
+            continue
+        aposta, oposta = par
+        
+        resultado = calcular_hedge(valor_base, aposta["odd"], oposta["odd"])
+        if _e_oportunidade(resultado, min_profit_percent):
+            oportunidades.append(
+                _montar_oportunidade(
+                    event, time_usuario,
+                    aposta["bookmaker"], aposta["odd"],
+                    oposta["bookmaker"], oposta["odd"],
+                    valor_base, resultado,
+                    _idade_da_linha(aposta, agora), _idade_da_linha(oposta, agora)
+                )
+            )
+    return oportunidades
+
+
+def avaliar_best_lines(
+    db: Session,
+    pares: Iterable[Tuple[Event, BestLine]],
+    valor_base: float = 100.0,
+    min_profit_percent: float = 1.0,
+    agora: Optional[datetime] = None,
+    max_idade_minutos: Optional[float] = None,
+    max_diferenca_minutos: Optional[float] = None
+) -> List[Dict]:
+    """
+    Avalia os eventos pela tabela de best lines: só a melhor combinação de
+    cada lado (mandante e visitante) por evento. Não ordena o resultado.
+    
+    Eventos cujo top 2 tem uma odd velha ou fora da diferença máxima entre
+    as pernas (top2_confiavel) são avaliados pelas odds ativas e frescas,
+    numa query só para eles: a odd descartada pode esconder a melhor.
+    """
+    if agora is None:
+        agora = datetime.utcnow()
+    min_scraped_at = _min_scraped_at(agora, max_idade_minutos)
+    if max_diferenca_minutos is None:
+        max_diferenca_minutos = MAX_DIFERENCA_PERNAS_MINUTOS
+    max_diferenca_segundos = max_diferenca_minutos * 60
+    
+    oportunidades = []
+    pelas_odds = []
+    for event, best_line in pares:
+        if all(
+            top2_confiavel(best_line.lines, (mercado_aposta, mercado_dc), min_scraped_at, max_diferenca_segundos)
+            for _, mercado_aposta, mercado_dc in LADOS
+        ):
+            oportunidades.extend(_melhores_do_evento(
+                event, best_line.lines, valor_base, min_profit_percent, agora, min_scraped_at, max_diferenca_segundos
+            ))
+        else:
+            pelas_odds.append(event.id)
+    
+    if pelas_odds:
+        for event in _carregar_odds_validas(db, pelas_odds, agora, max_idade_minutos):
+            linhas, _ = linhas_por_casa(event.odds)
+            oportunidades.extend(_melhores_do_evento(
+                event, linhas, valor_base, min_profit_percent, agora, min_scraped_at, max_diferenca_segundos
+            ))
+    
     return oportunidades
 
 
+def buscar_melhores_oportunidades(
+    db: Session,
+    valor_base: float = 100.0,
+    min_profit_percent: float = 1.0,
+    max_idade_minutos: Optional[float] = None,
+    max_diferenca_minutos: Optional[float] = None
+) -> List[Dict]:
+    """
+    Versão O(eventos) da busca: usa a tabela de best lines e retorna só a
+    melhor combinação de cada lado (mandante e visitante) por evento.
+    Eventos com menos de duas casas são descartados na própria query.
+    
+    Args:
+        db: Sessão do banco
+        valor_base: Valor base para calcular (default: R$ 100)
+        min_profit_percent: Lucro mínimo em % (default: 1%)
+        max_idade_minutos: Idade máxima de cada perna (default: ODDS_MAX_AGE_MINUTES)
+        max_diferenca_minutos: Diferença máxima entre as pernas (default: ODDS_MAX_SKEW_MINUTES)
+    
+    Returns:
+        Lista de oportunidades encontradas (ResultadoScan, com sql_statements)
+    """
+    agora = datetime.utcnow()
+    cutoff_time = agora - timedelta(hours=3)
+    
+    with contar_statements(db) as contador:
+        linhas = db.query(Event, BestLine).join(BestLine, BestLine.event_id == Event.id).filter(
+            Event.status.in_(["upcoming", "live"]),
+            Event.event_date > cutoff_time,
+            BestLine.bookmaker_count >= 2
+        ).all()
+        
+        oportunidades = ResultadoScan(avaliar_best_lines(
+            db, linhas, valor_base, min_profit_percent, agora, max_idade_minutos, max_diferenca_minutos
+        ))
+    
+    oportunidades.sql_statements = contador.total
+    oportunidades.eventos_avaliados = len(linhas)
+    oportunidades.sort(key=lambda x: x["profit_percent"], reverse=True)
+    
+    return oportunidades
+
+
+MERCADOS_1X2 = ("home_odd", "draw_odd", "away_odd")
+
+# Posição (no top 2) da odd de cada resultado, para as 8 combinações de surebet
+COMBINACOES_1X2 = np.array(list(itertools.product((0, 1), repeat=3)))
+
+
+def calcular_surebet_1x2(
+    banca: float,
+    odd_home: float,
+    odd_draw: float,
+    odd_away: float
+) -> Dict:
+    """
+    Calcula a divisão da banca entre os três resultados (1, X, 2) para que o
+    retorno seja o mesmo em qualquer resultado.
+    
+    Args:
+        banca: Valor total a apostar
+        odd_home: Odd do mandante
+        odd_draw: Odd do empate
+        odd_away: Odd do visitante
+    
+    Returns:
+        Dict com a soma das probabilidades implícitas, apostas e lucro
+    """
+    soma_probabilidades = 1 / odd_home + 1 / odd_draw + 1 / odd_away
+    retorno_garantido = banca / soma_probabilidades
+    lucro = retorno_garantido - banca
+    
+    return {
+        "soma_probabilidades": round(soma_probabilidades, 4),
+        "apostas": [round(retorno_garantido / odd, 2) for odd in (odd_home, odd_draw, odd_away)],
+        "total_investido": round(banca, 2),
+        "retorno_garantido": round(retorno_garantido, 2),
+        "lucro": round(lucro, 2),
+        "lucro_percentual": round((lucro / banca) * 100, 2)
+    }
+
+
+def _surebets_do_top2(linhas: List[Tuple[Event, BestLine]], min_profit_percent: float) -> List[Tuple[Event, List[Dict]]]:
+    """
+    Melhor combinação de cada evento a partir do top 2 de cada resultado,
+    avaliando com NumPy as 8 combinações de uma vez. Combinações em que as
+    três odds vêm da mesma casa são descartadas.
+    """
+    if not linhas:
+        return []
+    
+    # [evento, resultado, posição no top 2]: odd e casa de cada perna possível
+    pernas = [
+        (best_line.lines.get(mercado, []) + [None, None])[:2]
+        for _, best_line in linhas
+        for mercado in MERCADOS_1X2
+    ]
+    ids_casas = {}
+    odds = np.array(
+        [[perna["odd"] if perna else np.nan for perna in top] for top in pernas], dtype=float
+    ).reshape(len(linhas), 3, 2)
+    casas = np.array(
+        [[ids_casas.setdefault(perna["bookmaker"], len(ids_casas)) if perna else -1 for perna in top] for top in pernas],
+        dtype=np.int64
+    ).reshape(len(linhas), 3, 2)
+    
+    # [evento, combinação, resultado]
+    resultados = np.arange(3)
+    odds_combinacao = odds[:, resultados, COMBINACOES_1X2]
+    casas_combinacao = casas[:, resultados, COMBINACOES_1X2]
+    mesma_casa = (casas_combinacao[:, :, 0] == casas_combinacao[:, :, 1]) & (casas_combinacao[:, :, 1] == casas_combinacao[:, :, 2])
+    validas = ~np.isnan(odds_combinacao).any(axis=2) & ~mesma_casa
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        soma_probabilidades = np.where(validas, (1 / odds_combinacao).sum(axis=2), np.inf)
+    melhor_combinacao = soma_probabilidades.argmin(axis=1)
+    menor_soma = soma_probabilidades[np.arange(len(linhas)), melhor_combinacao]
+    lucro_percentual = (1 / menor_soma - 1) * 100
+    # Margem para o arredondamento; a decisão final usa calcular_surebet_1x2
+    candidatos = np.nonzero(lucro_percentual >= min_profit_percent - 0.01)[0]
+    
+    combinacoes = []
+    for i in candidatos:
+        posicoes = COMBINACOES_1X2[melhor_combinacao[i]]
+        combinacoes.append((linhas[i][0], [pernas[i * 3 + j][posicoes[j]] for j in range(3)]))
+    return combinacoes
+
+
+def _surebet_das_odds(linhas: Dict[str, List[Dict]], max_diferenca_segundos: float) -> Optional[List[Dict]]:
+    """
+    Melhor combinação testando a melhor odd de cada casa em cada resultado
+    (pernas de pelo menos duas casas, coletadas dentro da diferença máxima).
+    """
+    melhor = None
+    for pernas in itertools.product(*(linhas[mercado] for mercado in MERCADOS_1X2)):
+        if len({perna["bookmaker"] for perna in pernas}) == 1:
+            continue
+        if not sincronizadas(pernas, max_diferenca_segundos):
+            continue
+        soma = sum(1 / perna["odd"] for perna in pernas)
+        if melhor is None or soma < melhor[0]:
+            melhor = (soma, list(pernas))
+    return melhor[1] if melhor else None
+
+
+def buscar_surebets_1x2(
+    db: Session,
+    banca: float = 100.0,
+    min_profit_percent: float = 1.0,
+    max_idade_minutos: Optional[float] = None,
+    max_diferenca_minutos: Optional[float] = None
+) -> List[Dict]:
+    """
+    Busca surebets de três pernas (1, X e 2) combinando as odds de cada
+    resultado entre as casas, a partir da tabela de best lines.
+    Para cada evento combina as duas melhores odds de cada resultado e fica
+    com a combinação de menor soma de probabilidades implícitas (três odds da
+    mesma casa não valem; nesse caso a segunda melhor odd de um dos
+    resultados é usada). Eventos cujo top 2 tem uma odd velha ou fora da
+    diferença máxima (top2_confiavel) são avaliados pelas odds ativas e
+    frescas, numa query só para eles.
+    
+    Args:
+        db: Sessão do banco
+        banca: Valor total a dividir entre as três apostas (default: R$ 100)
+        min_profit_percent: Lucro mínimo em % (default: 1%)
+        max_idade_minutos: Idade máxima de cada perna (default: ODDS_MAX_AGE_MINUTES)
+        max_diferenca_minutos: Diferença máxima entre as três pernas (default: ODDS_MAX_SKEW_MINUTES)
+    
+    Returns:
+        Lista de surebets encontradas (ResultadoScan, com sql_statements)
+    """
+    agora = datetime.utcnow()
+    cutoff_time = agora - timedelta(hours=3)
+    min_scraped_at = _min_scraped_at(agora, max_idade_minutos)
+    if max_diferenca_minutos is None:
+        max_diferenca_minutos = MAX_DIFERENCA_PERNAS_MINUTOS
+    max_diferenca_segundos = max_diferenca_minutos * 60
+    
+    with contar_statements(db) as contador:
+        linhas = db.query(Event, BestLine).join(BestLine, BestLine.event_id == Event.id).filter(
+            Event.status.in_(["upcoming", "live"]),
+            Event.event_date > cutoff_time,
+            BestLine.bookmaker_count >= 2
+        ).all()
+        
+        confiaveis, pelas_odds = [], []
+        for event, best_line in linhas:
+            if top2_confiavel(best_line.lines, MERCADOS_1X2, min_scraped_at, max_diferenca_segundos):
+                confiaveis.append((event, best_line))
+            else:
+                pelas_odds.append(event.id)
+        
+        combinacoes = _surebets_do_top2(confiaveis, min_profit_percent)
+        if pelas_odds:
+            for event in _carregar_odds_validas(db, pelas_odds, agora, max_idade_minutos):
+                melhores = _surebet_das_odds(linhas_por_casa(event.odds)[0], max_diferenca_segundos)
+                if melhores is not None:
+                    combinacoes.append((event, melhores))
+    
+    surebets = ResultadoScan()
+    surebets.sql_statements = contador.total
+    surebets.eventos_avaliados = len(linhas)
+    
+    for event, melhores in combinacoes:
+        resultado = calcular_surebet_1x2(banca, *(melhor["odd"] for melhor in melhores))
+        if resultado["lucro"] <= 0 or resultado["lucro_percentual"] < min_profit_percent:
+            continue
+        
+        descricoes = (event.home_team, "Empate", event.away_team)
+        surebets.append({
+            "event": {
+                "id": event.id,
+                "home_team": event.home_team,
+                "away_team": event.away_team,
+                "league": event.league
+            },
+            "bets": [
+                {
+                    "description": descricao,
+                    "bookmaker": melhor["bookmaker"],
+                    "market": "Resultado Final",
+                    "odd": melhor["odd"],
+                    "amount": aposta,
+                    "age_seconds": _arredondar_idade(_idade_da_linha(melhor, agora))
+                }
+                for descricao, melhor, aposta in zip(descricoes, melhores, resultado["apostas"])
+            ],
+            "implied_probability_sum": resultado["soma_probabilidades"],
+            "total_invested": resultado["total_investido"],
+            "guaranteed_return": resultado["retorno_garantido"],
+            "profit": resultado["lucro"],
+            "profit_percent": resultado["lucro_percentual"]
+        })
+    
+    surebets.sort(key=lambda x: x["profit_percent"], reverse=True)
+    
+    return surebets
+
+
 def limpar_eventos_antigos(db: Session):
     """
     Marca eventos antigos como 'finished' para não processar mais.
     Eventos são considerados antigos se passaram mais de 3h do horário do jogo.
     """
-    cutoff_time = datetime.utcnow() - timedelta(hours=3)
+    now = datetime.utcnow()
+    cutoff_time = now - timedelta(hours=3)
     
-    # Atualiza status para finished
+    # Atualiza status para finished (e marca como sujos para o recálculo incremental)
     updated = db.query(Event).filter(
         Event.event_date < cutoff_time,
         Event.status != "finished"
-    ).update({"status": "finished"})
+    ).update({"status": "finished", "odds_updated_at": now}, synchronize_session=False)
     
     if updated > 0:
+        incrementar_versao(db)
         db.commit()
         print(f"✅ Marcados {updated} evento(s) como finalizados")
\ No newline at end of file
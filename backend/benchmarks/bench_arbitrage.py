@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark do motor de arbitragem com mercado sintético.
+
+Gera N eventos x M casas com odds sintéticas, grava no banco (SQLite ou
+Postgres local) e mede throughput e latência (p50/p95/p99) de:
+    - varredura (vetorizada, em loop e por best lines)
+    - cotação única (processar_arbitragem)
+    - cálculo de hedge (calcular_hedge e calcular_hedge_lote)
+
+Uso (a partir de backend/):
+    python benchmarks/bench_arbitrage.py --eventos 200 --casas 6 --saida antes.json
+    python benchmarks/bench_arbitrage.py --eventos 200 --casas 6 --comparar antes.json
+
+ATENÇÃO: as tabelas do banco informado são recriadas. Não use o banco de produção.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte", "sportingbet", "pixbet", "kto", "novibet"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de arbitragem")
+    parser.add_argument("--database-url", default="sqlite:///bench_arbitrage.db",
+                        help="Banco usado no benchmark (default: SQLite local)")
+    parser.add_argument("--eventos", type=int, default=100, help="Número de eventos")
+    parser.add_argument("--casas", type=int, default=4, help="Número de casas por evento")
+    parser.add_argument("--distribuicao", choices=["equilibrada", "favorito", "mista"], default="mista",
+                        help="Distribuição das probabilidades reais dos jogos")
+    parser.add_argument("--margem", type=float, default=0.06, help="Margem média das casas (0.06 = 6%%)")
+    parser.add_argument("--ruido", type=float, default=0.03, help="Variação das odds entre casas")
+    parser.add_argument("--densidade", type=float, default=0.05,
+                        help="Fração de eventos com arbitragem injetada (0 a 1)")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Repetições da varredura")
+    parser.add_argument("--cotacoes", type=int, default=500, help="Número de cotações únicas")
+    parser.add_argument("--hedges", type=int, default=10000, help="Número de cálculos de hedge")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON para salvar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    return parser.parse_args()
+
+
+def probabilidades_reais(rng: random.Random, distribuicao: str):
+    if distribuicao == "mista":
+        distribuicao = rng.choice(["equilibrada", "favorito"])
+    if distribuicao == "equilibrada":
+        p_home = rng.uniform(0.32, 0.45)
+        p_draw = rng.uniform(0.25, 0.32)
+    else:
+        p_home = rng.uniform(0.55, 0.75)
+        p_draw = rng.uniform(0.15, 0.25)
+    if rng.random() < 0.5:
+        # Favorito pode ser o visitante
+        return 1 - p_home - p_draw, p_draw, p_home
+    return p_home, p_draw, 1 - p_home - p_draw
+
+
+def gerar_mercado(db, args):
+    """
+    Gera eventos e odds sintéticas. Em uma fração (densidade) dos eventos uma
+    casa recebe uma odd de mandante inflada, criando arbitragem com Double Chance.
+    """
+    from models import Event, Odd
+    
+    rng = random.Random(args.seed)
+    casas = (CASAS * (args.casas // len(CASAS) + 1))[:args.casas]
+    casas = [casa if i < len(CASAS) else f"{casa}_{i}" for i, casa in enumerate(casas)]
+    now = datetime.utcnow()
+    n_odds = 0
+    n_arbitragens = 0
+    
+    for e in range(args.eventos):
+        event_id = f"evt_bench_{e}"
+        db.add(Event(
+            id=event_id,
+            sport="Futebol",
+            league=rng.choice(["brasileirao-serie-a", "brasileirao-serie-b", "premier-league"]),
+            home_team=f"Mandante {e}",
+            away_team=f"Visitante {e}",
+            event_date=now + timedelta(hours=rng.uniform(-1, 72)),
+            status="upcoming"
+        ))
+        
+        p_home, p_draw, p_away = probabilidades_reais(rng, args.distribuicao)
+        casa_inflada = rng.choice(casas) if rng.random() < args.densidade else None
+        n_arbitragens += casa_inflada is not None
+        
+        for casa in casas:
+            margem = 1 + max(0.0, rng.gauss(args.margem, args.margem / 3))
+            odd = lambda p: Decimal(str(round(max(1.01, 1 / (p * margem) * (1 + rng.gauss(0, args.ruido))), 2)))
+            home_odd = odd(p_home)
+            if casa == casa_inflada:
+                home_odd = Decimal(str(round(float(home_odd) * rng.uniform(1.15, 1.35), 2)))
+            db.add(Odd(
+                id=f"odd_bench_{e}_{casa}",
+                event_id=event_id,
+                bookmaker=casa,
+                home_odd=home_odd,
+                draw_odd=odd(p_draw),
+                away_odd=odd(p_away),
+                home_or_draw_odd=odd(p_home + p_draw),
+                away_or_draw_odd=odd(p_away + p_draw),
+                scraped_at=now,
+                is_active=True
+            ))
+            n_odds += 1
+    
+    db.commit()
+    return {"eventos": args.eventos, "odds": n_odds, "eventos_com_arbitragem": n_arbitragens}
+
+
+def medir(funcao, repeticoes: int):
+    """Executa a função N vezes e retorna throughput e percentis de latência (ms)."""
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao(i)
+        latencias.append((time.perf_counter() - t0) * 1000)
+    duracao = time.perf_counter() - inicio
+    
+    latencias.sort()
+    percentil = lambda p: latencias[min(len(latencias) - 1, int(round(p / 100 * (len(latencias) - 1))))]
+    return {
+        "repeticoes": repeticoes,
+        "ops_por_segundo": round(repeticoes / duracao, 2) if duracao > 0 else None,
+        "media_ms": round(statistics.fmean(latencias), 4),
+        "p50_ms": round(percentil(50), 4),
+        "p95_ms": round(percentil(95), 4),
+        "p99_ms": round(percentil(99), 4),
+    }
+
+
+def versao_git():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def comparar(resultados, arquivo_anterior):
+    anteriores = json.loads(Path(arquivo_anterior).read_text())["benchmarks"]
+    print(f"\n📊 Comparação com {arquivo_anterior} (p50 e ops/s):")
+    for nome, atual in resultados.items():
+        anterior = anteriores.get(nome)
+        if not anterior:
+            print(f"   • {nome}: sem referência")
+            continue
+        delta = (atual["p50_ms"] / anterior["p50_ms"] - 1) * 100 if anterior["p50_ms"] else 0.0
+        print(f"   • {nome}: p50 {anterior['p50_ms']} → {atual['p50_ms']} ms ({delta:+.1f}%), "
+              f"{anterior['ops_por_segundo']} → {atual['ops_por_segundo']} ops/s")
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    
+    from models import Base, SessionLocal, engine, Event, Odd
+    from best_lines import reconstruir_best_lines
+    from arbitrage import (
+        buscar_oportunidades_automaticas,
+        buscar_melhores_oportunidades,
+        processar_arbitragem,
+        calcular_hedge,
+        calcular_hedge_lote,
+    )
+    
+    print(f"🧪 Gerando mercado sintético ({args.eventos} eventos x {args.casas} casas)...")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    mercado = gerar_mercado(db, args)
+    reconstruir_best_lines(db)
+    
+    rng = random.Random(args.seed)
+    odds = db.query(Odd.event_id, Odd.bookmaker).all()
+    hedges = [(rng.choice([10, 20, 50, 100]), rng.uniform(1.5, 4.0), rng.uniform(1.1, 2.5)) for _ in range(args.hedges)]
+    
+    resultados = {}
+    
+    print("⏱️  Varredura...")
+    n_oportunidades = len(buscar_oportunidades_automaticas(db, min_profit_percent=1.0))
+    resultados["scan_vetorizado"] = medir(
+        lambda _: buscar_oportunidades_automaticas(db, min_profit_percent=1.0), args.repeticoes
+    )
+    resultados["scan_loop"] = medir(
+        lambda _: buscar_oportunidades_automaticas(db, min_profit_percent=1.0, vetorizado=False), args.repeticoes
+    )
+    resultados["scan_best_lines"] = medir(
+        lambda _: buscar_melhores_oportunidades(db, min_profit_percent=1.0), args.repeticoes
+    )
+    db.expire_all()
+    
+    print("⏱️  Cotações...")
+    cotacoes = [(*rng.choice(odds), rng.choice(["home", "away"])) for _ in range(args.cotacoes)]
+    resultados["quote"] = medir(
+        lambda i: processar_arbitragem(db, cotacoes[i][0], cotacoes[i][2], cotacoes[i][1], 100.0),
+        args.cotacoes
+    )
+    
+    print("⏱️  Hedge...")
+    resultados["hedge"] = medir(lambda i: calcular_hedge(*hedges[i]), args.hedges)
+    apostas, odds_usuario, odds_opostas = (list(coluna) for coluna in zip(*hedges))
+    lote = medir(lambda _: calcular_hedge_lote(apostas, odds_usuario, odds_opostas), max(1, args.repeticoes))
+    lote["cenarios_por_lote"] = len(hedges)
+    resultados["hedge_lote"] = lote
+    
+    db.close()
+    
+    relatorio = {
+        "executado_em": datetime.utcnow().isoformat(),
+        "git": versao_git(),
+        "banco": engine.dialect.name,
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar", "database_url")},
+        "mercado": {**mercado, "oportunidades": n_oportunidades},
+        "benchmarks": resultados,
+    }
+    
+    print("\n" + "=" * 60)
+    print(f"🥛 Benchmark de arbitragem ({relatorio['banco']}, git {relatorio['git']})")
+    print("=" * 60)
+    print(f"Mercado: {mercado['eventos']} eventos, {mercado['odds']} odds, {n_oportunidades} oportunidade(s)")
+    for nome, r in resultados.items():
+        print(f"   • {nome:16s} {r['ops_por_segundo']:>12} ops/s | p50 {r['p50_ms']} ms | "
+              f"p95 {r['p95_ms']} ms | p99 {r['p99_ms']} ms")
+    
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        print(f"\n💾 Resultados salvos em {args.saida}")
+    
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
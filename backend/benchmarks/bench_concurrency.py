@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência da API com carga mista de leitura e escrita.
+
+Dispara N clientes simultâneos contra uma API rodando (uvicorn) durante um
+tempo fixo, sorteando cada requisição pelos pesos de --mix:
+    - events: GET /api/events (modelo de leitura em memória)
+    - events_db: GET /api/events?has_arbitrage=false (consulta ao banco)
+    - scraper: POST /api/odds/scraper com um lote de odds (escrita)
+    - quote: POST /api/arbitrage/quote de um evento/casa existente
+
+Mede requisições por segundo e latência (p50/p95/p99) por tipo e no total.
+Serve para comparar a camada síncrona com a assíncrona (DB_ASYNC) no mesmo
+banco: rode a API com cada configuração e compare as saídas.
+
+Uso (a partir de backend/, com a API em outro terminal):
+    DB_ASYNC=false uvicorn main:app --port 8000
+    python benchmarks/bench_concurrency.py --url http://localhost:8000 --saida sync.json
+    DB_ASYNC=true uvicorn main:app --port 8000
+    python benchmarks/bench_concurrency.py --url http://localhost:8000 --comparar sync.json
+
+ATENÇÃO: o tipo scraper grava odds de eventos sintéticos no banco da API. Não
+use contra produção.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+TIPOS = ("events", "events_db", "scraper", "quote")
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência da API (leitura e escrita)")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base da API")
+    parser.add_argument("--concorrencia", type=int, default=64, help="Clientes simultâneos")
+    parser.add_argument("--duracao", type=float, default=20.0, help="Duração da medição (segundos)")
+    parser.add_argument("--aquecimento", type=float, default=2.0, help="Aquecimento antes de medir (segundos)")
+    parser.add_argument("--mix", default="events=50,events_db=20,scraper=20,quote=10",
+                        help="Pesos por tipo de requisição (events, events_db, scraper, quote)")
+    parser.add_argument("--eventos", type=int, default=200, help="Eventos sintéticos usados pelo scraper")
+    parser.add_argument("--registros", type=int, default=40, help="Registros por POST do scraper")
+    parser.add_argument("--limite", type=int, default=100, help="limit= das leituras de /api/events")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON para salvar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    return parser.parse_args()
+
+
+def interpretar_mix(mix: str):
+    pesos = {}
+    for parte in mix.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in TIPOS:
+            raise SystemExit(f"❌ Tipo inválido em --mix: {nome}. Use: {', '.join(TIPOS)}")
+        pesos[nome] = float(peso or 1)
+    return pesos
+
+
+def registro_scraper(rng: random.Random, args, indice: int, casa: str, tipo: str):
+    """Registro no formato dos scrapers (ver fast_json)."""
+    inicio = (datetime.utcnow() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    odd = lambda base: round(base * rng.uniform(0.9, 1.1), 2)
+    if tipo == "1X2":
+        selecoes = [("1", odd(2.2)), ("X", odd(3.3)), ("2", odd(3.4))]
+    else:
+        selecoes = [("1X", odd(1.35)), ("X2", odd(1.6))]
+    return {
+        "source": casa,
+        "sport": "Futebol",
+        "competition": "bench-concorrencia",
+        "event": {
+            "id": f"bench_{indice}",
+            "name": f"Mandante Bench {indice} vs Visitante Bench {indice}",
+            "start_time": inicio.isoformat() + "Z",
+        },
+        "market": {
+            "type": tipo,
+            "name": tipo,
+            "selections": [{"key": chave, "name": chave, "odd": valor} for chave, valor in selecoes],
+        },
+        "collected_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def payload_scraper(rng: random.Random, args):
+    casa = rng.choice(CASAS)
+    indices = rng.sample(range(args.eventos), min(args.eventos, max(1, args.registros // 2)))
+    return {"data": [
+        registro_scraper(rng, args, indice, casa, tipo) for indice in indices for tipo in ("1X2", "Double Chance")
+    ]}
+
+
+async def requisicao(cliente: httpx.AsyncClient, tipo: str, rng: random.Random, args, cotacoes):
+    if tipo == "events":
+        return await cliente.get("/api/events", params={"limit": args.limite})
+    if tipo == "events_db":
+        return await cliente.get("/api/events", params={"limit": args.limite, "has_arbitrage": "false"})
+    if tipo == "scraper":
+        return await cliente.post("/api/odds/scraper", json=payload_scraper(rng, args))
+    event_id, casa = rng.choice(cotacoes)
+    return await cliente.post("/api/arbitrage/quote", json={
+        "eventId": event_id, "team": rng.choice(["home", "away"]), "bookmaker": casa, "amount": 100.0
+    })
+
+
+async def preparar(cliente: httpx.AsyncClient, rng: random.Random, args):
+    """
+    Garante os eventos sintéticos no banco e devolve os pares (evento, casa)
+    usados nas cotações.
+    """
+    for casa in CASAS:
+        for inicio in range(0, args.eventos, 100):
+            lote = range(inicio, min(args.eventos, inicio + 100))
+            resposta = await cliente.post("/api/odds/scraper", json={"data": [
+                registro_scraper(rng, args, indice, casa, tipo) for indice in lote for tipo in ("1X2", "Double Chance")
+            ]})
+            resposta.raise_for_status()
+    
+    resposta = await cliente.get("/api/events", params={"limit": 1000, "fields": "homeOdd", "league": "bench-concorrencia"})
+    resposta.raise_for_status()
+    cotacoes = [
+        (evento["eventId"], casa)
+        for evento in resposta.json()["events"]
+        for casa in evento.get("odds", {})
+    ]
+    if not cotacoes:
+        raise SystemExit("❌ Nenhum evento com odds para as cotações")
+    return cotacoes
+
+
+def resumir(latencias, erros: int, duracao: float):
+    latencias = sorted(latencias)
+    if not latencias:
+        return {"requisicoes": 0, "erros": erros, "req_por_segundo": 0.0}
+    percentil = lambda p: latencias[min(len(latencias) - 1, int(round(p / 100 * (len(latencias) - 1))))]
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_por_segundo": round(len(latencias) / duracao, 2),
+        "media_ms": round(statistics.fmean(latencias), 2),
+        "p50_ms": round(percentil(50), 2),
+        "p95_ms": round(percentil(95), 2),
+        "p99_ms": round(percentil(99), 2),
+    }
+
+
+async def executar(args):
+    pesos = interpretar_mix(args.mix)
+    rng = random.Random(args.seed)
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=60.0) as cliente:
+        print(f"🧪 Preparando {args.eventos} eventos sintéticos em {args.url}...")
+        cotacoes = await preparar(cliente, rng, args)
+        
+        latencias = {tipo: [] for tipo in pesos}
+        erros = {tipo: 0 for tipo in pesos}
+        medindo = False
+        fim = time.perf_counter() + args.aquecimento + args.duracao
+        
+        async def trabalhador(numero: int):
+            rng_local = random.Random(args.seed + numero)
+            tipos, valores = list(pesos), list(pesos.values())
+            while time.perf_counter() < fim:
+                tipo = rng_local.choices(tipos, valores)[0]
+                t0 = time.perf_counter()
+                try:
+                    resposta = await requisicao(cliente, tipo, rng_local, args, cotacoes)
+                    ok = resposta.status_code < 400 or (tipo == "quote" and resposta.status_code == 404)
+                except httpx.HTTPError:
+                    ok = False
+                if not medindo:
+                    continue
+                if ok:
+                    latencias[tipo].append((time.perf_counter() - t0) * 1000)
+                else:
+                    erros[tipo] += 1
+        
+        print(f"⏱️  {args.concorrencia} clientes por {args.duracao:.0f}s (mix {args.mix})...")
+        tarefas = [asyncio.create_task(trabalhador(numero)) for numero in range(args.concorrencia)]
+        await asyncio.sleep(args.aquecimento)
+        medindo = True
+        inicio = time.perf_counter()
+        await asyncio.gather(*tarefas)
+        duracao = time.perf_counter() - inicio
+    
+    resultados = {tipo: resumir(latencias[tipo], erros[tipo], duracao) for tipo in pesos}
+    resultados["total"] = resumir(
+        [valor for valores in latencias.values() for valor in valores], sum(erros.values()), duracao
+    )
+    return resultados
+
+
+def comparar(resultados, arquivo_anterior):
+    anteriores = json.loads(Path(arquivo_anterior).read_text())["benchmarks"]
+    print(f"\n📊 Comparação com {arquivo_anterior} (req/s e p95):")
+    for nome, atual in resultados.items():
+        anterior = anteriores.get(nome)
+        if not anterior or not anterior.get("req_por_segundo"):
+            print(f"   • {nome}: sem referência")
+            continue
+        delta = (atual["req_por_segundo"] / anterior["req_por_segundo"] - 1) * 100
+        print(f"   • {nome}: {anterior['req_por_segundo']} → {atual['req_por_segundo']} req/s ({delta:+.1f}%), "
+              f"p95 {anterior.get('p95_ms')} → {atual.get('p95_ms')} ms")
+
+
+def main():
+    args = parse_args()
+    resultados = asyncio.run(executar(args))
+    
+    relatorio = {
+        "executado_em": datetime.utcnow().isoformat(),
+        "url": args.url,
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar", "url")},
+        "benchmarks": resultados,
+    }
+    
+    print("\n" + "=" * 60)
+    print(f"🥛 Benchmark de concorrência ({args.concorrencia} clientes, {args.url})")
+    print("=" * 60)
+    for nome, r in resultados.items():
+        print(f"   • {nome:10s} {r['req_por_segundo']:>10} req/s | p50 {r.get('p50_ms')} ms | "
+              f"p95 {r.get('p95_ms')} ms | p99 {r.get('p99_ms')} ms | erros {r['erros']}")
+    
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        print(f"\n💾 Resultados salvos em {args.saida}")
+    
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da codificação/decodificação JSON (custo por registro).
+
+Compara o caminho antigo com o caminho rápido (fast_json) em três pontos:
+    - scraper: serialização do payload (json.dumps vs orjson)
+    - ingestão: corpo de /api/odds/scraper -> dicts (json + modelos pydantic +
+      model_dump vs validação direta dos bytes em TypedDicts)
+    - leitura: resposta de /api/events (jsonable_encoder + JSONResponse vs
+      ORJSONResponse)
+
+Não usa banco. Sem orjson instalado, as linhas de orjson são puladas.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_json.py --registros 2000 --repeticoes 20
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from fast_json import decodificar_payload_scraper, orjson
+
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de JSON (custo por registro)")
+    parser.add_argument("--registros", type=int, default=2000, help="Registros por payload")
+    parser.add_argument("--repeticoes", type=int, default=20, help="Repetições de cada medição")
+    parser.add_argument("--saida", help="Arquivo JSON para salvar os resultados")
+    return parser.parse_args()
+
+
+# Modelos do endpoint antes do caminho rápido (referência do "antes")
+class ScraperSelection(BaseModel):
+    key: str
+    name: str
+    odd: float
+
+
+class ScraperMarket(BaseModel):
+    type: str
+    name: str
+    selections: list[ScraperSelection]
+
+
+class ScraperEvent(BaseModel):
+    id: str
+    name: str
+    start_time: Optional[str] = None
+    status: str = "upcoming"
+
+
+class ScraperOddsData(BaseModel):
+    source: str
+    sport: str
+    competition: str
+    event: ScraperEvent
+    market: ScraperMarket
+    collected_at: str
+
+
+class ScraperPayload(BaseModel):
+    data: list[ScraperOddsData]
+
+
+def _serialize_datetime(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def gerar_registros(n: int):
+    """
+    Registros no formato dos scrapers (1X2 e Double Chance alternados), com
+    collected_at como datetime, como saem dos parsers.
+    """
+    agora = datetime(2026, 10, 18, 12, 0, 0)
+    registros = []
+    for i in range(n):
+        casa = CASAS[i % len(CASAS)]
+        if i % 2 == 0:
+            mercado = {"type": "1X2", "name": "Resultado Final", "selections": [
+                {"key": "1", "name": "Home", "odd": 2.10}, {"key": "X", "name": "Draw", "odd": 3.25},
+                {"key": "2", "name": "Away", "odd": 3.60}]}
+        else:
+            mercado = {"type": "Double Chance", "name": "Dupla Chance", "selections": [
+                {"key": "1X", "name": "Home or Draw", "odd": 1.30}, {"key": "X2", "name": "Draw or Away", "odd": 1.70}]}
+        registros.append({
+            "source": casa,
+            "sport": "football",
+            "competition": "brasileirao",
+            "event": {
+                "id": f"{casa}_{i // 2}",
+                "name": f"Time {i // 2} vs Outro {i // 2}",
+                "start_time": (agora + timedelta(days=1)).isoformat() + "Z",
+                "status": "upcoming",
+            },
+            "market": mercado,
+            "collected_at": agora,
+        })
+    return registros
+
+
+def gerar_eventos(n: int):
+    """
+    Corpo de /api/events com n eventos x 4 casas.
+    """
+    eventos = []
+    for i in range(n):
+        eventos.append({
+            "eventId": f"evt_brasileirao_time_{i}_outro_{i}",
+            "homeTeam": f"Time {i}",
+            "awayTeam": f"Outro {i}",
+            "league": "brasileirao",
+            "eventDate": "2026-10-19T21:00:00",
+            "odds": {
+                casa: {"homeOdd": 2.1, "drawOdd": 3.25, "awayOdd": 3.6, "homeOrDrawOdd": 1.3, "awayOrDrawOdd": 1.7}
+                for casa in CASAS
+            },
+        })
+    return {"events": eventos}
+
+
+def medir(funcao, repeticoes: int, registros: int):
+    """
+    Mediana do custo por registro (µs).
+    """
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tempos) / registros * 1e6, 3)
+
+
+def main():
+    args = parse_args()
+    registros = gerar_registros(args.registros)
+    payload = {"data": registros}
+    corpo = json.dumps(payload, default=_serialize_datetime).encode("utf-8")
+    eventos = gerar_eventos(args.registros)
+    
+    casos = {
+        "scraper: json.dumps": lambda: json.dumps(payload, default=_serialize_datetime).encode("utf-8"),
+        "ingestão: json + pydantic + model_dump": lambda: [
+            registro.model_dump() for registro in ScraperPayload.model_validate(json.loads(corpo)).data
+        ],
+        "ingestão: validate_json (TypedDict)": lambda: decodificar_payload_scraper(corpo),
+        "leitura: JSONResponse": lambda: JSONResponse(jsonable_encoder(eventos)).body,
+    }
+    if orjson is not None:
+        from fastapi.responses import ORJSONResponse
+        casos["scraper: orjson"] = lambda: orjson.dumps(payload, default=_serialize_datetime)
+        casos["leitura: ORJSONResponse"] = lambda: ORJSONResponse(eventos).body
+    
+    # Confere que os dois caminhos da ingestão produzem os mesmos dicts
+    antes = [registro.model_dump() for registro in ScraperPayload.model_validate(json.loads(corpo)).data]
+    depois = decodificar_payload_scraper(corpo)
+    assert [dict(r, event=dict(r["event"], status=r["event"].get("status", "upcoming"))) for r in depois] == antes
+    
+    resultados = {nome: medir(funcao, args.repeticoes, args.registros) for nome, funcao in sorted(casos.items())}
+    
+    print("\n" + "=" * 60)
+    print(f"🥛 Benchmark de JSON ({args.registros} registros, orjson {'sim' if orjson else 'não'})")
+    print("=" * 60)
+    for nome, custo in resultados.items():
+        print(f"   • {nome:40s} {custo:>8} µs/registro")
+    
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f"\n💾 Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
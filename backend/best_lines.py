@@ -0,0 +1,212 @@
+"""
+Tabela de melhores odds (best lines) por evento.
+
+Para cada mercado guarda as duas melhores odds de casas diferentes, além do
+número de casas do evento. É atualizada na ingestão, só para os eventos que
+receberam odds, e permite achar a melhor Double Chance "excluindo a casa X"
+sem reler todas as odds do evento. O top 2 guarda odds de qualquer idade:
+quando uma delas é velha demais ou fora de sincronia (top2_confiavel), quem
+consulta volta às odds ativas e frescas do evento.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from models import BestLine, Odd
+
+MERCADOS = ("home_odd", "draw_odd", "away_odd", "home_or_draw_odd", "away_or_draw_odd")
+
+
+def linhas_por_casa(odds: Iterable[Odd]) -> Tuple[Dict[str, List[Dict]], int]:
+    """
+    Melhor odd de cada casa em cada mercado, da maior para a menor.
+    
+    Returns:
+        (linhas, número de casas distintas)
+    """
+    melhores_por_casa: Dict[str, Dict[str, Tuple[float, Optional[str]]]] = {mercado: {} for mercado in MERCADOS}
+    casas = set()
+    
+    for odd in odds:
+        casas.add(odd.bookmaker)
+        for mercado in MERCADOS:
+            valor = getattr(odd, mercado)
+            if valor is None or valor <= 0:
+                continue
+            valor = float(valor)
+            atual = melhores_por_casa[mercado].get(odd.bookmaker)
+            if atual is None or valor > atual[0]:
+                melhores_por_casa[mercado][odd.bookmaker] = (valor, _para_iso(odd.scraped_at))
+    
+    linhas = {}
+    for mercado, por_casa in melhores_por_casa.items():
+        linhas[mercado] = [
+            {"bookmaker": casa, "odd": valor, "scraped_at": scraped_at}
+            for casa, (valor, scraped_at) in sorted(por_casa.items(), key=lambda item: item[1][0], reverse=True)
+        ]
+    
+    return linhas, len(casas)
+
+
+def calcular_linhas(odds: Iterable[Odd]) -> Tuple[Dict[str, List[Dict]], int]:
+    """
+    Calcula as duas melhores odds de cada mercado a partir das linhas de odds.
+    
+    Returns:
+        (linhas, número de casas distintas)
+    """
+    linhas, n_casas = linhas_por_casa(odds)
+    return {mercado: top[:2] for mercado, top in linhas.items()}, n_casas
+
+
+def _para_iso(scraped_at: Optional[datetime]) -> Optional[str]:
+    """scraped_at como ISO em UTC sem timezone (mesmo formato das colunas TIMESTAMP)."""
+    if scraped_at is None:
+        return None
+    if scraped_at.tzinfo is not None:
+        scraped_at = scraped_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return scraped_at.isoformat()
+
+
+def scraped_at_da_linha(linha: Dict) -> Optional[datetime]:
+    valor = linha.get("scraped_at")
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def _fresca(linha: Dict, min_scraped_at: Optional[datetime]) -> bool:
+    if min_scraped_at is None:
+        return True
+    scraped_at = scraped_at_da_linha(linha)
+    return scraped_at is not None and scraped_at >= min_scraped_at
+
+
+def melhores_frescas(linhas: Dict[str, List[Dict]], mercado: str, min_scraped_at: Optional[datetime] = None) -> List[Dict]:
+    """Odds guardadas do mercado sem as coletadas antes de min_scraped_at."""
+    return [linha for linha in linhas.get(mercado, []) if _fresca(linha, min_scraped_at)]
+
+
+def sincronizadas(linhas: Iterable[Dict], max_diferenca_segundos: float) -> bool:
+    """As odds foram coletadas com no máximo max_diferenca_segundos de diferença."""
+    if max_diferenca_segundos <= 0:
+        return True
+    coletas = [scraped_at_da_linha(linha) for linha in linhas]
+    if any(coleta is None for coleta in coletas):
+        return False
+    return not coletas or (max(coletas) - min(coletas)).total_seconds() <= max_diferenca_segundos
+
+
+def top2_confiavel(
+    linhas: Dict[str, List[Dict]],
+    mercados: Iterable[str],
+    min_scraped_at: Optional[datetime] = None,
+    max_diferenca_segundos: float = 0
+) -> bool:
+    """
+    O top 2 guardado basta para a melhor combinação dos mercados quando
+    nenhuma das odds dele seria descartada: todas frescas e coletadas dentro
+    da diferença máxima entre si. Senão uma odd abaixo do top 2 pode formar
+    a melhor combinação, e o evento tem que ser avaliado pelas odds.
+    """
+    guardadas = [linha for mercado in mercados for linha in linhas.get(mercado, [])]
+    if any(not _fresca(linha, min_scraped_at) for linha in guardadas):
+        return False
+    return sincronizadas(guardadas, max_diferenca_segundos)
+
+
+def atualizar_best_lines(db: Session, event_ids: Iterable[str]) -> int:
+    """
+    Recalcula as best lines dos eventos informados (não faz commit).
+    Usa uma query para as odds e outra para as linhas já existentes.
+    
+    Returns:
+        Quantidade de eventos atualizados
+    """
+    event_ids = set(event_ids)
+    if not event_ids:
+        return 0
+    
+    odds_por_evento: Dict[str, List[Odd]] = {event_id: [] for event_id in event_ids}
+    for odd in db.query(Odd).filter(
+        Odd.event_id.in_(event_ids),
+        Odd.is_active == True
+    ).all():
+        odds_por_evento[odd.event_id].append(odd)
+    
+    existentes = {
+        linha.event_id: linha
+        for linha in db.query(BestLine).filter(BestLine.event_id.in_(event_ids)).all()
+    }
+    
+    now = datetime.utcnow()
+    for event_id, odds in odds_por_evento.items():
+        linhas, n_casas = calcular_linhas(odds)
+        linha = existentes.get(event_id)
+        if linha is None:
+            linha = BestLine(event_id=event_id)
+            db.add(linha)
+        linha.lines = linhas
+        linha.bookmaker_count = n_casas
+        linha.updated_at = now
+    
+    return len(odds_por_evento)
+
+
+def reconstruir_best_lines(db: Session) -> int:
+    """
+    Recalcula as best lines de todos os eventos que têm odds e faz commit.
+    Usado no startup para popular a tabela a partir das odds existentes.
+    """
+    event_ids = [row[0] for row in db.query(Odd.event_id).distinct().all()]
+    total = atualizar_best_lines(db, event_ids)
+    db.commit()
+    return total
+
+
+def melhor_excluindo(
+    linhas: Dict[str, List[Dict]],
+    mercado: str,
+    bookmaker: str,
+    min_scraped_at: Optional[datetime] = None
+) -> Optional[Dict]:
+    """
+    Melhor odd do mercado ignorando uma casa. Como a casa excluída ocupa no
+    máximo uma das duas posições, o top 2 basta se top2_confiavel(...) for
+    verdadeiro para o mercado.
+    """
+    for linha in melhores_frescas(linhas, mercado, min_scraped_at):
+        if linha["bookmaker"] != bookmaker:
+            return linha
+    return None
+
+
+def melhor_par(
+    linhas: Dict[str, List[Dict]],
+    mercado_aposta: str,
+    mercado_oposto: str,
+    min_scraped_at: Optional[datetime] = None,
+    max_diferenca_segundos: float = 0
+) -> Optional[Tuple[Dict, Dict]]:
+    """
+    Melhor combinação (aposta, oposta) com casas diferentes, coletadas com no
+    máximo max_diferenca_segundos de diferença. O lucro cresce com as duas
+    odds: com as linhas de todas as casas (linhas_por_casa) o resultado é
+    exato; com o top 2, só quando top2_confiavel(...) for verdadeiro.
+    """
+    melhor = None
+    opostas = melhores_frescas(linhas, mercado_oposto, min_scraped_at)
+    for aposta in melhores_frescas(linhas, mercado_aposta, min_scraped_at):
+        # A primeira oposta de outra casa que passa na diferença é a melhor para esta aposta
+        oposta = next(
+            (
+                oposta for oposta in opostas
+                if oposta["bookmaker"] != aposta["bookmaker"] and sincronizadas((aposta, oposta), max_diferenca_segundos)
+            ),
+            None
+        )
+        if oposta is None:
+            continue
+        # Maximiza o lucro do hedge: 1/odd_aposta + 1/odd_oposta menor possível
+        custo = 1 / aposta["odd"] + 1 / oposta["odd"]
+        if melhor is None or custo < melhor[0]:
+            melhor = (custo, aposta, oposta)
+    
+    return (melhor[1], melhor[2]) if melhor else None
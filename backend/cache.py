@@ -0,0 +1,83 @@
+"""
+Cache em memória de resultados de arbitragem, chaveado pela versão das odds.
+
+Quando a versão avança todas as entradas são descartadas; entradas também
+expiram após o TTL (o status dos eventos muda com o tempo mesmo sem escrita).
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable
+
+
+class CacheVersionado:
+    """
+    Cache chave -> valor válido para uma versão das odds.
+    Os valores são compartilhados entre leitores: não devem ser alterados.
+    """
+    
+    def __init__(self, ttl_segundos: float = 60.0, max_entradas: int = 1024):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.versao = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entradas: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def _sincronizar_versao(self, versao: int) -> None:
+        if self.versao is None or versao > self.versao:
+            self.evictions += len(self._entradas)
+            self._entradas.clear()
+            self.versao = versao
+    
+    def obter_ou_calcular(self, chave: Hashable, versao: int, calcular: Callable[[], Any]) -> Any:
+        """
+        Retorna o valor em cache para (chave, versão) ou calcula e guarda.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            self._sincronizar_versao(versao)
+            entrada = self._entradas.get(chave)
+            if entrada is not None and versao == self.versao:
+                valor, expira_em = entrada
+                if agora < expira_em:
+                    self.hits += 1
+                    return valor
+                del self._entradas[chave]
+                self.evictions += 1
+            self.misses += 1
+        
+        valor = calcular()
+        
+        with self._lock:
+            # Só guarda se a versão não avançou enquanto calculava
+            if versao == self.versao:
+                if len(self._entradas) >= self.max_entradas:
+                    self._entradas.pop(next(iter(self._entradas)))
+                    self.evictions += 1
+                self._entradas[chave] = (valor, agora + self.ttl_segundos)
+        
+        return valor
+    
+    def limpar(self) -> None:
+        with self._lock:
+            self.evictions += len(self._entradas)
+            self._entradas.clear()
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "version": self.versao,
+                "entries": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "ttl_seconds": self.ttl_segundos
+            }
+
+
+# Cache compartilhado do processo (API ou bot)
+cache_arbitragem = CacheVersionado()
@@ -0,0 +1,166 @@
+"""
+Configuração e métricas do pool de conexões do banco.
+
+Tudo vem do ambiente, em um lugar só (models cria os engines com opcoes_pool):
+    - DB_POOL_SIZE / DB_MAX_OVERFLOW: conexões mantidas e extras sob pico
+    - DB_POOL_TIMEOUT: espera máxima (segundos) por uma conexão livre
+    - DB_POOL_RECYCLE: idade máxima (segundos) de uma conexão, antes que o
+      servidor ou um proxy a derrube
+    - DB_POOL_PRE_PING: testa a conexão no checkout (bots ociosos entre ciclos)
+    - DB_STATEMENT_TIMEOUT_MS: statement_timeout do PostgreSQL (0 desativa)
+
+Os pools registram o tempo de cada checkout (esperando uma conexão livre ou
+abrindo uma nova) e os timeouts, para diagnosticar esgotamento sob carga
+(/api/db/pool).
+"""
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+TAMANHO_POOL = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+TIMEOUT_POOL = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+RECICLAR_SEGUNDOS = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+TIMEOUT_COMANDO_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Checkouts recentes usados nos percentis
+JANELA_CHECKOUTS = 1000
+
+# Checkout acima disso conta como espera (ms)
+LIMITE_ESPERA_MS = 1.0
+
+
+class MetricasPool:
+    """
+    Contadores de checkout de um pool (thread-safe).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recentes = deque(maxlen=JANELA_CHECKOUTS)
+        self.checkouts = 0
+        self.esperas = 0
+        self.timeouts = 0
+        self.espera_total_ms = 0.0
+        self.espera_maxima_ms = 0.0
+    
+    def registrar(self, duracao_ms: float, timeout: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._recentes.append(duracao_ms)
+            self.espera_total_ms += duracao_ms
+            if duracao_ms > self.espera_maxima_ms:
+                self.espera_maxima_ms = duracao_ms
+            if duracao_ms > LIMITE_ESPERA_MS:
+                self.esperas += 1
+            if timeout:
+                self.timeouts += 1
+    
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            recentes = sorted(self._recentes)
+            checkouts, esperas, timeouts = self.checkouts, self.esperas, self.timeouts
+            total, maxima = self.espera_total_ms, self.espera_maxima_ms
+        
+        def percentil(p: float) -> Optional[float]:
+            if not recentes:
+                return None
+            return round(recentes[min(len(recentes) - 1, int(round(p / 100 * (len(recentes) - 1))))], 3)
+        
+        return {
+            "checkouts": checkouts,
+            "waits": esperas,
+            "timeouts": timeouts,
+            "waitAvgMs": round(total / checkouts, 3) if checkouts else None,
+            "waitMaxMs": round(maxima, 3),
+            "waitP50Ms": percentil(50),
+            "waitP99Ms": percentil(99),
+            "slowRecent": len(recentes) - bisect.bisect_right(recentes, LIMITE_ESPERA_MS),
+        }
+
+
+class _PoolMedido:
+    """
+    Mede o tempo de _do_get (fila do pool + abertura de conexão nova).
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+    
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.registrar((time.perf_counter() - inicio) * 1000, timeout=True)
+            raise
+        self.metricas.registrar((time.perf_counter() - inicio) * 1000)
+        return conexao
+    
+    def recreate(self):
+        # dispose() troca o pool por um novo: mantém os contadores
+        novo = super().recreate()
+        novo.metricas = self.metricas
+        return novo
+
+
+class PoolMedido(_PoolMedido, QueuePool):
+    pass
+
+
+class PoolMedidoAsync(_PoolMedido, AsyncAdaptedQueuePool):
+    pass
+
+
+def opcoes_pool(url: str, assincrono: bool = False) -> Dict:
+    """
+    Argumentos de create_engine/create_async_engine com o pool configurado.
+    
+    Args:
+        url: URL do banco (SQLite em memória mantém o pool padrão)
+        assincrono: Engine assíncrono (pool adaptado ao asyncio)
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {"pool_pre_ping": PRE_PING}
+    
+    opcoes = {
+        "poolclass": PoolMedidoAsync if assincrono else PoolMedido,
+        "pool_size": TAMANHO_POOL,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": TIMEOUT_POOL,
+        "pool_recycle": RECICLAR_SEGUNDOS,
+        "pool_pre_ping": PRE_PING,
+    }
+    if TIMEOUT_COMANDO_MS > 0 and url.startswith("postgresql"):
+        opcoes["connect_args"] = {"options": f"-c statement_timeout={TIMEOUT_COMANDO_MS}"}
+    return opcoes
+
+
+def estatisticas_pool(engine) -> Optional[Dict]:
+    """
+    Estado atual e métricas de checkout do pool de um engine (None sem engine).
+    """
+    if engine is None:
+        return None
+    pool = engine.pool
+    estado = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            "size": pool.size(),
+            "maxOverflow": pool._max_overflow,
+            "checkedIn": pool.checkedin(),
+            "checkedOut": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "timeoutSeconds": pool.timeout(),
+        })
+    metricas = getattr(pool, "metricas", None)
+    if metricas is not None:
+        estado.update(metricas.estatisticas())
+    return estado
@@ -0,0 +1,38 @@
+"""
+Métricas do banco de dados.
+"""
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ContadorSQL:
+    """Conta os statements SQL executados pela thread atual."""
+    
+    def __init__(self):
+        self.total = 0
+        self._thread = threading.get_ident()
+    
+    def _antes_de_executar(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.total += 1
+
+
+@contextmanager
+def contar_statements(db: Session):
+    """
+    Conta os statements emitidos enquanto o bloco roda.
+    
+    Uso:
+        with contar_statements(db) as contador:
+            ...
+        print(contador.total)
+    """
+    contador = ContadorSQL()
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", contador._antes_de_executar)
+    try:
+        yield contador
+    finally:
+        event.remove(engine, "before_cursor_execute", contador._antes_de_executar)
@@ -0,0 +1,57 @@
+"""
+GET condicional (ETag / If-None-Match) dos endpoints de leitura.
+
+O ETag vem da versão das odds (versioning.espelho_versao), que avança a cada
+escrita de odds ou mudança de status de eventos. Se o cliente envia o ETag que
+já tem e a versão não mudou, a resposta é 304 sem corpo: o banco não é
+consultado e nada é serializado.
+"""
+from typing import Optional
+from fastapi import Request, Response
+
+# Revalida sempre: o cliente pode guardar a resposta, mas pergunta antes de reusar
+CACHE_CONTROL = "no-cache"
+
+
+def gerar_etag(recurso: str, versao: int) -> str:
+    """
+    ETag fraco de um recurso em uma versão das odds.
+    """
+    return f'W/"{recurso}-v{versao}"'
+
+
+def etag_corresponde(request: Request, etag: str) -> bool:
+    """
+    Compara If-None-Match com o ETag atual (comparação fraca, aceita lista e *).
+    """
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    if cabecalho.strip() == "*":
+        return True
+    
+    atual = etag[2:] if etag.startswith("W/") else etag
+    for candidato in cabecalho.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == atual:
+            return True
+    return False
+
+
+def nao_modificado(etag: str) -> Response:
+    """
+    Resposta 304 com o ETag atual.
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def com_etag(resposta: Response, etag: Optional[str]) -> Response:
+    """
+    Adiciona ETag e Cache-Control à resposta (sem ETag, devolve como está).
+    """
+    if etag is not None:
+        resposta.headers["ETag"] = etag
+        resposta.headers["Cache-Control"] = CACHE_CONTROL
+    return resposta
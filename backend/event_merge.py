@@ -0,0 +1,176 @@
+"""
+Fusão de eventos gravados com ids diferentes para a mesma partida.
+
+O id do evento vem das chaves canônicas dos times (ingestion.gerar_event_id).
+Quando a chave de um time muda, o mesmo jogo fica com dois eventos: ids
+gravados antes da normalização ("evt_Brasileirão_grêmio_são_paulo" agora é
+"..._gremio_sao_paulo") ou nomes que ficaram com a chave crua (acima de
+orcamento_fuzzy) até a fila em segundo plano gravar o apelido.
+
+remapear_eventos leva as odds, o histórico e os pedidos do evento antigo para
+o id atual e apaga o antigo. Roda no startup (railway_start.py, ou
+`python event_merge.py`) e sempre que um apelido é gravado.
+
+Uso:
+    python event_merge.py
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import exists, or_
+from sqlalchemy.orm import Session, aliased
+from models import (
+    ArbitrageOpportunity, BestLine, Event, EventKey, Odd, OddHistory, SessionLocal, UserRequest
+)
+from best_lines import atualizar_best_lines
+from ingestion import COLUNA_ASSINATURA, COLUNAS_MERCADO, gerar_event_id
+from odds_history import cache_chaves
+from opportunity_set import marcar_eventos_sujos
+from read_model import registrar_alteracao
+from team_aliases import chave_para_id
+from versioning import incrementar_versao
+
+
+def _fundir_odds(db: Session, antigo_id: str, destino_id: str) -> None:
+    """
+    Move as odds para o evento de destino. Se a casa já tem linha no destino,
+    cada mercado fica com a linha mais recente que o tem.
+    """
+    destino = {odd.bookmaker: odd for odd in db.query(Odd).filter(Odd.event_id == destino_id)}
+    for odd in db.query(Odd).filter(Odd.event_id == antigo_id).all():
+        atual = destino.get(odd.bookmaker)
+        if atual is None:
+            odd.event_id = destino_id
+            continue
+        
+        linhas = sorted((atual, odd), key=lambda linha: linha.scraped_at or datetime.min, reverse=True)
+        for tipo, colunas in COLUNAS_MERCADO.items():
+            fonte = next(
+                (linha for linha in linhas if any(getattr(linha, coluna) is not None for coluna in colunas)),
+                None
+            )
+            if fonte is not None and fonte is not atual:
+                for coluna in (*colunas, COLUNA_ASSINATURA[tipo]):
+                    setattr(atual, coluna, getattr(fonte, coluna))
+        atual.scraped_at = linhas[0].scraped_at
+        atual.is_active = bool(atual.is_active or odd.is_active)
+        db.delete(odd)
+
+
+def _fundir_historico(db: Session, antigo_id: str, destino_id: str) -> None:
+    """Leva o histórico de preços (odds_history) para a chave do evento de destino."""
+    chaves = dict(db.query(EventKey.event_id, EventKey.id).filter(EventKey.event_id.in_([antigo_id, destino_id])))
+    cache_chaves.eventos.pop(antigo_id, None)
+    chave_antiga = chaves.get(antigo_id)
+    if chave_antiga is None:
+        return
+    
+    chave_destino = chaves.get(destino_id)
+    if chave_destino is None:
+        # O destino ainda não tem histórico: a chave passa a ser dele
+        db.query(EventKey).filter(EventKey.id == chave_antiga).update(
+            {"event_id": destino_id}, synchronize_session=False
+        )
+        return
+    
+    # Os dois têm histórico: os pontos repetidos (mesma coleta) ficam com os do destino
+    destino = aliased(OddHistory)
+    repetido = exists().where(
+        destino.event_key == chave_destino,
+        destino.scraped_at == OddHistory.scraped_at,
+        destino.bookmaker_id == OddHistory.bookmaker_id,
+        destino.outcome == OddHistory.outcome
+    )
+    db.query(OddHistory).filter(OddHistory.event_key == chave_antiga, repetido).delete(synchronize_session=False)
+    db.query(OddHistory).filter(OddHistory.event_key == chave_antiga).update(
+        {"event_key": chave_destino}, synchronize_session=False
+    )
+    db.query(EventKey).filter(EventKey.id == chave_antiga).delete(synchronize_session=False)
+
+
+def fundir_evento(db: Session, antigo: Event, destino_id: str) -> None:
+    """
+    Funde o evento no de id destino_id, criando-o com os dados do antigo se
+    ainda não existir, e apaga o antigo (não faz commit).
+    """
+    if db.get(Event, destino_id) is None:
+        db.add(Event(
+            id=destino_id,
+            sport=antigo.sport,
+            league=antigo.league,
+            home_team=antigo.home_team,
+            away_team=antigo.away_team,
+            event_date=antigo.event_date,
+            status=antigo.status,
+            created_at=antigo.created_at,
+            finished_at=antigo.finished_at,
+            odds_updated_at=antigo.odds_updated_at
+        ))
+        db.flush()
+    
+    _fundir_odds(db, antigo.id, destino_id)
+    _fundir_historico(db, antigo.id, destino_id)
+    db.flush()
+    
+    db.query(UserRequest).filter(UserRequest.event_id == antigo.id).update(
+        {"event_id": destino_id}, synchronize_session=False
+    )
+    # As oportunidades e as best lines do destino são recalculadas
+    db.query(ArbitrageOpportunity).filter(ArbitrageOpportunity.event_id == antigo.id).delete(synchronize_session=False)
+    db.query(BestLine).filter(BestLine.event_id == antigo.id).delete(synchronize_session=False)
+    db.query(Event).filter(Event.id == antigo.id).delete(synchronize_session=False)
+    db.expunge(antigo)
+
+
+def remapear_eventos(db: Session, eventos: Optional[Iterable[Event]] = None) -> Dict[str, str]:
+    """
+    Funde cada evento cujo id não é o gerado hoje pelas chaves dos times no
+    evento do id atual (não faz commit).
+    
+    Args:
+        eventos: Eventos a conferir (padrão: todos os não finalizados)
+    
+    Returns:
+        id antigo -> id atual dos eventos fundidos
+    """
+    if eventos is None:
+        eventos = db.query(Event).filter(Event.status.in_(["upcoming", "live"])).all()
+    
+    remapeados = {}
+    for evento in list(eventos):
+        destino_id = gerar_event_id(evento.league, evento.home_team, evento.away_team)
+        if destino_id == evento.id:
+            continue
+        fundir_evento(db, evento, destino_id)
+        remapeados[evento.id] = destino_id
+    
+    if remapeados:
+        destinos = set(remapeados.values())
+        atualizar_best_lines(db, destinos)
+        marcar_eventos_sujos(db, destinos)
+        registrar_alteracao(db, set(remapeados) | destinos)
+        incrementar_versao(db)
+    return remapeados
+
+
+def remapear_eventos_dos_times(db: Session, chaves: Iterable[str]) -> Dict[str, str]:
+    """
+    remapear_eventos só para os eventos não finalizados gravados com alguma
+    das chaves de time informadas (as que acabaram de ganhar um apelido).
+    """
+    filtros = [Event.id.contains(chave_para_id(chave), autoescape=True) for chave in chaves]
+    if not filtros:
+        return {}
+    return remapear_eventos(db, db.query(Event).filter(
+        Event.status.in_(["upcoming", "live"]),
+        or_(*filtros)
+    ).all())
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        remapeados = remapear_eventos(db)
+        db.commit()
+        print(f"✅ {len(remapeados)} evento(s) remapeado(s) para o id atual")
+    finally:
+        db.close()
@@ -0,0 +1,283 @@
+"""
+Consulta de /api/events: eventos e odds em uma única query.
+
+A página de eventos (upcoming/live, ordenados por data e id) é uma subquery com
+LIMIT, e as odds vêm pelo LEFT JOIN com ela: uma ida ao banco por página em vez
+de uma consulta de odds por evento. A paginação é por cursor (keyset) sobre
+(event_date, id), então o custo de uma página não cresce com o número de
+eventos anteriores.
+
+Com fields= só as colunas pedidas entram no SELECT e na resposta; sem odds
+pedidas, o JOIN nem é feito.
+
+listar_eventos_async executa a mesma consulta com AsyncSession (DB_ASYNC=true).
+"""
+import base64
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, and_, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import ArbitrageOpportunity, Event, Odd
+
+STATUS_VISIVEIS = ("upcoming", "live")
+
+# Nome das colunas de odd na API
+MERCADOS_API = {
+    "homeOdd": "home_odd",
+    "drawOdd": "draw_odd",
+    "awayOdd": "away_odd",
+    "homeOrDrawOdd": "home_or_draw_odd",
+    "awayOrDrawOdd": "away_or_draw_odd"
+}
+
+# Campos do evento na API -> coluna (eventId sempre é devolvido)
+CAMPOS_EVENTO = {
+    "homeTeam": "home_team",
+    "awayTeam": "away_team",
+    "league": "league",
+    "eventDate": "event_date",
+}
+
+# Eventos por página no dump completo (stream)
+TAMANHO_PAGINA_DUMP = 500
+
+# Eventos por página quando só o cursor é enviado
+LIMITE_PAGINA = 200
+
+
+def codificar_cursor(event_date: datetime, event_id: str) -> str:
+    """
+    Cursor opaco da paginação: posição (data, id) do último evento da página.
+    """
+    bruto = f"{event_date.isoformat()}|{event_id}"
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Inverso de codificar_cursor. Levanta ValueError se o cursor for inválido.
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        data, event_id = bruto.split("|", 1)
+        return datetime.fromisoformat(data), event_id
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def interpretar_campos(fields: Optional[str]) -> Tuple[List[str], List[str]]:
+    """
+    Interpreta o parâmetro fields= (lista separada por vírgulas).
+    
+    Aceita os campos do evento (homeTeam, awayTeam, league, eventDate), "odds"
+    (todos os mercados) ou mercados específicos (homeOdd, drawOdd, ...).
+    
+    Returns:
+        (campos do evento, mercados da API); sem fields, todos
+    
+    Raises:
+        ValueError: Se algum campo for desconhecido
+    """
+    if not fields:
+        return list(CAMPOS_EVENTO), list(MERCADOS_API)
+    
+    campos, mercados = [], []
+    for campo in (parte.strip() for parte in fields.split(",")):
+        if not campo or campo == "eventId":
+            continue
+        if campo in CAMPOS_EVENTO:
+            campos.append(campo)
+        elif campo == "odds":
+            mercados.extend(MERCADOS_API)
+        elif campo in MERCADOS_API:
+            mercados.append(campo)
+        else:
+            validos = ["eventId", *CAMPOS_EVENTO, "odds", *MERCADOS_API]
+            raise ValueError(f"Campo inválido: {campo}. Use: {', '.join(validos)}")
+    
+    return list(dict.fromkeys(campos)), list(dict.fromkeys(mercados))
+
+
+def _float(valor) -> Optional[float]:
+    return float(valor) if valor is not None else None
+
+
+def _consulta_pagina(
+    league: Optional[str] = None,
+    bookmakers: Optional[Sequence[str]] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    com_arbitragem: Optional[bool] = None,
+    campos: Optional[Iterable[str]] = None,
+    mercados: Optional[Iterable[str]] = None,
+    limite: int = 200,
+    cursor: Optional[str] = None,
+    agora: Optional[datetime] = None
+) -> Tuple[Select, List[str], List[str]]:
+    """
+    SELECT de uma página de eventos (mais um, para saber se há próxima) com
+    suas odds, ordenada por data e id.
+    
+    Args:
+        league: Filtra pela liga (sem diferenciar maiúsculas)
+        bookmakers: Só eventos com odds dessas casas, e só as odds delas
+        desde: Data mínima do evento
+        ate: Data máxima do evento
+        com_arbitragem: True/False filtra eventos com/sem oportunidade vigente
+        campos: Campos do evento na resposta (padrão: todos)
+        mercados: Mercados (nomes da API) em odds (padrão: todos; vazio omite odds)
+        limite: Eventos por página
+        cursor: nextCursor da página anterior
+    
+    Returns:
+        (query, campos do evento, mercados da API)
+    
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    agora = agora or datetime.utcnow()
+    campos = list(CAMPOS_EVENTO) if campos is None else list(campos)
+    mercados = list(MERCADOS_API) if mercados is None else list(mercados)
+    bookmakers = [casa.lower() for casa in bookmakers or []]
+    
+    pagina = select(
+        Event.id, Event.event_date, *(getattr(Event, CAMPOS_EVENTO[campo]) for campo in campos if campo != "eventDate")
+    ).where(Event.status.in_(STATUS_VISIVEIS))
+    
+    if league:
+        pagina = pagina.where(func.lower(Event.league) == league.lower())
+    
+    if desde is not None:
+        pagina = pagina.where(Event.event_date >= desde)
+    
+    if ate is not None:
+        pagina = pagina.where(Event.event_date <= ate)
+    
+    if bookmakers:
+        pagina = pagina.where(exists().where(
+            Odd.event_id == Event.id,
+            func.lower(Odd.bookmaker).in_(bookmakers)
+        ))
+    
+    if com_arbitragem is not None:
+        oportunidade = exists().where(
+            ArbitrageOpportunity.event_id == Event.id,
+            ArbitrageOpportunity.expires_at > agora
+        )
+        pagina = pagina.where(oportunidade if com_arbitragem else ~oportunidade)
+    
+    if cursor:
+        ultima_data, ultimo_id = decodificar_cursor(cursor)
+        pagina = pagina.where(or_(
+            Event.event_date > ultima_data,
+            and_(Event.event_date == ultima_data, Event.id > ultimo_id)
+        ))
+    
+    # Um evento a mais indica que há próxima página
+    pagina = pagina.order_by(Event.event_date, Event.id).limit(limite + 1).subquery()
+    
+    colunas_evento = [pagina.c[CAMPOS_EVENTO[campo]] for campo in campos]
+    colunas_odds = [getattr(Odd, MERCADOS_API[mercado]) for mercado in mercados]
+    
+    if colunas_odds:
+        condicao = Odd.event_id == pagina.c.id
+        if bookmakers:
+            condicao = and_(condicao, func.lower(Odd.bookmaker).in_(bookmakers))
+        query = select(
+            pagina.c.id, pagina.c.event_date, *colunas_evento, Odd.bookmaker, *colunas_odds
+        ).select_from(pagina).outerjoin(Odd, condicao).order_by(
+            pagina.c.event_date, pagina.c.id, Odd.bookmaker
+        )
+    else:
+        query = select(pagina.c.id, pagina.c.event_date, *colunas_evento).order_by(
+            pagina.c.event_date, pagina.c.id
+        )
+    
+    return query, campos, mercados
+
+
+def _montar_pagina(linhas, campos: List[str], mercados: List[str], limite: int) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Agrupa as linhas (evento x casa) de _consulta_pagina nos eventos da API.
+    """
+    eventos = []
+    posicoes = []
+    atual = None
+    inicio_odds = 2 + len(campos)
+    for linha in linhas:
+        if atual is None or atual["eventId"] != linha[0]:
+            atual = {"eventId": linha[0]}
+            for campo, valor in zip(campos, linha[2:inicio_odds]):
+                atual[campo] = valor.isoformat() if campo == "eventDate" else valor
+            if mercados:
+                atual["odds"] = {}
+            eventos.append(atual)
+            posicoes.append((linha[1], linha[0]))
+        
+        if mercados and linha[inicio_odds] is not None:
+            atual["odds"][linha[inicio_odds]] = {
+                mercado: _float(valor) for mercado, valor in zip(mercados, linha[inicio_odds + 1:])
+            }
+    
+    proximo = None
+    if len(eventos) > limite:
+        eventos = eventos[:limite]
+        proximo = codificar_cursor(*posicoes[limite - 1])
+    
+    return eventos, proximo
+
+
+def listar_eventos(db: Session, limite: int = LIMITE_PAGINA, **filtros) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Página de eventos com suas odds, ordenada por data e id.
+    
+    Args:
+        limite: Eventos por página
+        **filtros: league, bookmakers, desde, ate, com_arbitragem, campos,
+            mercados, cursor e agora (ver _consulta_pagina)
+    
+    Returns:
+        (eventos no formato da API, cursor da próxima página ou None)
+    
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    query, campos, mercados = _consulta_pagina(limite=limite, **filtros)
+    return _montar_pagina(db.execute(query), campos, mercados, limite)
+
+
+async def listar_eventos_async(db: AsyncSession, limite: int = LIMITE_PAGINA, **filtros) -> Tuple[List[Dict], Optional[str]]:
+    """
+    listar_eventos com AsyncSession (DB_ASYNC=true): a mesma consulta, sem
+    ocupar uma thread enquanto espera o banco.
+    """
+    query, campos, mercados = _consulta_pagina(limite=limite, **filtros)
+    resultado = await db.execute(query)
+    return _montar_pagina(resultado.all(), campos, mercados, limite)
+
+
+def iterar_eventos(db: Session, tamanho_pagina: int = TAMANHO_PAGINA_DUMP, **filtros) -> Iterator[Dict]:
+    """
+    Todos os eventos que passam pelos filtros, página a página (dump completo
+    sem carregar tudo em memória). Aceita os mesmos filtros de listar_eventos.
+    """
+    cursor = None
+    while True:
+        eventos, cursor = listar_eventos(db, limite=tamanho_pagina, cursor=cursor, **filtros)
+        yield from eventos
+        if cursor is None:
+            return
+
+
+async def iterar_eventos_async(db: AsyncSession, tamanho_pagina: int = TAMANHO_PAGINA_DUMP, **filtros) -> AsyncIterator[Dict]:
+    """
+    iterar_eventos com AsyncSession.
+    """
+    cursor = None
+    while True:
+        eventos, cursor = await listar_eventos_async(db, limite=tamanho_pagina, cursor=cursor, **filtros)
+        for evento in eventos:
+            yield evento
+        if cursor is None:
+            return
@@ -0,0 +1,195 @@
+"""
+Codificação/decodificação JSON rápida da API.
+
+Entrada: o payload dos scrapers é validado direto dos bytes pelo pydantic-core
+em TypedDicts (dicts tipados). Não passa pelo json da stdlib, não cria um
+modelo pydantic por registro e dispensa o model_dump() antes de
+normalizar_registro.
+
+Saída: com orjson instalado (opcional), os endpoints de leitura respondem com
+ORJSONResponse. Sem ele, usam JSONResponse como antes.
+"""
+import json
+from typing import Any, Dict, List, Optional
+from typing_extensions import NotRequired, TypedDict
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as RespostaJSON
+else:
+    RespostaJSON = JSONResponse
+
+
+# Mesmo formato de ScraperPayload (main.py), como dicts tipados
+class SelecaoScraper(TypedDict):
+    key: str
+    name: str
+    odd: float
+
+
+class MercadoScraper(TypedDict):
+    type: str
+    name: str
+    selections: List[SelecaoScraper]
+
+
+class EventoScraper(TypedDict):
+    id: str
+    name: str
+    start_time: NotRequired[Optional[str]]
+    status: NotRequired[str]
+
+
+class RegistroScraper(TypedDict):
+    source: str
+    sport: str
+    competition: str
+    event: EventoScraper
+    market: MercadoScraper
+    collected_at: str
+
+
+class PayloadScraper(TypedDict):
+    data: List[RegistroScraper]
+
+
+# Só o envelope, para validar os registros um a um quando o payload falha
+class EnvelopeScraper(TypedDict):
+    data: List[Any]
+
+
+_validador_payload = TypeAdapter(PayloadScraper)
+_validador_registro = TypeAdapter(RegistroScraper)
+_validador_envelope = TypeAdapter(EnvelopeScraper)
+
+
+class RegistrosScraper(list):
+    """
+    Registros válidos do payload, com os erros dos registros descartados
+    (erros) e a quantidade recebida (total).
+    """
+    
+    def __init__(self, registros=(), erros: Optional[List[str]] = None, total: Optional[int] = None):
+        super().__init__(registros)
+        self.erros = erros or []
+        self.total = len(self) if total is None else total
+
+
+def _inline_defs(esquema, defs: Dict):
+    if isinstance(esquema, dict):
+        if "$ref" in esquema:
+            return _inline_defs(defs[esquema["$ref"].rsplit("/", 1)[-1]], defs)
+        return {chave: _inline_defs(valor, defs) for chave, valor in esquema.items() if chave != "$defs"}
+    if isinstance(esquema, list):
+        return [_inline_defs(valor, defs) for valor in esquema]
+    return esquema
+
+
+def _openapi_corpo(validador: TypeAdapter, tipo_conteudo: str) -> Dict:
+    esquema = validador.json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {tipo_conteudo: {"schema": _inline_defs(esquema, esquema.get("$defs", {}))}},
+        }
+    }
+
+
+def openapi_payload_scraper() -> Dict:
+    """
+    requestBody do OpenAPI para rotas que leem o corpo com ler_payload_scraper
+    (o /docs continua mostrando o formato do payload).
+    """
+    return _openapi_corpo(_validador_payload, "application/json")
+
+
+def openapi_ndjson_scraper() -> Dict:
+    """
+    requestBody do OpenAPI do stream NDJSON (um registro do scraper por linha).
+    """
+    return _openapi_corpo(_validador_registro, "application/x-ndjson")
+
+
+def decodificar_payload_scraper(corpo: bytes) -> List[Dict]:
+    """
+    Valida o corpo JSON do scraper e devolve os registros como dicts.
+    
+    Raises:
+        ValidationError: Se o JSON for inválido ou não seguir o formato
+    """
+    return _validador_payload.validate_json(corpo)["data"]
+
+
+def decodificar_registro_scraper(linha: bytes) -> Dict:
+    """
+    Valida uma linha NDJSON (um registro do scraper) e devolve o dict.
+    
+    Raises:
+        ValidationError: Se a linha não for JSON válido ou não seguir o formato
+    """
+    return _validador_registro.validate_json(linha)
+
+
+def _descrever_erro(e: ValidationError) -> str:
+    detalhe = e.errors(include_url=False)[0]
+    local = ".".join(str(parte) for parte in detalhe["loc"])
+    return f"{local + ': ' if local else ''}{detalhe['msg']}"
+
+
+def decodificar_registros_scraper(corpo: bytes) -> RegistrosScraper:
+    """
+    Decodifica o payload do scraper validando registro a registro: os
+    registros fora do formato são descartados e viram erros, os demais seguem.
+    
+    O caminho comum (payload todo válido) é uma única validação dos bytes;
+    só quando ela falha o envelope é relido e cada registro validado.
+    
+    Raises:
+        ValidationError: Se o corpo não for JSON válido ou não tiver a lista data
+    """
+    try:
+        return RegistrosScraper(decodificar_payload_scraper(corpo))
+    except ValidationError:
+        pass
+    
+    itens = _validador_envelope.validate_json(corpo)["data"]
+    registros = RegistrosScraper(total=len(itens))
+    for indice, item in enumerate(itens):
+        try:
+            registros.append(_validador_registro.validate_python(item))
+        except ValidationError as e:
+            registros.erros.append(f"Registro {indice}: {_descrever_erro(e)}")
+    return registros
+
+
+async def ler_payload_scraper(request: Request) -> RegistrosScraper:
+    """
+    Dependência do FastAPI: lê o corpo bruto e decodifica os registros.
+    Registros inválidos vêm em .erros; corpo ilegível ou sem a lista data
+    responde 422 no mesmo formato da validação padrão.
+    """
+    corpo = await request.body()
+    try:
+        return decodificar_registros_scraper(corpo)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [dict(erro, loc=("body",) + tuple(erro["loc"])) for erro in e.errors(include_url=False)]
+        )
+
+
+def codificar_json(valor: Any) -> bytes:
+    """
+    Serializa para bytes JSON (orjson quando instalado), para respostas
+    montadas em pedaços (StreamingResponse).
+    """
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
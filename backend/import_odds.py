@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Importação em massa de arquivos do scraper (backfill).
+
+Lê em streaming arquivos JSONL (por linha: um registro, um payload {"data": [...]}
+ou uma resposta de /scrape/*) e JSON (resposta de /scrape/* ou lista de
+registros), opcionalmente compactados com gzip. Os registros são normalizados
+com as mesmas regras de /api/odds/scraper e gravados em blocos:
+    - PostgreSQL: COPY para uma tabela temporária + merge set-based
+      (INSERT ... SELECT ... ON CONFLICT)
+    - outros bancos: upsert em lote de ingestion.persistir_lote
+
+Odds já gravadas com coleta mais recente que a do arquivo não são sobrescritas.
+As mudanças de preço do arquivo entram em odds_history.
+A memória usada é limitada pelo tamanho do bloco, não pelo tamanho dos arquivos.
+
+Uso (a partir de backend/):
+    python import_odds.py dumps/2026-10-*.jsonl
+    python import_odds.py --bloco 50000 --database-url postgresql://... scrape_betano.json.gz
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import datetime
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Importa arquivos do scraper para o banco")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos .jsonl/.json (ou .gz)")
+    parser.add_argument("--database-url", help="Banco de destino (default: DATABASE_URL)")
+    parser.add_argument("--bloco", type=int, default=20000, help="Registros por transação")
+    parser.add_argument("--max-erros", type=int, default=20, help="Erros de validação exibidos")
+    return parser.parse_args()
+
+
+# Início do array de registros: o próprio documento ou o campo "data" de /scrape/*
+INICIO_ARRAY = re.compile(r'^\s*\[|"data"\s*:\s*\[')
+TAMANHO_LEITURA = 1 << 16
+
+
+def abrir(caminho: str):
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, "rt", encoding="utf-8-sig")
+    return open(caminho, "r", encoding="utf-8-sig")
+
+
+def registros_do_objeto(obj):
+    """
+    Registros contidos em um objeto JSON: payload/resposta com "data", lista
+    de registros ou um registro isolado.
+    """
+    if isinstance(obj, list):
+        for item in obj:
+            yield from registros_do_objeto(item)
+    elif isinstance(obj, dict):
+        if isinstance(obj.get("data"), list):
+            yield from obj["data"]
+        elif "event" in obj and "market" in obj:
+            yield obj
+
+
+def ler_jsonl(arquivo):
+    for linha in arquivo:
+        linha = linha.strip()
+        if linha:
+            yield from registros_do_objeto(json.loads(linha))
+
+
+def ler_json(arquivo):
+    """
+    Percorre os elementos do array de registros sem carregar o arquivo inteiro.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    
+    while True:
+        inicio = INICIO_ARRAY.search(buffer)
+        if inicio:
+            break
+        mais = arquivo.read(TAMANHO_LEITURA)
+        if not mais:
+            return
+        buffer += mais
+    
+    pos = inicio.end()
+    while True:
+        # Pula separadores, lendo mais do arquivo quando o buffer acaba
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buffer):
+            mais = arquivo.read(TAMANHO_LEITURA)
+            if not mais:
+                return
+            buffer, pos = buffer[pos:] + mais, 0
+            continue
+        
+        if buffer[pos] == "]":
+            return
+        
+        try:
+            obj, fim = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Elemento incompleto no buffer
+            mais = arquivo.read(TAMANHO_LEITURA)
+            if not mais:
+                raise
+            buffer, pos = buffer[pos:] + mais, 0
+            continue
+        
+        yield from registros_do_objeto(obj)
+        pos = fim
+        if pos > TAMANHO_LEITURA:
+            buffer, pos = buffer[pos:], 0
+
+
+def ler_arquivo(caminho: str):
+    nome = caminho[:-3] if caminho.endswith(".gz") else caminho
+    with abrir(caminho) as arquivo:
+        if nome.endswith(".jsonl") or nome.endswith(".ndjson"):
+            yield from ler_jsonl(arquivo)
+        else:
+            yield from ler_json(arquivo)
+
+
+# Tabela temporária do COPY (esvaziada a cada commit)
+STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS staging_odds (
+    linha BIGINT,
+    odd_id VARCHAR(50),
+    event_id VARCHAR(50),
+    sport VARCHAR(50),
+    league VARCHAR(100),
+    home_team VARCHAR(100),
+    away_team VARCHAR(100),
+    event_date TIMESTAMP,
+    status VARCHAR(20),
+    bookmaker VARCHAR(50),
+    market VARCHAR(50),
+    home_odd NUMERIC(10, 2),
+    draw_odd NUMERIC(10, 2),
+    away_odd NUMERIC(10, 2),
+    home_or_draw_odd NUMERIC(10, 2),
+    away_or_draw_odd NUMERIC(10, 2),
+    scraped_at TIMESTAMP
+) ON COMMIT DELETE ROWS
+"""
+
+COLUNAS_STAGING = [
+    "linha", "odd_id", "event_id", "sport", "league", "home_team", "away_team", "event_date",
+    "status", "bookmaker", "market", "home_odd", "draw_odd", "away_odd",
+    "home_or_draw_odd", "away_or_draw_odd", "scraped_at",
+]
+
+MERGE_EVENTOS = """
+INSERT INTO events (id, sport, league, home_team, away_team, event_date, status, created_at)
+SELECT DISTINCT ON (event_id) event_id, sport, league, home_team, away_team, event_date, status, :agora
+FROM staging_odds
+ORDER BY event_id, linha
+ON CONFLICT (id) DO NOTHING
+"""
+
+# Uma instrução por mercado: cada um só sobrescreve as próprias colunas, e só
+# se a coleta do arquivo não for mais antiga que a gravada
+MERGE_ODDS = """
+INSERT INTO odds (id, event_id, bookmaker, market, {colunas}, scraped_at, is_active)
+SELECT DISTINCT ON (event_id, bookmaker) odd_id, event_id, bookmaker, market, {colunas}, scraped_at, TRUE
+FROM staging_odds
+WHERE market = :market
+ORDER BY event_id, bookmaker, scraped_at DESC NULLS LAST, linha DESC
+ON CONFLICT (event_id, bookmaker) DO UPDATE SET {atualizacoes}, {assinatura} = NULL, scraped_at = EXCLUDED.scraped_at
+WHERE odds.scraped_at IS NULL OR odds.scraped_at <= EXCLUDED.scraped_at
+"""
+
+
+# Histórico (odds_history): uma linha por mudança de preço dentro do bloco,
+# comparando o primeiro preço de cada (evento, casa, mercado) com o gravado
+CHAVES_HISTORICO = [
+    "INSERT INTO bookmakers (name) SELECT DISTINCT bookmaker FROM staging_odds ON CONFLICT (name) DO NOTHING",
+    "INSERT INTO event_keys (event_id) SELECT DISTINCT event_id FROM staging_odds ON CONFLICT (event_id) DO NOTHING",
+]
+
+MERGE_HISTORICO = """
+WITH precos AS (
+    SELECT s.event_id, s.bookmaker, s.scraped_at, s.linha, p.outcome, ROUND(p.odd * 100)::INTEGER AS odd_x100
+    FROM staging_odds s
+    CROSS JOIN LATERAL (VALUES {valores}) AS p(outcome, odd)
+    WHERE p.odd > 0 AND s.scraped_at IS NOT NULL
+), sequencia AS (
+    SELECT precos.*, LAG(odd_x100) OVER (
+        PARTITION BY event_id, bookmaker, outcome ORDER BY scraped_at, linha
+    ) AS anterior
+    FROM precos
+)
+INSERT INTO odds_history (event_key, scraped_at, bookmaker_id, outcome, odd_x100)
+SELECT k.id, q.scraped_at, b.id, q.outcome, q.odd_x100
+FROM sequencia q
+JOIN event_keys k ON k.event_id = q.event_id
+JOIN bookmakers b ON b.name = q.bookmaker
+LEFT JOIN odds o ON o.event_id = q.event_id AND o.bookmaker = q.bookmaker
+WHERE q.odd_x100 IS DISTINCT FROM COALESCE(q.anterior, ROUND((CASE q.outcome {casos} END) * 100)::INTEGER)
+ON CONFLICT DO NOTHING
+"""
+
+
+def carregar_copy(db, registros, primeira_linha: int) -> int:
+    """
+    COPY do bloco para staging_odds e merge nas tabelas definitivas.
+    Retorna o número de odds inseridas/atualizadas.
+    """
+    from sqlalchemy import text
+    from ingestion import COLUNAS_MERCADO, COLUNA_ASSINATURA, NOME_MERCADO, HISTORICO_ATIVO, apos_gravar_odds
+    from best_lines import MERCADOS
+    
+    db.execute(text(STAGING_DDL))
+    
+    cursor = db.connection().connection.driver_connection.cursor()
+    with cursor.copy(f"COPY staging_odds ({', '.join(COLUNAS_STAGING)}) FROM STDIN") as copy:
+        for numero, registro in enumerate(registros, start=primeira_linha):
+            evento = registro["event"]
+            odds = registro["odds"]
+            copy.write_row((
+                numero, f"odd_{uuid.uuid4().hex[:12]}", evento["id"], evento["sport"], evento["league"],
+                evento["home_team"], evento["away_team"], evento["event_date"], evento["status"],
+                registro["bookmaker"], registro["market"],
+                odds.get("home_odd"), odds.get("draw_odd"), odds.get("away_odd"),
+                odds.get("home_or_draw_odd"), odds.get("away_or_draw_odd"), registro["scraped_at"],
+            ))
+    
+    db.execute(text(MERGE_EVENTOS), {"agora": datetime.utcnow()})
+    
+    # Antes do merge das odds, para comparar com os preços ainda gravados
+    if HISTORICO_ATIVO:
+        for sql in CHAVES_HISTORICO:
+            db.execute(text(sql))
+        db.execute(text(MERGE_HISTORICO.format(
+            valores=", ".join(f"({codigo}, s.{coluna})" for codigo, coluna in enumerate(MERCADOS)),
+            casos=" ".join(f"WHEN {codigo} THEN o.{coluna}" for codigo, coluna in enumerate(MERCADOS))
+        )))
+    
+    gravadas = 0
+    for tipo, colunas in COLUNAS_MERCADO.items():
+        sql = MERGE_ODDS.format(
+            colunas=", ".join(colunas),
+            atualizacoes=", ".join(f"{coluna} = EXCLUDED.{coluna}" for coluna in colunas),
+            # Preço gravado sem assinatura: a próxima ingestão da API regrava a linha
+            assinatura=COLUNA_ASSINATURA[tipo]
+        )
+        gravadas += db.execute(text(sql), {"market": NOME_MERCADO[tipo]}).rowcount
+    
+    event_ids = [event_id for (event_id,) in db.execute(text("SELECT DISTINCT event_id FROM staging_odds"))]
+    apos_gravar_odds(db, event_ids)
+    db.commit()
+    return gravadas
+
+
+def carregar_lote(db, registros, primeira_linha: int) -> int:
+    """
+    Alternativa sem COPY (SQLite/dev): upsert em lote da ingestão da API.
+    """
+    from ingestion import persistir_lote, apos_gravar_odds
+    
+    resultado = persistir_lote(db, registros, somente_mais_recentes=True)
+    apos_gravar_odds(db, resultado["event_ids"])
+    db.commit()
+    return len(resultado["odds"])
+
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    
+    from models import SessionLocal
+    from ingestion import normalizar_registro
+    
+    db = SessionLocal()
+    usa_copy = db.get_bind().dialect.name == "postgresql"
+    carregar = carregar_copy if usa_copy else carregar_lote
+    print(f"📦 Importando {len(args.arquivos)} arquivo(s) via {'COPY + merge' if usa_copy else 'upsert em lote'} "
+          f"(blocos de {args.bloco})")
+    
+    lidos = validos = invalidos = gravadas = 0
+    bloco = []
+    inicio = time.perf_counter()
+    
+    def descarregar():
+        nonlocal gravadas
+        t0 = time.perf_counter()
+        gravadas += carregar(db, bloco, validos - len(bloco))
+        duracao = time.perf_counter() - t0
+        print(f"   • {validos} registros válidos ({len(bloco) / duracao:,.0f} registros/s no bloco)")
+        bloco.clear()
+    
+    try:
+        for caminho in args.arquivos:
+            print(f"📄 {caminho}")
+            for registro in ler_arquivo(caminho):
+                lidos += 1
+                try:
+                    bloco.append(normalizar_registro(registro))
+                    validos += 1
+                except Exception as e:
+                    invalidos += 1
+                    if invalidos <= args.max_erros:
+                        print(f"   ⚠️  Registro {lidos}: {e}")
+                    continue
+                
+                if len(bloco) >= args.bloco:
+                    descarregar()
+        
+        if bloco:
+            descarregar()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    
+    duracao = time.perf_counter() - inicio
+    print(f"✅ {lidos} registros lidos, {validos} válidos, {invalidos} inválidos, {gravadas} odds gravadas")
+    print(f"⏱️  {duracao:.1f}s ({lidos / duracao if duracao else 0:,.0f} registros/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""
+Ingestão em lote das odds enviadas pelos scrapers.
+
+Um payload vira poucas instruções SQL: uma consulta para os eventos e uma para
+as odds existentes, um INSERT ... ON CONFLICT DO NOTHING para os eventos novos e
+um INSERT ... ON CONFLICT DO UPDATE (por (event_id, bookmaker)) para cada
+combinação de mercados recebida. Nada é commitado aqui.
+
+Reenvios com os mesmos preços (mesma assinatura por mercado) não regravam a
+linha: no máximo renovam o scraped_at a cada INTERVALO_HEARTBEAT, e sem isso
+o evento nem é marcado como alterado.
+"""
+import os
+import uuid
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from models import Event, Odd, insert_com_conflito
+from best_lines import atualizar_best_lines
+from opportunity_set import marcar_eventos_sujos
+from versioning import incrementar_versao
+from read_model import registrar_alteracao
+from odds_history import detectar_mudancas, gravar_historico
+from team_aliases import indice_times, chave_para_id
+
+# Grava o histórico de mudanças de preço (odds_history) na ingestão
+HISTORICO_ATIVO = os.getenv("ODDS_HISTORY_ENABLED", "true").lower() != "false"
+
+# Colunas atualizadas por tipo de mercado do scraper
+COLUNAS_MERCADO = {
+    "1X2": ("home_odd", "draw_odd", "away_odd"),
+    "Double Chance": ("home_or_draw_odd", "away_or_draw_odd"),
+}
+
+COLUNAS_ODDS = {coluna for colunas in COLUNAS_MERCADO.values() for coluna in colunas}
+
+# Coluna com a assinatura dos preços de cada mercado
+COLUNA_ASSINATURA = {
+    "1X2": "fingerprint_1x2",
+    "Double Chance": "fingerprint_dc",
+}
+
+# Com preços iguais, o scraped_at só é renovado se o gravado for mais velho que isso
+INTERVALO_HEARTBEAT = timedelta(seconds=int(os.getenv("ODDS_HEARTBEAT_SECONDS", "300")))
+
+# Linhas por instrução (o PostgreSQL aceita até 65535 parâmetros por comando)
+TAMANHO_BLOCO = 1000
+
+# Valor de Odd.market quando a linha é criada por esse tipo de mercado
+NOME_MERCADO = {
+    "1X2": "Resultado Final",
+    "Double Chance": "Double Chance",
+}
+
+
+@lru_cache(maxsize=4096)
+def para_utc(valor: Optional[str]) -> Optional[datetime]:
+    """
+    Converte um timestamp ISO (com ou sem 'Z') para datetime UTC sem fuso.
+    Com cache: os registros de um payload repetem os mesmos horários.
+    """
+    if not valor:
+        return None
+    data = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def gerar_event_id(competicao: str, home_team: str, away_team: str, bookmaker: Optional[str] = None) -> str:
+    """
+    Id do evento a partir da competição e das chaves canônicas dos times, para
+    que a mesma partida escrita de jeitos diferentes por cada casa caia no
+    mesmo evento ("Botafogo-RJ" e "Botafogo" -> botafogo).
+    """
+    home = chave_para_id(indice_times.resolver(home_team, bookmaker, competicao))
+    away = chave_para_id(indice_times.resolver(away_team, bookmaker, competicao))
+    return f"evt_{competicao}_{home}_{away}"
+
+
+def _extrair_odds(tipo: str, selecoes: Iterable[Dict]) -> Dict[str, Optional[float]]:
+    odds = {coluna: None for coluna in COLUNAS_MERCADO[tipo]}
+    
+    for selecao in selecoes:
+        chave = selecao.get("key")
+        nome = selecao.get("name")
+        if tipo == "1X2":
+            if chave == "1" or nome == "Home":
+                odds["home_odd"] = selecao["odd"]
+            elif chave == "X" or nome == "Draw":
+                odds["draw_odd"] = selecao["odd"]
+            elif chave == "2" or nome == "Away":
+                odds["away_odd"] = selecao["odd"]
+        else:
+            if chave == "1X":
+                odds["home_or_draw_odd"] = selecao["odd"]
+            elif chave == "X2":
+                odds["away_or_draw_odd"] = selecao["odd"]
+    
+    return odds
+
+
+def normalizar_registro(registro: Dict) -> Dict:
+    """
+    Valida e normaliza um registro no formato do scraper.
+    
+    Args:
+        registro: Dict com source, competition, event, market e collected_at
+    
+    Returns:
+        Dict com event (colunas de Event), bookmaker, market (valor de Odd.market,
+        ou None se o mercado não é suportado), odds (colunas de Odd) e scraped_at
+    
+    Raises:
+        ValueError: Se o nome do evento não estiver no formato "Casa vs Fora"
+    """
+    evento = registro["event"]
+    teams = evento["name"].split(" vs ")
+    
+    if len(teams) != 2:
+        raise ValueError(f"Formato inválido do evento: {evento['name']}")
+    
+    home_team = teams[0].strip()
+    away_team = teams[1].strip()
+    competicao = registro["competition"]
+    tipo = registro["market"]["type"]
+    
+    return {
+        "event": {
+            "id": gerar_event_id(competicao, home_team, away_team, registro["source"]),
+            "sport": "Futebol",
+            "league": competicao,
+            "home_team": home_team,
+            "away_team": away_team,
+            "event_date": para_utc(evento.get("start_time")) or datetime.utcnow(),
+            "status": evento.get("status") or "upcoming",
+        },
+        "bookmaker": registro["source"],
+        "market": NOME_MERCADO.get(tipo),
+        "odds": _extrair_odds(tipo, registro["market"]["selections"]) if tipo in COLUNAS_MERCADO else {},
+        "scraped_at": para_utc(registro["collected_at"]),
+    }
+
+
+def assinatura_odds(odds: Dict, colunas: Iterable[str]) -> int:
+    """
+    Assinatura (crc32) dos preços de um mercado, em centésimos. Estável entre
+    processos, ao contrário de hash().
+    """
+    texto = "|".join(
+        "-" if odds.get(coluna) is None else str(int(round(float(odds[coluna]) * 100)))
+        for coluna in colunas
+    )
+    return zlib.crc32(texto.encode("ascii"))
+
+
+def _assinaturas(odds: Dict) -> Dict[str, int]:
+    """
+    Assinaturas dos mercados presentes nas colunas recebidas.
+    """
+    return {
+        COLUNA_ASSINATURA[tipo]: assinatura_odds(odds, colunas)
+        for tipo, colunas in COLUNAS_MERCADO.items()
+        if any(coluna in odds for coluna in colunas)
+    }
+
+
+def _sem_mudanca(assinaturas: Dict[str, int], atual: Optional[Dict]) -> bool:
+    return atual is not None and all(atual[coluna] == valor for coluna, valor in assinaturas.items())
+
+
+def _em_blocos(itens: List, tamanho: int = TAMANHO_BLOCO):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def _consolidar_odds(registros: List[Dict]) -> Dict[Tuple[str, str], Dict]:
+    """
+    Junta os registros de uma mesma (event_id, bookmaker): o ON CONFLICT não pode
+    atualizar a mesma linha duas vezes na mesma instrução.
+    """
+    linhas = {}
+    
+    for registro in registros:
+        if registro["market"] is None:
+            continue
+        
+        chave = (registro["event"]["id"], registro["bookmaker"])
+        linha = linhas.get(chave)
+        if linha is None:
+            linha = linhas[chave] = {
+                "event_id": chave[0],
+                "bookmaker": chave[1],
+                "market": registro["market"],
+                "scraped_at": registro["scraped_at"],
+            }
+        elif registro["scraped_at"] and (linha["scraped_at"] is None or registro["scraped_at"] > linha["scraped_at"]):
+            linha["scraped_at"] = registro["scraped_at"]
+        
+        # O último registro de cada mercado prevalece, como na gravação linha a linha
+        linha.update(registro["odds"])
+    
+    return linhas
+
+
+def persistir_lote(db: Session, registros: List[Dict], somente_mais_recentes: bool = False) -> Dict:
+    """
+    Grava um lote de registros normalizados (não faz commit).
+    
+    Args:
+        registros: Saída de normalizar_registro
+        somente_mais_recentes: Não sobrescreve odds coletadas depois do registro
+            (usado na importação de arquivos antigos)
+    
+    Returns:
+        Dict com saved/updated (por registro, como antes), new/changed/unchanged
+        (por registro, comparando com os preços já gravados), event_ids que
+        precisam de pós-processamento e a lista de chaves (event_id, bookmaker)
+        gravadas
+    """
+    if not registros:
+        return {"saved": 0, "updated": 0, "new": 0, "changed": 0, "unchanged": 0, "event_ids": set(), "odds": []}
+    
+    insert = insert_com_conflito(db)
+    
+    # Eventos: só os que ainda não existem; ON CONFLICT cobre payloads concorrentes
+    eventos = {}
+    for registro in registros:
+        eventos.setdefault(registro["event"]["id"], registro["event"])
+    
+    existentes = set()
+    for bloco in _em_blocos(list(eventos)):
+        existentes.update(event_id for (event_id,) in db.query(Event.id).filter(Event.id.in_(bloco)))
+    
+    novos = [dict(dados, created_at=datetime.utcnow()) for event_id, dados in eventos.items() if event_id not in existentes]
+    for bloco in _em_blocos(novos):
+        db.execute(insert(Event).values(bloco).on_conflict_do_nothing(index_elements=["id"]))
+    
+    # Odds: pré-carrega as linhas existentes (assinaturas, scraped_at e, para o
+    # histórico, os preços atuais)
+    linhas = _consolidar_odds(registros)
+    atuais = {}
+    colunas_atuais = [Odd.id, Odd.event_id, Odd.bookmaker, Odd.scraped_at, Odd.fingerprint_1x2, Odd.fingerprint_dc]
+    if HISTORICO_ATIVO:
+        colunas_atuais += [getattr(Odd, coluna) for coluna in sorted(COLUNAS_ODDS)]
+    for bloco in _em_blocos(list({event_id for event_id, _ in linhas})):
+        for linha in db.query(*colunas_atuais).filter(Odd.event_id.in_(bloco)):
+            atuais[(linha.event_id, linha.bookmaker)] = linha._asdict()
+    
+    saved = updated = novas = alteradas = iguais = 0
+    vistas = set(atuais)
+    for registro in registros:
+        if registro["market"] is None:
+            continue
+        chave = (registro["event"]["id"], registro["bookmaker"])
+        if chave in vistas:
+            updated += 1
+        else:
+            saved += 1
+            vistas.add(chave)
+        
+        atual = atuais.get(chave)
+        if atual is None:
+            novas += 1
+        elif _sem_mudanca(_assinaturas(registro["odds"]), atual):
+            iguais += 1
+        else:
+            alteradas += 1
+    
+    # Separa as linhas com preço novo das que só confirmam o preço gravado
+    gravar = []
+    heartbeats = []
+    for chave, linha in linhas.items():
+        assinaturas = _assinaturas(linha)
+        atual = atuais.get(chave)
+        
+        if not _sem_mudanca(assinaturas, atual):
+            linha.update(assinaturas)
+            gravar.append(linha)
+            continue
+        
+        # Mesmo preço: renova o scraped_at (frescor da odd) só de tempos em tempos
+        visto = linha["scraped_at"]
+        if visto is not None and (atual["scraped_at"] is None or visto - atual["scraped_at"] >= INTERVALO_HEARTBEAT):
+            heartbeats.append({"id": atual["id"], "scraped_at": visto, "event_id": chave[0]})
+    
+    # Histórico: só os preços que mudaram
+    if HISTORICO_ATIVO:
+        gravar_historico(db, detectar_mudancas(atuais, gravar))
+    
+    # Um upsert por combinação de colunas recebidas (1X2, Double Chance ou ambos):
+    # cada mercado só sobrescreve as próprias colunas e a própria assinatura
+    por_combinacao = {}
+    for linha in gravar:
+        colunas = tuple(sorted(coluna for coluna in linha if coluna in COLUNAS_ODDS or coluna.startswith("fingerprint_")))
+        por_combinacao.setdefault(colunas, []).append(linha)
+    
+    for colunas, grupo in por_combinacao.items():
+        stmt = insert(Odd)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["event_id", "bookmaker"],
+            set_={coluna: stmt.excluded[coluna] for coluna in colunas + ("scraped_at",)},
+            where=or_(Odd.scraped_at.is_(None), Odd.scraped_at <= stmt.excluded.scraped_at) if somente_mais_recentes else None
+        )
+        # executemany: o SQLAlchemy/driver agrupa as linhas sem recompilar a instrução
+        db.execute(stmt, [dict(linha, id=f"odd_{uuid.uuid4().hex[:12]}", is_active=True) for linha in grupo])
+    
+    # Heartbeat: UPDATE só do scraped_at, por chave primária, em lote
+    if heartbeats:
+        db.execute(update(Odd), [{"id": linha["id"], "scraped_at": linha["scraped_at"]} for linha in heartbeats])
+    
+    return {
+        "saved": saved,
+        "updated": updated,
+        "new": novas,
+        "changed": alteradas,
+        "unchanged": iguais,
+        "event_ids": (
+            {evento["id"] for evento in novos}
+            | {linha["event_id"] for linha in gravar}
+            | {linha["event_id"] for linha in heartbeats}
+        ),
+        "odds": list(linhas),
+    }
+
+
+def apos_gravar_odds(db: Session, event_ids: Iterable[str]) -> None:
+    """
+    Atualiza as estruturas derivadas dos eventos que receberam odds
+    (best lines, marca de evento sujo, versão das odds e modelo de leitura).
+    Não faz commit.
+    """
+    event_ids = set(event_ids)
+    if not event_ids:
+        return
+    
+    atualizar_best_lines(db, event_ids)
+    marcar_eventos_sujos(db, event_ids)
+    incrementar_versao(db)
+    registrar_alteracao(db, event_ids)
@@ -0,0 +1,192 @@
+"""
+Ingestão em streaming (NDJSON) para /api/odds/stream.
+
+Cada linha do corpo é um registro do scraper. As linhas são validadas à medida
+que chegam, normalizadas por lote em thread (a resolução dos times pode fazer
+comparações aproximadas, fora do event loop) e gravadas em lotes contínuos
+(persistir_lote + commit por lote), sem montar o payload inteiro em memória.
+Enquanto um lote é gravado (em thread) o próximo já vai sendo lido; no máximo
+dois lotes ficam em memória e o upload espera o banco quando ele está mais
+lento que a rede.
+"""
+import asyncio
+import os
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException
+from fast_json import decodificar_registro_scraper
+from ingestion import normalizar_registro, persistir_lote, apos_gravar_odds
+from team_aliases import orcamento_fuzzy
+
+# Registros por lote gravado
+TAMANHO_LOTE_STREAM = int(os.getenv("INGESTION_STREAM_BATCH", "500"))
+
+# Tamanho máximo de uma linha (um registro)
+LIMITE_LINHA = 1024 * 1024
+
+# Erros devolvidos no resumo (o total vem em errorCount)
+MAX_ERROS_RESUMO = 100
+
+
+async def linhas_ndjson(partes: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Quebra o corpo em linhas à medida que os pedaços chegam.
+    
+    Returns:
+        Iterador de (número da linha, conteúdo) das linhas não vazias
+    
+    Raises:
+        HTTPException: 413 se uma linha passar de LIMITE_LINHA
+    """
+    pendente = b""
+    numero = 0
+    
+    async for parte in partes:
+        if not parte:
+            continue
+        pendente += parte
+        *linhas, pendente = pendente.split(b"\n")
+        
+        for linha in linhas:
+            numero += 1
+            if len(linha) > LIMITE_LINHA:
+                raise HTTPException(status_code=413, detail=f"Linha {numero} maior que {LIMITE_LINHA} bytes")
+            if linha.strip():
+                yield numero, linha
+        
+        if len(pendente) > LIMITE_LINHA:
+            raise HTTPException(status_code=413, detail=f"Linha {numero + 1} maior que {LIMITE_LINHA} bytes")
+    
+    if pendente.strip():
+        yield numero + 1, pendente
+
+
+def _mensagem_erro(numero: int, e: Exception) -> str:
+    """Erro de uma linha no resumo."""
+    if isinstance(e, ValidationError):
+        detalhe = e.errors(include_url=False)[0]
+        local = ".".join(str(parte) for parte in detalhe["loc"])
+        return f"Linha {numero}: {local + ': ' if local else ''}{detalhe['msg']}"
+    if isinstance(e, ValueError):
+        return f"Linha {numero}: {str(e)}"
+    return f"Linha {numero}: Erro ao processar: {str(e)}"
+
+
+def _normalizar_lote(linhas: List[Tuple[int, Dict]], erro: Callable[[str], None]) -> List[Dict]:
+    """
+    Normaliza os registros decodificados de um lote (roda em thread); as
+    linhas recusadas vão para erro().
+    """
+    registros = []
+    for numero, registro in linhas:
+        try:
+            registros.append(normalizar_registro(registro))
+        except Exception as e:
+            erro(_mensagem_erro(numero, e))
+    return registros
+
+
+def _gravar_lote(db: Session, registros: List[Dict]) -> Dict:
+    """
+    Grava um lote e commita (roda em thread).
+    """
+    try:
+        resultado = persistir_lote(db, registros)
+        apos_gravar_odds(db, resultado["event_ids"])
+        db.commit()
+        return resultado
+    except Exception:
+        db.rollback()
+        raise
+
+
+async def ingerir_stream(partes: AsyncIterator[bytes], db: Session, tamanho_lote: int = TAMANHO_LOTE_STREAM) -> Dict:
+    """
+    Valida, normaliza e grava os registros NDJSON em lotes contínuos.
+    
+    Args:
+        partes: Pedaços do corpo da requisição (request.stream())
+        db: Sessão usada pelos lotes (um commit por lote)
+        tamanho_lote: Registros por lote
+    
+    Returns:
+        Resumo com linhas, registros aceitos, saved/updated, new/changed/unchanged,
+        lotes e erros
+    """
+    resumo = {
+        "success": True,
+        "lines": 0,
+        "accepted": 0,
+        "saved": 0,
+        "updated": 0,
+        "new": 0,
+        "changed": 0,
+        "unchanged": 0,
+        "batches": 0,
+        "errorCount": 0,
+        "errors": [],
+    }
+    
+    def erro(mensagem: str) -> None:
+        resumo["errorCount"] += 1
+        if len(resumo["errors"]) < MAX_ERROS_RESUMO:
+            resumo["errors"].append(mensagem)
+    
+    # (tarefa, número do lote, registros) do lote sendo gravado
+    gravacao: Optional[Tuple[asyncio.Future, int, int]] = None
+    numero_lote = 0
+    
+    async def aguardar_gravacao() -> None:
+        nonlocal gravacao
+        if gravacao is None:
+            return
+        tarefa, lote_atual, quantidade = gravacao
+        gravacao = None
+        try:
+            resultado = await tarefa
+            for chave in ("saved", "updated", "new", "changed", "unchanged"):
+                resumo[chave] += resultado[chave]
+            resumo["batches"] += 1
+        except Exception as e:
+            resumo["success"] = False
+            # Só a primeira linha: erros do SQLAlchemy trazem o SQL e os parâmetros
+            erro(f"Erro ao gravar o lote {lote_atual} ({quantidade} registros): {str(e).splitlines()[0]}")
+    
+    async def iniciar_gravacao(linhas: List[Tuple[int, Dict]]) -> None:
+        nonlocal gravacao, numero_lote
+        # Normaliza enquanto o lote anterior grava (o orçamento de orcamento_fuzzy segue para a thread)
+        lote = await run_in_threadpool(_normalizar_lote, linhas, erro)
+        resumo["accepted"] += len(lote)
+        # Um lote gravando por vez: a sessão não é compartilhada entre threads
+        await aguardar_gravacao()
+        if not lote:
+            return
+        numero_lote += 1
+        gravacao = (asyncio.ensure_future(run_in_threadpool(_gravar_lote, db, lote)), numero_lote, len(lote))
+    
+    linhas = []
+    try:
+        # Nomes de times novos: poucas comparações aproximadas por upload
+        with orcamento_fuzzy():
+            async for numero, linha in linhas_ndjson(partes):
+                resumo["lines"] = numero
+                try:
+                    linhas.append((numero, decodificar_registro_scraper(linha)))
+                except Exception as e:
+                    erro(_mensagem_erro(numero, e))
+                    continue
+                
+                if len(linhas) >= tamanho_lote:
+                    await iniciar_gravacao(linhas)
+                    linhas = []
+            
+            if linhas:
+                await iniciar_gravacao(linhas)
+    finally:
+        # Mesmo se o upload for interrompido, o lote em gravação termina
+        await aguardar_gravacao()
+    
+    resumo["errors"] = resumo["errors"] or None
+    return resumo
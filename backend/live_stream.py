@@ -0,0 +1,347 @@
+"""
+Canal de push (Server-Sent Events) de /api/stream.
+
+Tipos de mensagem:
+    - odds: um evento ativo mudou (odds, dados ou status). Vem do modelo de
+      leitura, logo após o commit da ingestão; a mensagem traz o evento
+      completo no formato de /api/events, ou removed=true quando ele deixa de
+      estar ativo (finalizado ou apagado)
+    - opportunity: oportunidade aberta, atualizada ou fechada (action). Um
+      ConjuntoOportunidades (sem persistir) reavalia os eventos alterados logo
+      após cada mudança de odds e, de tempos em tempos, também as pernas que
+      envelheceram. Sem conexões que peçam opportunity, a reavaliação para
+      (a thread fica parada) e o estado é descartado; a próxima assinatura
+      recomeça do zero
+
+Cada conexão tem filtros próprios e uma fila limitada: um cliente que não
+consome rápido o bastante é desconectado (mensagem dropped) em vez de segurar
+memória. Conexões ociosas custam só uma corrotina esperando na fila, então
+centenas cabem em um worker.
+
+Sem o modelo de leitura (READ_MODEL_ENABLED=false) não há mensagens odds e as
+oportunidades são reavaliadas só pelo intervalo.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from models import SessionLocal
+from opportunity_set import ConjuntoOportunidades
+from opportunity_store import gerar_id_oportunidade
+from read_model import modelo_leitura
+from fast_json import codificar_json
+
+TIPOS = ("odds", "opportunity")
+
+# Mensagens pendentes por cliente antes de desconectá-lo
+BUFFER_CLIENTE = int(os.getenv("STREAM_CLIENT_BUFFER", "256"))
+
+# Conexões simultâneas aceitas
+MAX_CLIENTES = int(os.getenv("STREAM_MAX_CLIENTS", "1000"))
+
+# Lucro mínimo (%) das oportunidades acompanhadas (os clientes filtram acima disso)
+LUCRO_MINIMO = float(os.getenv("STREAM_MIN_PROFIT", "0"))
+
+# Comentário enviado a conexões ociosas (mantém proxies abertos e detecta quedas)
+INTERVALO_PING = 15.0
+
+# Reavaliação das oportunidades mesmo sem odds novas (pernas envelhecem)
+INTERVALO_OPORTUNIDADES = 30.0
+
+# Espera antes de reavaliar, para juntar commits próximos
+ESPERA_AGRUPAMENTO = 0.1
+
+# Sugestão de reconexão ao cliente (ms)
+RETRY_MS = 3000
+
+
+class Assinante:
+    """
+    Uma conexão: fila limitada e filtros.
+    """
+    __slots__ = ("fila", "tipos", "ligas", "casas", "eventos", "min_lucro", "descartado")
+    
+    def __init__(
+        self,
+        tipos: Set[str],
+        ligas: Set[str],
+        casas: Set[str],
+        eventos: Set[str],
+        min_lucro: Optional[float],
+        tamanho_fila: int = BUFFER_CLIENTE
+    ):
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)
+        self.tipos = tipos
+        self.ligas = ligas
+        self.casas = casas
+        self.eventos = eventos
+        self.min_lucro = min_lucro
+        self.descartado = False
+    
+    def aceita(self, tipo: str, liga: Optional[str], casas: Iterable[str], event_id: str, lucro: Optional[float]) -> bool:
+        if tipo not in self.tipos:
+            return False
+        if self.eventos and event_id not in self.eventos:
+            return False
+        if self.ligas and (liga or "").lower() not in self.ligas:
+            return False
+        if self.casas and not any(casa.lower() in self.casas for casa in casas):
+            return False
+        if self.min_lucro is not None and lucro is not None and lucro < self.min_lucro:
+            return False
+        return True
+
+
+def _lista(valor: Optional[str]) -> Set[str]:
+    return {parte.strip().lower() for parte in (valor or "").split(",") if parte.strip()}
+
+
+def _formatar_oportunidade(opp_id: str, oportunidade: Dict) -> Dict:
+    """
+    Oportunidade no formato de /api/opportunities.
+    """
+    evento = oportunidade["event"]
+    aposta, hedge = oportunidade["bet1"], oportunidade["bet2"]
+    return {
+        "id": opp_id,
+        "eventId": evento["id"],
+        "homeTeam": evento["home_team"],
+        "awayTeam": evento["away_team"],
+        "league": evento["league"],
+        "userBookmaker": aposta["bookmaker"],
+        "userTeam": aposta["description"],
+        "userOdd": float(aposta["odd"]),
+        "hedgeBookmaker": hedge["bookmaker"],
+        "hedgeTeam": hedge["description"],
+        "hedgeOdd": float(hedge["odd"]),
+        "profitPercent": float(oportunidade["profit_percent"]),
+    }
+
+
+class CanalMudancas:
+    """
+    Distribui as mudanças de odds e oportunidades para as conexões abertas.
+    Produtores chamam publicar() de qualquer thread; a entrega roda no event
+    loop do servidor.
+    """
+    
+    def __init__(self, max_clientes: int = MAX_CLIENTES):
+        self.max_clientes = max_clientes
+        self.assinantes: Set[Assinante] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sequencia = itertools.count(1)
+        
+        self.publicadas = 0
+        self.entregues = 0
+        self.descartados = 0
+        
+        # Oportunidades abertas (id -> formato da API), para abrir/fechar
+        self.abertas: Dict[str, Dict] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._acordar = threading.Event()
+        # Conexões que pedem opportunity; sem nenhuma, a reavaliação fica parada
+        self.assinantes_oportunidades = 0
+        self._ativo = threading.Event()
+        self.acompanhando = False
+        self.reavaliacoes = 0
+        self.erros = 0
+    
+    def lotado(self) -> bool:
+        return len(self.assinantes) >= self.max_clientes
+    
+    def assinar(
+        self,
+        tipos: Optional[str] = None,
+        league: Optional[str] = None,
+        bookmaker: Optional[str] = None,
+        event_id: Optional[str] = None,
+        min_profit: Optional[float] = None
+    ) -> Assinante:
+        """
+        Registra uma conexão (chamar dentro do event loop).
+        
+        Raises:
+            ValueError: Se algum tipo for desconhecido
+        """
+        tipos_pedidos = _lista(tipos) or set(TIPOS)
+        invalidos = tipos_pedidos - set(TIPOS)
+        if invalidos:
+            raise ValueError(f"Tipo inválido: {', '.join(sorted(invalidos))}. Use: {', '.join(TIPOS)}")
+        
+        self._loop = asyncio.get_running_loop()
+        assinante = Assinante(tipos_pedidos, _lista(league), _lista(bookmaker), {
+            parte.strip() for parte in (event_id or "").split(",") if parte.strip()
+        }, min_profit)
+        self.assinantes.add(assinante)
+        
+        if "opportunity" in tipos_pedidos:
+            self.assinantes_oportunidades += 1
+            self._ativo.set()
+            self._iniciar_oportunidades()
+        return assinante
+    
+    def cancelar(self, assinante: Assinante) -> None:
+        """
+        Remove uma conexão (chamar dentro do event loop). A última que pedia
+        opportunity para a reavaliação das oportunidades.
+        """
+        if assinante not in self.assinantes:
+            return
+        self.assinantes.discard(assinante)
+        if "opportunity" in assinante.tipos:
+            self.assinantes_oportunidades -= 1
+            if not self.assinantes_oportunidades:
+                self._ativo.clear()
+                self._acordar.set()
+    
+    # --- Entrega ---
+    
+    def publicar(self, tipo: str, dados: Dict, liga: Optional[str], casas: Iterable[str], event_id: str, lucro: Optional[float] = None) -> None:
+        """
+        Publica uma mensagem (thread-safe). Sem conexões abertas, não faz nada.
+        """
+        loop = self._loop
+        if not self.assinantes or loop is None or loop.is_closed():
+            return
+        self.publicadas += 1
+        loop.call_soon_threadsafe(self._distribuir, tipo, dados, liga, tuple(casas), event_id, lucro)
+    
+    def _distribuir(self, tipo: str, dados: Dict, liga: Optional[str], casas: Tuple[str, ...], event_id: str, lucro: Optional[float]) -> None:
+        mensagem = None
+        for assinante in list(self.assinantes):
+            if not assinante.aceita(tipo, liga, casas, event_id, lucro):
+                continue
+            if mensagem is None:
+                # Serializada uma vez para todas as conexões
+                mensagem = f"id: {next(self._sequencia)}\nevent: {tipo}\ndata: ".encode() + codificar_json(dados) + b"\n\n"
+            try:
+                assinante.fila.put_nowait(mensagem)
+                self.entregues += 1
+            except asyncio.QueueFull:
+                # Cliente lento: desconecta em vez de acumular
+                assinante.descartado = True
+                self.cancelar(assinante)
+                self.descartados += 1
+    
+    async def mensagens(self, assinante: Assinante) -> AsyncIterator[bytes]:
+        """
+        Corpo SSE de uma conexão. Encerra (com a mensagem dropped) se o cliente
+        for descartado por lentidão.
+        """
+        try:
+            yield f"retry: {RETRY_MS}\n: conectado\n\n".encode()
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(assinante.fila.get(), timeout=INTERVALO_PING)
+                except asyncio.TimeoutError:
+                    mensagem = b": ping\n\n"
+                if assinante.descartado:
+                    yield b'event: dropped\ndata: {"reason":"buffer cheio"}\n\n'
+                    return
+                yield mensagem
+        finally:
+            self.cancelar(assinante)
+    
+    # --- Produtores ---
+    
+    def ao_alterar_eventos(self, alteracoes: List[Tuple[str, Optional[Dict], Optional[Dict]]]) -> None:
+        """
+        Ouvinte do modelo de leitura: publica as mudanças de eventos e pede a
+        reavaliação das oportunidades.
+        """
+        for event_id, novo, antigo in alteracoes:
+            if novo is not None:
+                dados = novo
+            else:
+                dados = {"eventId": event_id, "league": antigo["league"], "removed": True}
+            base = novo or antigo
+            self.publicar("odds", dados, base["league"], set(base["odds"]) | set((antigo or {}).get("odds", {})), event_id)
+        if alteracoes and self._ativo.is_set():
+            self._acordar.set()
+    
+    def _iniciar_oportunidades(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop_oportunidades, name="live-opportunities", daemon=True)
+        self._thread.start()
+    
+    def _loop_oportunidades(self) -> None:
+        while True:
+            # Parada até alguma conexão pedir opportunity
+            self._ativo.wait()
+            self.acompanhando = True
+            self._acompanhar_oportunidades()
+            self.abertas = {}
+            self.acompanhando = False
+    
+    def _acompanhar_oportunidades(self) -> None:
+        """
+        Reavalia as oportunidades enquanto houver conexões que pedem
+        opportunity (cada retomada começa de um conjunto novo).
+        """
+        conjunto = ConjuntoOportunidades(min_profit_percent=LUCRO_MINIMO)
+        primeira = True
+        while self._ativo.is_set():
+            try:
+                db = SessionLocal()
+                try:
+                    resultado = conjunto.atualizar(db)
+                finally:
+                    db.close()
+                atuais = {}
+                for oportunidade in resultado:
+                    opp_id = gerar_id_oportunidade(oportunidade)
+                    atuais[opp_id] = _formatar_oportunidade(opp_id, oportunidade)
+                
+                # A primeira avaliação só define o estado inicial
+                if not primeira:
+                    self._publicar_diferencas(self.abertas, atuais)
+                self.abertas = atuais
+                primeira = False
+                self.reavaliacoes += 1
+            except Exception as e:
+                self.erros += 1
+                print(f"⚠️  Erro ao reavaliar oportunidades do stream: {e}")
+            
+            self._acordar.wait(timeout=INTERVALO_OPORTUNIDADES)
+            time.sleep(ESPERA_AGRUPAMENTO)
+            self._acordar.clear()
+    
+    def _publicar_diferencas(self, anteriores: Dict[str, Dict], atuais: Dict[str, Dict]) -> None:
+        for opp_id, dados in atuais.items():
+            anterior = anteriores.get(opp_id)
+            if anterior == dados:
+                continue
+            acao = "opened" if anterior is None else "updated"
+            self.publicar(
+                "opportunity", dict(dados, action=acao), dados["league"],
+                (dados["userBookmaker"], dados["hedgeBookmaker"]), dados["eventId"], dados["profitPercent"]
+            )
+        for opp_id, dados in anteriores.items():
+            if opp_id not in atuais:
+                # Fechamento ignora o filtro de lucro: o cliente pode ter recebido a abertura
+                self.publicar(
+                    "opportunity", dict(dados, action="closed"), dados["league"],
+                    (dados["userBookmaker"], dados["hedgeBookmaker"]), dados["eventId"]
+                )
+    
+    def estatisticas(self) -> Dict:
+        return {
+            "clients": len(self.assinantes),
+            "maxClients": self.max_clientes,
+            "clientBuffer": BUFFER_CLIENTE,
+            "published": self.publicadas,
+            "delivered": self.entregues,
+            "dropped": self.descartados,
+            "opportunityClients": self.assinantes_oportunidades,
+            "opportunityTracking": self.acompanhando,
+            "openOpportunities": len(self.abertas),
+            "opportunityEvaluations": self.reavaliacoes,
+            "errors": self.erros,
+        }
+
+
+canal_mudancas = CanalMudancas()
+modelo_leitura.ouvintes.append(canal_mudancas.ao_alterar_eventos)
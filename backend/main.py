@@ -1,18 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, Optional
 from datetime import datetime, timedelta
+import math
 import uvicorn
-import uuid
+import numpy as np
 
-from models import get_db, Event, Odd
+from models import get_db, get_async_db, engine, async_engine, SessionLocal, AsyncSessionLocal, DB_ASYNC, Event, Odd
+from db_pool import estatisticas_pool
+from best_lines import atualizar_best_lines
+from ingestion import normalizar_registro, para_utc, persistir_lote, apos_gravar_odds
+from opportunity_store import listar_oportunidades
+from events_query import (
+    LIMITE_PAGINA,
+    MERCADOS_API,
+    interpretar_campos,
+    listar_eventos,
+    iterar_eventos,
+    listar_eventos_async,
+    iterar_eventos_async,
+)
+from odds_history import linha_do_tempo
+from update_event_status import remover_eventos_antigos
+from arbitrage import (
+    buscar_surebets_1x2,
+    calcular_hedge_lote,
+    MAX_CENARIOS_HEDGE,
+    processar_arbitragem_em_cache,
+    buscar_oportunidades_em_cache,
+)
+from versioning import incrementar_versao, obter_versao, obter_versao_async, espelho_versao
+from read_model import modelo_leitura, registrar_alteracao
+from live_stream import canal_mudancas
+from etag import gerar_etag, etag_corresponde, nao_modificado, com_etag
+from cache import cache_arbitragem
+from write_behind import MODO_INGESTAO, erro_transitorio, fila_ingestao
+from team_aliases import indice_times, orcamento_fuzzy
+from fast_json import RespostaJSON, RegistrosScraper, codificar_json, ler_payload_scraper, openapi_payload_scraper, openapi_ndjson_scraper
+from ingestion_stream import ingerir_stream
+from request_compression import DescompressaoMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carrega o modelo de leitura de /api/events (sem banco, as leituras usam a consulta)
+    await run_in_threadpool(modelo_leitura.iniciar)
+    # Índice de apelidos de times carregado antes da primeira ingestão
+    try:
+        await run_in_threadpool(indice_times.iniciar)
+    except Exception as e:
+        print(f"⚠️  Erro ao carregar o índice de times: {e}")
+    yield
+    # Grava os lotes que ainda estão na fila de ingestão antes de encerrar
+    fila_ingestao.parar()
 
 app = FastAPI(
     title="Betting Bot API",
     description="API para arbitragem de apostas",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -24,6 +78,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Corpos gzip/zstd dos scrapers (Content-Encoding), com limite de tamanho
+app.add_middleware(DescompressaoMiddleware)
+
+@app.exception_handler(RequestValidationError)
+async def erro_de_validacao(request: Request, exc: RequestValidationError):
+    """
+    NaN/Infinity no corpo respondem 400: o 422 padrão devolve a entrada
+    recusada, que não é serializável em JSON
+    """
+    if any(isinstance(erro.get("input"), float) and not math.isfinite(erro["input"]) for erro in exc.errors()):
+        return JSONResponse(status_code=400, content={"detail": "Os valores numéricos devem ser finitos"})
+    return await request_validation_exception_handler(request, exc)
+
 # Schemas
 class OddsUpdate(BaseModel):
     eventId: str
@@ -53,37 +120,31 @@ def update_odds(odds_data: OddsUpdate, db: Session = Depends(get_db)):
     Endpoint para o scraper enviar as odds coletadas
     """
     try:
-        # Verifica se o evento já existe
-        event = db.query(Event).filter(Event.id == odds_data.eventId).first()
-        
-        if not event:
-            # Cria o evento
-            event = Event(
-                id=odds_data.eventId,
-                sport=odds_data.sport,
-                league=odds_data.league,
-                home_team=odds_data.homeTeam,
-                away_team=odds_data.awayTeam,
-                event_date=datetime.fromisoformat(odds_data.eventDate.replace('Z', '+00:00')),
-                status="upcoming"
-            )
-            db.add(event)
-            db.commit()
+        # Upsert do evento e da odd (event_id, bookmaker) em uma transação
+        registro = {
+            "event": {
+                "id": odds_data.eventId,
+                "sport": odds_data.sport,
+                "league": odds_data.league,
+                "home_team": odds_data.homeTeam,
+                "away_team": odds_data.awayTeam,
+                "event_date": para_utc(odds_data.eventDate),
+                "status": "upcoming"
+            },
+            "bookmaker": odds_data.bookmaker,
+            "market": "Resultado Final",
+            "odds": {
+                "home_odd": odds_data.homeOdd,
+                "draw_odd": odds_data.drawOdd,
+                "away_odd": odds_data.awayOdd,
+                "home_or_draw_odd": odds_data.homeOrDrawOdd,
+                "away_or_draw_odd": odds_data.awayOrDrawOdd
+            },
+            "scraped_at": datetime.utcnow()
+        }
         
-        # Cria a odd
-        odd = Odd(
-            id=f"odd_{uuid.uuid4().hex[:12]}",
-            event_id=odds_data.eventId,
-            bookmaker=odds_data.bookmaker,
-            home_odd=odds_data.homeOdd,
-            draw_odd=odds_data.drawOdd,
-            away_odd=odds_data.awayOdd,
-            home_or_draw_odd=odds_data.homeOrDrawOdd,  # NOVO
-            away_or_draw_odd=odds_data.awayOrDrawOdd,  # NOVO
-            scraped_at=datetime.utcnow()
-        )
-
-        db.add(odd)
+        resultado = persistir_lote(db, [registro])
+        apos_gravar_odds(db, resultado["event_ids"])
         db.commit()
         
         return {
@@ -96,213 +157,599 @@ def update_odds(odds_data: OddsUpdate, db: Session = Depends(get_db)):
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao salvar odds: {str(e)}")
-    
-    # Schema para o formato do scraper
-class ScraperSelection(BaseModel):
-    key: str
-    name: str
-    odd: float
-
-class ScraperMarket(BaseModel):
-    type: str
-    name: str
-    selections: list[ScraperSelection]
-
-class ScraperEvent(BaseModel):
-    id: str
-    name: str
-    start_time: Optional[str] = None
-    status: str = "upcoming"
-
-class ScraperOddsData(BaseModel):
-    source: str
-    sport: str
-    competition: str
-    event: ScraperEvent
-    market: ScraperMarket
-    collected_at: str
 
-class ScraperPayload(BaseModel):
-    data: list[ScraperOddsData]
-
-@app.post("/api/odds/scraper")
-@app.post("/api/odds/scraper")
-def receive_scraper_odds(payload: ScraperPayload, db: Session = Depends(get_db)):
+@app.post("/api/odds/scraper", openapi_extra=openapi_payload_scraper())
+def receive_scraper_odds(data: RegistrosScraper = Depends(ler_payload_scraper), db: Session = Depends(get_db)):
     """
     Endpoint específico para receber dados do scraper no formato dele
     Processa tanto '1X2' quanto 'Double Chance'
+    (corpo decodificado direto em dicts tipados, ver fast_json)
     """
-    saved_count = 0
-    updated_count = 0
-    errors = []
+    registros, errors = _normalizar_payload(data)
     
-    for odds_data in payload.data:
-        try:
-            # Parse do nome do evento (ex: "Grêmio vs Botafogo-RJ")
-            event_name = odds_data.event.name
-            teams = event_name.split(" vs ")
-            
-            if len(teams) != 2:
-                errors.append(f"Formato inválido do evento: {event_name}")
-                continue
-            
-            home_team = teams[0].strip()
-            away_team = teams[1].strip()
-            
-            # Gera um eventId único baseado nos times e competição
-            event_id = f"evt_{odds_data.competition}_{home_team.lower().replace(' ', '_')}_{away_team.lower().replace(' ', '_')}"
-            
-            # Verifica se o evento já existe
-            event = db.query(Event).filter(Event.id == event_id).first()
-            
-            if not event:
-                # Cria o evento
-                event_date = datetime.fromisoformat(odds_data.event.start_time.replace('Z', '+00:00')) if odds_data.event.start_time else datetime.utcnow()
-                
-                # Determina o status baseado no horário
-                status = odds_data.event.status if odds_data.event.status else "upcoming"
-                
-                event = Event(
-                    id=event_id,
-                    sport="Futebol",
-                    league=odds_data.competition,
-                    home_team=home_team,
-                    away_team=away_team,
-                    event_date=event_date,
-                    status=status
-                )
-                db.add(event)
-                db.commit()
-            
-            # Verifica se já existe odd desse bookmaker para esse evento
-            existing_odd = db.query(Odd).filter(
-                Odd.event_id == event_id,
-                Odd.bookmaker == odds_data.source
-            ).first()
-            
-            # Processa baseado no tipo de market
-            if odds_data.market.type == "1X2":
-                # Extrai as odds de Resultado Final
-                home_odd = None
-                draw_odd = None
-                away_odd = None
-                
-                for selection in odds_data.market.selections:
-                    if selection.key == "1" or selection.name == "Home":
-                        home_odd = selection.odd
-                    elif selection.key == "X" or selection.name == "Draw":
-                        draw_odd = selection.odd
-                    elif selection.key == "2" or selection.name == "Away":
-                        away_odd = selection.odd
-                
-                if existing_odd:
-                    # Atualiza odds de Resultado Final
-                    existing_odd.home_odd = home_odd
-                    existing_odd.draw_odd = draw_odd
-                    existing_odd.away_odd = away_odd
-                    existing_odd.scraped_at = datetime.fromisoformat(odds_data.collected_at.replace('Z', '+00:00'))
-                    db.commit()
-                    updated_count += 1
-                else:
-                    # Cria nova odd
-                    odd = Odd(
-                        id=f"odd_{uuid.uuid4().hex[:12]}",
-                        event_id=event_id,
-                        bookmaker=odds_data.source,
-                        market="Resultado Final",
-                        home_odd=home_odd,
-                        draw_odd=draw_odd,
-                        away_odd=away_odd,
-                        home_or_draw_odd=None,
-                        away_or_draw_odd=None,
-                        scraped_at=datetime.fromisoformat(odds_data.collected_at.replace('Z', '+00:00'))
-                    )
-                    db.add(odd)
-                    db.commit()
-                    saved_count += 1
-            
-            elif odds_data.market.type == "Double Chance":
-                # Extrai as odds de Double Chance
-                home_or_draw_odd = None
-                away_or_draw_odd = None
-                
-                for selection in odds_data.market.selections:
-                    if selection.key == "1X":
-                        home_or_draw_odd = selection.odd
-                    elif selection.key == "X2":
-                        away_or_draw_odd = selection.odd
-                
-                if existing_odd:
-                    # Atualiza odds de Double Chance
-                    existing_odd.home_or_draw_odd = home_or_draw_odd
-                    existing_odd.away_or_draw_odd = away_or_draw_odd
-                    existing_odd.scraped_at = datetime.fromisoformat(odds_data.collected_at.replace('Z', '+00:00'))
-                    db.commit()
-                    updated_count += 1
-                else:
-                    # Cria nova odd só com Double Chance
-                    odd = Odd(
-                        id=f"odd_{uuid.uuid4().hex[:12]}",
-                        event_id=event_id,
-                        bookmaker=odds_data.source,
-                        market="Double Chance",
-                        home_odd=None,
-                        draw_odd=None,
-                        away_odd=None,
-                        home_or_draw_odd=home_or_draw_odd,
-                        away_or_draw_odd=away_or_draw_odd,
-                        scraped_at=datetime.fromisoformat(odds_data.collected_at.replace('Z', '+00:00'))
-                    )
-                    db.add(odd)
-                    db.commit()
-                    saved_count += 1
-            
-        except Exception as e:
-            errors.append(f"Erro ao processar {odds_data.event.name}: {str(e)}")
-            db.rollback()
+    # Modo fila: grava em segundo plano e responde 202 com o id do lote
+    if MODO_INGESTAO == "queue" and registros:
+        return _enfileirar_payload(registros, errors, data.total)
     
-    return {
+    # Gravação em lote: poucas queries e um único commit por payload
+    resultado = _gravar_isolando(db, registros, errors) if registros else None
+    
+    return _resposta_payload(resultado is not None or not registros, resultado, data.total, errors)
+
+def _normalizar_payload(data: RegistrosScraper) -> tuple[list[dict], list[str]]:
+    """
+    Normaliza os registros do scraper. Validação por registro: um registro
+    inválido não derruba o payload (os descartados na decodificação já vêm
+    em data.erros).
+    
+    Returns:
+        (registros normalizados, erros)
+    """
+    errors = list(data.erros)
+    registros = []
+    # Nomes de times novos: poucas comparações aproximadas por payload
+    with orcamento_fuzzy():
+        for odds_data in data:
+            try:
+                registros.append(normalizar_registro(odds_data))
+            except ValueError as e:
+                errors.append(str(e))
+            except Exception as e:
+                errors.append(f"Erro ao processar {odds_data['event']['name']}: {str(e)}")
+    return registros, errors
+
+def _enfileirar_payload(registros: list[dict], errors: list[str], total: int) -> JSONResponse:
+    """
+    INGESTION_MODE=queue: 202 com o id do lote, ou 429 com a fila cheia
+    """
+    batch_id = fila_ingestao.enfileirar(registros, errors)
+    if batch_id is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Fila de ingestão cheia, tente novamente",
+            headers={"Retry-After": "1"}
+        )
+    
+    return JSONResponse(status_code=202, content={
         "success": True,
-        "saved": saved_count,
-        "updated": updated_count,
-        "total": len(payload.data),
+        "batchId": batch_id,
+        "accepted": len(registros),
+        "total": total,
         "errors": errors if errors else None
+    })
+
+def _gravar_payload(db: Session, registros: list[dict]) -> dict:
+    """
+    Grava os registros e atualiza as estruturas derivadas (sem commit)
+    """
+    resultado = persistir_lote(db, registros)
+    apos_gravar_odds(db, resultado["event_ids"])
+    return resultado
+
+def _gravar_isolando(db: Session, registros: list[dict], errors: list[str]) -> Optional[dict]:
+    """
+    Grava e commita os registros em uma transação. Se o lote falhar, divide ao
+    meio e tenta cada metade, até isolar os registros que falham: os demais
+    são gravados e cada registro ruim vira um erro próprio. Falha de conexão
+    com o banco não é dividida (todas as partes falhariam igual).
+    
+    Returns:
+        Contagens somadas das partes gravadas (None se nada foi gravado)
+    """
+    try:
+        resultado = _gravar_payload(db, registros)
+        db.commit()
+        return resultado
+    except Exception as e:
+        db.rollback()
+        # Só a primeira linha: erros do SQLAlchemy trazem o SQL e os parâmetros
+        mensagem = str(e).splitlines()[0] if str(e) else type(e).__name__
+        if erro_transitorio(e):
+            errors.append(f"Erro ao gravar {len(registros)} registros: {mensagem}")
+            return None
+        if len(registros) == 1:
+            registro = registros[0]
+            evento = registro["event"]
+            errors.append(
+                f"Erro ao gravar {evento['home_team']} vs {evento['away_team']} "
+                f"({registro['bookmaker']}, {registro['market']}): {mensagem}"
+            )
+            return None
+    
+    meio = len(registros) // 2
+    partes = [_gravar_isolando(db, parte, errors) for parte in (registros[:meio], registros[meio:])]
+    partes = [parte for parte in partes if parte is not None]
+    if not partes:
+        return None
+    return {
+        **{chave: sum(parte[chave] for parte in partes) for chave in ("saved", "updated", "new", "changed", "unchanged")},
+        "event_ids": set().union(*(parte["event_ids"] for parte in partes)),
+        "odds": [odd for parte in partes for odd in parte["odds"]],
     }
 
-@app.get("/api/events")
-def get_events(db: Session = Depends(get_db)):
+def _resposta_payload(success: bool, resultado: Optional[dict], total: int, errors: list[str]) -> dict:
+    contagens = {"new": 0, "changed": 0, "unchanged": 0}
+    if resultado is not None:
+        contagens = {chave: resultado[chave] for chave in contagens}
+    return {
+        "success": success,
+        "saved": resultado["saved"] if resultado else 0,
+        "updated": resultado["updated"] if resultado else 0,
+        **contagens,
+        "total": total,
+        "errors": errors if errors else None
+    }
+
+@app.post("/api/odds/stream", openapi_extra=openapi_ndjson_scraper())
+async def receive_scraper_stream(request: Request, db: Session = Depends(get_db)):
     """
-    Retorna todos os eventos disponíveis com suas odds
-    Filtra apenas eventos que não estão finalizados
+    Recebe registros do scraper em NDJSON (um por linha) e grava em lotes
+    contínuos enquanto o upload chega. Responde com o resumo no final.
+    Linhas inválidas não derrubam o stream; um lote que falha é desfeito e
+    os demais seguem.
     """
-    events = db.query(Event).filter(
-        Event.status.in_(["upcoming", "live"])
-    ).all()
+    return await ingerir_stream(request.stream(), db)
+
+@app.get("/api/stream")
+async def stream_changes(
+    request: Request,
+    types: Optional[str] = None,
+    league: Optional[str] = None,
+    bookmaker: Optional[str] = None,
+    event_id: Optional[str] = None,
+    min_profit: Optional[float] = None
+):
+    """
+    Server-Sent Events com as mudanças de odds (event: odds) e as oportunidades
+    abertas/atualizadas/fechadas (event: opportunity), logo após o commit.
     
-    result = []
-    for event in events:
-        odds = db.query(Odd).filter(Odd.event_id == event.id).all()
-        
-        odds_by_bookmaker = {}
-        for odd in odds:
-            odds_by_bookmaker[odd.bookmaker] = {
-                "homeOdd": float(odd.home_odd) if odd.home_odd else None,
-                "drawOdd": float(odd.draw_odd) if odd.draw_odd else None,
-                "awayOdd": float(odd.away_odd) if odd.away_odd else None,
-                "homeOrDrawOdd": float(odd.home_or_draw_odd) if odd.home_or_draw_odd else None,
-                "awayOrDrawOdd": float(odd.away_or_draw_odd) if odd.away_or_draw_odd else None
+    types, league, bookmaker e event_id aceitam listas separadas por vírgula;
+    min_profit filtra as oportunidades. Clientes que não acompanham o ritmo
+    recebem event: dropped e são desconectados.
+    """
+    if canal_mudancas.lotado():
+        raise HTTPException(status_code=503, detail="Limite de conexões do stream atingido")
+    
+    try:
+        assinante = canal_mudancas.assinar(
+            tipos=types, league=league, bookmaker=bookmaker, event_id=event_id, min_profit=min_profit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        canal_mudancas.mensagens(assinante),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/stream/stats")
+def stream_stats():
+    """
+    Conexões abertas e mensagens entregues/descartadas do /api/stream
+    """
+    return canal_mudancas.estatisticas()
+
+@app.get("/api/ingestion/queue")
+def ingestion_queue_stats():
+    """
+    Profundidade, atraso e contadores da fila de ingestão (INGESTION_MODE=queue)
+    """
+    return fila_ingestao.estatisticas()
+
+@app.get("/api/ingestion/batches/{batch_id}")
+def ingestion_batch_status(batch_id: str):
+    """
+    Status de um lote aceito com 202 (queued, retrying, written ou failed)
+    """
+    status = fila_ingestao.obter_status(batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    return status
+
+@app.get("/api/events", response_class=RespostaJSON)
+def get_events(
+    request: Request,
+    league: Optional[str] = None,
+    bookmaker: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    has_arbitrage: Optional[bool] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Eventos não finalizados com suas odds (uma consulta por página).
+    
+    date_from/date_to em ISO (com ou sem fuso). bookmaker aceita várias casas
+    separadas por vírgula; fields limita os campos
+    (ex.: fields=homeTeam,awayTeam,homeOdd,awayOdd). Sem limit nem cursor
+    devolve todos os eventos (nextCursor null); com limit pagina, e para a
+    próxima página envie o nextCursor recebido (cursor sem limit usa páginas
+    de LIMITE_PAGINA). Com stream=true devolve todos os eventos em uma
+    resposta em streaming (ignora limit e cursor).
+    
+    Servido do modelo de leitura em memória quando carregado (X-Read-Source:
+    memory); has_arbitrage e o fallback consultam o banco (database).
+    
+    Responde com ETag (geração do modelo ou versão das odds); If-None-Match
+    igual devolve 304 sem consultar os eventos. has_arbitrage depende da
+    expiração das oportunidades (tempo), então não usa ETag.
+    """
+    filtros, usar_modelo = _filtros_eventos(league, bookmaker, date_from, date_to, has_arbitrage, fields)
+    
+    # ETag: geração do modelo de leitura ou versão das odds (consulta ao banco)
+    versao = None
+    if not usar_modelo and has_arbitrage is None:
+        versao = espelho_versao.atual()
+        if versao is None:
+            versao = obter_versao(db)
+    etag = _etag_eventos(usar_modelo, versao)
+    if etag is not None and etag_corresponde(request, etag):
+        return nao_modificado(etag)
+    
+    fonte = {"X-Read-Source": "memory" if usar_modelo else "database"}
+    if stream:
+        resposta = StreamingResponse(_dump_eventos(filtros, usar_modelo), media_type="application/json", headers=fonte)
+        return com_etag(resposta, etag)
+    
+    limite = _limite_eventos(limit, cursor)
+    try:
+        if usar_modelo:
+            eventos, proximo_cursor = _listar_do_modelo(filtros, limite, cursor)
+        elif limite is None:
+            eventos, proximo_cursor = list(iterar_eventos(db, **filtros)), None
+        else:
+            eventos, proximo_cursor = listar_eventos(db, limite=limite, cursor=cursor, **filtros)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return com_etag(RespostaJSON({"events": eventos, "nextCursor": proximo_cursor}, headers=fonte), etag)
+
+def _filtros_eventos(
+    league: Optional[str],
+    bookmaker: Optional[str],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    has_arbitrage: Optional[bool],
+    fields: Optional[str]
+) -> tuple[dict, bool]:
+    """
+    Filtros de /api/events (400 se inválidos) e se a leitura vem do modelo em memória
+    """
+    try:
+        campos, mercados = interpretar_campos(fields)
+        filtros = {
+            "league": league,
+            "bookmakers": [casa.strip() for casa in bookmaker.split(",") if casa.strip()] if bookmaker else None,
+            "desde": para_utc(date_from),
+            "ate": para_utc(date_to),
+            "com_arbitragem": has_arbitrage,
+            "campos": campos,
+            "mercados": mercados,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Sem filtro de arbitragem (depende da tabela de oportunidades), lê da memória
+    return filtros, has_arbitrage is None and modelo_leitura.disponivel()
+
+def _limite_eventos(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """
+    Tamanho da página de /api/events: None (todos os eventos) quando o cliente
+    não pagina, como antes do cursor.
+    """
+    if limit is None and cursor is None:
+        return None
+    return limit or LIMITE_PAGINA
+
+def _etag_eventos(usar_modelo: bool, versao: Optional[int]) -> Optional[str]:
+    if usar_modelo:
+        return gerar_etag("events-m", modelo_leitura.geracao)
+    if versao is not None:
+        return gerar_etag("events", versao)
+    return None
+
+def _listar_do_modelo(filtros: dict, limite: Optional[int], cursor: Optional[str] = None):
+    filtros = {chave: valor for chave, valor in filtros.items() if chave != "com_arbitragem"}
+    return modelo_leitura.listar(limite=limite, cursor=cursor, **filtros)
+
+def _dump_eventos(filtros: dict, usar_modelo: bool):
+    """
+    Corpo de /api/events?stream=true: {"events": [...]} montado evento a evento.
+    Do banco, lê página a página com sessão própria (a do Depends é fechada
+    antes do streaming terminar).
+    """
+    yield b'{"events":['
+    if usar_modelo:
+        eventos, _ = _listar_do_modelo(filtros, None)
+        for indice, evento in enumerate(eventos):
+            yield (b"," if indice else b"") + codificar_json(evento)
+    else:
+        db = SessionLocal()
+        try:
+            for indice, evento in enumerate(iterar_eventos(db, **filtros)):
+                yield (b"," if indice else b"") + codificar_json(evento)
+        finally:
+            db.close()
+    yield b']}'
+
+# Valores, odds, incremento e limites: finitos e maiores que zero
+ValorPositivo = Annotated[float, Field(gt=0, allow_inf_nan=False)]
+
+class HedgePair(BaseModel):
+    userOdd: ValorPositivo
+    hedgeOdd: ValorPositivo
+    userBookmaker: Optional[str] = None
+    hedgeBookmaker: Optional[str] = None
+
+class HedgeBatchRequest(BaseModel):
+    stakes: list[ValorPositivo]
+    pairs: list[HedgePair]
+    stakeIncrement: Optional[ValorPositivo] = None
+    maxStakes: Optional[dict[str, ValorPositivo]] = None
+
+@app.get("/api/events/{event_id}/history", response_class=RespostaJSON)
+def get_event_history(
+    event_id: str,
+    bookmaker: Optional[str] = None,
+    market: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Linha do tempo das mudanças de preço de um evento (odds_history)
+    """
+    if market is not None and market not in MERCADOS_API:
+        raise HTTPException(status_code=400, detail=f"Mercado inválido. Use: {', '.join(MERCADOS_API)}")
+    
+    pontos = linha_do_tempo(
+        db,
+        event_id,
+        bookmaker=bookmaker,
+        mercado=MERCADOS_API.get(market),
+        desde=since,
+        ate=until,
+        limite=limit
+    )
+    colunas_api = {coluna: nome for nome, coluna in MERCADOS_API.items()}
+    
+    return RespostaJSON({
+        "eventId": event_id,
+        "points": [
+            {
+                "bookmaker": ponto["bookmaker"],
+                "market": colunas_api[ponto["market"]],
+                "odd": ponto["odd"],
+                "scrapedAt": ponto["scraped_at"].isoformat()
             }
-        
+            for ponto in pontos
+        ],
+        "total": len(pontos)
+    })
+
+class TeamAliasRequest(BaseModel):
+    alias: str
+    canonical: str
+
+@app.get("/api/teams/unresolved")
+def unresolved_teams(limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """
+    Nomes de times sem apelido com um candidato parecido (revisar e cadastrar
+    em POST /api/teams/aliases)
+    """
+    nomes = indice_times.nao_resolvidos(db, limite=limit)
+    
+    return {
+        "teams": [
+            {
+                "name": nome.raw_name,
+                "key": nome.name_key,
+                "bookmaker": nome.bookmaker,
+                "competition": nome.competition,
+                "suggestion": nome.suggestion,
+                "score": float(nome.score) if nome.score is not None else None,
+                "occurrences": nome.occurrences,
+                "firstSeen": nome.first_seen.isoformat() if nome.first_seen else None,
+                "lastSeen": nome.last_seen.isoformat() if nome.last_seen else None
+            }
+            for nome in nomes
+        ],
+        "total": len(nomes)
+    }
+
+@app.get("/api/teams/aliases")
+def team_aliases():
+    """
+    Apelidos em uso (padrão + cadastrados + aceitos pela comparação aproximada)
+    """
+    apelidos = indice_times.listar_apelidos()
+    return {"aliases": apelidos, "total": len(apelidos)}
+
+@app.post("/api/teams/aliases")
+def add_team_alias(request: TeamAliasRequest, db: Session = Depends(get_db)):
+    """
+    Cadastra um apelido de time sem redeploy. Vale para as próximas odds
+    recebidas; eventos já criados com o nome antigo não são renomeados.
+    """
+    try:
+        apelido = indice_times.adicionar_apelido(db, request.alias, request.canonical)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    
+    return {"success": True, **apelido}
+
+@app.post("/api/hedge/batch")
+def hedge_batch(request: HedgeBatchRequest):
+    """
+    Calcula o hedge de todas as combinações (par de odds x valor) de uma vez
+    """
+    if not request.stakes or not request.pairs:
+        return {"results": [], "total": 0}
+    if len(request.stakes) * len(request.pairs) > MAX_CENARIOS_HEDGE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo de {MAX_CENARIOS_HEDGE} combinações (valores x pares) por chamada"
+        )
+    
+    stakes = np.asarray(request.stakes, dtype=float)[None, :]
+    
+    try:
+        resultados = calcular_hedge_lote(
+            stakes,
+            np.asarray([par.userOdd for par in request.pairs], dtype=float)[:, None],
+            np.asarray([par.hedgeOdd for par in request.pairs], dtype=float)[:, None],
+            incremento=request.stakeIncrement,
+            bookmakers_usuario=np.asarray([par.userBookmaker for par in request.pairs], dtype=object)[:, None],
+            bookmakers_opostos=np.asarray([par.hedgeBookmaker for par in request.pairs], dtype=object)[:, None],
+            limites=request.maxStakes
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    n_stakes = len(request.stakes)
+    return {
+        "results": [
+            {"pair": i // n_stakes, "stake": request.stakes[i % n_stakes], **resultado}
+            for i, resultado in enumerate(resultados)
+        ],
+        "total": len(resultados)
+    }
+
+class ArbitrageQuote(BaseModel):
+    eventId: str
+    team: str  # 'home' ou 'away'
+    bookmaker: str
+    amount: float
+
+@app.post("/api/arbitrage/quote")
+def arbitrage_quote(quote: ArbitrageQuote, db: Session = Depends(get_db)):
+    """
+    Calcula o hedge com Double Chance para uma aposta do usuário
+    (servido do cache enquanto não chegam odds novas)
+    """
+    resultado = processar_arbitragem_em_cache(
+        db, quote.eventId, quote.team, quote.bookmaker, quote.amount
+    )
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Evento, odd ou Double Chance oposta não encontrados")
+    return resultado
+
+@app.get("/api/arbitrage/opportunities")
+def arbitrage_opportunities(valor_base: float = 100.0, min_profit: float = 1.0, db: Session = Depends(get_db)):
+    """
+    Oportunidades de arbitragem com Double Chance
+    (servidas do cache enquanto não chegam odds novas)
+    """
+    oportunidades = buscar_oportunidades_em_cache(db, valor_base, min_profit)
+    return {"opportunities": oportunidades, "total": len(oportunidades)}
+
+@app.get("/api/opportunities", response_class=RespostaJSON)
+def list_opportunities(
+    min_profit: Optional[float] = None,
+    league: Optional[str] = None,
+    bookmaker: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Oportunidades gravadas pelo bot (sem recalcular), da maior para a menor
+    lucratividade. Para a próxima página, envie o nextCursor recebido.
+    """
+    try:
+        linhas, proximo_cursor = listar_oportunidades(
+            db,
+            min_profit=min_profit,
+            league=league,
+            bookmaker=bookmaker,
+            limite=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = []
+    for opp, event in linhas:
         result.append({
+            "id": opp.id,
             "eventId": event.id,
             "homeTeam": event.home_team,
             "awayTeam": event.away_team,
             "league": event.league,
             "eventDate": event.event_date.isoformat(),
-            "odds": odds_by_bookmaker
+            "userBookmaker": opp.user_bookmaker,
+            "userTeam": opp.user_team,
+            "userOdd": float(opp.user_odd),
+            "hedgeBookmaker": opp.hedge_bookmaker,
+            "hedgeTeam": opp.hedge_team,
+            "hedgeOdd": float(opp.hedge_odd),
+            "profitPercent": float(opp.profit_percent),
+            "createdAt": opp.created_at.isoformat() if opp.created_at else None,
+            "updatedAt": opp.updated_at.isoformat() if opp.updated_at else None,
+            "expiresAt": opp.expires_at.isoformat() if opp.expires_at else None
         })
     
-    return {"events": result}
+    return RespostaJSON({"opportunities": result, "nextCursor": proximo_cursor})
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """
+    Hits/misses do cache de arbitragem
+    """
+    return cache_arbitragem.estatisticas()
+
+@app.get("/api/db/pool")
+def db_pool_stats():
+    """
+    Pool de conexões: conexões em uso, overflow, tempo de checkout e timeouts
+    (engine síncrono e, com DB_ASYNC, o assíncrono)
+    """
+    return {
+        "sync": estatisticas_pool(engine),
+        "async": estatisticas_pool(async_engine),
+    }
+
+@app.get("/api/read-model")
+def read_model_stats():
+    """
+    Estado do modelo de leitura em memória de /api/events
+    """
+    return modelo_leitura.estatisticas()
+
+@app.get("/api/read-model/check")
+def read_model_check(reconcile: bool = False):
+    """
+    Compara o modelo de leitura com o banco (divergências passageiras são
+    possíveis com escritas concorrentes). Com reconcile=true, recarrega o
+    modelo depois da comparação.
+    """
+    if not modelo_leitura.carregado:
+        raise HTTPException(status_code=503, detail="Modelo de leitura não carregado")
+    
+    resultado = modelo_leitura.verificar()
+    if reconcile:
+        resultado["reconciled"] = modelo_leitura.reconciliar()
+    return resultado
+
+@app.get("/api/surebets")
+def get_surebets(banca: float = 100.0, min_profit: float = 1.0, db: Session = Depends(get_db)):
+    """
+    Retorna surebets de três pernas (1, X, 2) com a divisão da banca
+    """
+    surebets = buscar_surebets_1x2(db, banca=banca, min_profit_percent=min_profit)
+    
+    return {
+        "surebets": surebets,
+        "total": len(surebets),
+        "events_checked": surebets.eventos_avaliados
+    }
 
 # Duração média de um jogo de futebol (em minutos)
 MATCH_DURATION = 120
@@ -313,74 +760,78 @@ def update_event_statuses(db: Session = Depends(get_db)):
     Atualiza o status de todos os eventos baseado no horário atual
     """
     try:
-        now = datetime.utcnow()
-        updated_count = 0
-        finished_count = 0
-        
-        # Busca todos os eventos que não estão finalizados
-        events = db.query(Event).filter(
-            Event.status.in_(["upcoming", "live"])
-        ).all()
-        
-        for event in events:
-            old_status = event.status
-            
-            # Determina o novo status
-            if now < event.event_date:
-                new_status = "upcoming"
-            elif (now - event.event_date) > timedelta(minutes=MATCH_DURATION):
-                new_status = "finished"
-            else:
-                new_status = "live"
-            
-            if old_status != new_status:
-                event.status = new_status
-                
-                # Se o evento foi finalizado, marca o horário e desativa as odds
-                if new_status == "finished":
-                    event.finished_at = now
-                    
-                    # Desativa todas as odds deste evento
-                    db.query(Odd).filter(
-                        Odd.event_id == event.id
-                    ).update({"is_active": False})
-                    
-                    finished_count += 1
-                
-                updated_count += 1
-        
+        resultado = _atualizar_status_eventos(db)
         db.commit()
-        
-        return {
-            "success": True,
-            "updated": updated_count,
-            "finished": finished_count,
-            "timestamp": now.isoformat()
-        }
+        return resultado
         
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao atualizar status: {str(e)}")
 
+def _atualizar_status_eventos(db: Session) -> dict:
+    """
+    Recalcula upcoming/live/finished dos eventos não finalizados (sem commit)
+    """
+    now = datetime.utcnow()
+    updated_count = 0
+    finished_count = 0
+    
+    # Busca todos os eventos que não estão finalizados
+    events = db.query(Event).filter(
+        Event.status.in_(["upcoming", "live"])
+    ).all()
+    ids_finalizados = []
+    
+    for event in events:
+        old_status = event.status
+        
+        # Determina o novo status
+        if now < event.event_date:
+            new_status = "upcoming"
+        elif (now - event.event_date) > timedelta(minutes=MATCH_DURATION):
+            new_status = "finished"
+        else:
+            new_status = "live"
+        
+        if old_status != new_status:
+            event.status = new_status
+            event.odds_updated_at = now
+            registrar_alteracao(db, [event.id])
+            
+            # Se o evento foi finalizado, marca o horário e desativa as odds
+            if new_status == "finished":
+                event.finished_at = now
+                
+                # Desativa todas as odds deste evento
+                db.query(Odd).filter(
+                    Odd.event_id == event.id
+                ).update({"is_active": False})
+                ids_finalizados.append(event.id)
+                
+                finished_count += 1
+            
+            updated_count += 1
+    
+    # Sem as odds desativadas, as best lines dos eventos finalizados ficam vazias
+    atualizar_best_lines(db, ids_finalizados)
+    
+    if updated_count > 0:
+        incrementar_versao(db)
+    
+    return {
+        "success": True,
+        "updated": updated_count,
+        "finished": finished_count,
+        "timestamp": now.isoformat()
+    }
+
 @app.delete("/api/events/cleanup")
 def cleanup_finished_events(days_old: int = 7, db: Session = Depends(get_db)):
     """
     Remove eventos finalizados há mais de X dias
     """
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-        
-        # Busca eventos finalizados há mais de X dias
-        old_events = db.query(Event).filter(
-            Event.status == "finished",
-            Event.finished_at < cutoff_date
-        ).all()
-        
-        deleted_count = len(old_events)
-        
-        for event in old_events:
-            db.delete(event)
-        
+        deleted_count, cutoff_date = remover_eventos_antigos(db, days_old)
         db.commit()
         
         return {
@@ -482,19 +933,38 @@ def trigger_scraper_casa(casa: str):
 
 
 @app.get("/api/scraper/status")
-def scraper_status():
+def scraper_status(request: Request):
     """
     Endpoint para N8N: Verifica status dos scrapers e sistema.
+    Responde com ETag (versão das odds); If-None-Match igual devolve 304 sem
+    consultar o banco.
+    """
+    versao = espelho_versao.atual()
+    etag = gerar_etag("status", versao) if versao is not None else None
+    if etag is not None and etag_corresponde(request, etag):
+        return nao_modificado(etag)
+    
+    status = status_sistema()
+    if status["database"]["status"] != "connected":
+        etag = None
+    return com_etag(JSONResponse(status), etag)
+
+
+def status_sistema() -> dict:
+    """
+    Status do banco e dos scrapers (corpo de /api/scraper/status).
     """
     from datetime import datetime
     
     # Verifica banco de dados
     try:
         db = SessionLocal()
-        event_count = db.query(Event).count()
-        odd_count = db.query(Odd).count()
-        upcoming_events = db.query(Event).filter(Event.status == "upcoming").count()
-        db.close()
+        try:
+            event_count = db.query(Event).count()
+            odd_count = db.query(Odd).count()
+            upcoming_events = db.query(Event).filter(Event.status == "upcoming").count()
+        finally:
+            db.close()
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
@@ -541,7 +1011,7 @@ def webhook_n8n(payload: dict = None):
     
     elif action == "status":
         # Retorna status
-        return scraper_status()
+        return status_sistema()
     
     else:
         return {
@@ -551,5 +1021,91 @@ def webhook_n8n(payload: dict = None):
             "message": "Webhook recebido! Use 'action' para especificar o que fazer."
         }
 
+# ========================================
+# Camada assíncrona (DB_ASYNC=true)
+# ========================================
+# Listagem de eventos com AsyncSession: a espera pelo banco não ocupa uma
+# thread do pool do Starlette (40 por padrão), então leituras concorrentes não
+# disputam threads. Só rotas com consultas nativas assíncronas entram aqui: a
+# lógica ORM síncrona (ingestão, status, cotação) em AsyncSession.run_sync
+# bloquearia o event loop, então esses endpoints continuam os síncronos acima
+# (def, no pool de threads com Session). Com DB_ASYNC=false nada muda.
+
+rotas_async = APIRouter()
+
+@rotas_async.get("/api/events", response_class=RespostaJSON)
+async def get_events_async(
+    request: Request,
+    league: Optional[str] = None,
+    bookmaker: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    has_arbitrage: Optional[bool] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    get_events com AsyncSession (mesmos parâmetros, resposta e ETag)
+    """
+    filtros, usar_modelo = _filtros_eventos(league, bookmaker, date_from, date_to, has_arbitrage, fields)
+    
+    versao = None
+    if not usar_modelo and has_arbitrage is None:
+        versao = espelho_versao.atual()
+        if versao is None:
+            versao = await obter_versao_async(db)
+    etag = _etag_eventos(usar_modelo, versao)
+    if etag is not None and etag_corresponde(request, etag):
+        return nao_modificado(etag)
+    
+    fonte = {"X-Read-Source": "memory" if usar_modelo else "database"}
+    if stream:
+        corpo = _dump_eventos(filtros, True) if usar_modelo else _dump_eventos_async(filtros)
+        return com_etag(StreamingResponse(corpo, media_type="application/json", headers=fonte), etag)
+    
+    limite = _limite_eventos(limit, cursor)
+    try:
+        if usar_modelo:
+            eventos, proximo_cursor = _listar_do_modelo(filtros, limite, cursor)
+        elif limite is None:
+            eventos, proximo_cursor = [evento async for evento in iterar_eventos_async(db, **filtros)], None
+        else:
+            eventos, proximo_cursor = await listar_eventos_async(db, limite=limite, cursor=cursor, **filtros)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return com_etag(RespostaJSON({"events": eventos, "nextCursor": proximo_cursor}, headers=fonte), etag)
+
+async def _dump_eventos_async(filtros: dict):
+    """
+    _dump_eventos do banco com sessão assíncrona própria
+    """
+    yield b'{"events":['
+    async with AsyncSessionLocal() as db:
+        indice = 0
+        async for evento in iterar_eventos_async(db, **filtros):
+            yield (b"," if indice else b"") + codificar_json(evento)
+            indice += 1
+    yield b']}'
+
+def _usar_rotas_async() -> None:
+    """
+    Troca, na mesma posição, as rotas síncronas pelas assíncronas de mesmo
+    caminho e método (a ordem de resolução e o OpenAPI não mudam).
+    """
+    for rota in rotas_async.routes:
+        for indice, existente in enumerate(app.router.routes):
+            if isinstance(existente, APIRoute) and existente.path == rota.path and existente.methods == rota.methods:
+                app.router.routes[indice] = rota
+                break
+        else:
+            app.router.routes.append(rota)
+
+if DB_ASYNC:
+    _usar_rotas_async()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
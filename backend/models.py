@@ -1,20 +1,45 @@
-from sqlalchemy import create_engine, Column, String, DECIMAL, TIMESTAMP, Boolean, ForeignKey
+from sqlalchemy import create_engine, Column, String, DECIMAL, TIMESTAMP, Boolean, ForeignKey, Integer, SmallInteger, BigInteger, JSON, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Depois do load_dotenv: db_pool lê o ambiente ao ser importado
+from db_pool import opcoes_pool
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Garante que usa psycopg3 (não psycopg2)
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **opcoes_pool(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Camada assíncrona (DB_ASYNC=true): endpoints quentes da API com AsyncSession
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+def url_async(url: str) -> str:
+    """
+    URL do engine assíncrono: psycopg3 já é async; SQLite usa aiosqlite.
+    """
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    
+    async_engine = create_async_engine(url_async(DATABASE_URL), **opcoes_pool(url_async(DATABASE_URL), assincrono=True))
+    # Sem expirar no commit: acessar um atributo depois dele exigiria outra ida ao banco (await)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Models
@@ -30,8 +55,15 @@ class Event(Base):
     status = Column(String(20), default="upcoming")
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     finished_at = Column(TIMESTAMP)
+    odds_updated_at = Column(TIMESTAMP, index=True)  # Marca o evento como "sujo" para o recálculo incremental
     
     odds = relationship("Odd", back_populates="event", cascade="all, delete-orphan")
+    best_line = relationship("BestLine", uselist=False, cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Paginação por cursor de /api/events: ORDER BY event_date, id
+        Index("idx_events_date_id", "event_date", "id"),
+    )
 
 class Odd(Base):
     __tablename__ = "odds"
@@ -47,23 +79,106 @@ class Odd(Base):
     away_or_draw_odd = Column(DECIMAL(10, 2)) 
     scraped_at = Column(TIMESTAMP, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    # Assinatura dos preços de cada mercado (ingestion.assinatura_odds): reenvio igual não regrava a linha
+    fingerprint_1x2 = Column(BigInteger)
+    fingerprint_dc = Column(BigInteger)
     
     event = relationship("Event", back_populates="odds")
+    
+    __table_args__ = (
+        # Uma linha por (evento, casa): alvo do upsert da ingestão
+        Index("uq_odds_event_bookmaker", "event_id", "bookmaker", unique=True),
+        # Índice parcial da varredura: odds ativas por evento e idade
+        Index(
+            "idx_odds_active_event_scraped", "event_id", "scraped_at",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active")
+        ),
+    )
+
+class BestLine(Base):
+    __tablename__ = "best_lines"
+    
+    # Duas melhores odds (casas diferentes) de cada mercado, mantidas na ingestão
+    event_id = Column(String(50), ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    bookmaker_count = Column(Integer, nullable=False, default=0)
+    lines = Column(JSON, nullable=False)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    
+    # Contador incrementado a cada escrita de odds (invalida caches)
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
 
 class ArbitrageOpportunity(Base):
     __tablename__ = "arbitrage_opportunities"
     
     id = Column(String(50), primary_key=True)
-    event_id = Column(String(50), ForeignKey("events.id"))
+    event_id = Column(String(50), ForeignKey("events.id", ondelete="CASCADE"), index=True)
     user_bookmaker = Column(String(50), nullable=False)
-    user_team = Column(String(50), nullable=False)
+    user_team = Column(String(120), nullable=False)
     user_odd = Column(DECIMAL(10, 2), nullable=False)
     hedge_bookmaker = Column(String(50), nullable=False)
-    hedge_team = Column(String(50), nullable=False)
+    hedge_team = Column(String(120), nullable=False)
     hedge_odd = Column(DECIMAL(10, 2), nullable=False)
     profit_percent = Column(DECIMAL(10, 2))
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
-    expires_at = Column(TIMESTAMP)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow)
+    expires_at = Column(TIMESTAMP, index=True)
+    
+    __table_args__ = (
+        # Paginação por cursor da API: ORDER BY profit_percent DESC, id
+        Index("idx_arb_opps_profit_id", text("profit_percent DESC"), "id"),
+    )
+
+class Bookmaker(Base):
+    __tablename__ = "bookmakers"
+    
+    # Chave pequena das casas no histórico de odds
+    id = Column(SmallInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+class EventKey(Base):
+    __tablename__ = "event_keys"
+    
+    # Chave inteira dos eventos no histórico (sem FK: o histórico sobrevive à limpeza de eventos)
+    id = Column(Integer, primary_key=True)
+    event_id = Column(String(50), unique=True, nullable=False)
+
+class OddHistory(Base):
+    __tablename__ = "odds_history"
+    
+    # Append-only: uma linha por mudança de preço. A PK cobre a consulta da linha do tempo de um evento
+    event_key = Column(Integer, primary_key=True)
+    scraped_at = Column(TIMESTAMP, primary_key=True)
+    bookmaker_id = Column(SmallInteger, primary_key=True)
+    outcome = Column(SmallInteger, primary_key=True)  # Índice em best_lines.MERCADOS
+    odd_x100 = Column(Integer, nullable=False)  # Odd * 100
+
+class TeamAlias(Base):
+    __tablename__ = "team_aliases"
+    
+    # Chaves normalizadas (team_aliases.normalizar_nome): "botafogo rj" -> "botafogo"
+    alias = Column(String(120), primary_key=True)
+    canonical = Column(String(120), nullable=False)
+    source = Column(String(20), nullable=False, default="manual")  # manual, fuzzy
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+class UnresolvedTeamName(Base):
+    __tablename__ = "unresolved_team_names"
+    
+    # Nomes sem apelido com um candidato parecido, aguardando revisão
+    name_key = Column(String(120), primary_key=True)
+    raw_name = Column(String(120), nullable=False)
+    bookmaker = Column(String(50))
+    competition = Column(String(100))
+    suggestion = Column(String(120))
+    score = Column(DECIMAL(4, 3))
+    occurrences = Column(Integer, nullable=False, default=1)
+    first_seen = Column(TIMESTAMP, default=datetime.utcnow)
+    last_seen = Column(TIMESTAMP, default=datetime.utcnow)
 
 class UserRequest(Base):
     __tablename__ = "user_requests"
@@ -77,10 +192,25 @@ class UserRequest(Base):
     processed = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
 
+def insert_com_conflito(db):
+    """
+    INSERT com suporte a ON CONFLICT do dialeto da sessão (PostgreSQL ou SQLite).
+    """
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        return postgresql.insert
+    if dialeto == "sqlite":
+        return sqlite.insert
+    raise RuntimeError(f"Upsert não suportado no dialeto {dialeto}")
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
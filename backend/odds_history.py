@@ -0,0 +1,214 @@
+"""
+Histórico append-only das odds (movimento de linha).
+
+Cada mudança de preço vira uma linha compacta em odds_history: chave inteira
+do evento, smallint da casa e do mercado, odd * 100 como inteiro e o horário
+da coleta. Recoletas com o mesmo preço não são gravadas. A detecção usa os
+valores atuais que a ingestão já carrega para o upsert, então o custo extra
+no caminho principal é um INSERT em lote por payload (quando há mudanças).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+from models import Bookmaker, EventKey, OddHistory, insert_com_conflito
+from best_lines import MERCADOS
+
+CODIGO_MERCADO = {mercado: codigo for codigo, mercado in enumerate(MERCADOS)}
+
+# Linhas por INSERT
+TAMANHO_BLOCO = 1000
+
+
+def escalar_odd(odd) -> Optional[int]:
+    """
+    Odd em centésimos (2.35 -> 235).
+    """
+    if odd is None:
+        return None
+    return int(round(float(odd) * 100))
+
+
+def detectar_mudancas(
+    atuais: Dict[Tuple[str, str], Dict],
+    linhas: Iterable[Dict]
+) -> List[Tuple[str, str, str, int, datetime]]:
+    """
+    Compara as linhas que serão gravadas com os preços atuais.
+    
+    Args:
+        atuais: (event_id, bookmaker) -> {coluna: odd, ..., "scraped_at": ...}
+            das odds já gravadas
+        linhas: Linhas consolidadas da ingestão (event_id, bookmaker, colunas
+            de odds e scraped_at)
+    
+    Returns:
+        Lista de (event_id, bookmaker, coluna, odd * 100, scraped_at) com os
+        preços que mudaram (ou que aparecem pela primeira vez)
+    """
+    mudancas = []
+    
+    for linha in linhas:
+        chave = (linha["event_id"], linha["bookmaker"])
+        atual = atuais.get(chave, {})
+        
+        for coluna in MERCADOS:
+            if coluna not in linha:
+                continue
+            
+            nova = escalar_odd(linha[coluna])
+            if nova is None or nova <= 0:
+                continue
+            
+            if nova != escalar_odd(atual.get(coluna)):
+                mudancas.append((chave[0], chave[1], coluna, nova, linha["scraped_at"]))
+    
+    return mudancas
+
+
+def _promover(sessao: Session) -> None:
+    for cache, novos in sessao.info["chaves_pendentes"]:
+        cache.update(novos)
+    sessao.info["chaves_pendentes"].clear()
+
+
+def _descartar(sessao: Session) -> None:
+    sessao.info["chaves_pendentes"].clear()
+
+
+def _pendentes(db: Session) -> List:
+    """
+    Chaves criadas na transação corrente da sessão, promovidas ao cache no commit.
+    """
+    if "chaves_pendentes" not in db.info:
+        db.info["chaves_pendentes"] = []
+        sa_event.listen(db, "after_commit", _promover)
+        sa_event.listen(db, "after_rollback", _descartar)
+    return db.info["chaves_pendentes"]
+
+
+class _CacheChaves:
+    """
+    Cache em processo das chaves pequenas (casa -> id, evento -> id). Chaves
+    criadas numa transação só entram no cache depois do commit.
+    """
+    
+    def __init__(self):
+        self.bookmakers: Dict[str, int] = {}
+        self.eventos: Dict[str, int] = {}
+    
+    def _resolver(self, db: Session, modelo, coluna_nome: str, nomes: Iterable[str], cache: Dict[str, int]) -> Dict[str, int]:
+        faltando = [nome for nome in set(nomes) if nome not in cache]
+        if not faltando:
+            return cache
+        
+        insert = insert_com_conflito(db)
+        coluna = getattr(modelo, coluna_nome)
+        for inicio in range(0, len(faltando), TAMANHO_BLOCO):
+            bloco = faltando[inicio:inicio + TAMANHO_BLOCO]
+            db.execute(
+                insert(modelo).values([{coluna_nome: nome} for nome in bloco])
+                .on_conflict_do_nothing(index_elements=[coluna_nome])
+            )
+        
+        novos = {}
+        for inicio in range(0, len(faltando), TAMANHO_BLOCO):
+            bloco = faltando[inicio:inicio + TAMANHO_BLOCO]
+            novos.update(db.query(coluna, modelo.id).filter(coluna.in_(bloco)).all())
+        
+        _pendentes(db).append((cache, novos))
+        return {**cache, **novos}
+    
+    def bookmaker_ids(self, db: Session, nomes: Iterable[str]) -> Dict[str, int]:
+        return self._resolver(db, Bookmaker, "name", nomes, self.bookmakers)
+    
+    def event_keys(self, db: Session, event_ids: Iterable[str]) -> Dict[str, int]:
+        return self._resolver(db, EventKey, "event_id", event_ids, self.eventos)
+
+
+cache_chaves = _CacheChaves()
+
+
+def gravar_historico(db: Session, mudancas: List[Tuple[str, str, str, int, datetime]]) -> int:
+    """
+    Grava as mudanças no histórico (não faz commit).
+    
+    Returns:
+        Número de linhas enviadas ao banco
+    """
+    if not mudancas:
+        return 0
+    
+    bookmakers = cache_chaves.bookmaker_ids(db, {bookmaker for _, bookmaker, _, _, _ in mudancas})
+    eventos = cache_chaves.event_keys(db, {event_id for event_id, _, _, _, _ in mudancas})
+    
+    linhas = {}
+    for event_id, bookmaker, coluna, odd_x100, scraped_at in mudancas:
+        linha = {
+            "event_key": eventos[event_id],
+            "scraped_at": scraped_at or datetime.utcnow(),
+            "bookmaker_id": bookmakers[bookmaker],
+            "outcome": CODIGO_MERCADO[coluna],
+            "odd_x100": odd_x100,
+        }
+        linhas[(linha["event_key"], linha["scraped_at"], linha["bookmaker_id"], linha["outcome"])] = linha
+    
+    # executemany: o SQLAlchemy agrupa as linhas em INSERTs multi-valores sem
+    # recompilar a instrução a cada lote
+    insert = insert_com_conflito(db)
+    db.execute(insert(OddHistory).on_conflict_do_nothing(), list(linhas.values()))
+    
+    return len(linhas)
+
+
+def linha_do_tempo(
+    db: Session,
+    event_id: str,
+    bookmaker: Optional[str] = None,
+    mercado: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    limite: int = 1000
+) -> List[Dict]:
+    """
+    Mudanças de preço de um evento em ordem cronológica (usa a PK
+    (event_key, scraped_at, ...)).
+    
+    Args:
+        event_id: Id do evento
+        bookmaker: Filtra por casa
+        mercado: Filtra por coluna de odd (ex: "home_odd")
+        desde / ate: Janela de scraped_at
+        limite: Máximo de pontos retornados
+    
+    Returns:
+        Lista de {"bookmaker", "market", "odd", "scraped_at"}
+    """
+    event_key = db.query(EventKey.id).filter(EventKey.event_id == event_id).scalar()
+    if event_key is None:
+        return []
+    
+    query = db.query(OddHistory, Bookmaker.name).join(
+        Bookmaker, Bookmaker.id == OddHistory.bookmaker_id
+    ).filter(OddHistory.event_key == event_key)
+    
+    if bookmaker:
+        query = query.filter(Bookmaker.name == bookmaker)
+    if mercado:
+        query = query.filter(OddHistory.outcome == CODIGO_MERCADO[mercado])
+    if desde:
+        query = query.filter(OddHistory.scraped_at >= desde)
+    if ate:
+        query = query.filter(OddHistory.scraped_at <= ate)
+    
+    pontos = query.order_by(OddHistory.scraped_at, OddHistory.bookmaker_id, OddHistory.outcome).limit(limite).all()
+    
+    return [
+        {
+            "bookmaker": nome,
+            "market": MERCADOS[ponto.outcome],
+            "odd": ponto.odd_x100 / 100,
+            "scraped_at": ponto.scraped_at,
+        }
+        for ponto, nome in pontos
+    ]
@@ -0,0 +1,175 @@
+"""
+Recálculo incremental de oportunidades.
+
+A ingestão marca os eventos que receberam odds (Event.odds_updated_at) e o
+ConjuntoOportunidades reavalia só esses eventos a cada ciclo, mantendo em
+memória as oportunidades dos demais. Eventos cujas oportunidades usam uma
+perna que passou da idade máxima também são reavaliados. Com persistir=True
+o resultado de cada ciclo é gravado em arbitrage_opportunities.
+
+Com best_lines=True (padrão dos bots, ARBITRAGE_BEST_LINES) os eventos sujos
+são avaliados pela tabela de best lines, uma linha por evento, em vez do par
+a par sobre todas as odds: sai só a melhor combinação de cada lado do evento.
+"""
+import os
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, selectinload
+from models import Event
+import arbitrage
+from arbitrage import ResultadoScan, avaliar_best_lines, avaliar_eventos, criterio_odds_validas
+from db_stats import contar_statements
+from opportunity_store import persistir_oportunidades
+
+# Reavalia também eventos marcados um pouco antes da última marca vista,
+# para cobrir transações que fizeram commit fora de ordem
+MARGEM_SUJOS = timedelta(seconds=10)
+
+# Avalia pela tabela de best lines (true/false)
+USAR_BEST_LINES = os.getenv("ARBITRAGE_BEST_LINES", "true").lower() != "false"
+
+
+def marcar_eventos_sujos(db: Session, event_ids: Iterable[str], quando: Optional[datetime] = None) -> int:
+    """
+    Marca eventos como alterados (não faz commit).
+    """
+    event_ids = set(event_ids)
+    if not event_ids:
+        return 0
+    
+    return db.query(Event).filter(Event.id.in_(event_ids)).update(
+        {"odds_updated_at": quando or datetime.utcnow()},
+        synchronize_session=False
+    )
+
+
+class ConjuntoOportunidades:
+    """
+    Oportunidades mantidas entre ciclos do bot. O primeiro ciclo faz a
+    varredura completa; os seguintes só reavaliam os eventos sujos.
+    """
+    
+    def __init__(
+        self,
+        valor_base: float = 100.0,
+        min_profit_percent: float = 1.0,
+        ciclos_para_recalculo_total: int = 60,
+        persistir: bool = False,
+        best_lines: Optional[bool] = None
+    ):
+        self.valor_base = valor_base
+        self.min_profit_percent = min_profit_percent
+        self.ciclos_para_recalculo_total = ciclos_para_recalculo_total
+        self.persistir = persistir
+        self.best_lines = USAR_BEST_LINES if best_lines is None else best_lines
+        
+        self.por_evento: Dict[str, List[Dict]] = {}
+        self.datas_eventos: Dict[str, datetime] = {}
+        self.expira_em: Dict[str, datetime] = {}
+        self.ultima_marca: Optional[datetime] = None
+        self.ciclos = 0
+    
+    def _consulta_base(self, db: Session, agora: datetime):
+        if self.best_lines:
+            return db.query(Event).options(selectinload(Event.best_line))
+        return db.query(Event).options(
+            selectinload(Event.odds.and_(criterio_odds_validas(agora)))
+        )
+    
+    def _esquecer(self, event_id: str) -> None:
+        self.por_evento.pop(event_id, None)
+        self.datas_eventos.pop(event_id, None)
+        self.expira_em.pop(event_id, None)
+    
+    def atualizar(self, db: Session) -> ResultadoScan:
+        """
+        Reavalia os eventos sujos e retorna todas as oportunidades mantidas,
+        ordenadas por lucro percentual.
+        """
+        now = datetime.utcnow()
+        cutoff_time = now - timedelta(hours=3)
+        recalculo_total = self.ciclos % self.ciclos_para_recalculo_total == 0
+        self.ciclos += 1
+        
+        with contar_statements(db) as contador:
+            marca = db.query(func.max(Event.odds_updated_at)).scalar()
+            
+            if recalculo_total:
+                events = self._consulta_base(db, now).filter(
+                    Event.status.in_(["upcoming", "live"]),
+                    Event.event_date > cutoff_time
+                ).all()
+                self.por_evento.clear()
+                self.datas_eventos.clear()
+                self.expira_em.clear()
+            else:
+                filtros = []
+                if marca is not None and (self.ultima_marca is None or marca > self.ultima_marca):
+                    # Eventos sujos, em qualquer status: os que saíram da janela são removidos
+                    if self.ultima_marca is None:
+                        filtros.append(Event.odds_updated_at.isnot(None))
+                    else:
+                        filtros.append(Event.odds_updated_at > self.ultima_marca - MARGEM_SUJOS)
+                
+                # Eventos com alguma perna que ficou velha desde o último cálculo
+                expirados = [event_id for event_id, expira_em in self.expira_em.items() if expira_em <= now]
+                if expirados:
+                    filtros.append(Event.id.in_(expirados))
+                
+                events = self._consulta_base(db, now).filter(or_(*filtros)).all() if filtros else []
+            
+            elegiveis = []
+            for event in events:
+                self._esquecer(event.id)
+                if event.status in ("upcoming", "live") and event.event_date > cutoff_time:
+                    elegiveis.append(event)
+                    self.datas_eventos[event.id] = event.event_date
+            
+            if self.best_lines:
+                novas = avaliar_best_lines(
+                    db,
+                    (
+                        (event, event.best_line) for event in elegiveis
+                        if event.best_line is not None and event.best_line.bookmaker_count >= 2
+                    ),
+                    self.valor_base, self.min_profit_percent, agora=now
+                )
+            else:
+                novas = avaliar_eventos(elegiveis, self.valor_base, self.min_profit_percent, agora=now)
+            for oportunidade in novas:
+                event_id = oportunidade["event"]["id"]
+                self.por_evento.setdefault(event_id, []).append(oportunidade)
+                
+                if arbitrage.MAX_IDADE_ODD_MINUTOS > 0:
+                    idades = [oportunidade[perna]["age_seconds"] or 0 for perna in ("bet1", "bet2")]
+                    expira_em = now + timedelta(seconds=arbitrage.MAX_IDADE_ODD_MINUTOS * 60 - max(idades))
+                    self.expira_em[event_id] = min(expira_em, self.expira_em.get(event_id, expira_em))
+        
+        if marca is not None:
+            self.ultima_marca = marca
+        
+        if self.persistir:
+            persistir_oportunidades(
+                db,
+                novas,
+                event_ids=None if recalculo_total else [event.id for event in events],
+                datas_eventos=self.datas_eventos,
+                agora=now
+            )
+            db.commit()
+        
+        # Eventos que saíram da janela de tempo sem receber odds novas
+        for event_id, event_date in list(self.datas_eventos.items()):
+            if event_date <= cutoff_time:
+                self._esquecer(event_id)
+        
+        oportunidades = ResultadoScan(
+            oportunidade
+            for oportunidades_evento in self.por_evento.values()
+            for oportunidade in oportunidades_evento
+        )
+        oportunidades.sort(key=lambda x: x["profit_percent"], reverse=True)
+        oportunidades.sql_statements = contador.total
+        oportunidades.eventos_avaliados = len(elegiveis)
+        return oportunidades
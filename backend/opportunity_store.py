@@ -0,0 +1,239 @@
+"""
+Persistência das oportunidades na tabela arbitrage_opportunities.
+
+O bot grava o resultado de cada ciclo (upsert por id determinístico) e os
+leitores (API, frontend) consultam a tabela indexada em vez de disparar uma
+varredura completa. Cada linha vale até expires_at: o momento em que a perna
+mais velha passa da idade máxima ou o evento sai da janela da varredura.
+"""
+import base64
+import hashlib
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from models import ArbitrageOpportunity, Event, insert_com_conflito
+import arbitrage
+
+# Mesmo corte da varredura: eventos iniciados há mais de 3h saem da janela
+JANELA_EVENTO = timedelta(hours=3)
+
+# Linhas expiradas há mais tempo que isso são apagadas
+RETENCAO_EXPIRADAS = timedelta(days=1)
+
+
+def gerar_id_oportunidade(oportunidade: Dict) -> str:
+    """
+    Id determinístico da oportunidade (evento + time apostado + casas), estável
+    entre ciclos para que o upsert atualize a mesma linha.
+    """
+    chave = "|".join([
+        oportunidade["event"]["id"],
+        oportunidade["bet1"]["description"],
+        oportunidade["bet1"]["bookmaker"],
+        oportunidade["bet2"]["bookmaker"],
+    ])
+    return "opp_" + hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+
+def _calcular_expiracao(oportunidade: Dict, agora: datetime, data_evento: Optional[datetime]) -> Optional[datetime]:
+    expiracoes = []
+    
+    if arbitrage.MAX_IDADE_ODD_MINUTOS > 0:
+        idades = [oportunidade[perna]["age_seconds"] or 0 for perna in ("bet1", "bet2")]
+        expiracoes.append(agora + timedelta(seconds=arbitrage.MAX_IDADE_ODD_MINUTOS * 60 - max(idades)))
+    
+    if data_evento is not None:
+        expiracoes.append(data_evento + JANELA_EVENTO)
+    
+    return min(expiracoes) if expiracoes else None
+
+
+def persistir_oportunidades(
+    db: Session,
+    oportunidades: Iterable[Dict],
+    event_ids: Optional[Iterable[str]] = None,
+    datas_eventos: Optional[Dict[str, datetime]] = None,
+    agora: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Grava as oportunidades de um ciclo (não faz commit).
+    
+    Args:
+        oportunidades: Oportunidades encontradas nos eventos avaliados
+        event_ids: Eventos reavaliados neste ciclo. As oportunidades vigentes
+            desses eventos que não aparecem mais são expiradas. None indica
+            varredura completa (todas as vigentes são consideradas)
+        datas_eventos: Data de cada evento, para limitar a validade
+        agora: Instante do ciclo (padrão: utcnow)
+    
+    Returns:
+        Contagem de linhas inseridas, atualizadas, expiradas e apagadas
+    """
+    agora = agora or datetime.utcnow()
+    datas_eventos = datas_eventos or {}
+    
+    novas = {}
+    for oportunidade in oportunidades:
+        novas[gerar_id_oportunidade(oportunidade)] = oportunidade
+    
+    # Uma consulta traz as linhas que serão atualizadas ou expiradas
+    vigentes = or_(ArbitrageOpportunity.expires_at.is_(None), ArbitrageOpportunity.expires_at > agora)
+    filtros = []
+    if event_ids is None:
+        filtros.append(vigentes)
+    else:
+        event_ids = set(event_ids)
+        if event_ids:
+            filtros.append(and_(ArbitrageOpportunity.event_id.in_(event_ids), vigentes))
+    if novas:
+        filtros.append(ArbitrageOpportunity.id.in_(list(novas)))
+    
+    existentes = {}
+    if filtros:
+        existentes = {
+            linha.id: linha
+            for linha in db.query(ArbitrageOpportunity).filter(or_(*filtros)).all()
+        }
+    
+    # Upsert (ON CONFLICT (id) DO UPDATE): os dois bots gravam com persistir=True
+    # em processos separados e podem achar a mesma oportunidade no mesmo ciclo
+    linhas_novas = []
+    for opp_id, oportunidade in novas.items():
+        linhas_novas.append({
+            "id": opp_id,
+            "event_id": oportunidade["event"]["id"],
+            "user_bookmaker": oportunidade["bet1"]["bookmaker"],
+            "user_team": oportunidade["bet1"]["description"],
+            "user_odd": oportunidade["bet1"]["odd"],
+            "hedge_bookmaker": oportunidade["bet2"]["bookmaker"],
+            "hedge_team": oportunidade["bet2"]["description"],
+            "hedge_odd": oportunidade["bet2"]["odd"],
+            "profit_percent": oportunidade["profit_percent"],
+            "created_at": agora,
+            "updated_at": agora,
+            "expires_at": _calcular_expiracao(
+                oportunidade, agora, datas_eventos.get(oportunidade["event"]["id"])
+            ),
+        })
+    
+    if linhas_novas:
+        insert = insert_com_conflito(db)(ArbitrageOpportunity).values(linhas_novas)
+        db.execute(insert.on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                coluna: insert.excluded[coluna]
+                for coluna in linhas_novas[0]
+                if coluna not in ("id", "created_at")
+            }
+        ))
+    
+    atualizadas = sum(1 for opp_id in novas if existentes.pop(opp_id, None) is not None)
+    inseridas = len(novas) - atualizadas
+    expiradas = 0
+    
+    # Vigentes dos eventos avaliados que não foram encontradas de novo
+    for linha in existentes.values():
+        if linha.expires_at is None or linha.expires_at > agora:
+            linha.expires_at = agora
+            linha.updated_at = agora
+            expiradas += 1
+    
+    apagadas = db.query(ArbitrageOpportunity).filter(
+        ArbitrageOpportunity.expires_at < agora - RETENCAO_EXPIRADAS
+    ).delete(synchronize_session=False)
+    
+    db.flush()
+    
+    return {
+        "inseridas": inseridas,
+        "atualizadas": atualizadas,
+        "expiradas": expiradas,
+        "apagadas": apagadas,
+    }
+
+
+def codificar_cursor(profit_percent, opp_id: str) -> str:
+    """
+    Cursor opaco da paginação: posição (lucro, id) da última linha da página.
+    """
+    bruto = f"{Decimal(profit_percent)}|{opp_id}"
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[Decimal, str]:
+    """
+    Inverso de codificar_cursor. Levanta ValueError se o cursor for inválido.
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        profit_percent, opp_id = bruto.split("|", 1)
+        return Decimal(profit_percent), opp_id
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def listar_oportunidades(
+    db: Session,
+    min_profit: Optional[float] = None,
+    league: Optional[str] = None,
+    bookmaker: Optional[str] = None,
+    limite: int = 50,
+    cursor: Optional[str] = None,
+    agora: Optional[datetime] = None
+) -> Tuple[List[Tuple[ArbitrageOpportunity, Event]], Optional[str]]:
+    """
+    Oportunidades vigentes ordenadas por lucro (desc) e id, com paginação por
+    cursor (keyset) sobre o índice (profit_percent DESC, id).
+    
+    Args:
+        min_profit: Lucro percentual mínimo
+        league: Filtra pela liga (sem diferenciar maiúsculas)
+        bookmaker: Filtra pela casa, em qualquer uma das pernas
+        limite: Tamanho da página
+        cursor: Valor de next_cursor da página anterior
+    
+    Returns:
+        (linhas da página como pares (oportunidade, evento), cursor da próxima página ou None)
+    """
+    agora = agora or datetime.utcnow()
+    
+    query = db.query(ArbitrageOpportunity, Event).join(
+        Event, Event.id == ArbitrageOpportunity.event_id
+    ).filter(
+        ArbitrageOpportunity.expires_at > agora
+    )
+    
+    if min_profit is not None:
+        query = query.filter(ArbitrageOpportunity.profit_percent >= min_profit)
+    
+    if league:
+        query = query.filter(func.lower(Event.league) == league.lower())
+    
+    if bookmaker:
+        bookmaker = bookmaker.lower()
+        query = query.filter(or_(
+            func.lower(ArbitrageOpportunity.user_bookmaker) == bookmaker,
+            func.lower(ArbitrageOpportunity.hedge_bookmaker) == bookmaker
+        ))
+    
+    if cursor:
+        ultimo_lucro, ultimo_id = decodificar_cursor(cursor)
+        query = query.filter(or_(
+            ArbitrageOpportunity.profit_percent < ultimo_lucro,
+            and_(ArbitrageOpportunity.profit_percent == ultimo_lucro, ArbitrageOpportunity.id > ultimo_id)
+        ))
+    
+    linhas = query.order_by(
+        ArbitrageOpportunity.profit_percent.desc(),
+        ArbitrageOpportunity.id
+    ).limit(limite + 1).all()
+    
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1][0]
+        proximo = codificar_cursor(ultima.profit_percent, ultima.id)
+    
+    return linhas, proximo
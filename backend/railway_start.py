@@ -22,9 +22,10 @@ def wait_for_db(max_retries=30, delay=2):
     
     print(f"🔄 Verificando conexão com PostgreSQL...")
     
+    # Um engine só para as tentativas (sem o statement_timeout da API: migrações podem demorar)
+    engine = create_engine(database_url, pool_pre_ping=True)
     for attempt in range(1, max_retries + 1):
         try:
-            engine = create_engine(database_url, pool_pre_ping=True)
             with engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
             print(f"✅ PostgreSQL conectado! (tentativa {attempt})")
@@ -55,12 +56,69 @@ def run_migrations(engine):
         "ALTER TABLE odds ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE",
         "ALTER TABLE odds ADD COLUMN IF NOT EXISTS home_or_draw_odd DECIMAL(10, 2)",
         "ALTER TABLE odds ADD COLUMN IF NOT EXISTS away_or_draw_odd DECIMAL(10, 2)",
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS odds_updated_at TIMESTAMP",
         "UPDATE odds SET is_active = TRUE WHERE is_active IS NULL",
         "CREATE INDEX IF NOT EXISTS idx_events_status ON events(status)",
         "CREATE INDEX IF NOT EXISTS idx_events_event_date ON events(event_date)",
         "CREATE INDEX IF NOT EXISTS idx_odds_is_active ON odds(is_active)",
         "CREATE INDEX IF NOT EXISTS idx_events_finished_at ON events(finished_at)",
-        "CREATE INDEX IF NOT EXISTS idx_odds_event_bookmaker ON odds(event_id, bookmaker)",
+        # Só antes do índice único existir: funde as duplicatas (event_id, bookmaker) na coleta
+        # mais recente (mercados vazios dela vêm das outras linhas) e remove as demais
+        """DO $$
+        BEGIN
+            IF to_regclass('uq_odds_event_bookmaker') IS NULL THEN
+                -- Cada mercado da linha mantida (coleta mais recente) vazio vem da duplicata mais recente que o tem
+                WITH ordenadas AS (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY event_id, bookmaker ORDER BY scraped_at DESC NULLS LAST, id DESC
+                    ) AS rn FROM odds
+                ), duplicatas AS (
+                    SELECT
+                        event_id,
+                        bookmaker,
+                        (array_agg(home_odd ORDER BY rn) FILTER (WHERE home_odd IS NOT NULL))[1] AS home_odd,
+                        (array_agg(draw_odd ORDER BY rn) FILTER (WHERE draw_odd IS NOT NULL))[1] AS draw_odd,
+                        (array_agg(away_odd ORDER BY rn) FILTER (WHERE away_odd IS NOT NULL))[1] AS away_odd,
+                        (array_agg(home_or_draw_odd ORDER BY rn) FILTER (WHERE home_or_draw_odd IS NOT NULL))[1] AS home_or_draw_odd,
+                        (array_agg(away_or_draw_odd ORDER BY rn) FILTER (WHERE away_or_draw_odd IS NOT NULL))[1] AS away_or_draw_odd,
+                        bool_or(is_active) AS is_active
+                    FROM ordenadas
+                    WHERE rn > 1
+                    GROUP BY event_id, bookmaker
+                )
+                UPDATE odds o SET
+                    home_odd = COALESCE(o.home_odd, d.home_odd),
+                    draw_odd = COALESCE(o.draw_odd, d.draw_odd),
+                    away_odd = COALESCE(o.away_odd, d.away_odd),
+                    home_or_draw_odd = COALESCE(o.home_or_draw_odd, d.home_or_draw_odd),
+                    away_or_draw_odd = COALESCE(o.away_or_draw_odd, d.away_or_draw_odd),
+                    is_active = o.is_active OR d.is_active
+                FROM ordenadas s
+                JOIN duplicatas d ON d.event_id = s.event_id AND d.bookmaker = s.bookmaker
+                WHERE s.rn = 1 AND o.id = s.id;
+                
+                DELETE FROM odds WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY event_id, bookmaker ORDER BY scraped_at DESC NULLS LAST, id DESC
+                        ) AS rn FROM odds
+                    ) d WHERE d.rn > 1
+                );
+            END IF;
+        END $$""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_odds_event_bookmaker ON odds(event_id, bookmaker)",
+        "DROP INDEX IF EXISTS idx_odds_event_bookmaker",
+        "CREATE INDEX IF NOT EXISTS ix_events_odds_updated_at ON events(odds_updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_odds_active_event_scraped ON odds(event_id, scraped_at) WHERE is_active",
+        "ALTER TABLE arbitrage_opportunities ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP",
+        "ALTER TABLE arbitrage_opportunities ALTER COLUMN user_team TYPE VARCHAR(120)",
+        "ALTER TABLE arbitrage_opportunities ALTER COLUMN hedge_team TYPE VARCHAR(120)",
+        "CREATE INDEX IF NOT EXISTS ix_arbitrage_opportunities_event_id ON arbitrage_opportunities(event_id)",
+        "CREATE INDEX IF NOT EXISTS ix_arbitrage_opportunities_expires_at ON arbitrage_opportunities(expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_arb_opps_profit_id ON arbitrage_opportunities(profit_percent DESC, id)",
+        "ALTER TABLE odds ADD COLUMN IF NOT EXISTS fingerprint_1x2 BIGINT",
+        "ALTER TABLE odds ADD COLUMN IF NOT EXISTS fingerprint_dc BIGINT",
+        "CREATE INDEX IF NOT EXISTS idx_events_date_id ON events(event_date, id)",
     ]
     
     try:
@@ -76,6 +134,31 @@ def run_migrations(engine):
     except Exception as e:
         print(f"⚠️  Erro nas migrações: {e}")
 
+def remap_event_ids(engine):
+    """Funde os eventos gravados com ids antigos (antes da normalização dos times) no id atual"""
+    try:
+        print("🔀 Remapeando ids de eventos...")
+        from sqlalchemy.orm import Session
+        from event_merge import remapear_eventos
+        with Session(engine) as db:
+            total = len(remapear_eventos(db))
+            db.commit()
+        print(f"✅ {total} evento(s) remapeado(s)!")
+    except Exception as e:
+        print(f"⚠️  Erro ao remapear eventos: {e}")
+
+def rebuild_best_lines(engine):
+    """Recalcula a tabela de best lines a partir das odds existentes"""
+    try:
+        print("📈 Recalculando best lines...")
+        from sqlalchemy.orm import Session
+        from best_lines import reconstruir_best_lines
+        with Session(engine) as db:
+            total = reconstruir_best_lines(db)
+        print(f"✅ Best lines de {total} evento(s) recalculadas!")
+    except Exception as e:
+        print(f"⚠️  Erro ao recalcular best lines: {e}")
+
 def start_server():
     """Inicia o servidor uvicorn"""
     import uvicorn
@@ -105,6 +188,13 @@ if __name__ == "__main__":
     # 3. Executar migrações
     run_migrations(engine)
     
-    # 4. Iniciar servidor
+    # 4. Fundir eventos com ids antigos
+    remap_event_ids(engine)
+    
+    # 5. Popular best lines
+    rebuild_best_lines(engine)
+    
+    # 6. Iniciar servidor (a API usa o engine de models, com o pool configurado)
+    engine.dispose()
     print("=" * 60)
     start_server()
@@ -0,0 +1,502 @@
+"""
+Modelo de leitura em memória de /api/events.
+
+O processo da API mantém os eventos ativos (upcoming/live) e as odds por casa
+já no formato da resposta, carregados do banco na inicialização. As leituras
+filtram e paginam esse estado sem acessar o banco.
+
+Atualização:
+    - escritas deste processo (ingestão, /api/odds/update, atualização de
+      status e limpeza) registram os eventos alterados na sessão
+      (registrar_alteracao); o commit só os marca como pendentes e a thread
+      do modelo relê esses eventos (o commit não espera a consulta nem uma
+      reconciliação em andamento). Com releituras pendentes, /api/events lê
+      do banco, então quem escreveu já lê o que gravou
+    - escritas de outros processos (bot, scripts) aparecem na versão das odds
+      (espelho_versao) e disparam uma reconciliação completa
+    - a cada READ_MODEL_RECONCILE_SECONDS o modelo é reconciliado com o banco
+      de qualquer forma
+
+O estado é um par (eventos, ordem) trocado de uma vez: leitores pegam a
+referência atual sem lock. Sem modelo carregado (ou desatualizado por falha
+na reconciliação), /api/events usa a consulta ao banco.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import event as sa_event, select
+from sqlalchemy.orm import Session
+from models import Event, Odd, SessionLocal
+from events_query import CAMPOS_EVENTO, LIMITE_PAGINA, MERCADOS_API, STATUS_VISIVEIS, codificar_cursor, decodificar_cursor
+from versioning import espelho_versao, obter_versao
+
+ATIVO = os.getenv("READ_MODEL_ENABLED", "true").lower() == "true"
+
+# Reconciliação completa com o banco (segundos)
+INTERVALO_RECONCILIACAO = float(os.getenv("READ_MODEL_RECONCILE_SECONDS", "30"))
+
+# Intervalo entre verificações da versão das odds (escritas de outros processos)
+INTERVALO_VERIFICACAO = 1.0
+
+# Sem reconciliar por mais que isso (falhas seguidas), as leituras voltam ao banco
+LIMITE_ATRASO = 3 * INTERVALO_RECONCILIACAO
+
+# Eventos por consulta ao reler eventos alterados
+TAMANHO_BLOCO = 1000
+
+# Ids de eventos alterados na transação, em session.info
+_MARCA_EVENTOS = "eventos_alterados"
+
+# Ids já commitados, relidos quando a transação libera a conexão
+_MARCA_COMMITADOS = "eventos_commitados"
+
+
+class EventoLido:
+    """
+    Evento no modelo: a resposta da API pronta e os campos usados nos filtros.
+    """
+    __slots__ = ("posicao", "liga", "casas", "api")
+    
+    def __init__(self, posicao: Tuple[datetime, str], liga: str, casas: Set[str], api: Dict):
+        self.posicao = posicao
+        self.liga = liga
+        self.casas = casas
+        self.api = api
+
+
+def registrar_alteracao(db: Session, event_ids: Iterable[str]) -> None:
+    """
+    Registra eventos alterados na transação atual; o modelo os relê após o
+    commit (não faz nada em rollback).
+    """
+    db.info.setdefault(_MARCA_EVENTOS, set()).update(event_ids)
+
+
+def carregar_eventos(db: Session, event_ids: Optional[Sequence[str]] = None) -> Dict[str, EventoLido]:
+    """
+    Eventos ativos com suas odds, em uma consulta (LEFT JOIN).
+    
+    Args:
+        event_ids: Só esses eventos (padrão: todos os ativos)
+    
+    Returns:
+        event_id -> EventoLido
+    """
+    query = select(
+        Event.id, Event.event_date, Event.home_team, Event.away_team, Event.league,
+        Odd.bookmaker, *(getattr(Odd, coluna) for coluna in MERCADOS_API.values())
+    ).select_from(Event).outerjoin(Odd, Odd.event_id == Event.id).where(
+        Event.status.in_(STATUS_VISIVEIS)
+    ).order_by(Event.id, Odd.bookmaker)
+    
+    if event_ids is None:
+        blocos = [query]
+    else:
+        event_ids = list(event_ids)
+        blocos = [
+            query.where(Event.id.in_(event_ids[inicio:inicio + TAMANHO_BLOCO]))
+            for inicio in range(0, len(event_ids), TAMANHO_BLOCO)
+        ]
+    
+    eventos = {}
+    for bloco in blocos:
+        for event_id, data, home, away, liga, casa, *odds in db.execute(bloco):
+            evento = eventos.get(event_id)
+            if evento is None:
+                evento = eventos[event_id] = EventoLido(
+                    (data, event_id),
+                    liga.lower(),
+                    set(),
+                    {
+                        "eventId": event_id,
+                        "homeTeam": home,
+                        "awayTeam": away,
+                        "league": liga,
+                        "eventDate": data.isoformat(),
+                        "odds": {},
+                    }
+                )
+            if casa is not None:
+                evento.casas.add(casa.lower())
+                evento.api["odds"][casa] = {
+                    mercado: float(valor) if valor is not None else None
+                    for mercado, valor in zip(MERCADOS_API, odds)
+                }
+    return eventos
+
+
+class ModeloLeitura:
+    """
+    Eventos ativos em memória, servidos por listar() sem acessar o banco.
+    """
+    
+    def __init__(self, session_factory=SessionLocal, intervalo_reconciliacao: float = INTERVALO_RECONCILIACAO):
+        self.session_factory = session_factory
+        self.intervalo_reconciliacao = intervalo_reconciliacao
+        
+        # (event_id -> EventoLido, posições (event_date, id) ordenadas)
+        self._estado: Tuple[Dict[str, EventoLido], List[Tuple[datetime, str]]] = ({}, [])
+        self.carregado = False
+        # Muda sempre que o conteúdo servido muda (ETag); começa no relógio para
+        # não repetir valores entre reinícios do processo
+        self.geracao = time.time_ns()
+        # Versão das odds vista na última leitura do banco
+        self.versao_vista: Optional[int] = None
+        
+        # Serializa releituras e reconciliações: uma releitura mais antiga nunca
+        # sobrescreve uma mais nova
+        self._lock_escrita = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._acordar = threading.Event()
+        self._reconciliar_ja = False
+        
+        # Eventos commitados por este processo à espera da releitura, e os da
+        # releitura em andamento
+        self._pendentes: Set[str] = set()
+        self._relendo: Set[str] = set()
+        self._lock_pendentes = threading.Lock()
+        
+        self.ultima_reconciliacao = 0.0
+        self.reconciliacoes = 0
+        self.divergencias = 0
+        self.atualizacoes = 0
+        self.erros = 0
+        
+        # Chamados com [(event_id, evento novo ou None, evento anterior ou None)]
+        # a cada mudança aplicada (sob o lock de escrita: devem ser rápidos)
+        self.ouvintes: List[Callable[[List[Tuple[str, Optional[Dict], Optional[Dict]]]], None]] = []
+    
+    # --- Leitura ---
+    
+    def disponivel(self) -> bool:
+        """
+        Se as leituras podem ser servidas da memória (carregada, reconciliada
+        há pouco e sem commits locais ainda não relidos).
+        """
+        if self._pendentes or self._relendo:
+            return False
+        return self.carregado and time.time() - self.ultima_reconciliacao <= LIMITE_ATRASO
+    
+    def listar(
+        self,
+        league: Optional[str] = None,
+        bookmakers: Optional[Sequence[str]] = None,
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        campos: Optional[Iterable[str]] = None,
+        mercados: Optional[Iterable[str]] = None,
+        limite: Optional[int] = LIMITE_PAGINA,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Mesmo resultado de events_query.listar_eventos (sem o filtro de
+        arbitragem), a partir da memória. limite None devolve todos.
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        eventos, ordem = self._estado
+        campos = list(CAMPOS_EVENTO) if campos is None else list(campos)
+        mercados = list(MERCADOS_API) if mercados is None else list(mercados)
+        casas = {casa.lower() for casa in bookmakers or []}
+        liga = league.lower() if league else None
+        completo = len(campos) == len(CAMPOS_EVENTO) and len(mercados) == len(MERCADOS_API) and not casas
+        
+        inicio = 0
+        if cursor:
+            inicio = bisect.bisect_right(ordem, decodificar_cursor(cursor))
+        if desde is not None:
+            inicio = max(inicio, bisect.bisect_left(ordem, (desde, "")))
+        
+        pagina = []
+        ultima = None
+        for posicao in ordem[inicio:] if inicio else ordem:
+            if ate is not None and posicao[0] > ate:
+                break
+            evento = eventos.get(posicao[1])
+            if evento is None:
+                continue
+            if liga is not None and evento.liga != liga:
+                continue
+            if casas and not (casas & evento.casas):
+                continue
+            
+            if limite is not None and len(pagina) == limite:
+                return pagina, codificar_cursor(*ultima)
+            
+            ultima = posicao
+            if completo:
+                # Compartilhado entre leitores: não deve ser alterado
+                pagina.append(evento.api)
+            else:
+                pagina.append(self._recortar(evento.api, campos, mercados, casas))
+        
+        return pagina, None
+    
+    @staticmethod
+    def _recortar(api: Dict, campos: List[str], mercados: List[str], casas: Set[str]) -> Dict:
+        resultado = {"eventId": api["eventId"]}
+        for campo in campos:
+            resultado[campo] = api[campo]
+        if mercados:
+            resultado["odds"] = {
+                casa: {mercado: odds[mercado] for mercado in mercados}
+                for casa, odds in api["odds"].items()
+                if not casas or casa.lower() in casas
+            }
+        return resultado
+    
+    # --- Escrita ---
+    
+    def _trocar(self, eventos: Dict[str, EventoLido], alterados: Iterable[str]) -> int:
+        """
+        Aplica os eventos relidos (ausentes em eventos são removidos), troca o
+        estado e avisa os ouvintes. Devolve quantos mudaram de fato.
+        """
+        atuais, ordem = self._estado
+        novos = dict(atuais)
+        removidas, inseridas = [], []
+        alteracoes = []
+        for event_id in alterados:
+            antigo = atuais.get(event_id)
+            novo = eventos.get(event_id)
+            if antigo is not None and novo is not None and antigo.api == novo.api:
+                continue
+            if antigo is not None or novo is not None:
+                alteracoes.append((event_id, novo.api if novo else None, antigo.api if antigo else None))
+            if antigo is not None:
+                del novos[event_id]
+                removidas.append(antigo.posicao)
+            if novo is not None:
+                novos[event_id] = novo
+                inseridas.append(novo.posicao)
+        
+        mudaram = len(alteracoes)
+        if not mudaram:
+            return 0
+        
+        if len(removidas) + len(inseridas) > 64:
+            nova_ordem = sorted(evento.posicao for evento in novos.values())
+        else:
+            nova_ordem = list(ordem)
+            for posicao in removidas:
+                del nova_ordem[bisect.bisect_left(nova_ordem, posicao)]
+            for posicao in inseridas:
+                bisect.insort(nova_ordem, posicao)
+        
+        self._estado = (novos, nova_ordem)
+        self.geracao += 1
+        
+        # A carga inicial não é uma mudança
+        if self.carregado:
+            for ouvinte in self.ouvintes:
+                try:
+                    ouvinte(alteracoes)
+                except Exception as e:
+                    print(f"⚠️  Erro ao notificar mudança no modelo de leitura: {e}")
+        return mudaram
+    
+    @contextmanager
+    def _consumindo_pendentes(self):
+        """
+        (Sob o lock de escrita) Os eventos pendentes passam para _relendo
+        durante uma releitura; se ela falhar, voltam a ficar pendentes.
+        """
+        with self._lock_pendentes:
+            # _relendo antes: disponivel() nunca vê os dois conjuntos vazios
+            self._relendo, self._pendentes = self._pendentes, set()
+        try:
+            yield self._relendo
+        except Exception:
+            with self._lock_pendentes:
+                self._pendentes |= self._relendo
+            raise
+        finally:
+            self._relendo = set()
+    
+    def atualizar_pendentes(self) -> None:
+        """
+        Relê do banco os eventos commitados por este processo desde a última
+        releitura (thread do modelo).
+        """
+        with self._lock_escrita, self._consumindo_pendentes() as event_ids:
+            if not event_ids:
+                return
+            event_ids = list(event_ids)
+            db = self.session_factory()
+            try:
+                eventos = carregar_eventos(db, event_ids)
+                versao = obter_versao(db)
+            finally:
+                db.close()
+            self._trocar(eventos, event_ids)
+            self.versao_vista = versao
+            self.atualizacoes += 1
+    
+    def reconciliar(self) -> int:
+        """
+        Recarrega todos os eventos ativos e troca o estado.
+        
+        Returns:
+            Quantos eventos divergiam do banco
+        """
+        # Os commits pendentes até aqui entram na recarga
+        with self._lock_escrita, self._consumindo_pendentes():
+            db = self.session_factory()
+            try:
+                versao = obter_versao(db)
+                eventos = carregar_eventos(db)
+            finally:
+                db.close()
+            divergentes = self._trocar(eventos, set(eventos) | set(self._estado[0]))
+            self.versao_vista = versao
+            self.carregado = True
+            self.ultima_reconciliacao = time.time()
+            self.reconciliacoes += 1
+            if self.reconciliacoes > 1:
+                self.divergencias += divergentes
+            return divergentes
+    
+    def verificar(self, max_ids: int = 50) -> Dict:
+        """
+        Compara o modelo com o banco sem alterá-lo. Escritas concorrentes podem
+        aparecer como divergências passageiras.
+        """
+        eventos, _ = self._estado
+        db = self.session_factory()
+        try:
+            banco = carregar_eventos(db)
+        finally:
+            db.close()
+        
+        faltando = sorted(set(banco) - set(eventos))
+        sobrando = sorted(set(eventos) - set(banco))
+        diferentes = sorted(
+            event_id for event_id in set(banco) & set(eventos)
+            if banco[event_id].api != eventos[event_id].api
+        )
+        return {
+            "consistent": not (faltando or sobrando or diferentes),
+            "events": len(eventos),
+            "databaseEvents": len(banco),
+            "missing": faltando[:max_ids],
+            "extra": sobrando[:max_ids],
+            "different": diferentes[:max_ids],
+            "missingCount": len(faltando),
+            "extraCount": len(sobrando),
+            "differentCount": len(diferentes),
+        }
+    
+    # --- Segundo plano ---
+    
+    def iniciar(self) -> None:
+        """
+        Carga inicial (síncrona) e thread de reconciliação. Se o banco falhar,
+        a thread tenta de novo e as leituras usam o banco até lá.
+        """
+        if not ATIVO or self._thread is not None:
+            return
+        try:
+            self.reconciliar()
+            print(f"✅ Modelo de leitura carregado: {len(self._estado[0])} evento(s)")
+        except Exception as e:
+            self.erros += 1
+            print(f"⚠️  Erro ao carregar o modelo de leitura: {e}")
+        self._thread = threading.Thread(target=self._loop, name="read-model", daemon=True)
+        self._thread.start()
+    
+    def _loop(self) -> None:
+        suspeita = None
+        while True:
+            self._acordar.wait(timeout=INTERVALO_VERIFICACAO)
+            self._acordar.clear()
+            
+            if self._pendentes and not self._reconciliar_ja:
+                try:
+                    self.atualizar_pendentes()
+                except Exception as e:
+                    # Sem a releitura, a reconciliação corrige o modelo
+                    self.erros += 1
+                    self._reconciliar_ja = True
+                    print(f"⚠️  Erro ao atualizar o modelo de leitura: {e}")
+            
+            # Versão acima da vista em duas verificações seguidas: escrita de
+            # outro processo (a releitura local já teria atualizado versao_vista)
+            # Sem requisições recentes o espelho está pausado (None): só a
+            # reconciliação periódica roda
+            versao = espelho_versao.atual(registrar_uso=False)
+            externa = versao is not None and self.versao_vista is not None and versao > self.versao_vista
+            atrasada = time.time() - self.ultima_reconciliacao >= self.intervalo_reconciliacao
+            
+            if self._reconciliar_ja or atrasada or (externa and suspeita == versao) or not self.carregado:
+                self._reconciliar_ja = False
+                suspeita = None
+                try:
+                    self.reconciliar()
+                except Exception as e:
+                    self.erros += 1
+                    print(f"⚠️  Erro ao reconciliar o modelo de leitura: {e}")
+            else:
+                suspeita = versao if externa else None
+    
+    def apos_commit(self, event_ids: Set[str]) -> None:
+        """
+        Marca os eventos de um commit deste processo para releitura e acorda a
+        thread do modelo (não consulta o banco nem espera o lock de escrita).
+        """
+        if not self.carregado:
+            return
+        with self._lock_pendentes:
+            self._pendentes.update(event_ids)
+        self._acordar.set()
+    
+    def estatisticas(self) -> Dict:
+        eventos, _ = self._estado
+        return {
+            "enabled": ATIVO,
+            "loaded": self.carregado,
+            "available": self.disponivel(),
+            "events": len(eventos),
+            "generation": self.geracao,
+            "seenVersion": self.versao_vista,
+            "lastReconcileAt": (
+                datetime.utcfromtimestamp(self.ultima_reconciliacao).isoformat()
+                if self.ultima_reconciliacao else None
+            ),
+            "reconciles": self.reconciliacoes,
+            "driftedEvents": self.divergencias,
+            "inPlaceUpdates": self.atualizacoes,
+            "pendingEvents": len(self._pendentes) + len(self._relendo),
+            "errors": self.erros,
+            "reconcileSeconds": self.intervalo_reconciliacao,
+        }
+
+
+modelo_leitura = ModeloLeitura()
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apos_commit(db: Session) -> None:
+    event_ids = db.info.pop(_MARCA_EVENTOS, None)
+    if event_ids:
+        db.info.setdefault(_MARCA_COMMITADOS, set()).update(event_ids)
+
+
+@sa_event.listens_for(Session, "after_transaction_end")
+def _apos_fim_transacao(db: Session, transacao) -> None:
+    # Em after_commit a conexão da sessão ainda não voltou ao pool: reler ali
+    # (outra conexão) com todas as conexões ocupadas por escritas esgotaria o pool
+    if transacao.parent is not None:
+        return
+    event_ids = db.info.pop(_MARCA_COMMITADOS, None)
+    if event_ids:
+        modelo_leitura.apos_commit(event_ids)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _apos_rollback(db: Session) -> None:
+    db.info.pop(_MARCA_EVENTOS, None)
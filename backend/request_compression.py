@@ -0,0 +1,128 @@
+"""
+Descompressão dos corpos de requisição enviados pelos scrapers.
+
+Com Content-Encoding gzip ou zstd o corpo é descomprimido em streaming, antes
+de chegar aos endpoints (que continuam lendo JSON normalmente). O tamanho
+descomprimido é limitado (MAX_REQUEST_BODY_MB): acima do limite a requisição
+recebe 413 sem que o corpo inteiro seja expandido em memória.
+"""
+import os
+import zlib
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional
+    zstandard = None
+
+ERROS_DESCOMPRESSAO = (zlib.error,) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+# Tamanho máximo do corpo descomprimido
+LIMITE_CORPO = int(float(os.getenv("MAX_REQUEST_BODY_MB", "50")) * 1024 * 1024)
+
+# Entrada do zstd é passada em fatias pequenas para limitar a expansão por chamada
+FATIA_ZSTD = 256
+
+
+class _Gzip:
+    def __init__(self):
+        self.obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    
+    def descomprimir(self, dados: bytes, restante: int) -> bytes:
+        saida = self.obj.decompress(dados, restante + 1)
+        if self.obj.unconsumed_tail:
+            # Ainda havia saída: já passou do limite
+            return saida + b"\0"
+        return saida
+    
+    def terminou(self) -> bool:
+        return self.obj.eof
+
+
+class _Zstd:
+    def __init__(self):
+        self.obj = zstandard.ZstdDecompressor().decompressobj()
+        self.fim = False
+    
+    def descomprimir(self, dados: bytes, restante: int) -> bytes:
+        partes = []
+        total = 0
+        for inicio in range(0, len(dados), FATIA_ZSTD):
+            parte = self.obj.decompress(dados[inicio:inicio + FATIA_ZSTD])
+            partes.append(parte)
+            total += len(parte)
+            if total > restante:
+                break
+        self.fim = self.obj.eof
+        return b"".join(partes)
+    
+    def terminou(self) -> bool:
+        return self.fim
+
+
+def _descompressor(codificacao: str):
+    if codificacao in ("gzip", "x-gzip"):
+        return _Gzip()
+    if codificacao == "zstd" and zstandard is not None:
+        return _Zstd()
+    return None
+
+
+class DescompressaoMiddleware:
+    """
+    Middleware ASGI que descomprime corpos gzip/zstd (Content-Encoding).
+    Codificação não suportada -> 415; corpo inválido -> 400; acima do limite -> 413.
+    """
+    
+    def __init__(self, app, limite: int = LIMITE_CORPO):
+        self.app = app
+        self.limite = limite
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        codificacao: Optional[str] = None
+        for nome, valor in scope["headers"]:
+            if nome == b"content-encoding":
+                codificacao = valor.decode("latin-1").strip().lower()
+        
+        if codificacao in (None, "", "identity"):
+            return await self.app(scope, receive, send)
+        
+        descompressor = _descompressor(codificacao)
+        if descompressor is None:
+            resposta = JSONResponse(status_code=415, content={"detail": f"Content-Encoding não suportado: {codificacao}"})
+            return await resposta(scope, receive, send)
+        
+        # O corpo muda de tamanho: remove Content-Length e Content-Encoding
+        scope = dict(scope, headers=[
+            (nome, valor) for nome, valor in scope["headers"]
+            if nome not in (b"content-length", b"content-encoding")
+        ])
+        limite = self.limite
+        recebido = 0
+        
+        async def receive_descomprimido():
+            nonlocal recebido
+            mensagem = await receive()
+            if mensagem["type"] != "http.request":
+                return mensagem
+            
+            try:
+                dados = descompressor.descomprimir(mensagem.get("body", b""), limite - recebido)
+            except ERROS_DESCOMPRESSAO as e:
+                raise HTTPException(status_code=400, detail=f"Corpo {codificacao} inválido: {e}")
+            
+            recebido += len(dados)
+            if recebido > limite:
+                raise HTTPException(status_code=413, detail=f"Corpo descomprimido maior que {limite} bytes")
+            
+            if not mensagem.get("more_body", False) and not descompressor.terminou():
+                raise HTTPException(status_code=400, detail=f"Corpo {codificacao} incompleto")
+            
+            return {"type": "http.request", "body": dados, "more_body": mensagem.get("more_body", False)}
+        
+        await self.app(scope, receive_descomprimido, send)
@@ -14,9 +14,16 @@ CREATE TABLE IF NOT EXISTS events (
     event_date TIMESTAMP NOT NULL,
     status VARCHAR(20) DEFAULT 'upcoming',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    finished_at TIMESTAMP
+    finished_at TIMESTAMP,
+    odds_updated_at TIMESTAMP
 );
 
+CREATE INDEX idx_events_status ON events(status);
+CREATE INDEX idx_events_event_date ON events(event_date);
+CREATE INDEX idx_events_finished_at ON events(finished_at);
+CREATE INDEX ix_events_odds_updated_at ON events(odds_updated_at);
+CREATE INDEX idx_events_date_id ON events(event_date, id);
+
 -- Tabela de odds
 CREATE TABLE IF NOT EXISTS odds (
     id VARCHAR(50) PRIMARY KEY,
@@ -26,27 +33,92 @@ CREATE TABLE IF NOT EXISTS odds (
     home_odd DECIMAL(10, 2),
     draw_odd DECIMAL(10, 2),
     away_odd DECIMAL(10, 2),
+    home_or_draw_odd DECIMAL(10, 2),
+    away_or_draw_odd DECIMAL(10, 2),
     scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    is_active BOOLEAN DEFAULT TRUE
+    is_active BOOLEAN DEFAULT TRUE,
+    fingerprint_1x2 BIGINT,
+    fingerprint_dc BIGINT
 );
 
-CREATE INDEX idx_odds_event_bookmaker ON odds(event_id, bookmaker);
+CREATE UNIQUE INDEX uq_odds_event_bookmaker ON odds(event_id, bookmaker);
+CREATE INDEX idx_odds_is_active ON odds(is_active);
+CREATE INDEX idx_odds_active_event_scraped ON odds(event_id, scraped_at) WHERE is_active;
+
+-- Tabela de best lines (duas melhores odds por mercado, por evento)
+CREATE TABLE IF NOT EXISTS best_lines (
+    event_id VARCHAR(50) PRIMARY KEY REFERENCES events(id) ON DELETE CASCADE,
+    bookmaker_count INTEGER NOT NULL DEFAULT 0,
+    lines JSON NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Versão global das odds (invalidação de caches)
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
 
 -- Tabela de oportunidades de arbitragem
 CREATE TABLE IF NOT EXISTS arbitrage_opportunities (
     id VARCHAR(50) PRIMARY KEY,
     event_id VARCHAR(50) REFERENCES events(id) ON DELETE CASCADE,
     user_bookmaker VARCHAR(50) NOT NULL,
-    user_team VARCHAR(50) NOT NULL,
+    user_team VARCHAR(120) NOT NULL,
     user_odd DECIMAL(10, 2) NOT NULL,
     hedge_bookmaker VARCHAR(50) NOT NULL,
-    hedge_team VARCHAR(50) NOT NULL,
+    hedge_team VARCHAR(120) NOT NULL,
     hedge_odd DECIMAL(10, 2) NOT NULL,
     profit_percent DECIMAL(10, 2),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     expires_at TIMESTAMP
 );
 
+CREATE INDEX ix_arbitrage_opportunities_event_id ON arbitrage_opportunities(event_id);
+CREATE INDEX ix_arbitrage_opportunities_expires_at ON arbitrage_opportunities(expires_at);
+CREATE INDEX idx_arb_opps_profit_id ON arbitrage_opportunities(profit_percent DESC, id);
+
+-- Histórico append-only de mudanças de preço (chaves pequenas, odd * 100)
+CREATE TABLE IF NOT EXISTS bookmakers (
+    id SMALLSERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS event_keys (
+    id SERIAL PRIMARY KEY,
+    event_id VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS odds_history (
+    event_key INTEGER NOT NULL,
+    scraped_at TIMESTAMP NOT NULL,
+    bookmaker_id SMALLINT NOT NULL,
+    outcome SMALLINT NOT NULL,
+    odd_x100 INTEGER NOT NULL,
+    PRIMARY KEY (event_key, scraped_at, bookmaker_id, outcome)
+);
+
+-- Apelidos de times (casamento de eventos entre casas) e nomes a revisar
+CREATE TABLE IF NOT EXISTS team_aliases (
+    alias VARCHAR(120) PRIMARY KEY,
+    canonical VARCHAR(120) NOT NULL,
+    source VARCHAR(20) NOT NULL DEFAULT 'manual',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS unresolved_team_names (
+    name_key VARCHAR(120) PRIMARY KEY,
+    raw_name VARCHAR(120) NOT NULL,
+    bookmaker VARCHAR(50),
+    competition VARCHAR(100),
+    suggestion VARCHAR(120),
+    score DECIMAL(4, 3),
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Tabela de requisições de usuários
 CREATE TABLE IF NOT EXISTS user_requests (
     id VARCHAR(50) PRIMARY KEY,
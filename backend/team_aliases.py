@@ -0,0 +1,434 @@
+"""
+Índice de apelidos de times para casar eventos entre casas.
+
+Cada casa escreve os times de um jeito ("Botafogo-RJ", "Botafogo", "Grêmio",
+"Gremio FBPA"...). O id do evento é montado com a chave canônica do time:
+    1. normalização (acentos, caixa, pontuação, termos genéricos como "FC")
+    2. tabela team_aliases (curada, editável pela API sem redeploy)
+    3. nomes já vistos em eventos são canônicos de si mesmos
+
+Na ingestão, nomes já vistos custam só consultas a dicionários (O(1)). Um nome
+desconhecido passa uma vez pela comparação aproximada (difflib, com cache) já
+na ingestão, para que o primeiro evento use o id do time conhecido; a fila em
+segundo plano grava o apelido quando a semelhança é muito alta e, quando é só
+plausível, registra o nome em unresolved_team_names para revisão.
+
+A comparação só considera os times conhecidos com alguma palavra de mesmo
+início (3 letras), e cada lote ingerido faz no máximo TEAM_FUZZY_INLINE_PER_BATCH
+comparações na requisição (ver orcamento_fuzzy); acima disso o nome fica com a
+chave crua e só a fila em segundo plano o compara. Quando um apelido é gravado,
+os eventos criados com a chave antiga são fundidos no id atual (event_merge).
+"""
+import difflib
+import os
+import re
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+from sqlalchemy.orm import Session
+from models import SessionLocal, Event, TeamAlias, UnresolvedTeamName, insert_com_conflito
+
+# Semelhança mínima para criar o apelido automaticamente
+LIMIAR_ACEITE = float(os.getenv("TEAM_FUZZY_ACCEPT", "0.92"))
+
+# Semelhança mínima para sugerir o apelido em /api/teams/unresolved
+LIMIAR_SUGESTAO = float(os.getenv("TEAM_FUZZY_SUGGEST", "0.6"))
+
+# Comparações aproximadas feitas na própria requisição, por lote ingerido
+MAX_FUZZY_POR_LOTE = int(os.getenv("TEAM_FUZZY_INLINE_PER_BATCH", "20"))
+
+# Letras iniciais de cada palavra usadas para pré-filtrar os candidatos
+TAMANHO_PREFIXO = 3
+
+# Entradas máximas dos caches de chaves e de comparações aproximadas
+LIMITE_CACHE = 100000
+
+# Intervalo de recarga dos apelidos e nomes conhecidos (outros processos podem alterá-los)
+INTERVALO_RECARGA = 60.0
+
+# Termos genéricos removidos da chave ("Fortaleza EC" -> "fortaleza")
+TERMOS_GENERICOS = {"fc", "ec", "sc", "ac", "afc", "cf", "fbpa", "clube", "club", "futebol"}
+
+# Apelidos curados de fábrica (nome -> canônico), normalizados ao carregar
+APELIDOS_PADRAO = {
+    "Botafogo-RJ": "Botafogo",
+    "Flamengo-RJ": "Flamengo",
+    "Fluminense-RJ": "Fluminense",
+    "Vasco da Gama": "Vasco",
+    "Vasco-RJ": "Vasco",
+    "Atlético Mineiro": "Atlético-MG",
+    "Athletico Paranaense": "Athletico-PR",
+    "Athletico": "Athletico-PR",
+    "Atlético-PR": "Athletico-PR",
+    "Atlético Goianiense": "Atlético-GO",
+    "América Mineiro": "América-MG",
+    "Red Bull Bragantino": "Bragantino",
+    "RB Bragantino": "Bragantino",
+    "Bragantino-SP": "Bragantino",
+    "Grêmio-RS": "Grêmio",
+    "Internacional-RS": "Internacional",
+    "Juventude-RS": "Juventude",
+    "Corinthians-SP": "Corinthians",
+    "Palmeiras-SP": "Palmeiras",
+    "Santos-SP": "Santos",
+    "São Paulo-SP": "São Paulo",
+    "Mirassol-SP": "Mirassol",
+    "Cruzeiro-MG": "Cruzeiro",
+    "Bahia-BA": "Bahia",
+    "Vitória-BA": "Vitória",
+    "Fortaleza-CE": "Fortaleza",
+    "Ceará-CE": "Ceará",
+    "Sport Recife": "Sport",
+    "Sport-PE": "Sport",
+    "Coritiba-PR": "Coritiba",
+    "Chapecoense-SC": "Chapecoense",
+    "Criciúma-SC": "Criciúma",
+    "Cuiabá-MT": "Cuiabá",
+    "Clube do Remo": "Remo",
+    "Remo-PA": "Remo",
+}
+
+
+def normalizar_nome(nome: str) -> str:
+    """
+    Chave normalizada de um nome de time: sem acentos, minúscula, sem
+    pontuação e sem termos genéricos ("Grêmio FBPA" -> "gremio").
+    """
+    sem_acentos = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    tokens = re.sub(r"[^a-z0-9]+", " ", sem_acentos.lower()).split()
+    relevantes = [token for token in tokens if token not in TERMOS_GENERICOS]
+    return " ".join(relevantes or tokens)
+
+
+def chave_para_id(chave: str) -> str:
+    return chave.replace(" ", "_")
+
+
+def _prefixos(chave: str) -> Set[str]:
+    return {token[:TAMANHO_PREFIXO] for token in chave.split()}
+
+
+def _indexar_prefixos(chaves: Iterable[str]) -> Dict[str, Set[str]]:
+    """Prefixo de palavra -> chaves conhecidas que têm uma palavra com esse início."""
+    indice: Dict[str, Set[str]] = {}
+    for chave in chaves:
+        for prefixo in _prefixos(chave):
+            indice.setdefault(prefixo, set()).add(chave)
+    return indice
+
+
+# Comparações restantes no lote atual (None: sem limite, fora de um lote)
+_orcamento_fuzzy: ContextVar[Optional[List[int]]] = ContextVar("orcamento_fuzzy", default=None)
+
+
+@contextmanager
+def orcamento_fuzzy(limite: Optional[int] = None):
+    """
+    Limita as comparações aproximadas feitas por resolver() dentro do bloco
+    (um payload ou stream de ingestão). Nomes novos acima do limite ficam com a
+    chave crua e são comparados só na fila em segundo plano.
+    """
+    token = _orcamento_fuzzy.set([MAX_FUZZY_POR_LOTE if limite is None else limite])
+    try:
+        yield
+    finally:
+        _orcamento_fuzzy.reset(token)
+
+
+class IndiceTimes:
+    """
+    Apelidos e nomes conhecidos em memória, recarregados do banco em segundo
+    plano. resolver() nunca acessa o banco.
+    """
+    
+    def __init__(self, session_factory=SessionLocal, intervalo_recarga: float = INTERVALO_RECARGA):
+        self.session_factory = session_factory
+        self.intervalo_recarga = intervalo_recarga
+        
+        self.apelidos: Dict[str, str] = {}
+        self.conhecidos: Set[str] = set()
+        self.por_prefixo: Dict[str, Set[str]] = {}
+        self.chaves_por_nome: Dict[str, str] = {}
+        self.cache_fuzzy: Dict[str, Tuple[Optional[str], float, bool]] = {}
+        
+        # Nome cru -> (casa, competição) dos nomes desconhecidos ainda não processados
+        self.pendentes: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        
+        self._lock = threading.Lock()
+        self._carregado = False
+        self._thread: Optional[threading.Thread] = None
+        self._acordar = threading.Event()
+        self.ultima_recarga = 0.0
+    
+    def _chave(self, nome: str) -> str:
+        chave = self.chaves_por_nome.get(nome)
+        if chave is None:
+            chave = normalizar_nome(nome)
+            if len(self.chaves_por_nome) < LIMITE_CACHE:
+                self.chaves_por_nome[nome] = chave
+        return chave
+    
+    def resolver(self, nome: str, bookmaker: Optional[str] = None, competicao: Optional[str] = None) -> str:
+        """
+        Chave canônica do time. Nomes conhecidos: consultas a dicionário apenas;
+        nomes novos: comparação aproximada (com cache) antes de devolver a
+        chave, para não separar o evento do mesmo jogo em outro id, dentro do
+        limite de orcamento_fuzzy.
+        """
+        if not self._carregado:
+            self.iniciar()
+        
+        chave = self._chave(nome)
+        canonico = self.apelidos.get(chave)
+        if canonico is not None:
+            return canonico
+        if chave in self.conhecidos:
+            return chave
+        
+        if nome not in self.pendentes:
+            with self._lock:
+                self.pendentes[nome] = (bookmaker, competicao)
+            self._acordar.set()
+        
+        # A fila grava o apelido (ou o nome para revisão) com o mesmo resultado do cache
+        resultado = self.cache_fuzzy.get(chave)
+        if resultado is None:
+            orcamento = _orcamento_fuzzy.get()
+            if orcamento is not None:
+                if orcamento[0] <= 0:
+                    return chave
+                orcamento[0] -= 1
+            resultado = self.melhor_candidato(chave)
+        
+        candidato, score, unico = resultado
+        if candidato is not None and unico and score >= LIMIAR_ACEITE:
+            return candidato
+        return chave
+    
+    # --- Segundo plano ---
+    
+    def iniciar(self) -> None:
+        """
+        Primeira carga e thread de recarga. Chamado no startup da API (fora do
+        event loop); sem isso, a primeira resolução faz a carga.
+        """
+        with self._lock:
+            if self._carregado:
+                return
+            # Primeira carga síncrona: a ingestão precisa dos apelidos desde o início
+            self.recarregar()
+            self._carregado = True
+            self._thread = threading.Thread(target=self._loop, name="team-aliases", daemon=True)
+            self._thread.start()
+    
+    def recarregar(self, db: Optional[Session] = None) -> None:
+        """
+        Recarrega apelidos (padrão + tabela) e nomes de times já gravados em eventos.
+        """
+        proprio = db is None
+        db = db or self.session_factory()
+        try:
+            apelidos = {
+                normalizar_nome(nome): normalizar_nome(canonico)
+                for nome, canonico in APELIDOS_PADRAO.items()
+            }
+            for alias, canonico in db.query(TeamAlias.alias, TeamAlias.canonical):
+                apelidos[alias] = canonico
+            
+            conhecidos = set(apelidos.values())
+            for home_team, away_team in db.query(Event.home_team, Event.away_team).distinct():
+                for nome in (home_team, away_team):
+                    chave = normalizar_nome(nome)
+                    conhecidos.add(apelidos.get(chave, chave))
+        finally:
+            if proprio:
+                db.close()
+        
+        # Troca as referências de uma vez: resolver() não precisa de lock
+        self.apelidos = apelidos
+        self._definir_conhecidos(conhecidos)
+        self.ultima_recarga = time.time()
+    
+    def _definir_conhecidos(self, conhecidos: Set[str]) -> None:
+        self.por_prefixo = _indexar_prefixos(conhecidos)
+        self.conhecidos = conhecidos
+    
+    def _loop(self) -> None:
+        while True:
+            self._acordar.wait(timeout=self.intervalo_recarga)
+            self._acordar.clear()
+            try:
+                if time.time() - self.ultima_recarga >= self.intervalo_recarga:
+                    self.recarregar()
+                self.processar_pendentes()
+            except Exception as e:
+                print(f"⚠️  Erro no índice de times: {e}")
+            # Agrupa nomes que chegam juntos no mesmo payload
+            time.sleep(1)
+    
+    def melhor_candidato(self, chave: str) -> Tuple[Optional[str], float, bool]:
+        """
+        Nome conhecido mais parecido com a chave (difflib), com cache. Compara
+        só com os conhecidos que têm alguma palavra com o mesmo início.
+        
+        Returns:
+            (candidato ou None, semelhança, se o candidato é único acima do
+            limiar de aceite)
+        """
+        if chave in self.cache_fuzzy:
+            return self.cache_fuzzy[chave]
+        
+        # Só os conhecidos com uma palavra de mesmo início
+        por_prefixo = self.por_prefixo
+        possiveis = set()
+        for prefixo in _prefixos(chave):
+            possiveis.update(por_prefixo.get(prefixo, ()))
+        
+        candidatos = difflib.get_close_matches(chave, sorted(possiveis), n=2, cutoff=LIMIAR_SUGESTAO)
+        scores = [difflib.SequenceMatcher(None, chave, candidato).ratio() for candidato in candidatos]
+        if candidatos:
+            unico = len(scores) == 1 or scores[1] < LIMIAR_ACEITE
+            resultado = (candidatos[0], scores[0], unico)
+        else:
+            resultado = (None, 0.0, False)
+        
+        if len(self.cache_fuzzy) < LIMITE_CACHE:
+            self.cache_fuzzy[chave] = resultado
+        return resultado
+    
+    def processar_pendentes(self) -> None:
+        """
+        Compara os nomes desconhecidos com os conhecidos: cria o apelido se a
+        semelhança for muito alta, registra para revisão se for plausível e
+        aceita como time novo caso contrário.
+        """
+        with self._lock:
+            pendentes, self.pendentes = self.pendentes, {}
+        if not pendentes:
+            return
+        
+        db = self.session_factory()
+        try:
+            insert = insert_com_conflito(db)
+            agora = datetime.utcnow()
+            novos_apelidos = {}
+            novos_conhecidos = set()
+            
+            for nome, (bookmaker, competicao) in pendentes.items():
+                chave = self._chave(nome)
+                if chave in self.apelidos or chave in self.conhecidos:
+                    continue
+                
+                candidato, score, unico = self.melhor_candidato(chave)
+                if candidato is not None and unico and score >= LIMIAR_ACEITE:
+                    novos_apelidos[chave] = candidato
+                    db.execute(
+                        insert(TeamAlias).values(alias=chave, canonical=candidato, source="fuzzy", created_at=agora)
+                        .on_conflict_do_nothing(index_elements=["alias"])
+                    )
+                    continue
+                
+                # Time novo: passa a ser canônico de si mesmo
+                novos_conhecidos.add(chave)
+                
+                if candidato is not None:
+                    stmt = insert(UnresolvedTeamName).values(
+                        name_key=chave,
+                        raw_name=nome,
+                        bookmaker=bookmaker,
+                        competition=competicao,
+                        suggestion=candidato,
+                        score=round(score, 3),
+                        occurrences=1,
+                        first_seen=agora,
+                        last_seen=agora
+                    )
+                    db.execute(stmt.on_conflict_do_update(
+                        index_elements=["name_key"],
+                        set_={
+                            "occurrences": UnresolvedTeamName.occurrences + 1,
+                            "suggestion": stmt.excluded.suggestion,
+                            "score": stmt.excluded.score,
+                            "last_seen": stmt.excluded.last_seen,
+                        }
+                    ))
+            
+            db.commit()
+        finally:
+            db.close()
+        
+        if novos_apelidos:
+            self.apelidos = {**self.apelidos, **novos_apelidos}
+            self._fundir_eventos(novos_apelidos)
+        if novos_conhecidos:
+            self._definir_conhecidos(self.conhecidos | novos_conhecidos)
+    
+    def _fundir_eventos(self, chaves: Iterable[str]) -> None:
+        """
+        Eventos criados com a chave crua antes do apelido existir (acima de
+        orcamento_fuzzy) passam para o id com a chave canônica.
+        """
+        from event_merge import remapear_eventos_dos_times
+        
+        db = self.session_factory()
+        try:
+            remapeados = remapear_eventos_dos_times(db, chaves)
+            db.commit()
+        finally:
+            db.close()
+        if remapeados:
+            print(f"🔀 {len(remapeados)} evento(s) fundido(s) pelos novos apelidos")
+    
+    # --- Curadoria ---
+    
+    def adicionar_apelido(self, db: Session, nome: str, canonico: str) -> Dict[str, str]:
+        """
+        Grava um apelido curado (não faz commit) e já o aplica neste processo,
+        fundindo os eventos gravados com a chave do apelido. Os demais
+        processos o recebem na próxima recarga.
+        """
+        from event_merge import remapear_eventos_dos_times
+        
+        if not self._carregado:
+            self.iniciar()
+        
+        chave = normalizar_nome(nome)
+        chave_canonica = normalizar_nome(canonico)
+        # Encadeamento: se o canônico já é apelido de outro, aponta direto para o final
+        chave_canonica = self.apelidos.get(chave_canonica, chave_canonica)
+        
+        if chave == chave_canonica:
+            raise ValueError("O apelido e o nome canônico são o mesmo time")
+        
+        stmt = insert_com_conflito(db)(TeamAlias).values(
+            alias=chave, canonical=chave_canonica, source="manual", created_at=datetime.utcnow()
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["alias"],
+            set_={"canonical": stmt.excluded.canonical, "source": stmt.excluded.source}
+        ))
+        db.query(UnresolvedTeamName).filter(UnresolvedTeamName.name_key == chave).delete(synchronize_session=False)
+        
+        self.apelidos = {**self.apelidos, chave: chave_canonica}
+        self._definir_conhecidos(self.conhecidos | {chave_canonica})
+        self.cache_fuzzy.clear()
+        remapear_eventos_dos_times(db, [chave])
+        return {"alias": chave, "canonical": chave_canonica}
+    
+    def listar_apelidos(self) -> Dict[str, str]:
+        if not self._carregado:
+            self.iniciar()
+        return dict(sorted(self.apelidos.items()))
+    
+    def nao_resolvidos(self, db: Session, limite: int = 100) -> List[UnresolvedTeamName]:
+        return db.query(UnresolvedTeamName).order_by(
+            UnresolvedTeamName.occurrences.desc(),
+            UnresolvedTeamName.last_seen.desc()
+        ).limit(limite).all()
+
+
+indice_times = IndiceTimes()
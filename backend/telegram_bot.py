@@ -5,7 +5,8 @@ from telegram import Bot
 from telegram.constants import ParseMode
 from dotenv import load_dotenv
 from models import SessionLocal
-from arbitrage import buscar_oportunidades_automaticas
+from opportunity_set import ConjuntoOportunidades
+from arbitrage import calcular_hedge_lote
 
 load_dotenv()
 
@@ -20,8 +21,12 @@ VALORES_TESTE = [10, 20, 50, 100]  # Valores fixos para V1
 # Armazena oportunidades já enviadas para não repetir
 oportunidades_enviadas = set()
 
+# Oportunidades mantidas entre ciclos (recálculo incremental) e gravadas
+# em arbitrage_opportunities, lidas por GET /api/opportunities
+conjunto_oportunidades = ConjuntoOportunidades(valor_base=100.0, min_profit_percent=MIN_PROFIT_PERCENT, persistir=True)
 
-def formatar_mensagem_oportunidade(oportunidade: dict, valor: float) -> str:
+
+def formatar_mensagem_oportunidade(oportunidade: dict, valor: float, resultado: dict = None) -> str:
     """
     Formata uma oportunidade em mensagem bonita para o Telegram.
     """
@@ -29,9 +34,10 @@ def formatar_mensagem_oportunidade(oportunidade: dict, valor: float) -> str:
     bet1 = oportunidade['bet1']
     bet2 = oportunidade['bet2']
     
-    # Recalcula para o valor específico
-    from arbitrage import calcular_hedge
-    resultado = calcular_hedge(valor, bet1['odd'], bet2['odd'])
+    # Recalcula para o valor específico (se não veio do cálculo em lote)
+    if resultado is None:
+        from arbitrage import calcular_hedge
+        resultado = calcular_hedge(valor, bet1['odd'], bet2['odd'])
     
     mensagem = f"""
 🎯 <b>OPORTUNIDADE DE ARBITRAGEM!</b>
@@ -92,15 +98,11 @@ async def monitorar_oportunidades(chat_id: str):
         try:
             db = SessionLocal()
             
-            # Busca oportunidades
-            oportunidades = buscar_oportunidades_automaticas(
-                db,
-                valor_base=100.0,  # Base para comparação
-                min_profit_percent=MIN_PROFIT_PERCENT
-            )
+            # Busca oportunidades (só reavalia eventos que receberam odds novas)
+            oportunidades = conjunto_oportunidades.atualizar(db)
             
             if oportunidades:
-                print(f"🔍 Encontradas {len(oportunidades)} oportunidade(s)!")
+                print(f"🔍 Encontradas {len(oportunidades)} oportunidade(s)! ({oportunidades.eventos_avaliados} evento(s) reavaliado(s), {oportunidades.sql_statements} queries SQL)")
                 
                 for oportunidade in oportunidades:
                     # Cria ID único para a oportunidade
@@ -108,9 +110,14 @@ async def monitorar_oportunidades(chat_id: str):
                     
                     # Verifica se já enviou essa oportunidade
                     if opp_id not in oportunidades_enviadas:
-                        # Envia para cada valor de teste
-                        for valor in VALORES_TESTE:
-                            mensagem = formatar_mensagem_oportunidade(oportunidade, valor)
+                        # Envia para cada valor de teste (hedge de todos os valores em um cálculo)
+                        resultados = calcular_hedge_lote(
+                            VALORES_TESTE,
+                            oportunidade['bet1']['odd'],
+                            oportunidade['bet2']['odd']
+                        )
+                        for valor, resultado in zip(VALORES_TESTE, resultados):
+                            mensagem = formatar_mensagem_oportunidade(oportunidade, valor, resultado)
                             await enviar_para_grupo(chat_id, mensagem)
                             await asyncio.sleep(1)  # Delay para não spammar
                         
@@ -5,7 +5,8 @@ from telegram import Bot
 from telegram.constants import ParseMode
 from dotenv import load_dotenv
 from models import SessionLocal
-from arbitrage import buscar_oportunidades_automaticas, limpar_eventos_antigos
+from arbitrage import limpar_eventos_antigos, calcular_hedge_lote
+from opportunity_set import ConjuntoOportunidades
 
 print("=" * 60)
 print("🤖 INICIANDO BOT DO TELEGRAM")
@@ -45,13 +46,18 @@ VALORES_TESTE = [10, 20, 50, 100]
 oportunidades_enviadas = set()
 ultima_limpeza_cache = datetime.now()
 
-def formatar_mensagem_oportunidade(oportunidade: dict, valor: float) -> str:
+# Oportunidades mantidas entre ciclos (recálculo incremental) e gravadas
+# em arbitrage_opportunities, lidas por GET /api/opportunities
+conjunto_oportunidades = ConjuntoOportunidades(valor_base=100.0, min_profit_percent=MIN_PROFIT_PERCENT, persistir=True)
+
+def formatar_mensagem_oportunidade(oportunidade: dict, valor: float, resultado: dict = None) -> str:
     event = oportunidade['event']
     bet1 = oportunidade['bet1']
     bet2 = oportunidade['bet2']
     
-    from arbitrage import calcular_hedge
-    resultado = calcular_hedge(valor, bet1['odd'], bet2['odd'])
+    if resultado is None:
+        from arbitrage import calcular_hedge
+        resultado = calcular_hedge(valor, bet1['odd'], bet2['odd'])
     
     mensagem = f"""
 🎯 <b>OPORTUNIDADE DE ARBITRAGEM!</b>
@@ -120,15 +126,11 @@ Você receberá notificações automaticamente quando encontrarmos boas oportuni
             # NOVO: Limpa eventos antigos a cada ciclo
             limpar_eventos_antigos(db)
             
-            # Busca oportunidades
-            oportunidades = buscar_oportunidades_automaticas(
-                db,
-                valor_base=100.0,
-                min_profit_percent=MIN_PROFIT_PERCENT
-            )
+            # Busca oportunidades (só reavalia eventos que receberam odds novas)
+            oportunidades = conjunto_oportunidades.atualizar(db)
             
             if oportunidades:
-                print(f"🔍 Encontradas {len(oportunidades)} oportunidade(s)!")
+                print(f"🔍 Encontradas {len(oportunidades)} oportunidade(s)! ({oportunidades.eventos_avaliados} evento(s) reavaliado(s), {oportunidades.sql_statements} queries SQL)")
                 ciclos_sem_oportunidades = 0
                 
                 for oportunidade in oportunidades:
@@ -139,9 +141,14 @@ Você receberá notificações automaticamente quando encontrarmos boas oportuni
                     if opp_id not in oportunidades_enviadas:
                         print(f"📤 Enviando oportunidade: {opp_id}")
                         
-                        # Envia para cada valor de teste
-                        for valor in VALORES_TESTE:
-                            mensagem = formatar_mensagem_oportunidade(oportunidade, valor)
+                        # Envia para cada valor de teste (hedge de todos os valores em um cálculo)
+                        resultados = calcular_hedge_lote(
+                            VALORES_TESTE,
+                            oportunidade['bet1']['odd'],
+                            oportunidade['bet2']['odd']
+                        )
+                        for valor, resultado in zip(VALORES_TESTE, resultados):
+                            mensagem = formatar_mensagem_oportunidade(oportunidade, valor, resultado)
                             await enviar_para_grupo(TELEGRAM_CHAT_ID, mensagem)
                             await asyncio.sleep(1)  # Delay para não spammar
                         
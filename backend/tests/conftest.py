@@ -0,0 +1,108 @@
+"""
+Configuração dos testes do backend.
+
+Os testes usam um banco SQLite temporário: DATABASE_URL (e o modo de
+ingestão) são definidos aqui, antes de qualquer import de models, então a
+suíte nunca toca o banco configurado no .env.
+
+Uso (a partir de backend/):
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_DIRETORIO_BANCO = tempfile.mkdtemp(prefix="betting-bot-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DIRETORIO_BANCO}/testes.db"
+os.environ["DB_ASYNC"] = "false"
+os.environ["INGESTION_MODE"] = "sync"
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import pytest
+from ingestion import apos_gravar_odds, normalizar_registro, persistir_lote
+from models import Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    """Sessão em um banco recém-criado (tabelas vazias)."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+@pytest.fixture
+def cliente(db):
+    """
+    TestClient da API (com o lifespan) sobre o banco recém-criado. Os estados
+    em memória de testes anteriores (modelo de leitura, versão espelhada e
+    cache de arbitragem) são descartados.
+    """
+    from fastapi.testclient import TestClient
+    from cache import cache_arbitragem
+    from main import app
+    from read_model import modelo_leitura
+    from versioning import espelho_versao
+    
+    with TestClient(app) as cliente:
+        cache_arbitragem.limpar()
+        espelho_versao.invalidar()
+        modelo_leitura.reconciliar()
+        yield cliente
+
+
+def _registro_scraper(
+    casa: str,
+    mandante: str,
+    visitante: str,
+    tipo: str = "1X2",
+    odds=None,
+    coletado_em: str = "2026-10-18T12:00:00Z",
+    competicao: str = "Brasileirão",
+    inicio: str = "2026-10-19T18:00:00Z",
+) -> dict:
+    if odds is None:
+        odds = (2.1, 3.2, 3.5) if tipo == "1X2" else (1.3, 1.6)
+    chaves = ("1", "X", "2") if tipo == "1X2" else ("1X", "X2")
+    return {
+        "source": casa,
+        "sport": "Futebol",
+        "competition": competicao,
+        "event": {"id": "x", "name": f"{mandante} vs {visitante}", "start_time": inicio},
+        "market": {
+            "type": tipo,
+            "name": tipo,
+            "selections": [{"key": chave, "name": chave, "odd": odd} for chave, odd in zip(chaves, odds)],
+        },
+        "collected_at": coletado_em,
+    }
+
+
+@pytest.fixture
+def registro_scraper():
+    """Monta um registro no formato enviado pelos scrapers (ver fast_json)."""
+    return _registro_scraper
+
+
+def _gravar_registros(db, registros) -> dict:
+    resultado = persistir_lote(db, [normalizar_registro(registro) for registro in registros])
+    apos_gravar_odds(db, resultado["event_ids"])
+    db.commit()
+    return resultado
+
+
+@pytest.fixture
+def gravar_registros():
+    """
+    Grava registros do scraper como a ingestão síncrona: persistir_lote,
+    apos_gravar_odds e commit (devolve o resultado de persistir_lote).
+    """
+    return _gravar_registros
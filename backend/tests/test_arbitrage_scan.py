@@ -0,0 +1,93 @@
+"""
+Varredura vetorizada (NumPy) x varredura original em loops: mesmas
+oportunidades, na mesma ordem, para mercados aleatórios.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from arbitrage import avaliar_eventos, buscar_oportunidades_automaticas, calcular_hedge
+from models import Event, Odd
+
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte", "pinnacle"]
+
+
+def mercado_aleatorio(seed: int, n_eventos: int = 60, agora: datetime = None):
+    """Eventos (não persistidos) com odds aleatórias, algumas faltando."""
+    rng = random.Random(seed)
+    agora = agora or datetime.utcnow()
+    
+    def odd(minimo: float, maximo: float):
+        if rng.random() < 0.1:
+            return None
+        return Decimal(str(round(rng.uniform(minimo, maximo), 2)))
+    
+    eventos = []
+    for i in range(n_eventos):
+        evento = Event(
+            id=f"evt_{i}", sport="Futebol", league="teste", home_team=f"Mandante {i}",
+            away_team=f"Visitante {i}", event_date=agora + timedelta(hours=2), status="upcoming"
+        )
+        for casa in rng.sample(CASAS, rng.randint(0, len(CASAS))):
+            evento.odds.append(Odd(
+                id=f"odd_{i}_{casa}", bookmaker=casa,
+                home_odd=odd(1.2, 5.0), draw_odd=odd(2.8, 4.0), away_odd=odd(1.2, 5.0),
+                home_or_draw_odd=odd(1.05, 2.8), away_or_draw_odd=odd(1.05, 2.8),
+                scraped_at=None if rng.random() < 0.05 else agora - timedelta(minutes=rng.randint(0, 90))
+            ))
+        eventos.append(evento)
+    return eventos
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("min_profit", [0.0, 1.0, 3.5])
+@pytest.mark.parametrize("max_diferenca", [0, 30])
+def test_vetorizada_igual_ao_loop(seed, min_profit, max_diferenca):
+    agora = datetime.utcnow()
+    eventos = mercado_aleatorio(seed, agora=agora)
+    
+    argumentos = dict(valor_base=100.0, min_profit_percent=min_profit, agora=agora, max_diferenca_minutos=max_diferenca)
+    loop = avaliar_eventos(eventos, vetorizado=False, **argumentos)
+    vetorizada = avaliar_eventos(eventos, vetorizado=True, **argumentos)
+    
+    assert vetorizada == loop
+
+
+def test_mercado_aleatorio_tem_oportunidades():
+    # Garante que a comparação acima não passa só por listas vazias
+    agora = datetime.utcnow()
+    oportunidades = avaliar_eventos(mercado_aleatorio(0, agora=agora), min_profit_percent=0.0, agora=agora, max_diferenca_minutos=0)
+    assert len(oportunidades) > 10
+    for oportunidade in oportunidades:
+        assert oportunidade["bet1"]["bookmaker"] != oportunidade["bet2"]["bookmaker"]
+        assert oportunidade["profit"] > 0
+
+
+def test_limiar_de_lucro_igual_ao_calcular_hedge():
+    # Casos perto do limiar: a decisão final é do calcular_hedge (arredondado)
+    agora = datetime.utcnow()
+    evento = Event(id="evt_limiar", sport="Futebol", league="teste", home_team="A", away_team="B",
+                   event_date=agora, status="upcoming")
+    evento.odds.append(Odd(id="o1", bookmaker="betano", home_odd=Decimal("2.02"), scraped_at=agora))
+    evento.odds.append(Odd(id="o2", bookmaker="bet365", away_or_draw_odd=Decimal("2.00"), scraped_at=agora))
+    
+    percentual = calcular_hedge(100.0, 2.02, 2.00)["lucro_percentual"]
+    for min_profit in (percentual - 0.01, percentual, percentual + 0.01):
+        loop = avaliar_eventos([evento], min_profit_percent=min_profit, vetorizado=False, agora=agora)
+        vetorizada = avaliar_eventos([evento], min_profit_percent=min_profit, vetorizado=True, agora=agora)
+        assert vetorizada == loop
+        assert len(loop) == (1 if min_profit <= percentual else 0)
+
+
+@pytest.mark.parametrize("n_eventos", [1, 60])
+def test_varredura_usa_dois_statements(db, n_eventos):
+    # Eventos e odds em duas consultas, qualquer que seja o número de eventos
+    db.add_all(mercado_aleatorio(1, n_eventos=n_eventos))
+    db.commit()
+    db.expunge_all()
+    
+    resultado = buscar_oportunidades_automaticas(db, min_profit_percent=0.0)
+    
+    assert resultado.eventos_avaliados == n_eventos
+    assert resultado.sql_statements == 2
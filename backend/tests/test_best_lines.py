@@ -0,0 +1,133 @@
+"""
+Tabela de best lines: depois de cada ingestão é igual a um recálculo a partir
+das odds ativas, e esvazia quando o evento é finalizado. A cotação do hedge
+só usa odds ativas e frescas.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from arbitrage import encontrar_melhor_odd_double_chance
+from best_lines import atualizar_best_lines, calcular_linhas
+from models import BestLine, Event, Odd
+import update_event_status
+
+JOGOS = [("Palmeiras", "Santos"), ("Flamengo", "Vasco"), ("Grêmio", "Internacional"), ("Bahia", "Vitória")]
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte"]
+
+
+def conferir_com_recalculo(db):
+    odds_por_evento = {}
+    for odd in db.query(Odd).filter(Odd.is_active == True):
+        odds_por_evento.setdefault(odd.event_id, []).append(odd)
+
+    db.expire_all()
+    best_lines = {linha.event_id: linha for linha in db.query(BestLine)}
+    assert set(best_lines) == {event_id for (event_id,) in db.query(Odd.event_id).distinct()}
+    for event_id, linha in best_lines.items():
+        linhas, n_casas = calcular_linhas(odds_por_evento.get(event_id, []))
+        assert linha.lines == linhas
+        assert linha.bookmaker_count == n_casas
+
+
+@pytest.fixture
+def ingerido(db, registro_scraper, gravar_registros):
+    """Quatro rodadas de ingestão com preços aleatórios e casas entrando aos poucos."""
+    rng = random.Random(17)
+    inicio = datetime(2026, 10, 18, 12, 0)
+    for rodada in range(4):
+        coletado_em = (inicio + timedelta(minutes=rodada)).isoformat() + "Z"
+        registros = []
+        for mandante, visitante in JOGOS:
+            for casa in rng.sample(CASAS, rng.randint(1, len(CASAS))):
+                registros.append(registro_scraper(
+                    casa, mandante, visitante, "1X2",
+                    tuple(round(rng.uniform(1.3, 5.0), 2) for _ in range(3)), coletado_em
+                ))
+                registros.append(registro_scraper(
+                    casa, mandante, visitante, "Double Chance",
+                    tuple(round(rng.uniform(1.05, 2.6), 2) for _ in range(2)), coletado_em
+                ))
+        gravar_registros(db, registros)
+        conferir_com_recalculo(db)
+    return db
+
+
+def test_ingestao_mantem_a_tabela_igual_ao_recalculo(ingerido):
+    assert ingerido.query(BestLine).count() == len(JOGOS)
+    assert all(linha.bookmaker_count >= 1 for linha in ingerido.query(BestLine))
+
+
+def finalizar_no_passado(db, event_id):
+    db.get(Event, event_id).event_date = datetime.utcnow() - timedelta(hours=4)
+    db.commit()
+
+
+def test_evento_finalizado_pela_api_esvazia_as_best_lines(ingerido, cliente):
+    event_id = ingerido.query(BestLine).filter(BestLine.bookmaker_count >= 2).first().event_id
+    finalizar_no_passado(ingerido, event_id)
+
+    assert cliente.post("/api/events/update-status").json()["finished"] == 1
+
+    conferir_com_recalculo(ingerido)
+    assert ingerido.get(BestLine, event_id).bookmaker_count == 0
+    assert encontrar_melhor_odd_double_chance(ingerido, event_id, "home", "betano") is None
+
+
+def test_evento_finalizado_pelo_script_esvazia_as_best_lines(ingerido):
+    event_id = ingerido.query(BestLine).filter(BestLine.bookmaker_count >= 2).first().event_id
+    finalizar_no_passado(ingerido, event_id)
+
+    assert update_event_status.update_event_statuses()["finished"] == 1
+
+    conferir_com_recalculo(ingerido)
+    assert ingerido.get(BestLine, event_id).bookmaker_count == 0
+    assert encontrar_melhor_odd_double_chance(ingerido, event_id, "away", "bet365") is None
+
+
+@pytest.fixture
+def hedge_velho(db):
+    """Palmeiras x Santos: a melhor "Visitante ou Empate" tem 10 horas; a de 5 minutos está abaixo dela."""
+    agora = datetime.utcnow()
+    db.add(Event(
+        id="evt_hedge", sport="Futebol", league="Brasileirão", home_team="Palmeiras",
+        away_team="Santos", event_date=agora + timedelta(hours=6), status="upcoming"
+    ))
+    for casa, home_odd, away_or_draw_odd, idade in [
+        ("betano", 2.5, None, timedelta(minutes=1)),
+        ("bet365", None, 2.2, timedelta(hours=10)),
+        ("superbet", None, 2.1, timedelta(hours=10)),
+        ("esportesdasorte", None, 1.7, timedelta(minutes=5)),
+    ]:
+        db.add(Odd(
+            id=f"odd_{casa}", event_id="evt_hedge", bookmaker=casa, home_odd=home_odd,
+            away_or_draw_odd=away_or_draw_odd, scraped_at=agora - idade
+        ))
+    db.commit()
+    return db
+
+
+@pytest.mark.parametrize("com_best_lines", [True, False])
+def test_cotacao_ignora_odd_velha(hedge_velho, com_best_lines):
+    if com_best_lines:
+        atualizar_best_lines(hedge_velho, ["evt_hedge"])
+        hedge_velho.commit()
+    
+    melhor = encontrar_melhor_odd_double_chance(hedge_velho, "evt_hedge", "home", "betano")
+    
+    assert (melhor["bookmaker"], melhor["odd"]) == ("esportesdasorte", 1.7)
+    hedge_velho.query(Odd).filter(Odd.bookmaker == "esportesdasorte").update({"is_active": False})
+    assert encontrar_melhor_odd_double_chance(hedge_velho, "evt_hedge", "home", "betano") is None
+
+
+def test_api_cotacao_nao_usa_odd_velha(hedge_velho, cliente):
+    atualizar_best_lines(hedge_velho, ["evt_hedge"])
+    hedge_velho.commit()
+    cotacao = {"eventId": "evt_hedge", "team": "home", "bookmaker": "betano", "amount": 100}
+    
+    assert cliente.post("/api/arbitrage/quote", json=cotacao).json()["hedge_bet"]["bookmaker"] == "esportesdasorte"
+    
+    # A odd do próprio usuário também tem que estar fresca
+    hedge_velho.query(Odd).filter(Odd.bookmaker == "betano").update({"scraped_at": datetime.utcnow() - timedelta(days=7)})
+    hedge_velho.commit()
+    assert cliente.post("/api/arbitrage/quote", json={**cotacao, "amount": 50}).status_code == 404
@@ -0,0 +1,77 @@
+"""
+Camada assíncrona (DB_ASYNC=true): GET /api/events com AsyncSession sobre
+aiosqlite devolve o mesmo que a rota síncrona; as escritas continuam nas
+rotas síncronas.
+"""
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from events_query import iterar_eventos
+import main
+import models
+from read_model import modelo_leitura
+from versioning import espelho_versao
+
+
+@pytest.fixture
+def cliente_async(cliente, monkeypatch):
+    """
+    O cliente com as rotas de DB_ASYNC=true (o DB_ASYNC dos testes é false).
+    Sem pool: as conexões aiosqlite não sobrevivem ao event loop do TestClient.
+    """
+    sessoes = async_sessionmaker(
+        create_async_engine(models.url_async(models.DATABASE_URL), poolclass=NullPool),
+        autoflush=False, expire_on_commit=False
+    )
+    monkeypatch.setattr(models, "AsyncSessionLocal", sessoes)
+    monkeypatch.setattr(main, "AsyncSessionLocal", sessoes)
+    monkeypatch.setattr(main.app.router, "routes", list(main.app.router.routes))
+    main._usar_rotas_async()
+    # Leitura pelo banco (sem modelo em memória nem versão espelhada)
+    monkeypatch.setattr(modelo_leitura, "disponivel", lambda: False)
+    monkeypatch.setattr(espelho_versao, "atual", lambda registrar_uso=True: None)
+    return cliente
+
+
+def endpoint(caminho, metodo):
+    [rota] = [rota for rota in main.app.router.routes if getattr(rota, "path", None) == caminho and metodo in rota.methods]
+    return rota.endpoint
+
+
+def test_rotas_async_so_na_listagem(cliente_async):
+    assert endpoint("/api/events", "GET") is main.get_events_async
+    assert endpoint("/api/odds/scraper", "POST") is main.receive_scraper_odds
+    assert endpoint("/api/events/update-status", "POST") is main.update_event_statuses
+    assert endpoint("/api/arbitrage/quote", "POST") is main.arbitrage_quote
+
+
+def test_listagem_async_igual_a_sincrona(cliente_async, db, registro_scraper):
+    resposta = cliente_async.post("/api/odds/scraper", json={"data": [
+        registro_scraper(casa, mandante, visitante, inicio=inicio)
+        for mandante, visitante, inicio in [
+            ("Palmeiras", "Santos", "2026-10-19T18:00:00Z"),
+            ("Flamengo", "Vasco", "2026-10-20T18:00:00Z"),
+        ]
+        for casa in ("betano", "bet365")
+    ]})
+    assert resposta.json()["success"]
+    
+    resposta = cliente_async.get("/api/events")
+    assert resposta.headers["X-Read-Source"] == "database"
+    eventos = resposta.json()["events"]
+    assert [evento["homeTeam"] for evento in eventos] == ["Palmeiras", "Flamengo"]
+    assert set(eventos[0]["odds"]) == {"betano", "bet365"}
+    
+    # ETag pela versão lida com a sessão assíncrona
+    assert cliente_async.get("/api/events", headers={"If-None-Match": resposta.headers["ETag"]}).status_code == 304
+    
+    pagina = cliente_async.get("/api/events", params={"limit": 1}).json()
+    assert [evento["homeTeam"] for evento in pagina["events"]] == ["Palmeiras"]
+    pagina = cliente_async.get("/api/events", params={"limit": 1, "cursor": pagina["nextCursor"]}).json()
+    assert ([evento["homeTeam"] for evento in pagina["events"]], pagina["nextCursor"]) == (["Flamengo"], None)
+    
+    assert cliente_async.get("/api/events", params={"stream": True}).json()["events"] == eventos
+    
+    # Mesmo resultado da consulta síncrona
+    assert eventos == list(iterar_eventos(db))
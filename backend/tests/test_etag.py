@@ -0,0 +1,91 @@
+"""
+GET condicional: o ETag de /api/events só muda quando as odds mudam, e o
+If-None-Match correspondente devolve 304 sem corpo.
+"""
+import time
+
+import pytest
+from etag import etag_corresponde, gerar_etag
+from read_model import modelo_leitura
+from starlette.requests import Request
+from versioning import espelho_versao
+
+
+def requisicao(if_none_match=None):
+    cabecalhos = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": cabecalhos})
+
+
+@pytest.mark.parametrize("cabecalho, esperado", [
+    (None, False),
+    ('W/"events-v3"', True),
+    ('"events-v3"', True),
+    ('W/"events-v2", W/"events-v3"', True),
+    ("*", True),
+    ('W/"events-v4"', False),
+    ('W/"status-v3"', False),
+])
+def test_etag_corresponde(cabecalho, esperado):
+    assert etag_corresponde(requisicao(cabecalho), gerar_etag("events", 3)) is esperado
+
+
+@pytest.fixture
+def payload(registro_scraper):
+    return [registro_scraper(casa, "Palmeiras", "Santos") for casa in ("betano", "bet365")]
+
+
+@pytest.mark.parametrize("memoria", [True, False], ids=["memoria", "banco"])
+def test_events_304_ate_as_odds_mudarem(cliente, payload, registro_scraper, monkeypatch, memoria):
+    if not memoria:
+        # Sem o modelo de leitura, o ETag vem da versão das odds no banco
+        monkeypatch.setattr(modelo_leitura, "disponivel", lambda: False)
+    
+    def enviar(registros):
+        cliente.post("/api/odds/scraper", json={"data": registros})
+        # Até a thread do modelo reler os eventos do commit, as leituras vão ao banco
+        limite = time.time() + 5
+        while memoria and not modelo_leitura.disponivel() and time.time() < limite:
+            time.sleep(0.01)
+    
+    enviar(payload)
+    
+    primeira = cliente.get("/api/events")
+    etag = primeira.headers["ETag"]
+    assert primeira.headers["Cache-Control"] == "no-cache"
+    
+    repetida = cliente.get("/api/events", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["ETag"] == etag
+    
+    # Reenvio com os mesmos preços não muda a versão
+    enviar(payload)
+    assert cliente.get("/api/events", headers={"If-None-Match": etag}).status_code == 304
+    
+    # Preço novo: outro ETag e corpo atualizado
+    alterado = registro_scraper("betano", "Palmeiras", "Santos", odds=(2.5, 3.2, 3.0), coletado_em="2026-10-18T12:05:00Z")
+    enviar([alterado])
+    nova = cliente.get("/api/events", headers={"If-None-Match": etag})
+    assert nova.status_code == 200
+    assert nova.headers["X-Read-Source"] == ("memory" if memoria else "database")
+    assert nova.headers["ETag"] != etag
+    assert nova.json()["events"][0]["odds"]["betano"]["homeOdd"] == 2.5
+
+
+def test_has_arbitrage_true_nao_usa_etag(cliente, payload):
+    cliente.post("/api/odds/scraper", json={"data": payload})
+    resposta = cliente.get("/api/events", params={"has_arbitrage": "true"})
+    assert resposta.status_code == 200
+    assert "ETag" not in resposta.headers
+
+
+def test_scraper_status_304(cliente, payload):
+    cliente.post("/api/odds/scraper", json={"data": payload})
+    
+    # O commit invalida o espelho da versão até a releitura em segundo plano
+    limite = time.time() + 5
+    while espelho_versao.atual() is None and time.time() < limite:
+        time.sleep(0.05)
+    
+    etag = cliente.get("/api/scraper/status").headers["ETag"]
+    assert cliente.get("/api/scraper/status", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,127 @@
+"""
+Fusão de eventos (event_merge): o evento gravado com um id antigo (antes da
+normalização dos times, ou com a chave crua acima de orcamento_fuzzy) passa
+para o id atual com as odds, o histórico e as best lines.
+"""
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import team_aliases
+from event_merge import remapear_eventos
+from models import BestLine, Bookmaker, Event, EventKey, Odd, OddHistory
+from odds_history import cache_chaves, linha_do_tempo
+
+ID_LEGADO = "evt_Brasileirão_grêmio_são_paulo"
+ID_ATUAL = "evt_Brasileirão_gremio_sao_paulo"
+
+
+@pytest.fixture
+def legado(db):
+    """Grêmio x São Paulo gravado com o id de antes da normalização: betano com 1X2 e histórico."""
+    cache_chaves.bookmakers.clear()
+    cache_chaves.eventos.clear()
+    db.add(Event(
+        id=ID_LEGADO, sport="Futebol", league="Brasileirão", home_team="Grêmio", away_team="São Paulo",
+        event_date=datetime(2026, 10, 19, 18, 0), status="upcoming"
+    ))
+    db.add(Odd(
+        id="odd_legado", event_id=ID_LEGADO, bookmaker="betano", market="Resultado Final",
+        home_odd=Decimal("2.40"), draw_odd=Decimal("3.10"), away_odd=Decimal("3.00"),
+        scraped_at=datetime(2026, 10, 18, 11, 0)
+    ))
+    db.add(Bookmaker(id=1, name="betano"))
+    db.add(EventKey(id=1, event_id=ID_LEGADO))
+    db.add(OddHistory(event_key=1, scraped_at=datetime(2026, 10, 18, 11, 0), bookmaker_id=1, outcome=0, odd_x100=240))
+    db.commit()
+    return db
+
+
+def test_id_legado_e_fundido_no_id_atual(legado, registro_scraper, gravar_registros):
+    # A ingestão depois da normalização cria o evento com o id atual
+    gravar_registros(legado, [
+        registro_scraper("betano", "Grêmio", "São Paulo", "Double Chance", (1.4, 1.5), "2026-10-18T12:00:00Z"),
+        registro_scraper("bet365", "Grêmio", "São Paulo", "1X2", (2.3, 3.2, 3.1), "2026-10-18T12:00:00Z"),
+    ])
+    assert {evento.id for evento in legado.query(Event)} == {ID_LEGADO, ID_ATUAL}
+    
+    assert remapear_eventos(legado) == {ID_LEGADO: ID_ATUAL}
+    legado.commit()
+    
+    assert [evento.id for evento in legado.query(Event)] == [ID_ATUAL]
+    odds = {odd.bookmaker: odd for odd in legado.query(Odd)}
+    assert set(odds) == {"betano", "bet365"}
+    # A mesma casa nos dois eventos: cada mercado fica com a linha que o tem
+    betano = odds["betano"]
+    assert (betano.home_odd, betano.away_odd) == (Decimal("2.40"), Decimal("3.00"))
+    assert (betano.home_or_draw_odd, betano.away_or_draw_odd) == (Decimal("1.40"), Decimal("1.50"))
+    assert betano.fingerprint_dc is not None
+    assert betano.scraped_at == datetime(2026, 10, 18, 12, 0)
+    
+    best_line = legado.get(BestLine, ID_ATUAL)
+    assert best_line.bookmaker_count == 2
+    assert best_line.lines["home_odd"][0] == {"bookmaker": "betano", "odd": 2.4, "scraped_at": "2026-10-18T12:00:00"}
+    
+    # O histórico do id antigo continua na linha do tempo do evento
+    pontos = linha_do_tempo(legado, ID_ATUAL, bookmaker="betano", mercado="home_odd")
+    assert [(ponto["odd"], ponto["scraped_at"]) for ponto in pontos] == [(2.4, datetime(2026, 10, 18, 11, 0))]
+    assert legado.query(EventKey).filter(EventKey.event_id == ID_LEGADO).count() == 0
+    
+    # Idempotente: nada mais a remapear
+    assert remapear_eventos(legado) == {}
+
+
+def test_id_legado_sem_evento_atual_e_renomeado(legado):
+    assert remapear_eventos(legado) == {ID_LEGADO: ID_ATUAL}
+    legado.commit()
+    
+    evento = legado.get(Event, ID_ATUAL)
+    assert (evento.home_team, evento.away_team, evento.status) == ("Grêmio", "São Paulo", "upcoming")
+    assert legado.query(Odd).one().event_id == ID_ATUAL
+    assert legado.query(OddHistory).one().event_key == legado.query(EventKey).one().id
+
+
+def test_evento_finalizado_nao_e_remapeado(legado):
+    legado.get(Event, ID_LEGADO).status = "finished"
+    legado.commit()
+    
+    assert remapear_eventos(legado) == {}
+
+
+def esperar(condicao, segundos=10):
+    limite = time.time() + segundos
+    while not condicao() and time.time() < limite:
+        time.sleep(0.05)
+    return condicao()
+
+
+def test_chave_crua_acima_do_orcamento_e_fundida_quando_o_apelido_e_gravado(cliente, db, registro_scraper, monkeypatch):
+    cliente.post("/api/odds/scraper", json={"data": [registro_scraper("betano", "Jacuipense Zeta", "Kappa Visitante")]})
+    assert esperar(lambda: {"jacuipense zeta", "kappa visitante"} <= team_aliases.indice_times.conhecidos)
+    
+    # Sem orçamento, a grafia nova fica com a chave crua: outro evento, até a fila gravar o apelido
+    monkeypatch.setattr(team_aliases, "MAX_FUZZY_POR_LOTE", 0)
+    cliente.post("/api/odds/scraper", json={"data": [registro_scraper("bet365", "Jacuipense Zetta", "Kappa Visitante")]})
+    
+    assert esperar(lambda: db.query(Event).count() == 1 and db.query(Odd).count() == 2)
+    db.expire_all()
+    assert db.query(Event).one().id == "evt_Brasileirão_jacuipense_zeta_kappa_visitante"
+    assert [evento["eventId"] for evento in cliente.get("/api/events").json()["events"]] == [
+        "evt_Brasileirão_jacuipense_zeta_kappa_visitante"
+    ]
+
+
+def test_apelido_curado_funde_os_eventos(cliente, db, registro_scraper):
+    cliente.post("/api/odds/scraper", json={"data": [
+        registro_scraper("betano", "Clube Omega", "Clube Sigma"),
+        registro_scraper("bet365", "Omega FC Bahia", "Clube Sigma"),
+    ]})
+    assert db.query(Event).count() == 2
+    
+    resposta = cliente.post("/api/teams/aliases", json={"alias": "Omega FC Bahia", "canonical": "Clube Omega"})
+    
+    assert resposta.status_code == 200
+    db.expire_all()
+    assert [evento.id for evento in db.query(Event)] == ["evt_Brasileirão_omega_sigma"]
+    assert {odd.bookmaker for odd in db.query(Odd)} == {"betano", "bet365"}
@@ -0,0 +1,140 @@
+"""
+Paginação por cursor (keyset) de /api/events: as páginas cobrem todos os
+eventos uma única vez, na ordem (event_date, id), com ou sem filtros.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from events_query import codificar_cursor, iterar_eventos, listar_eventos
+from models import Event, Odd
+
+CASAS = ["betano", "bet365", "superbet"]
+
+
+@pytest.fixture
+def eventos(db):
+    """80 eventos visíveis (vários na mesma data) e 10 finalizados."""
+    rng = random.Random(7)
+    base = datetime(2026, 10, 20, 15, 0)
+    for i in range(90):
+        evento = Event(
+            id=f"evt_{i:03d}",
+            sport="Futebol",
+            league=rng.choice(["Brasileirão", "Copa do Brasil"]),
+            home_team=f"Mandante {i}",
+            away_team=f"Visitante {i}",
+            # Poucas datas distintas: o desempate pelo id cruza as páginas
+            event_date=base + timedelta(hours=rng.randint(0, 8)),
+            status="finished" if i >= 80 else rng.choice(["upcoming", "live"]),
+        )
+        db.add(evento)
+        for casa in rng.sample(CASAS, rng.randint(1, len(CASAS))):
+            db.add(Odd(
+                id=f"odd_{i}_{casa}", event_id=evento.id, bookmaker=casa,
+                home_odd=Decimal("2.10"), draw_odd=Decimal("3.20"), away_odd=Decimal("3.50"),
+                scraped_at=base - timedelta(minutes=5)
+            ))
+    db.commit()
+    return db
+
+
+def paginar(db, limite, **filtros):
+    paginas, cursor = [], None
+    while True:
+        pagina, cursor = listar_eventos(db, limite=limite, cursor=cursor, **filtros)
+        paginas.append(pagina)
+        if cursor is None:
+            return paginas
+
+
+def ordem(db, **filtros):
+    consulta = db.query(Event).filter(Event.status.in_(["upcoming", "live"]))
+    if "league" in filtros:
+        consulta = consulta.filter(Event.league == filtros["league"])
+    return [evento.id for evento in consulta.order_by(Event.event_date, Event.id)]
+
+
+@pytest.mark.parametrize("limite", [1, 7, 25, 80, 200])
+def test_paginas_cobrem_todos_os_eventos_uma_vez(eventos, limite):
+    paginas = paginar(eventos, limite)
+    
+    ids = [evento["eventId"] for pagina in paginas for evento in pagina]
+    assert ids == ordem(eventos)
+    assert all(len(pagina) <= limite for pagina in paginas)
+    assert len(paginas) == max(1, -(-80 // limite))
+
+
+def test_paginas_com_filtros(eventos):
+    paginas = paginar(eventos, 6, league="brasileirão", campos=["homeTeam"], mercados=["homeOdd"])
+    
+    ids = [evento["eventId"] for pagina in paginas for evento in pagina]
+    assert ids == ordem(eventos, league="Brasileirão")
+    for evento in (evento for pagina in paginas for evento in pagina):
+        assert set(evento) == {"eventId", "homeTeam", "odds"}
+        assert all(set(odds) == {"homeOdd"} for odds in evento["odds"].values())
+
+
+def test_paginas_por_casa_so_trazem_as_odds_dela(eventos):
+    ids = [evento["eventId"] for pagina in paginar(eventos, 9, bookmakers=["BET365"]) for evento in pagina]
+    com_bet365 = {odd.event_id for odd in eventos.query(Odd).filter(Odd.bookmaker == "bet365")}
+    assert ids == [event_id for event_id in ordem(eventos) if event_id in com_bet365]
+    for pagina in paginar(eventos, 9, bookmakers=["bet365"]):
+        assert all(list(evento["odds"]) == ["bet365"] for evento in pagina)
+
+
+def test_evento_novo_antes_do_cursor_nao_desloca_as_paginas(eventos):
+    primeira, cursor = listar_eventos(eventos, limite=10)
+    
+    # Um evento inserido antes da posição do cursor não repete nem pula eventos
+    eventos.add(Event(id="evt_000a", sport="Futebol", league="Brasileirão", home_team="Novo", away_team="Time",
+                      event_date=datetime(2026, 10, 20, 14, 0), status="upcoming"))
+    eventos.commit()
+    segunda, _ = listar_eventos(eventos, limite=10, cursor=cursor)
+    
+    esperado = [event_id for event_id in ordem(eventos) if event_id != "evt_000a"]
+    assert [evento["eventId"] for evento in primeira + segunda] == esperado[:20]
+
+
+def test_dump_completo_igual_as_paginas(eventos):
+    assert list(iterar_eventos(eventos, tamanho_pagina=11)) == [
+        evento for pagina in paginar(eventos, 1000) for evento in pagina
+    ]
+
+
+def test_cursor_invalido(eventos):
+    with pytest.raises(ValueError):
+        listar_eventos(eventos, limite=10, cursor="isto-nao-e-um-cursor")
+
+
+# eventos antes de cliente: o modelo de leitura carrega os eventos já gravados
+def test_api_sem_limit_devolve_todos_os_eventos(eventos, cliente):
+    for parametros in ({}, {"has_arbitrage": "false"}):
+        corpo = cliente.get("/api/events", params=parametros).json()
+        assert [evento["eventId"] for evento in corpo["events"]] == ordem(eventos)
+        assert corpo["nextCursor"] is None
+
+
+def test_api_paginas_iguais_na_memoria_e_no_banco(eventos, cliente):
+    # has_arbitrage=false consulta o banco (sem oportunidades, mesmos eventos)
+    for parametros in ({}, {"has_arbitrage": "false"}):
+        ids, cursor = [], None
+        while True:
+            resposta = cliente.get("/api/events", params={**parametros, "limit": 13, **({"cursor": cursor} if cursor else {})})
+            assert resposta.status_code == 200
+            ids += [evento["eventId"] for evento in resposta.json()["events"]]
+            cursor = resposta.json()["nextCursor"]
+            if cursor is None:
+                break
+        assert ids == ordem(eventos)
+    
+    # cursor sem limit continua a paginação
+    ultimo = eventos.get(Event, ordem(eventos)[9])
+    corpo = cliente.get("/api/events", params={"cursor": codificar_cursor(ultimo.event_date, ultimo.id)}).json()
+    assert [evento["eventId"] for evento in corpo["events"]] == ordem(eventos)[10:]
+
+
+def test_api_cursor_invalido_responde_400(eventos, cliente):
+    assert cliente.get("/api/events", params={"cursor": "xx", "limit": 5}).status_code == 400
+    assert cliente.get("/api/events", params={"cursor": "xx", "has_arbitrage": "false"}).status_code == 400
@@ -0,0 +1,142 @@
+"""
+Hedge em lote (calcular_hedge_lote e POST /api/hedge/batch): mesmo resultado
+do cálculo unitário, limites por casa e arredondamento das apostas.
+"""
+import math
+
+import numpy as np
+import pytest
+from arbitrage import calcular_hedge, calcular_hedge_lote
+
+
+def test_lote_igual_ao_calculo_unitario():
+    apostas = [10.0, 55.5, 100.0, 333.33]
+    odds = [(2.1, 1.9), (3.4, 1.45), (1.5, 2.8), (2.0, 2.0)]
+    odds_usuario = np.array([odd_u for odd_u, _ in odds])[:, None]
+    odds_opostas = np.array([odd_o for _, odd_o in odds])[:, None]
+    
+    resultados = calcular_hedge_lote(np.array(apostas)[None, :], odds_usuario, odds_opostas)
+    
+    # Ordem achatada do broadcasting: par de odds x valor
+    assert len(resultados) == len(odds) * len(apostas)
+    esperados = [
+        dict(calcular_hedge(aposta, odd_u, odd_o), aposta_usuario=round(aposta, 2), limitado=False)
+        for odd_u, odd_o in odds for aposta in apostas
+    ]
+    assert resultados == esperados
+
+
+def test_limite_reduz_as_duas_pernas_na_mesma_proporcao():
+    resultados = calcular_hedge_lote(
+        [100.0, 20.0], 2.0, 1.6,
+        bookmakers_usuario="betano", bookmakers_opostos="bet365",
+        limites={"bet365": 50.0}
+    )
+    
+    # Aposta oposta de 125 passa do limite de 50: fator 0.4
+    limitado, livre = resultados
+    assert limitado["limitado"] is True
+    assert limitado["aposta_oposta"] == 50.0
+    assert limitado["aposta_usuario"] == 40.0
+    assert limitado["lucro_percentual"] == calcular_hedge(100.0, 2.0, 1.6)["lucro_percentual"]
+    
+    # Aposta oposta de 25 cabe no limite
+    assert livre["limitado"] is False
+    assert livre["aposta_usuario"] == 20.0
+    assert livre["aposta_oposta"] == 25.0
+
+
+def test_limite_da_perna_do_usuario():
+    [resultado] = calcular_hedge_lote(
+        200.0, 1.8, 2.2,
+        bookmakers_usuario="betano", bookmakers_opostos="bet365",
+        limites={"betano": 80.0, "superbet": 1.0}
+    )
+    assert resultado["limitado"] is True
+    assert resultado["aposta_usuario"] == 80.0
+    assert resultado["aposta_oposta"] == round(80.0 * 1.8 / 2.2, 2)
+
+
+@pytest.mark.parametrize("incremento", [0.5, 1.0, 5.0])
+def test_apostas_arredondadas_para_o_incremento(incremento):
+    apostas = np.linspace(10, 250, 37)
+    resultados = calcular_hedge_lote(apostas, 2.37, 1.71, incremento=incremento)
+    for aposta, resultado in zip(apostas, resultados):
+        for valor in (resultado["aposta_usuario"], resultado["aposta_oposta"]):
+            assert math.isclose(valor / incremento, round(valor / incremento), abs_tol=1e-6)
+        # Sem limite, arredonda para o múltiplo mais próximo
+        assert abs(resultado["aposta_usuario"] - aposta) <= incremento / 2 + 1e-9
+
+
+def test_perna_limitada_arredonda_para_baixo():
+    # 100 x 2.0 / 1.6 = 125 > 49.9: fator 0.3992, pernas 39.92 e 49.9
+    [resultado] = calcular_hedge_lote(
+        100.0, 2.0, 1.6, incremento=0.5,
+        bookmakers_opostos="bet365", limites={"bet365": 49.9}
+    )
+    assert resultado["limitado"] is True
+    assert resultado["aposta_oposta"] == 49.5
+    assert resultado["aposta_usuario"] == 39.5
+
+
+def test_odds_e_incremento_invalidos():
+    with pytest.raises(ValueError):
+        calcular_hedge_lote([100.0], [2.0], [0.0])
+    with pytest.raises(ValueError):
+        calcular_hedge_lote([100.0], [-1.5], [2.0])
+    with pytest.raises(ValueError):
+        calcular_hedge_lote([100.0], [2.0], [1.8], incremento=0)
+
+
+@pytest.mark.parametrize("argumentos", [
+    {"apostas_usuario": [-100.0]},
+    {"apostas_usuario": [float("nan")]},
+    {"apostas_usuario": [1e308]},
+    {"limites": {"bet365": -50.0}},
+])
+def test_valores_e_limites_invalidos(argumentos):
+    argumentos = {"apostas_usuario": [100.0], "odds_usuario": [2.0], "odds_opostas": [1.8], **argumentos}
+    with pytest.raises(ValueError):
+        calcular_hedge_lote(**argumentos, bookmakers_opostos="bet365")
+
+
+def test_endpoint_hedge_batch():
+    from fastapi.testclient import TestClient
+    import main
+    
+    cliente = TestClient(main.app)
+    resposta = cliente.post("/api/hedge/batch", json={
+        "stakes": [50, 100],
+        "pairs": [
+            {"userOdd": 2.0, "hedgeOdd": 1.6, "userBookmaker": "betano", "hedgeBookmaker": "bet365"},
+            {"userOdd": 3.1, "hedgeOdd": 1.5, "userBookmaker": "betano", "hedgeBookmaker": "superbet"},
+        ],
+        "stakeIncrement": 1,
+        "maxStakes": {"bet365": 100},
+    })
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["total"] == 4
+    assert [(r["pair"], r["stake"]) for r in corpo["results"]] == [(0, 50), (0, 100), (1, 50), (1, 100)]
+    assert [r["limitado"] for r in corpo["results"]] == [False, True, False, False]
+    assert all(r["aposta_oposta"] == int(r["aposta_oposta"]) for r in corpo["results"])
+    
+
+
+@pytest.mark.parametrize("corpo, status", [
+    ({"stakes": [10], "pairs": [{"userOdd": 2.0, "hedgeOdd": 0}]}, 422),
+    ({"stakes": [-10], "pairs": [{"userOdd": 2.0, "hedgeOdd": 1.6}]}, 422),
+    ('{"stakes": [NaN], "pairs": [{"userOdd": 2.0, "hedgeOdd": 1.6}]}', 400),
+    ('{"stakes": [10], "pairs": [{"userOdd": Infinity, "hedgeOdd": 1.6}]}', 400),
+    ({"stakes": [10], "pairs": [{"userOdd": 2.0, "hedgeOdd": 1.6, "hedgeBookmaker": "bet365"}], "maxStakes": {"bet365": -5}}, 422),
+    # Finito na entrada, mas a perna oposta estoura para infinito
+    ({"stakes": [1e308], "pairs": [{"userOdd": 2.0, "hedgeOdd": 1.6}]}, 400),
+    ({"stakes": list(range(1, 101)), "pairs": [{"userOdd": 2.0, "hedgeOdd": 1.6}] * 101}, 413),
+])
+def test_endpoint_hedge_batch_invalido(corpo, status):
+    from fastapi.testclient import TestClient
+    import main
+    
+    # NaN não é JSON válido para o httpx: vai como texto
+    argumentos = {"content": corpo, "headers": {"Content-Type": "application/json"}} if isinstance(corpo, str) else {"json": corpo}
+    assert TestClient(main.app).post("/api/hedge/batch", **argumentos).status_code == status
@@ -0,0 +1,100 @@
+"""
+Importador em massa (import_odds): leitura em streaming dos formatos de
+arquivo e ida e volta no SQLite (upsert em lote, sem regredir coletas mais
+recentes já gravadas).
+"""
+import gzip
+import json
+import sys
+
+import pytest
+import import_odds
+from import_odds import ler_arquivo
+from models import Event, Odd, OddHistory
+from odds_history import cache_chaves
+
+
+@pytest.fixture
+def registros(registro_scraper):
+    return [
+        registro_scraper(casa, mandante, visitante, tipo)
+        for mandante, visitante in [("Palmeiras", "Santos"), ("Flamengo", "Vasco"), ("Bahia", "Vitória")]
+        for casa in ("betano", "bet365")
+        for tipo in ("1X2", "Double Chance")
+    ]
+
+
+def nomes(lidos):
+    return [(registro["source"], registro["event"]["name"], registro["market"]["type"]) for registro in lidos]
+
+
+def test_jsonl_com_registros_payloads_e_linhas_vazias(tmp_path, registros):
+    caminho = tmp_path / "dump.jsonl"
+    caminho.write_text("\n".join([
+        json.dumps(registros[0]),
+        "",
+        json.dumps({"data": registros[1:5]}),
+        json.dumps({"success": True, "data": registros[5:]}),
+    ]), encoding="utf-8")
+
+    assert nomes(ler_arquivo(str(caminho))) == nomes(registros)
+
+
+@pytest.mark.parametrize("formato", ["resposta", "lista"])
+def test_json_lido_em_pedacos(tmp_path, registros, monkeypatch, formato):
+    # Buffer pequeno: os elementos do array atravessam várias leituras
+    monkeypatch.setattr(import_odds, "TAMANHO_LEITURA", 64)
+    documento = {"success": True, "total": len(registros), "data": registros} if formato == "resposta" else registros
+    caminho = tmp_path / "scrape_betano.json.gz"
+    with gzip.open(caminho, "wt", encoding="utf-8") as arquivo:
+        json.dump(documento, arquivo, ensure_ascii=False, indent=2)
+
+    assert nomes(ler_arquivo(str(caminho))) == nomes(registros)
+
+
+def test_json_truncado_levanta_erro(tmp_path, registros):
+    caminho = tmp_path / "truncado.json"
+    caminho.write_text(json.dumps(registros)[:-40], encoding="utf-8")
+
+    with pytest.raises(json.JSONDecodeError):
+        list(ler_arquivo(str(caminho)))
+
+
+def importar(monkeypatch, *argumentos):
+    monkeypatch.setattr(sys, "argv", ["import_odds.py", *map(str, argumentos)])
+    import_odds.main()
+
+
+def test_importacao_no_sqlite(db, tmp_path, registros, registro_scraper, monkeypatch, capsys):
+    cache_chaves.bookmakers.clear()
+    cache_chaves.eventos.clear()
+
+    arquivo = tmp_path / "dump.jsonl"
+    invalido = registro_scraper("betano", "Palmeiras", "Santos")
+    invalido["event"]["name"] = "Palmeiras x Santos"
+    arquivo.write_text("\n".join(json.dumps(registro) for registro in registros + [invalido]), encoding="utf-8")
+
+    # Blocos de 5 registros: várias transações
+    importar(monkeypatch, arquivo, "--bloco", 5)
+
+    assert "13 registros lidos, 12 válidos, 1 inválidos" in capsys.readouterr().out
+    assert db.query(Event).count() == 3
+    assert db.query(Odd).count() == 6
+    assert db.query(Odd).filter(Odd.home_odd.is_(None) | Odd.away_or_draw_odd.is_(None)).count() == 0
+    assert db.query(OddHistory).count() == 3 * 2 * 5
+
+    # Um arquivo mais antigo não sobrescreve o preço gravado; um mais novo sim
+    antigo = tmp_path / "antigo.jsonl"
+    antigo.write_text(json.dumps(registro_scraper(
+        "betano", "Palmeiras", "Santos", "1X2", (9.0, 9.0, 9.0), "2026-10-18T11:00:00Z"
+    )), encoding="utf-8")
+    novo = tmp_path / "novo.jsonl"
+    novo.write_text(json.dumps(registro_scraper(
+        "bet365", "Palmeiras", "Santos", "1X2", (2.6, 3.1, 2.9), "2026-10-18T13:00:00Z"
+    )), encoding="utf-8")
+    importar(monkeypatch, antigo, novo)
+
+    db.expire_all()
+    precos = {odd.bookmaker: float(odd.home_odd) for odd in db.query(Odd).join(Event).filter(Event.home_team == "Palmeiras")}
+    assert precos == {"betano": 2.1, "bet365": 2.6}
+    assert db.query(Event).count() == 3
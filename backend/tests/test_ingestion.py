@@ -0,0 +1,107 @@
+"""
+Ingestão em lote com assinaturas por mercado: reenviar os mesmos preços não
+regrava as odds nem avança a versão; só o mercado alterado é reescrito.
+"""
+import pytest
+from models import Odd
+from versioning import obter_versao
+
+JOGOS = [("Palmeiras", "Santos"), ("Flamengo", "Vasco"), ("Grêmio", "Internacional")]
+CASAS = ["betano", "bet365"]
+
+
+@pytest.fixture
+def payload(registro_scraper):
+    return [
+        registro_scraper(casa, mandante, visitante, tipo)
+        for mandante, visitante in JOGOS
+        for casa in CASAS
+        for tipo in ("1X2", "Double Chance")
+    ]
+
+
+def precos(db):
+    colunas = ("home_odd", "draw_odd", "away_odd", "home_or_draw_odd", "away_or_draw_odd", "scraped_at")
+    return {
+        (odd.event_id, odd.bookmaker): tuple(getattr(odd, coluna) for coluna in colunas)
+        for odd in db.query(Odd)
+    }
+
+
+def test_primeiro_envio_grava_tudo_como_novo(db, payload, gravar_registros):
+    resultado = gravar_registros(db, payload)
+    
+    assert resultado["new"] == len(payload)
+    assert resultado["changed"] == resultado["unchanged"] == 0
+    assert len(resultado["event_ids"]) == len(JOGOS)
+    assert db.query(Odd).count() == len(JOGOS) * len(CASAS)
+    assert db.query(Odd).filter(Odd.fingerprint_1x2.is_(None) | Odd.fingerprint_dc.is_(None)).count() == 0
+
+
+def test_reenvio_sem_mudanca_nao_regrava(db, payload, gravar_registros):
+    gravar_registros(db, payload)
+    versao = obter_versao(db)
+    antes = precos(db)
+    
+    resultado = gravar_registros(db, payload)
+    
+    assert resultado["new"] == 0
+    assert resultado["changed"] == 0
+    assert resultado["unchanged"] == len(payload)
+    assert resultado["event_ids"] == set()
+    assert obter_versao(db) == versao
+    assert precos(db) == antes
+
+
+def test_so_o_mercado_alterado_e_reescrito(db, payload, registro_scraper, gravar_registros):
+    gravar_registros(db, payload)
+    versao = obter_versao(db)
+    dc_antes = {chave: valores[3:5] for chave, valores in precos(db).items()}
+    
+    alterado = registro_scraper("betano", "Flamengo", "Vasco", "1X2", odds=(2.4, 3.1, 3.0), coletado_em="2026-10-18T12:01:00Z")
+    mesmo_mercado = lambda registro: (registro["source"], registro["event"]["name"], registro["market"]["type"]) == (
+        "betano", "Flamengo vs Vasco", "1X2"
+    )
+    payload = [alterado if mesmo_mercado(registro) else registro for registro in payload]
+    resultado = gravar_registros(db, payload)
+    
+    assert resultado["new"] == 0
+    assert resultado["changed"] == 1
+    assert resultado["unchanged"] == len(payload) - 1
+    assert len(resultado["event_ids"]) == 1
+    assert obter_versao(db) == versao + 1
+    
+    odd = db.query(Odd).filter(Odd.bookmaker == "betano", Odd.event_id.like("%flamengo%")).one()
+    assert (float(odd.home_odd), float(odd.draw_odd), float(odd.away_odd)) == (2.4, 3.1, 3.0)
+    # A Double Chance da mesma linha não foi tocada
+    assert {chave: valores[3:5] for chave, valores in precos(db).items()} == dc_antes
+
+
+def test_mesmo_preco_renova_o_scraped_at_so_apos_o_heartbeat(db, payload, registro_scraper, gravar_registros):
+    gravar_registros(db, payload)
+    
+    # Um minuto depois: dentro do intervalo de heartbeat, nada é gravado
+    pouco_depois = [dict(registro, collected_at="2026-10-18T12:01:00Z") for registro in payload]
+    assert gravar_registros(db, pouco_depois)["event_ids"] == set()
+    assert {valores[5].minute for valores in precos(db).values()} == {0}
+    
+    # Uma hora depois: só o scraped_at é renovado, sem contar como mudança
+    mais_tarde = [dict(registro, collected_at="2026-10-18T13:00:00Z") for registro in payload]
+    resultado = gravar_registros(db, mais_tarde)
+    assert resultado["changed"] == 0
+    assert resultado["unchanged"] == len(payload)
+    assert {valores[5].hour for valores in precos(db).values()} == {13}
+
+
+def test_assinatura_limpa_faz_a_proxima_ingestao_regravar(db, payload, gravar_registros):
+    # A importação de arquivos limpa a assinatura do mercado que sobrescreve
+    gravar_registros(db, payload)
+    db.query(Odd).update({"fingerprint_1x2": None}, synchronize_session=False)
+    db.commit()
+    
+    resultado = gravar_registros(db, payload)
+    
+    registros_1x2 = sum(1 for registro in payload if registro["market"]["type"] == "1X2")
+    assert resultado["changed"] == registros_1x2
+    assert resultado["unchanged"] == len(payload) - registros_1x2
+    assert db.query(Odd).filter(Odd.fingerprint_1x2.is_(None)).count() == 0
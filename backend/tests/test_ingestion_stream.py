@@ -0,0 +1,90 @@
+"""
+POST /api/odds/stream (NDJSON): linhas quebradas entre pedaços do corpo,
+linha acima do limite (413), linhas inválidas e lote que falha na gravação
+entram no resumo sem derrubar os demais lotes. A normalização roda fora do
+event loop.
+"""
+import asyncio
+import functools
+import json
+
+import ingestion_stream
+import main
+from ingestion_stream import ingerir_stream, linhas_ndjson
+from models import Odd
+
+
+def ndjson(registros) -> bytes:
+    return b"".join(json.dumps(registro).encode() + b"\n" for registro in registros)
+
+
+def test_linhas_quebradas_entre_pedacos():
+    async def pedacos():
+        for parte in (b'{"a": 1}\n{"b"', b"", b': 2}\n\n{"c', b'": 3}'):
+            yield parte
+    
+    async def ler():
+        return [(numero, json.loads(linha)) async for numero, linha in linhas_ndjson(pedacos())]
+    
+    assert asyncio.run(ler()) == [(1, {"a": 1}), (2, {"b": 2}), (4, {"c": 3})]
+
+
+def test_linha_acima_do_limite_responde_413(cliente, monkeypatch, registro_scraper):
+    monkeypatch.setattr(ingestion_stream, "LIMITE_LINHA", 100)
+    corpo = ndjson([registro_scraper("betano", "Palmeiras", "Santos")])
+    
+    resposta = cliente.post("/api/odds/stream", content=corpo, headers={"Content-Type": "application/x-ndjson"})
+    
+    assert resposta.status_code == 413
+    assert "Linha 1" in resposta.json()["detail"]
+
+
+def test_resumo_com_linha_invalida_e_lote_que_falha(cliente, db, monkeypatch, registro_scraper):
+    # Lotes de 2 registros; o lote com o Bahia falha na gravação
+    monkeypatch.setattr(main, "ingerir_stream", functools.partial(ingerir_stream, tamanho_lote=2))
+    persistir_lote = ingestion_stream.persistir_lote
+    
+    def persistir_com_falha(db, registros, *args, **kwargs):
+        if any(registro["event"]["home_team"] == "Bahia" for registro in registros):
+            raise RuntimeError("falha no banco\nINSERT INTO odds ...")
+        return persistir_lote(db, registros, *args, **kwargs)
+    
+    monkeypatch.setattr(ingestion_stream, "persistir_lote", persistir_com_falha)
+    
+    # A normalização (resolução dos times) não roda no event loop
+    normalizar_registro = ingestion_stream.normalizar_registro
+    no_event_loop = []
+    
+    def normalizar_fora_do_loop(registro):
+        try:
+            asyncio.get_running_loop()
+            no_event_loop.append(registro)
+        except RuntimeError:
+            pass
+        return normalizar_registro(registro)
+    
+    monkeypatch.setattr(ingestion_stream, "normalizar_registro", normalizar_fora_do_loop)
+    
+    corpo = b"".join([
+        ndjson([registro_scraper("betano", "Palmeiras", "Santos"), registro_scraper("bet365", "Palmeiras", "Santos")]),
+        b"{nao e json\n",
+        ndjson([
+            {**registro_scraper("betano", "Flamengo", "Vasco"), "market": {"type": "1X2"}},
+            registro_scraper("betano", "Bahia", "Vitória"),
+            registro_scraper("betano", "Grêmio", "Inter"),
+            registro_scraper("betano", "Cruzeiro", "Atlético"),
+        ]),
+    ])
+    
+    resposta = cliente.post("/api/odds/stream", content=corpo, headers={"Content-Type": "application/x-ndjson"})
+    
+    assert resposta.status_code == 200
+    resumo = resposta.json()
+    assert not no_event_loop
+    assert resumo["success"] is False
+    assert (resumo["lines"], resumo["accepted"], resumo["saved"], resumo["batches"]) == (7, 5, 3, 2)
+    assert resumo["errorCount"] == 3
+    assert resumo["errors"][0].startswith("Linha 3: ")
+    assert resumo["errors"][1].startswith("Linha 4: market.")
+    assert resumo["errors"][2] == "Erro ao gravar o lote 2 (2 registros): falha no banco"
+    assert db.query(Odd).count() == 3
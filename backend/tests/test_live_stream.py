@@ -0,0 +1,92 @@
+"""
+Push de /api/stream (SSE): uma ingestão chega às conexões abertas que aceitam
+a mensagem, e a conexão encerrada sai do canal.
+"""
+import asyncio
+import json
+import time
+
+from live_stream import canal_mudancas
+
+
+def ler_mensagem(bruta: bytes) -> dict:
+    campos = dict(linha.split(": ", 1) for linha in bruta.decode().strip().split("\n"))
+    return {"event": campos["event"], "data": json.loads(campos["data"])}
+
+
+def test_ingestao_publica_para_a_conexao_e_desconexao_cancela(cliente, registro_scraper):
+    async def cenario():
+        assinante = canal_mudancas.assinar(tipos="odds")
+        outra_liga = canal_mudancas.assinar(tipos="odds", league="Série B")
+        mensagens = canal_mudancas.mensagens(assinante)
+        assert (await anext(mensagens)).startswith(b"retry:")
+
+        # A ingestão roda fora do event loop, como numa requisição síncrona
+        resposta = await asyncio.to_thread(cliente.post, "/api/odds/scraper", json={"data": [
+            registro_scraper("betano", "Palmeiras", "Santos", "1X2", (2.4, 3.1, 3.2))
+        ]})
+        assert resposta.json()["success"]
+
+        mensagem = ler_mensagem(await asyncio.wait_for(anext(mensagens), timeout=5))
+        assert mensagem["event"] == "odds"
+        assert mensagem["data"]["homeTeam"] == "Palmeiras"
+        assert mensagem["data"]["odds"]["betano"]["homeOdd"] == 2.4
+        assert outra_liga.fila.empty()
+
+        # Cliente desconectado: o gerador do corpo é fechado e a conexão sai do canal
+        assert assinante in canal_mudancas.assinantes
+        await mensagens.aclose()
+        assert assinante not in canal_mudancas.assinantes
+
+        canal_mudancas.cancelar(outra_liga)
+        return canal_mudancas.estatisticas()
+
+    entregues = canal_mudancas.entregues
+    estatisticas = asyncio.run(cenario())
+
+    assert estatisticas["clients"] == 0
+    assert estatisticas["delivered"] == entregues + 1
+
+
+def test_stream_tipo_invalido_responde_400(cliente):
+    assert cliente.get("/api/stream", params={"types": "odds,placar"}).status_code == 400
+    assert canal_mudancas.estatisticas()["clients"] == 0
+
+
+def test_reavaliacao_de_oportunidades_para_sem_assinantes(cliente, registro_scraper):
+    # Avaliações feitas pela thread (com ou sem erro do banco)
+    avaliacoes = lambda: canal_mudancas.reavaliacoes + canal_mudancas.erros
+    
+    def esperar(condicao, segundos=10):
+        limite = time.time() + segundos
+        while not condicao() and time.time() < limite:
+            time.sleep(0.01)
+        return condicao()
+    
+    async def cenario():
+        # Conexão que só pede odds não liga a reavaliação
+        so_odds = canal_mudancas.assinar(tipos="odds")
+        assert canal_mudancas.estatisticas()["opportunityClients"] == 0
+        
+        antes = avaliacoes()
+        assinante = canal_mudancas.assinar(tipos="opportunity")
+        assert await asyncio.to_thread(esperar, lambda: avaliacoes() > antes)
+        
+        # A última conexão de opportunity sai: a thread para mesmo com odds novas
+        canal_mudancas.cancelar(assinante)
+        canal_mudancas.cancelar(so_odds)
+        assert await asyncio.to_thread(esperar, lambda: not canal_mudancas.estatisticas()["opportunityTracking"])
+        parada = avaliacoes()
+        await asyncio.to_thread(cliente.post, "/api/odds/scraper", json={"data": [
+            registro_scraper("betano", "Palmeiras", "Santos", "1X2", (2.4, 3.1, 3.2))
+        ]})
+        await asyncio.sleep(0.3)
+        assert avaliacoes() == parada
+        assert canal_mudancas.abertas == {}
+        
+        # Nova assinatura retoma
+        assinante = canal_mudancas.assinar(tipos="opportunity")
+        assert await asyncio.to_thread(esperar, lambda: avaliacoes() > parada)
+        canal_mudancas.cancelar(assinante)
+    
+    asyncio.run(cenario())
@@ -0,0 +1,66 @@
+"""
+Histórico append-only (odds_history): cada preço novo vira uma linha; reenviar
+o mesmo preço (dedup por assinatura) não grava nada.
+"""
+import pytest
+from models import OddHistory
+from odds_history import cache_chaves, linha_do_tempo
+
+
+@pytest.fixture
+def historico(db):
+    # O cache de chaves é do processo: ids de bancos de testes anteriores não valem
+    cache_chaves.bookmakers.clear()
+    cache_chaves.eventos.clear()
+    return db
+
+
+def test_primeira_coleta_grava_todos_os_precos(historico, registro_scraper, gravar_registros):
+    resultado = gravar_registros(historico, [
+        registro_scraper("betano", "Palmeiras", "Santos", "1X2", (2.1, 3.2, 3.5)),
+        registro_scraper("betano", "Palmeiras", "Santos", "Double Chance", (1.3, 1.6)),
+        registro_scraper("bet365", "Palmeiras", "Santos", "1X2", (2.05, 3.3, 3.6)),
+    ])
+
+    assert historico.query(OddHistory).count() == 8
+    event_id = next(iter(resultado["event_ids"]))
+    pontos = linha_do_tempo(historico, event_id, bookmaker="betano", mercado="home_or_draw_odd")
+    assert [(ponto["market"], ponto["odd"]) for ponto in pontos] == [("home_or_draw_odd", 1.3)]
+
+
+def test_mudanca_de_preco_acrescenta_e_reenvio_igual_nao(historico, registro_scraper, gravar_registros):
+    gravar_registros(historico, [registro_scraper("betano", "Palmeiras", "Santos", "1X2", (2.1, 3.2, 3.5), "2026-10-18T12:00:00Z")])
+    assert historico.query(OddHistory).count() == 3
+
+    # Mesmo preço coletado de novo: nenhuma linha
+    resultado = gravar_registros(historico, [
+        registro_scraper("betano", "Palmeiras", "Santos", "1X2", (2.1, 3.2, 3.5), "2026-10-18T12:01:00Z")
+    ])
+    assert resultado["unchanged"] == 1
+    assert historico.query(OddHistory).count() == 3
+
+    # Só a odd do mandante mudou: uma linha, só para ela
+    resultado = gravar_registros(historico, [
+        registro_scraper("betano", "Palmeiras", "Santos", "1X2", (2.25, 3.2, 3.5), "2026-10-18T12:02:00Z")
+    ])
+    assert resultado["changed"] == 1
+    assert historico.query(OddHistory).count() == 4
+
+    event_id = next(iter(resultado["event_ids"]))
+    pontos = linha_do_tempo(historico, event_id, mercado="home_odd")
+    assert [ponto["odd"] for ponto in pontos] == [2.1, 2.25]
+    assert pontos[0]["scraped_at"] < pontos[1]["scraped_at"]
+
+
+def test_api_linha_do_tempo(historico, cliente, registro_scraper):
+    for minuto, odd in enumerate((2.1, 2.1, 2.3, 2.2)):
+        corpo = cliente.post("/api/odds/scraper", json={"data": [
+            registro_scraper("betano", "Palmeiras", "Santos", "1X2", (odd, 3.2, 3.5), f"2026-10-18T12:0{minuto}:00Z")
+        ]}).json()
+        assert corpo["success"]
+
+    event_id = cliente.get("/api/events").json()["events"][0]["eventId"]
+    resposta = cliente.get(f"/api/events/{event_id}/history", params={"market": "homeOdd"}).json()
+
+    assert [ponto["odd"] for ponto in resposta["points"]] == [2.1, 2.3, 2.2]
+    assert cliente.get(f"/api/events/{event_id}/history", params={"market": "xx"}).status_code == 400
@@ -0,0 +1,172 @@
+"""
+Recálculo incremental (ConjuntoOportunidades): só os eventos sujos são
+reavaliados, e o resultado acumulado é igual ao de uma varredura completa.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from arbitrage import buscar_melhores_oportunidades, buscar_oportunidades_automaticas
+from best_lines import atualizar_best_lines, reconstruir_best_lines
+from models import Event, Odd
+from opportunity_set import ConjuntoOportunidades, marcar_eventos_sujos
+
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte"]
+
+
+def preco(rng, minimo, maximo):
+    return Decimal(str(round(rng.uniform(minimo, maximo), 2)))
+
+
+@pytest.fixture
+def mercado(db):
+    rng = random.Random(3)
+    agora = datetime.utcnow()
+    for i in range(40):
+        db.add(Event(
+            id=f"evt_{i:02d}", sport="Futebol", league="Brasileirão", home_team=f"Mandante {i}",
+            away_team=f"Visitante {i}", event_date=agora + timedelta(hours=rng.randint(1, 48)), status="upcoming"
+        ))
+        for casa in CASAS:
+            db.add(Odd(
+                id=f"odd_{i}_{casa}", event_id=f"evt_{i:02d}", bookmaker=casa,
+                home_odd=preco(rng, 1.3, 4.5), away_odd=preco(rng, 1.3, 4.5),
+                home_or_draw_odd=preco(rng, 1.05, 2.6), away_or_draw_odd=preco(rng, 1.05, 2.6),
+                scraped_at=agora - timedelta(minutes=5)
+            ))
+    db.commit()
+    return db
+
+
+def chaves(oportunidades):
+    return sorted(
+        (o["event"]["id"], o["bet1"]["description"], o["bet1"]["bookmaker"], o["bet2"]["bookmaker"], o["profit_percent"])
+        for o in oportunidades
+    )
+
+
+def alterar_precos(db, rng, event_ids, quando):
+    for odd in db.query(Odd).filter(Odd.event_id.in_(event_ids)):
+        odd.home_odd = preco(rng, 1.3, 4.5)
+        odd.away_or_draw_odd = preco(rng, 1.05, 2.6)
+    atualizar_best_lines(db, event_ids)
+    marcar_eventos_sujos(db, event_ids, quando)
+    db.commit()
+
+
+def test_primeiro_ciclo_igual_a_varredura_completa(mercado):
+    conjunto = ConjuntoOportunidades(min_profit_percent=0.5, best_lines=False)
+    oportunidades = conjunto.atualizar(mercado)
+    
+    assert oportunidades.eventos_avaliados == 40
+    assert chaves(oportunidades) == chaves(buscar_oportunidades_automaticas(mercado, min_profit_percent=0.5))
+    assert len(oportunidades) > 0
+
+
+def test_so_os_eventos_sujos_sao_reavaliados(mercado):
+    rng = random.Random(5)
+    conjunto = ConjuntoOportunidades(min_profit_percent=0.5, best_lines=False)
+    conjunto.atualizar(mercado)
+    marca = datetime.utcnow()
+    anteriores = set()
+    
+    for ciclo in range(1, 6):
+        sujos = {f"evt_{i:02d}" for i in rng.sample(range(40), 4)}
+        alterar_precos(mercado, rng, sujos, marca + timedelta(minutes=ciclo))
+        
+        oportunidades = conjunto.atualizar(mercado)
+        
+        # Os eventos da última marca vista são reavaliados de novo (MARGEM_SUJOS)
+        assert oportunidades.eventos_avaliados == len(sujos | anteriores)
+        assert chaves(oportunidades) == chaves(buscar_oportunidades_automaticas(mercado, min_profit_percent=0.5))
+        anteriores = sujos
+    
+    # Sem marcas novas, nada é reavaliado
+    assert conjunto.atualizar(mercado).eventos_avaliados == 0
+
+
+def test_evento_finalizado_sai_do_conjunto(mercado):
+    conjunto = ConjuntoOportunidades(min_profit_percent=0.0, best_lines=False)
+    event_id = conjunto.atualizar(mercado)[0]["event"]["id"]
+    
+    mercado.get(Event, event_id).status = "finished"
+    marcar_eventos_sujos(mercado, [event_id], datetime.utcnow() + timedelta(minutes=1))
+    mercado.commit()
+    
+    oportunidades = conjunto.atualizar(mercado)
+    assert oportunidades.eventos_avaliados == 0
+    assert all(o["event"]["id"] != event_id for o in oportunidades)
+    assert chaves(oportunidades) == chaves(buscar_oportunidades_automaticas(mercado, min_profit_percent=0.0))
+
+
+def test_best_lines_so_avaliam_os_eventos_sujos(mercado):
+    rng = random.Random(9)
+    # Um evento com uma casa só fica fora da avaliação (bookmaker_count < 2)
+    mercado.query(Odd).filter(Odd.event_id == "evt_00", Odd.bookmaker != "betano").delete()
+    reconstruir_best_lines(mercado)
+    conjunto = ConjuntoOportunidades(min_profit_percent=0.5, best_lines=True)
+    
+    oportunidades = conjunto.atualizar(mercado)
+    assert chaves(oportunidades) == chaves(buscar_melhores_oportunidades(mercado, min_profit_percent=0.5))
+    assert len(oportunidades) > 0
+    assert all(o["event"]["id"] != "evt_00" for o in oportunidades)
+    
+    marca = datetime.utcnow()
+    for ciclo in range(1, 4):
+        sujos = {f"evt_{i:02d}" for i in rng.sample(range(1, 40), 4)}
+        alterar_precos(mercado, rng, sujos, marca + timedelta(minutes=ciclo))
+        
+        oportunidades = conjunto.atualizar(mercado)
+        assert chaves(oportunidades) == chaves(buscar_melhores_oportunidades(mercado, min_profit_percent=0.5))
+
+
+def melhor_por_lado(oportunidades):
+    melhores = {}
+    for o in oportunidades:
+        chave = (o["event"]["id"], o["bet1"]["description"])
+        melhores[chave] = max(melhores.get(chave, o["profit_percent"]), o["profit_percent"])
+    return melhores
+
+
+def test_odd_velha_no_top_2_nao_esconde_a_fresca(db):
+    agora = datetime.utcnow()
+    db.add(Event(
+        id="evt_velho", sport="Futebol", league="Brasileirão", home_team="Palmeiras",
+        away_team="Santos", event_date=agora + timedelta(hours=6), status="upcoming"
+    ))
+    for casa, home_odd, away_or_draw_odd, idade in [
+        ("betano", "3.0", None, timedelta(hours=10)),
+        ("bet365", "2.9", None, timedelta(hours=10)),
+        ("superbet", "2.6", None, timedelta(minutes=1)),
+        ("esportesdasorte", None, "1.8", timedelta(minutes=1)),
+    ]:
+        db.add(Odd(
+            id=f"odd_{casa}", event_id="evt_velho", bookmaker=casa,
+            home_odd=home_odd and Decimal(home_odd), away_or_draw_odd=away_or_draw_odd and Decimal(away_or_draw_odd),
+            scraped_at=agora - idade
+        ))
+    db.commit()
+    reconstruir_best_lines(db)
+    
+    esperado = [("evt_velho", "Palmeiras", "superbet", "esportesdasorte", 6.36)]
+    assert chaves(buscar_oportunidades_automaticas(db)) == esperado
+    assert chaves(buscar_melhores_oportunidades(db)) == esperado
+    assert chaves(ConjuntoOportunidades(best_lines=True).atualizar(db)) == esperado
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_best_lines_iguais_ao_melhor_par_da_varredura(mercado, seed):
+    # Pernas velhas e fora de sincronia no top 2: o evento é avaliado pelas odds
+    rng = random.Random(seed)
+    agora = datetime.utcnow()
+    for odd in mercado.query(Odd):
+        odd.scraped_at = agora - timedelta(minutes=rng.choice([1, 5, 40, 90, 150, 600]))
+    mercado.commit()
+    reconstruir_best_lines(mercado)
+    
+    melhores = buscar_melhores_oportunidades(mercado, min_profit_percent=0.0)
+    
+    assert len(melhores) > 0
+    assert melhor_por_lado(melhores) == melhor_por_lado(buscar_oportunidades_automaticas(mercado, min_profit_percent=0.0))
+    assert chaves(ConjuntoOportunidades(min_profit_percent=0.0, best_lines=True).atualizar(mercado)) == chaves(melhores)
@@ -0,0 +1,199 @@
+"""
+Oportunidades gravadas (persistir_oportunidades) e GET /api/opportunities:
+upsert por id, expiração das que sumiram, limpeza das antigas e paginação
+por cursor (keyset) na ordem (lucro desc, id).
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from models import ArbitrageOpportunity, Event, SessionLocal, engine
+from opportunity_store import gerar_id_oportunidade, persistir_oportunidades
+from update_event_status import remover_eventos_antigos
+
+CASAS = ["betano", "bet365", "superbet", "esportesdasorte"]
+
+
+def oportunidade(event_id, casa1, casa2, lucro, time="Mandante", idade=60):
+    return {
+        "event": {"id": event_id},
+        "bet1": {"description": time, "bookmaker": casa1, "odd": 2.5, "age_seconds": idade},
+        "bet2": {"description": f"{time} (oposta)", "bookmaker": casa2, "odd": 1.9, "age_seconds": idade},
+        "profit_percent": lucro,
+    }
+
+
+@pytest.fixture
+def eventos(db):
+    agora = datetime.utcnow()
+    for i in range(4):
+        db.add(Event(
+            id=f"evt_{i}", sport="Futebol", league="Brasileirão" if i % 2 == 0 else "Copa do Brasil",
+            home_team=f"Mandante {i}", away_team=f"Visitante {i}",
+            event_date=agora + timedelta(hours=6), status="upcoming"
+        ))
+    db.commit()
+    return db
+
+
+def test_insere_e_depois_atualiza_a_mesma_linha(eventos):
+    inicio = datetime.utcnow()
+    assert persistir_oportunidades(eventos, [oportunidade("evt_0", "betano", "bet365", 2.0)], agora=inicio) == {
+        "inseridas": 1, "atualizadas": 0, "expiradas": 0, "apagadas": 0
+    }
+    eventos.commit()
+
+    depois = inicio + timedelta(minutes=1)
+    contagem = persistir_oportunidades(eventos, [oportunidade("evt_0", "betano", "bet365", 3.5)], agora=depois)
+    eventos.commit()
+
+    assert contagem["inseridas"] == 0 and contagem["atualizadas"] == 1
+    eventos.expire_all()
+    linha = eventos.query(ArbitrageOpportunity).one()
+    assert linha.profit_percent == Decimal("3.50")
+    assert linha.created_at == inicio
+    assert linha.updated_at == depois
+    assert linha.expires_at == depois + timedelta(minutes=119)
+
+
+def test_outro_processo_grava_a_mesma_oportunidade_no_meio_do_ciclo(eventos):
+    agora = datetime.utcnow()
+    estado = {"gravou": False}
+    
+    def outro_bot_grava_antes(conn, cursor, statement, parameters, context, executemany):
+        # O outro bot grava depois desta sessão ter lido as linhas existentes
+        if estado["gravou"] or not statement.startswith("INSERT INTO arbitrage_opportunities"):
+            return
+        estado["gravou"] = True
+        outro = SessionLocal()
+        try:
+            persistir_oportunidades(outro, [oportunidade("evt_0", "betano", "bet365", 2.0)], agora=agora)
+            outro.commit()
+        finally:
+            outro.close()
+    
+    event.listen(engine, "before_cursor_execute", outro_bot_grava_antes)
+    try:
+        persistir_oportunidades(eventos, [oportunidade("evt_0", "betano", "bet365", 2.4)], agora=agora)
+        eventos.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", outro_bot_grava_antes)
+    
+    assert estado["gravou"]
+    assert [float(linha.profit_percent) for linha in eventos.query(ArbitrageOpportunity)] == [2.4]
+
+
+def test_oportunidade_que_sumiu_expira_so_no_evento_avaliado(eventos):
+    agora = datetime.utcnow()
+    persistir_oportunidades(eventos, [
+        oportunidade("evt_0", "betano", "bet365", 2.0),
+        oportunidade("evt_1", "betano", "bet365", 2.0),
+    ], agora=agora)
+    eventos.commit()
+
+    depois = agora + timedelta(minutes=1)
+    contagem = persistir_oportunidades(eventos, [], event_ids=["evt_0"], agora=depois)
+    eventos.commit()
+
+    assert contagem["expiradas"] == 1
+    expira_em = {linha.event_id: linha.expires_at for linha in eventos.query(ArbitrageOpportunity)}
+    assert expira_em["evt_0"] == depois
+    assert expira_em["evt_1"] > depois
+
+    # Varredura completa (event_ids=None): todas as vigentes são consideradas
+    assert persistir_oportunidades(eventos, [], agora=depois)["expiradas"] == 1
+
+
+def test_expiradas_alem_da_retencao_sao_apagadas(eventos):
+    agora = datetime.utcnow()
+    persistir_oportunidades(eventos, [oportunidade("evt_0", "betano", "bet365", 2.0)], agora=agora)
+    persistir_oportunidades(eventos, [], agora=agora + timedelta(minutes=1))
+    eventos.commit()
+
+    assert persistir_oportunidades(eventos, [], agora=agora + timedelta(hours=23))["apagadas"] == 0
+    assert persistir_oportunidades(eventos, [], agora=agora + timedelta(days=1, minutes=2))["apagadas"] == 1
+    eventos.commit()
+    assert eventos.query(ArbitrageOpportunity).count() == 0
+
+
+def test_limpeza_de_eventos_antigos_apaga_as_oportunidades(eventos):
+    persistir_oportunidades(eventos, [oportunidade("evt_0", "betano", "bet365", 2.0)])
+    evento = eventos.get(Event, "evt_0")
+    evento.status = "finished"
+    evento.finished_at = datetime.utcnow() - timedelta(days=8)
+    eventos.commit()
+
+    assert remover_eventos_antigos(eventos, days_old=7)[0] == 1
+    eventos.commit()
+    assert eventos.query(ArbitrageOpportunity).count() == 0
+    assert eventos.get(Event, "evt_1") is not None
+
+
+@pytest.fixture
+def gravadas(eventos):
+    """60 oportunidades vigentes (lucros repetidos cruzam as páginas) e uma expirada."""
+    rng = random.Random(11)
+    agora = datetime.utcnow()
+    oportunidades = []
+    for i in range(60):
+        casa1, casa2 = rng.sample(CASAS, 2)
+        oportunidades.append(oportunidade(
+            f"evt_{i % 4}", casa1, casa2, rng.choice([0.5, 1.0, 1.5, 2.25, 3.0]), time=f"Time {i}"
+        ))
+    persistir_oportunidades(eventos, oportunidades, agora=agora)
+
+    expirada = oportunidade("evt_0", "betano", "bet365", 9.0, time="Expirada")
+    persistir_oportunidades(eventos, [expirada], event_ids=[], agora=agora)
+    eventos.query(ArbitrageOpportunity).filter(
+        ArbitrageOpportunity.id == gerar_id_oportunidade(expirada)
+    ).update({"expires_at": agora - timedelta(minutes=1)})
+    eventos.commit()
+    return eventos
+
+
+def ordem(db, min_profit=None, league=None, bookmaker=None):
+    consulta = db.query(ArbitrageOpportunity).join(Event).filter(ArbitrageOpportunity.expires_at > datetime.utcnow())
+    if min_profit is not None:
+        consulta = consulta.filter(ArbitrageOpportunity.profit_percent >= min_profit)
+    if league:
+        consulta = consulta.filter(Event.league == league)
+    linhas = consulta.all()
+    if bookmaker:
+        linhas = [linha for linha in linhas if bookmaker in (linha.user_bookmaker, linha.hedge_bookmaker)]
+    return [linha.id for linha in sorted(linhas, key=lambda linha: (-linha.profit_percent, linha.id))]
+
+
+def paginar(cliente, limite, **filtros):
+    ids, cursor = [], None
+    while True:
+        resposta = cliente.get("/api/opportunities", params={**filtros, "limit": limite, **({"cursor": cursor} if cursor else {})})
+        assert resposta.status_code == 200
+        pagina = resposta.json()["opportunities"]
+        assert len(pagina) <= limite
+        ids += [opp["id"] for opp in pagina]
+        cursor = resposta.json()["nextCursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("limite", [1, 7, 60, 200])
+def test_api_paginas_cobrem_as_vigentes_uma_vez(gravadas, cliente, limite):
+    ids = paginar(cliente, limite)
+    assert ids == ordem(gravadas)
+    assert len(ids) == 60
+
+
+def test_api_filtros(gravadas, cliente):
+    assert paginar(cliente, 8, min_profit=1.5) == ordem(gravadas, min_profit=1.5)
+    assert paginar(cliente, 8, league="copa do brasil") == ordem(gravadas, league="Copa do Brasil")
+    assert paginar(cliente, 8, bookmaker="BET365") == ordem(gravadas, bookmaker="bet365")
+
+    corpo = cliente.get("/api/opportunities", params={"min_profit": 3.0, "limit": 1}).json()
+    assert corpo["opportunities"][0]["profitPercent"] == 3.0
+    assert corpo["opportunities"][0]["league"] in ("Brasileirão", "Copa do Brasil")
+
+
+def test_api_cursor_invalido_responde_400(gravadas, cliente):
+    assert cliente.get("/api/opportunities", params={"cursor": "xx"}).status_code == 400
@@ -0,0 +1,138 @@
+"""
+Modelo de leitura em memória: mesmas páginas da consulta ao banco, releitura
+dos eventos após commits locais e reconciliação de escritas externas.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from events_query import listar_eventos
+from models import Event, Odd
+from read_model import ModeloLeitura, modelo_leitura, registrar_alteracao
+
+CASAS = ["betano", "Bet365", "superbet"]
+BASE = datetime(2026, 10, 20, 15, 0)
+
+
+@pytest.fixture
+def eventos(db):
+    rng = random.Random(11)
+    for i in range(60):
+        evento = Event(
+            id=f"evt_{i:03d}", sport="Futebol", league=rng.choice(["Brasileirão", "Série B"]),
+            home_team=f"Mandante {i}", away_team=f"Visitante {i}",
+            event_date=BASE + timedelta(hours=rng.randint(0, 12)),
+            status=rng.choice(["upcoming", "upcoming", "live", "finished"]),
+        )
+        db.add(evento)
+        # Alguns eventos sem odds (LEFT JOIN) e odds com mercados faltando
+        for casa in rng.sample(CASAS, rng.randint(0, len(CASAS))):
+            preco = lambda: None if rng.random() < 0.2 else Decimal(str(round(rng.uniform(1.1, 4.0), 2)))
+            db.add(Odd(
+                id=f"odd_{i}_{casa}", event_id=evento.id, bookmaker=casa,
+                home_odd=preco(), draw_odd=preco(), away_odd=preco(),
+                home_or_draw_odd=preco(), away_or_draw_odd=preco(),
+            ))
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def modelo(eventos):
+    modelo = ModeloLeitura()
+    modelo.reconciliar()
+    return modelo
+
+
+def paginas(listar, limite, **filtros):
+    resultado, cursor = [], None
+    while True:
+        pagina, cursor = listar(limite=limite, cursor=cursor, **filtros)
+        resultado.append(pagina)
+        if cursor is None:
+            return resultado
+
+
+@pytest.mark.parametrize("filtros", [
+    {},
+    {"league": "série b"},
+    {"bookmakers": ["bet365"]},
+    {"bookmakers": ["betano", "superbet"], "mercados": ["homeOdd", "awayOrDrawOdd"]},
+    {"campos": ["homeTeam"], "mercados": []},
+    {"desde": BASE + timedelta(hours=3), "ate": BASE + timedelta(hours=9)},
+])
+@pytest.mark.parametrize("limite", [1, 9, 200])
+def test_paginas_iguais_as_do_banco(eventos, modelo, filtros, limite):
+    banco = paginas(lambda **argumentos: listar_eventos(eventos, **argumentos), limite, **filtros)
+    memoria = paginas(modelo.listar, limite, **filtros)
+    assert memoria == banco
+
+
+def test_verificar_e_reconciliar_escrita_externa(eventos, modelo):
+    assert modelo.verificar()["consistent"] is True
+    
+    # Escrita de outro processo: o modelo não é avisado
+    eventos.query(Odd).filter(Odd.event_id == "evt_001").update({"home_odd": Decimal("9.99")})
+    finalizado = eventos.query(Event).filter(Event.status != "finished").order_by(Event.id).first()
+    finalizado.status = "finished"
+    eventos.add(Event(id="evt_novo", sport="Futebol", league="Brasileirão", home_team="Novo", away_team="Time",
+                      event_date=BASE, status="upcoming"))
+    eventos.commit()
+    
+    relatorio = modelo.verificar()
+    assert relatorio["consistent"] is False
+    assert relatorio["missing"] == ["evt_novo"]
+    assert relatorio["extra"] == [finalizado.id]
+    
+    geracao = modelo.geracao
+    divergentes = modelo.reconciliar()
+    assert divergentes == relatorio["missingCount"] + relatorio["extraCount"] + relatorio["differentCount"]
+    assert modelo.geracao > geracao
+    assert modelo.verificar()["consistent"] is True
+    assert modelo.listar(limite=None) == listar_eventos(eventos, limite=1000)
+
+
+def esperar(condicao, segundos=5):
+    limite = time.time() + segundos
+    while not condicao() and time.time() < limite:
+        time.sleep(0.01)
+    return condicao()
+
+
+def test_commit_local_rele_so_os_eventos_alterados(eventos):
+    # Os listeners da sessão marcam os eventos; a thread do modelo global os relê
+    modelo_leitura.iniciar()
+    modelo_leitura.reconciliar()
+    geracao = modelo_leitura.geracao
+    
+    evento = eventos.query(Event).filter(Event.status == "upcoming").order_by(Event.id).first()
+    eventos.add(Odd(id="odd_local", event_id=evento.id, bookmaker="pinnacle", home_odd=Decimal("2.22")))
+    registrar_alteracao(eventos, [evento.id])
+    
+    # Uma reconciliação em andamento (lock de escrita) não segura o commit;
+    # até a releitura, as leituras vão ao banco
+    with modelo_leitura._lock_escrita:
+        eventos.commit()
+        assert modelo_leitura.disponivel() is False
+    
+    assert esperar(modelo_leitura.disponivel)
+    lido = next(item for item in modelo_leitura.listar(limite=None)[0] if item["eventId"] == evento.id)
+    assert lido["odds"]["pinnacle"]["homeOdd"] == 2.22
+    assert modelo_leitura.geracao == geracao + 1
+
+
+def test_rollback_descarta_as_alteracoes_registradas(eventos):
+    # Os listeners da sessão atualizam o modelo global
+    modelo_leitura.reconciliar()
+    geracao = modelo_leitura.geracao
+    
+    eventos.add(Event(id="evt_desfeito", sport="Futebol", league="Brasileirão", home_team="A", away_team="B",
+                      event_date=BASE, status="upcoming"))
+    registrar_alteracao(eventos, ["evt_desfeito"])
+    eventos.rollback()
+    eventos.commit()
+    
+    assert modelo_leitura.geracao == geracao
+    assert all(item["eventId"] != "evt_desfeito" for item in modelo_leitura.listar(limite=None)[0])
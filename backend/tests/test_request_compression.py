@@ -0,0 +1,81 @@
+"""
+Corpos gzip/zstd (Content-Encoding): descomprimidos antes dos endpoints,
+com limite de tamanho descomprimido e erros 400/413/415.
+"""
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from request_compression import DescompressaoMiddleware
+
+LIMITE = 64 * 1024
+
+
+@pytest.fixture(scope="module")
+def eco():
+    app = FastAPI()
+    app.add_middleware(DescompressaoMiddleware, limite=LIMITE)
+    
+    @app.post("/eco")
+    async def ecoar(request: Request):
+        corpo = await request.body()
+        return {"tamanho": len(corpo), "encoding": request.headers.get("content-encoding")}
+    
+    return TestClient(app)
+
+
+def test_sem_compressao_passa_direto(eco):
+    assert eco.post("/eco", content=b"x" * 100).json() == {"tamanho": 100, "encoding": None}
+
+
+def test_gzip_descomprimido(eco):
+    corpo = json.dumps({"data": ["registro"] * 500}).encode()
+    resposta = eco.post("/eco", content=gzip.compress(corpo), headers={"Content-Encoding": "gzip"})
+    assert resposta.status_code == 200
+    assert resposta.json() == {"tamanho": len(corpo), "encoding": None}
+
+
+def test_gzip_no_limite_e_acima_do_limite(eco):
+    no_limite = eco.post("/eco", content=gzip.compress(b"0" * LIMITE), headers={"Content-Encoding": "gzip"})
+    assert no_limite.status_code == 200
+    assert no_limite.json()["tamanho"] == LIMITE
+    
+    # Bomba de compressão: poucos KB que expandem para muitos MB
+    bomba = gzip.compress(b"0" * (50 * 1024 * 1024))
+    assert len(bomba) < LIMITE
+    assert eco.post("/eco", content=bomba, headers={"Content-Encoding": "gzip"}).status_code == 413
+    
+    um_a_mais = eco.post("/eco", content=gzip.compress(b"0" * (LIMITE + 1)), headers={"Content-Encoding": "gzip"})
+    assert um_a_mais.status_code == 413
+
+
+def test_zstd_descomprimido_e_limitado(eco):
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    
+    resposta = eco.post("/eco", content=compressor.compress(b"1" * 5000), headers={"Content-Encoding": "zstd"})
+    assert resposta.json() == {"tamanho": 5000, "encoding": None}
+    
+    bomba = compressor.compress(b"0" * (50 * 1024 * 1024))
+    assert eco.post("/eco", content=bomba, headers={"Content-Encoding": "zstd"}).status_code == 413
+
+
+@pytest.mark.parametrize("corpo", [b"nao e gzip", gzip.compress(b"x" * 1000)[:-12]], ids=["invalido", "incompleto"])
+def test_corpo_gzip_invalido_responde_400(eco, corpo):
+    assert eco.post("/eco", content=corpo, headers={"Content-Encoding": "gzip"}).status_code == 400
+
+
+def test_codificacao_nao_suportada_responde_415(eco):
+    assert eco.post("/eco", content=b"abc", headers={"Content-Encoding": "br"}).status_code == 415
+
+
+def test_payload_gzip_do_scraper(cliente, registro_scraper):
+    corpo = json.dumps({"data": [registro_scraper("betano", "Palmeiras", "Santos")]}).encode()
+    resposta = cliente.post(
+        "/api/odds/scraper", content=gzip.compress(corpo),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"}
+    )
+    assert resposta.status_code == 200
+    assert resposta.json()["saved"] == 1
@@ -0,0 +1,73 @@
+"""
+POST /api/odds/scraper: registros inválidos e linhas que falham na gravação
+são reportados um a um, sem derrubar os demais registros do payload.
+"""
+import ingestion
+import main
+from models import Event, Odd
+
+
+def test_registro_invalido_nao_derruba_o_payload(cliente, db, registro_scraper):
+    payload = [
+        registro_scraper("betano", "Palmeiras", "Santos"),
+        {"bad": 1},
+        registro_scraper("betano", "Flamengo", "Vasco"),
+        {**registro_scraper("bet365", "Bahia", "Vitória"), "market": {"type": "1X2"}},
+    ]
+    
+    resposta = cliente.post("/api/odds/scraper", json={"data": payload})
+    
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["success"] is True
+    assert corpo["total"] == 4
+    assert corpo["saved"] == 2
+    assert len(corpo["errors"]) == 2
+    assert corpo["errors"][0].startswith("Registro 1: ")
+    assert corpo["errors"][1].startswith("Registro 3: market.")
+    assert db.query(Odd).count() == 2
+
+
+def test_corpo_sem_lista_de_registros_responde_422(cliente):
+    assert cliente.post("/api/odds/scraper", json={"registros": []}).status_code == 422
+    assert cliente.post("/api/odds/scraper", content=b"{nao e json", headers={"Content-Type": "application/json"}).status_code == 422
+
+
+def test_linha_que_falha_na_gravacao_e_isolada(cliente, db, registro_scraper, monkeypatch):
+    persistir_lote = ingestion.persistir_lote
+    
+    def persistir_com_falha(db, registros, *args, **kwargs):
+        resultado = persistir_lote(db, registros, *args, **kwargs)
+        if any(registro["bookmaker"] == "casa-quebrada" for registro in registros):
+            raise ValueError("violação simulada")
+        return resultado
+    
+    monkeypatch.setattr(main, "persistir_lote", persistir_com_falha)
+    payload = [registro_scraper("betano", f"Mandante {i}", f"Visitante {i}") for i in range(7)]
+    payload.insert(2, registro_scraper("casa-quebrada", "Ceará", "Fortaleza"))
+    payload.append(registro_scraper("casa-quebrada", "Sport", "Remo"))
+    
+    corpo = cliente.post("/api/odds/scraper", json={"data": payload}).json()
+    
+    assert corpo["success"] is True
+    assert corpo["saved"] == 7
+    assert corpo["total"] == 9
+    assert len(corpo["errors"]) == 2
+    assert all("casa-quebrada" in erro and "violação simulada" in erro for erro in corpo["errors"])
+    assert db.query(Odd).filter(Odd.bookmaker == "betano").count() == 7
+    assert db.query(Odd).filter(Odd.bookmaker == "casa-quebrada").count() == 0
+    assert db.query(Event).count() == 7
+
+
+def test_nada_gravado_responde_sem_sucesso(cliente, registro_scraper, monkeypatch):
+    def sempre_falha(db, registros, *args, **kwargs):
+        raise ValueError("violação simulada")
+    
+    monkeypatch.setattr(main, "persistir_lote", sempre_falha)
+    payload = [registro_scraper("betano", "Palmeiras", "Santos"), registro_scraper("bet365", "Palmeiras", "Santos")]
+    
+    corpo = cliente.post("/api/odds/scraper", json={"data": payload}).json()
+    
+    assert corpo["success"] is False
+    assert corpo["saved"] == 0
+    assert len(corpo["errors"]) == 2
@@ -0,0 +1,137 @@
+"""
+Surebets de três pernas (1, X, 2): divisão da banca, limiar de lucro,
+combinações com a segunda melhor odd quando a melhor de cada resultado é da
+mesma casa, e pernas velhas ou fora de sincronia fora da conta (sem esconder
+as odds frescas abaixo delas no top 2).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from arbitrage import buscar_surebets_1x2, calcular_surebet_1x2
+
+
+def _iso(momento: datetime) -> str:
+    return momento.replace(microsecond=0).isoformat() + "Z"
+
+
+@pytest.fixture
+def gravar(db, registro_scraper, gravar_registros):
+    """Grava odds 1X2 de Palmeiras x Santos: {casa: (1, X, 2)} (idade em minutos opcional)."""
+    inicio = _iso(datetime.utcnow() + timedelta(days=1))
+    
+    def gravar(odds_por_casa, idades=None):
+        agora = datetime.utcnow()
+        registros = [
+            registro_scraper(
+                casa, "Palmeiras", "Santos", odds=odds, inicio=inicio,
+                coletado_em=_iso(agora - timedelta(minutes=(idades or {}).get(casa, 0)))
+            )
+            for casa, odds in odds_por_casa.items()
+        ]
+        gravar_registros(db, registros)
+    
+    return gravar
+
+
+def test_divisao_da_banca_iguala_o_retorno():
+    resultado = calcular_surebet_1x2(100.0, 3.0, 3.6, 4.5)
+    
+    assert resultado["soma_probabilidades"] == pytest.approx(0.8333, abs=1e-4)
+    assert resultado["apostas"] == [40.0, 33.33, 26.67]
+    assert resultado["retorno_garantido"] == 120.0
+    assert resultado["lucro"] == 20.0
+    assert resultado["lucro_percentual"] == 20.0
+    for aposta, odd in zip(resultado["apostas"], (3.0, 3.6, 4.5)):
+        assert aposta * odd == pytest.approx(120.0, abs=0.02)
+
+
+def test_combina_a_melhor_odd_de_cada_casa(db, gravar):
+    gravar({"betano": (3.0, 3.1, 2.5), "bet365": (2.5, 3.6, 2.4), "superbet": (2.4, 3.0, 4.5)})
+    
+    surebets = buscar_surebets_1x2(db, min_profit_percent=0.0)
+    
+    assert len(surebets) == 1
+    pernas = surebets[0]["bets"]
+    assert [(perna["bookmaker"], perna["odd"]) for perna in pernas] == [
+        ("betano", 3.0), ("bet365", 3.6), ("superbet", 4.5)
+    ]
+    assert surebets[0]["profit_percent"] == 20.0
+    assert surebets.eventos_avaliados == 1
+
+
+def test_limiar_de_lucro(db, gravar, cliente):
+    gravar({"betano": (3.0, 3.1, 2.5), "bet365": (2.5, 3.6, 2.4), "superbet": (2.4, 3.0, 4.5)})
+    
+    assert len(buscar_surebets_1x2(db, min_profit_percent=20.0)) == 1
+    assert buscar_surebets_1x2(db, min_profit_percent=20.01) == []
+    
+    resposta = cliente.get("/api/surebets", params={"banca": 300, "min_profit": 5})
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["total"] == 1
+    assert corpo["events_checked"] == 1
+    assert [perna["amount"] for perna in corpo["surebets"][0]["bets"]] == [120.0, 100.0, 80.0]
+    assert cliente.get("/api/surebets", params={"min_profit": 25}).json()["total"] == 0
+
+
+def test_mesma_casa_no_topo_usa_a_segunda_melhor_odd(db, gravar):
+    # betano tem a melhor odd dos três resultados; a surebet existe trocando
+    # uma perna pela segunda melhor odd (a que menos custa: o empate)
+    gravar({"betano": (3.0, 3.6, 4.5), "bet365": (2.8, 3.55, 4.2)})
+    
+    surebets = buscar_surebets_1x2(db, min_profit_percent=1.0)
+    
+    assert len(surebets) == 1
+    pernas = surebets[0]["bets"]
+    assert [(perna["bookmaker"], perna["odd"]) for perna in pernas] == [
+        ("betano", 3.0), ("bet365", 3.55), ("betano", 4.5)
+    ]
+    assert surebets[0]["profit"] == calcular_surebet_1x2(100.0, 3.0, 3.55, 4.5)["lucro"]
+
+
+def test_mesma_casa_sem_alternativa_nao_e_surebet(db, gravar):
+    gravar({"betano": (3.0, 3.6, 4.5), "bet365": (1.5, 2.0, 2.0)})
+    
+    assert buscar_surebets_1x2(db, min_profit_percent=0.0) == []
+
+
+def test_pernas_velhas_sao_ignoradas(db, gravar):
+    gravar(
+        {"betano": (3.0, 3.1, 2.5), "bet365": (2.5, 3.6, 2.4), "superbet": (2.4, 3.0, 4.5)},
+        idades={"superbet": 600}
+    )
+    
+    assert buscar_surebets_1x2(db, min_profit_percent=1.0) == []
+    
+    surebets = buscar_surebets_1x2(db, min_profit_percent=1.0, max_idade_minutos=0, max_diferenca_minutos=0)
+    assert len(surebets) == 1
+    assert surebets[0]["bets"][2]["bookmaker"] == "superbet"
+
+
+def test_odd_velha_no_top_2_nao_esconde_a_fresca(db, gravar):
+    # As duas melhores odds do visitante são velhas; a terceira (fresca) fecha a surebet
+    gravar(
+        {
+            "betano": (1.5, 2.0, 5.0), "bet365": (1.5, 2.0, 4.8),
+            "superbet": (3.0, 3.0, 4.5), "esportesdasorte": (2.0, 3.6, 2.0)
+        },
+        idades={"betano": 600, "bet365": 600}
+    )
+    
+    surebets = buscar_surebets_1x2(db, min_profit_percent=1.0)
+    
+    assert len(surebets) == 1
+    assert [(perna["bookmaker"], perna["odd"]) for perna in surebets[0]["bets"]] == [
+        ("superbet", 3.0), ("esportesdasorte", 3.6), ("superbet", 4.5)
+    ]
+    assert surebets[0]["profit_percent"] == 20.0
+
+
+def test_pernas_fora_de_sincronia_sao_ignoradas(db, gravar):
+    gravar(
+        {"betano": (3.0, 3.1, 2.5), "bet365": (2.5, 3.6, 2.4), "superbet": (2.4, 3.0, 4.5)},
+        idades={"superbet": 60}
+    )
+    
+    assert buscar_surebets_1x2(db, min_profit_percent=1.0, max_diferenca_minutos=30) == []
+    assert len(buscar_surebets_1x2(db, min_profit_percent=1.0, max_diferenca_minutos=90)) == 1
@@ -0,0 +1,122 @@
+"""
+Índice de apelidos de times: nomes conhecidos, apelidos e grafias novas
+parecidas com um time conhecido caem na mesma chave já na primeira ingestão.
+"""
+import time
+from datetime import datetime
+
+import pytest
+import team_aliases
+from models import Event, TeamAlias, UnresolvedTeamName
+from team_aliases import IndiceTimes, indice_times, normalizar_nome, orcamento_fuzzy
+
+
+@pytest.fixture
+def indice(db):
+    db.add(Event(id="evt_alfa", sport="Futebol", league="Série B", home_team="Time Novo Alfa",
+                 away_team="Outro Time", event_date=datetime(2026, 10, 20), status="upcoming"))
+    db.commit()
+    indice = IndiceTimes()
+    indice.recarregar()
+    # Sem a thread de segundo plano: o teste chama processar_pendentes
+    indice._carregado = True
+    return indice
+
+
+@pytest.mark.parametrize("nome, chave", [
+    ("Grêmio FBPA", "gremio"),
+    ("Fortaleza EC", "fortaleza"),
+    ("São Paulo-SP", "sao paulo sp"),
+    ("FC", "fc"),
+])
+def test_normalizar_nome(nome, chave):
+    assert normalizar_nome(nome) == chave
+
+
+def test_conhecidos_e_apelidos_padrao(indice):
+    assert indice.resolver("Time Novo Alfa") == "time novo alfa"
+    assert indice.resolver("Botafogo-RJ") == "botafogo"
+    assert indice.resolver("Atlético-PR") == "athletico pr"
+    assert indice.pendentes == {}
+
+
+def test_grafia_nova_parecida_resolve_na_hora(indice, db):
+    assert indice.resolver("Time Novo Alfaa", "bet365", "Série B") == "time novo alfa"
+    
+    # A fila grava o apelido com o mesmo resultado
+    indice.processar_pendentes()
+    alias = db.get(TeamAlias, "time novo alfaa")
+    assert (alias.canonical, alias.source) == ("time novo alfa", "fuzzy")
+    assert indice.apelidos["time novo alfaa"] == "time novo alfa"
+
+
+def test_nome_so_plausivel_vira_time_novo_para_revisao(indice, db):
+    assert indice.resolver("Time Novo", "betano", "Série B") == "time novo"
+    indice.processar_pendentes()
+    
+    pendente = db.get(UnresolvedTeamName, "time novo")
+    assert pendente.suggestion == "time novo alfa"
+    assert pendente.bookmaker == "betano"
+    assert "time novo" in indice.conhecidos
+    assert db.get(TeamAlias, "time novo") is None
+
+
+def test_caches_limitados(indice, monkeypatch):
+    monkeypatch.setattr(team_aliases, "LIMITE_CACHE", 3)
+    for i in range(10):
+        indice.resolver(f"Clube Desconhecido {i}")
+    assert len(indice.cache_fuzzy) <= 3
+    assert len(indice.chaves_por_nome) <= 3
+
+
+def test_so_compara_com_conhecidos_de_mesmo_inicio(indice, monkeypatch):
+    comparados = []
+    get_close_matches = team_aliases.difflib.get_close_matches
+    
+    def registrar(palavra, possibilidades, *args, **kwargs):
+        comparados.append(list(possibilidades))
+        return get_close_matches(palavra, possibilidades, *args, **kwargs)
+    
+    monkeypatch.setattr(team_aliases.difflib, "get_close_matches", registrar)
+    assert indice.resolver("Time Novo Alfaa") == "time novo alfa"
+    assert indice.resolver("Xyz Qwerty") == "xyz qwerty"
+    
+    assert "time novo alfa" in comparados[0]
+    assert "flamengo" not in comparados[0]
+    assert comparados[1] == []
+
+
+def test_limite_de_comparacoes_por_lote(indice, monkeypatch):
+    monkeypatch.setattr(team_aliases, "MAX_FUZZY_POR_LOTE", 2)
+    
+    with orcamento_fuzzy():
+        chaves = [indice.resolver(nome) for nome in ("Clube Novo Um", "Clube Novo Dois", "Time Novo Alfaa")]
+    
+    # O terceiro nome passa do limite: chave crua, comparado só em segundo plano
+    assert chaves[2] == "time novo alfaa"
+    assert "time novo alfaa" not in indice.cache_fuzzy
+    assert set(indice.pendentes) == {"Clube Novo Um", "Clube Novo Dois", "Time Novo Alfaa"}
+    indice.processar_pendentes()
+    assert indice.apelidos["time novo alfaa"] == "time novo alfa"
+    
+    # Num lote novo (ou com o resultado em cache) volta a resolver na hora
+    with orcamento_fuzzy():
+        assert indice.resolver("Time Novo Alfaa") == "time novo alfa"
+        assert indice.resolver("Time Novo Alfah") == "time novo alfa"
+
+
+def test_primeiro_payload_com_grafia_nova_cai_no_mesmo_evento(cliente, db, registro_scraper):
+    cliente.post("/api/odds/scraper", json={"data": [registro_scraper("betano", "Time Novo Beta", "Time Novo Gama")]})
+    
+    # O time novo passa a ser conhecido depois que a fila em segundo plano o processa
+    limite = time.time() + 10
+    while not {"time novo beta", "time novo gama"} <= indice_times.conhecidos and time.time() < limite:
+        time.sleep(0.05)
+    
+    corpo = cliente.post("/api/odds/scraper", json={"data": [
+        registro_scraper("bet365", "Time Novo Betta", "Time Novo Gama"),
+        registro_scraper("superbet", "Time Novo Beta", "Tme Novo Gama"),
+    ]}).json()
+    
+    assert corpo["new"] == 2
+    assert db.query(Event).count() == 1
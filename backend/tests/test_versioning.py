@@ -0,0 +1,72 @@
+"""
+Versão global das odds: incremento por upsert, só visível após o commit, e o
+espelho em memória que só relê o banco enquanto há leituras.
+"""
+import time
+
+from models import DataVersion
+from versioning import EspelhoVersao, incrementar_versao, obter_versao
+
+
+def test_primeiro_incremento_cria_a_linha(db):
+    assert obter_versao(db) == 0
+    incrementar_versao(db)
+    db.commit()
+    assert obter_versao(db) == 1
+    assert db.query(DataVersion).count() == 1
+
+
+def test_incrementos_na_mesma_transacao_e_em_seguidas(db):
+    incrementar_versao(db)
+    incrementar_versao(db)
+    db.commit()
+    incrementar_versao(db)
+    db.commit()
+    assert obter_versao(db) == 3
+
+
+def test_rollback_desfaz_o_incremento(db):
+    incrementar_versao(db)
+    db.commit()
+    incrementar_versao(db)
+    incrementar_versao(db, "outra")
+    db.rollback()
+    assert obter_versao(db) == 1
+    assert obter_versao(db, "outra") == 0
+
+
+def test_versoes_independentes_por_nome(db):
+    incrementar_versao(db, "odds")
+    incrementar_versao(db, "status")
+    incrementar_versao(db, "status")
+    db.commit()
+    assert (obter_versao(db, "odds"), obter_versao(db, "status")) == (1, 2)
+
+
+def esperar(condicao, limite=5.0):
+    fim = time.time() + limite
+    while not condicao() and time.time() < fim:
+        time.sleep(0.01)
+    return condicao()
+
+
+def test_espelho_so_rele_com_leituras_recentes(db):
+    incrementar_versao(db)
+    db.commit()
+    espelho = EspelhoVersao(intervalo=0.01, ocioso=0.2)
+    
+    espelho.atual()
+    assert esperar(lambda: espelho.atual() == 1)
+    
+    # Sem leituras: pausa, descarta a cópia e para de consultar o banco
+    assert esperar(lambda: espelho.pausado)
+    assert espelho.atual(registrar_uso=False) is None
+    releituras = espelho.releituras
+    time.sleep(0.2)
+    assert espelho.releituras == releituras
+    
+    # A próxima leitura retoma a releitura, já com escritas feitas na pausa
+    incrementar_versao(db)
+    db.commit()
+    assert esperar(lambda: espelho.atual() == 2)
+    assert espelho.releituras > releituras
@@ -0,0 +1,122 @@
+"""
+Fila de ingestão (INGESTION_MODE=queue): lotes aceitos são gravados mesmo
+com o banco indisponível por um tempo; só erros permanentes viram failed, e
+apenas no lote que os causou. No encerramento a fila não espera o banco.
+"""
+import time
+
+import pytest
+import write_behind
+from ingestion import normalizar_registro
+from models import Odd
+from sqlalchemy.exc import IntegrityError, OperationalError
+from write_behind import FilaIngestao, erro_transitorio
+
+
+def queda_do_banco():
+    return OperationalError("INSERT INTO odds ...", {}, Exception("server closed the connection unexpectedly"))
+
+
+@pytest.fixture
+def fila(db, monkeypatch):
+    monkeypatch.setattr(write_behind, "ESPERA_INICIAL", 0.01)
+    monkeypatch.setattr(write_behind, "ESPERA_MAXIMA", 0.05)
+    fila = FilaIngestao(capacidade=50)
+    yield fila
+    fila.parar(timeout=10)
+
+
+@pytest.fixture
+def lotes(registro_scraper):
+    return [
+        [normalizar_registro(registro_scraper(casa, f"Mandante {i}", f"Visitante {i}")) for casa in ("betano", "bet365")]
+        for i in range(3)
+    ]
+
+
+def falhar(monkeypatch, deve_falhar):
+    """persistir_lote da fila levanta o erro de deve_falhar(registros), se houver."""
+    persistir_lote = write_behind.persistir_lote
+    chamadas = []
+    
+    def persistir(db, registros, *args, **kwargs):
+        chamadas.append(len(registros))
+        erro = deve_falhar(registros)
+        if erro is not None:
+            raise erro
+        return persistir_lote(db, registros, *args, **kwargs)
+    
+    monkeypatch.setattr(write_behind, "persistir_lote", persistir)
+    return chamadas
+
+
+def test_erro_transitorio():
+    assert erro_transitorio(queda_do_banco())
+    assert not erro_transitorio(IntegrityError("INSERT", {}, Exception("duplicate key")))
+    assert not erro_transitorio(ValueError("registro inválido"))
+
+
+def test_banco_indisponivel_nao_perde_lotes(fila, lotes, db, monkeypatch):
+    # As 6 primeiras tentativas encontram o banco fora do ar
+    quedas = [6]
+    
+    def cair(registros):
+        if quedas[0]:
+            quedas[0] -= 1
+            return queda_do_banco()
+        return None
+    
+    chamadas = falhar(monkeypatch, cair)
+    
+    batch_ids = [fila.enfileirar(lote) for lote in lotes]
+    fila.fila.join()
+    fila.parar(timeout=10)
+    
+    assert [fila.obter_status(batch_id)["status"] for batch_id in batch_ids] == ["written"] * 3
+    assert all(fila.obter_status(batch_id)["writeError"] is None for batch_id in batch_ids)
+    estatisticas = fila.estatisticas()
+    assert estatisticas["batchesFailed"] == 0
+    assert estatisticas["batchesWaitingForDatabase"] == 0
+    assert estatisticas["transientErrors"] == 6
+    assert len(chamadas) > 6
+    assert db.query(Odd).count() == 6
+
+
+def test_erro_permanente_falha_so_o_lote_ruim(fila, lotes, db, monkeypatch):
+    ruim = lotes[1][0]["event"]["id"]
+    falhar(monkeypatch, lambda registros: (
+        IntegrityError("INSERT", {}, Exception("violação")) if any(r["event"]["id"] == ruim for r in registros) else None
+    ))
+    
+    batch_ids = [fila.enfileirar(lote) for lote in lotes]
+    fila.parar(timeout=10)
+    
+    assert [fila.obter_status(batch_id)["status"] for batch_id in batch_ids] == ["written", "failed", "written"]
+    assert "violação" in fila.obter_status(batch_ids[1])["writeError"]
+    assert fila.estatisticas()["batchesFailed"] == 1
+    assert db.query(Odd).count() == 4
+
+
+def test_encerrar_com_o_banco_fora_marca_os_pendentes_como_failed(fila, lotes, db, monkeypatch):
+    monkeypatch.setattr(write_behind, "ESPERA_INICIAL", 60)
+    monkeypatch.setattr(write_behind, "ESPERA_MAXIMA", 60)
+    chamadas = falhar(monkeypatch, lambda registros: queda_do_banco())
+    
+    batch_ids = [fila.enfileirar(lote) for lote in lotes]
+    while not chamadas:
+        time.sleep(0.01)
+    
+    # A thread está na espera de 60s; parar() a interrompe sem nova tentativa
+    inicio = time.monotonic()
+    fila.parar(timeout=10)
+    
+    assert time.monotonic() - inicio < 5
+    assert not fila.estatisticas()["writerAlive"]
+    status = [fila.obter_status(batch_id) for batch_id in batch_ids]
+    assert [s["status"] for s in status] == ["failed"] * 3
+    assert all("banco indisponível" in s["writeError"] for s in status)
+    estatisticas = fila.estatisticas()
+    assert estatisticas["batchesFailed"] == 3
+    assert estatisticas["batchesWaitingForDatabase"] == 0
+    assert estatisticas["depth"] == 0
+    assert db.query(Odd).count() == 0
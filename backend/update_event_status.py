@@ -3,8 +3,12 @@ Script para atualizar status de eventos baseado no horário
 Deve ser executado periodicamente (via cron job ou scheduler)
 """
 from datetime import datetime, timedelta
-from models import get_db, Event, Odd
+from typing import Tuple
+from best_lines import atualizar_best_lines
+from models import get_db, Event, Odd, ArbitrageOpportunity
 from sqlalchemy.orm import Session
+from versioning import incrementar_versao
+from read_model import registrar_alteracao
 
 
 # Duração média de um jogo de futebol (em minutos)
@@ -26,6 +30,7 @@ def update_event_statuses():
         events = db.query(Event).filter(
             Event.status.in_(["upcoming", "live"])
         ).all()
+        ids_finalizados = []
         
         for event in events:
             old_status = event.status
@@ -33,6 +38,7 @@ def update_event_statuses():
             
             if old_status != new_status:
                 event.status = new_status
+                event.odds_updated_at = now
                 
                 # Se o evento foi finalizado, marca o horário e desativa as odds
                 if new_status == "finished":
@@ -42,6 +48,7 @@ def update_event_statuses():
                     db.query(Odd).filter(
                         Odd.event_id == event.id
                     ).update({"is_active": False})
+                    ids_finalizados.append(event.id)
                     
                     finished_count += 1
                     print(f"✓ Evento finalizado: {event.home_team} vs {event.away_team}")
@@ -51,6 +58,11 @@ def update_event_statuses():
                 
                 updated_count += 1
         
+        # Sem as odds desativadas, as best lines dos eventos finalizados ficam vazias
+        atualizar_best_lines(db, ids_finalizados)
+        
+        if updated_count > 0:
+            incrementar_versao(db)
         db.commit()
         
         print(f"\n📊 Resumo da atualização:")
@@ -95,6 +107,39 @@ def determine_status(event_date: datetime, now: datetime) -> str:
     return "live"
 
 
+def remover_eventos_antigos(db: Session, days_old: int = 7) -> Tuple[int, datetime]:
+    """
+    Apaga os eventos finalizados há mais de X dias (não faz commit).
+    As oportunidades dos eventos são apagadas antes: bancos criados pelo
+    schema antigo não têm ON DELETE CASCADE nessa FK.
+    
+    Returns:
+        (eventos apagados, data de corte)
+    """
+    cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+    
+    # Busca eventos finalizados há mais de X dias
+    old_events = db.query(Event).filter(
+        Event.status == "finished",
+        Event.finished_at < cutoff_date
+    ).all()
+    
+    if not old_events:
+        return 0, cutoff_date
+    
+    event_ids = [event.id for event in old_events]
+    db.query(ArbitrageOpportunity).filter(
+        ArbitrageOpportunity.event_id.in_(event_ids)
+    ).delete(synchronize_session=False)
+    
+    for event in old_events:
+        db.delete(event)
+    registrar_alteracao(db, event_ids)
+    incrementar_versao(db)
+    
+    return len(old_events), cutoff_date
+
+
 def cleanup_old_finished_events(days_old: int = 7):
     """
     Remove eventos finalizados há mais de X dias
@@ -105,19 +150,7 @@ def cleanup_old_finished_events(days_old: int = 7):
     db = next(get_db())
     
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-        
-        # Busca eventos finalizados há mais de X dias
-        old_events = db.query(Event).filter(
-            Event.status == "finished",
-            Event.finished_at < cutoff_date
-        ).all()
-        
-        deleted_count = len(old_events)
-        
-        for event in old_events:
-            db.delete(event)
-        
+        deleted_count, _ = remover_eventos_antigos(db, days_old)
         db.commit()
         
         print(f"🗑️  Removidos {deleted_count} eventos antigos (> {days_old} dias)")
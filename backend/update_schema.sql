@@ -46,6 +46,135 @@ UPDATE odds
 SET is_active = FALSE 
 WHERE event_id IN (SELECT id FROM events WHERE status = 'finished');
 
+-- 9. Tabela de best lines (duas melhores odds por mercado, por evento)
+CREATE TABLE IF NOT EXISTS best_lines (
+    event_id VARCHAR(50) PRIMARY KEY REFERENCES events(id) ON DELETE CASCADE,
+    bookmaker_count INTEGER NOT NULL DEFAULT 0,
+    lines JSON NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 10. Marca de evento alterado (recálculo incremental de oportunidades)
+ALTER TABLE events 
+ADD COLUMN IF NOT EXISTS odds_updated_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS ix_events_odds_updated_at ON events(odds_updated_at);
+
+-- 11. Versão global das odds (invalidação de caches)
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- 12. Índice parcial da varredura (odds ativas por evento e idade)
+CREATE INDEX IF NOT EXISTS idx_odds_active_event_scraped ON odds(event_id, scraped_at) WHERE is_active;
+
+-- 13. Oportunidades persistidas pelo bot (upsert com expiração)
+ALTER TABLE arbitrage_opportunities ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE arbitrage_opportunities ALTER COLUMN user_team TYPE VARCHAR(120);
+ALTER TABLE arbitrage_opportunities ALTER COLUMN hedge_team TYPE VARCHAR(120);
+CREATE INDEX IF NOT EXISTS ix_arbitrage_opportunities_event_id ON arbitrage_opportunities(event_id);
+CREATE INDEX IF NOT EXISTS ix_arbitrage_opportunities_expires_at ON arbitrage_opportunities(expires_at);
+CREATE INDEX IF NOT EXISTS idx_arb_opps_profit_id ON arbitrage_opportunities(profit_percent DESC, id);
+
+-- 14. Uma odd por (evento, casa): antes do índice único do upsert existir, funde as
+-- duplicatas na coleta mais recente (sem perder o mercado das outras linhas) e remove as demais
+DO $$
+BEGIN
+    IF to_regclass('uq_odds_event_bookmaker') IS NULL THEN
+        -- Cada mercado da linha mantida (coleta mais recente) vazio vem da duplicata mais recente que o tem
+        WITH ordenadas AS (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY event_id, bookmaker ORDER BY scraped_at DESC NULLS LAST, id DESC
+            ) AS rn FROM odds
+        ), duplicatas AS (
+            SELECT
+                event_id,
+                bookmaker,
+                (array_agg(home_odd ORDER BY rn) FILTER (WHERE home_odd IS NOT NULL))[1] AS home_odd,
+                (array_agg(draw_odd ORDER BY rn) FILTER (WHERE draw_odd IS NOT NULL))[1] AS draw_odd,
+                (array_agg(away_odd ORDER BY rn) FILTER (WHERE away_odd IS NOT NULL))[1] AS away_odd,
+                (array_agg(home_or_draw_odd ORDER BY rn) FILTER (WHERE home_or_draw_odd IS NOT NULL))[1] AS home_or_draw_odd,
+                (array_agg(away_or_draw_odd ORDER BY rn) FILTER (WHERE away_or_draw_odd IS NOT NULL))[1] AS away_or_draw_odd,
+                bool_or(is_active) AS is_active
+            FROM ordenadas
+            WHERE rn > 1
+            GROUP BY event_id, bookmaker
+        )
+        UPDATE odds o SET
+            home_odd = COALESCE(o.home_odd, d.home_odd),
+            draw_odd = COALESCE(o.draw_odd, d.draw_odd),
+            away_odd = COALESCE(o.away_odd, d.away_odd),
+            home_or_draw_odd = COALESCE(o.home_or_draw_odd, d.home_or_draw_odd),
+            away_or_draw_odd = COALESCE(o.away_or_draw_odd, d.away_or_draw_odd),
+            is_active = o.is_active OR d.is_active
+        FROM ordenadas s
+        JOIN duplicatas d ON d.event_id = s.event_id AND d.bookmaker = s.bookmaker
+        WHERE s.rn = 1 AND o.id = s.id;
+        
+        DELETE FROM odds WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY event_id, bookmaker ORDER BY scraped_at DESC NULLS LAST, id DESC
+                ) AS rn FROM odds
+            ) d WHERE d.rn > 1
+        );
+    END IF;
+END $$;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_odds_event_bookmaker ON odds(event_id, bookmaker);
+DROP INDEX IF EXISTS idx_odds_event_bookmaker;
+
+-- 15. Histórico append-only de mudanças de preço (chaves pequenas, odd * 100)
+CREATE TABLE IF NOT EXISTS bookmakers (
+    id SMALLSERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS event_keys (
+    id SERIAL PRIMARY KEY,
+    event_id VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS odds_history (
+    event_key INTEGER NOT NULL,
+    scraped_at TIMESTAMP NOT NULL,
+    bookmaker_id SMALLINT NOT NULL,
+    outcome SMALLINT NOT NULL,
+    odd_x100 INTEGER NOT NULL,
+    PRIMARY KEY (event_key, scraped_at, bookmaker_id, outcome)
+);
+
+-- 16. Apelidos de times (casamento de eventos entre casas) e nomes a revisar
+CREATE TABLE IF NOT EXISTS team_aliases (
+    alias VARCHAR(120) PRIMARY KEY,
+    canonical VARCHAR(120) NOT NULL,
+    source VARCHAR(20) NOT NULL DEFAULT 'manual',
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS unresolved_team_names (
+    name_key VARCHAR(120) PRIMARY KEY,
+    raw_name VARCHAR(120) NOT NULL,
+    bookmaker VARCHAR(50),
+    competition VARCHAR(100),
+    suggestion VARCHAR(120),
+    score DECIMAL(4, 3),
+    occurrences INTEGER NOT NULL DEFAULT 1,
+    first_seen TIMESTAMP DEFAULT NOW(),
+    last_seen TIMESTAMP DEFAULT NOW()
+);
+
+-- 17. Assinatura dos preços por mercado (reenvio sem mudança não regrava a odd)
+ALTER TABLE odds ADD COLUMN IF NOT EXISTS fingerprint_1x2 BIGINT;
+ALTER TABLE odds ADD COLUMN IF NOT EXISTS fingerprint_dc BIGINT;
+
+-- 18. Paginação por cursor de /api/events (ORDER BY event_date, id)
+CREATE INDEX IF NOT EXISTS idx_events_date_id ON events(event_date, id);
+
+-- 19. Ids de eventos gravados antes da normalização dos times ("grêmio" -> "gremio"):
+--     a fusão no id atual depende da normalização em Python e roda no startup
+--     (railway_start.py) ou com `python event_merge.py`
+
 -- Verificação final
 SELECT 'Schema atualizado com sucesso!' as message;
 
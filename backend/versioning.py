@@ -0,0 +1,179 @@
+"""
+Versão global das odds.
+
+Cada escrita de odds (ou mudança de status de eventos) incrementa o contador
+na mesma transação, então a versão só avança quando a escrita é commitada.
+Caches usam a versão como chave para saber se ainda são válidos.
+
+O espelho_versao mantém uma cópia em memória da versão, para que os endpoints
+de leitura respondam 304 (ETag) sem consultar o banco. Commits deste processo
+que incrementaram a versão invalidam o espelho na hora; escritas de outros
+processos (bot, scripts) aparecem na próxima releitura periódica. A releitura
+só roda enquanto há leituras recentes (ETAG_VERSION_IDLE_SECONDS): sem
+requisições o espelho é descartado e a thread dorme até a próxima.
+"""
+import os
+import threading
+import time
+from typing import Optional
+from sqlalchemy import event as sa_event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import DataVersion, SessionLocal, insert_com_conflito
+
+VERSAO_ODDS = "odds"
+
+# Intervalo (segundos) entre releituras da versão pelo espelho
+INTERVALO_ESPELHO = float(os.getenv("ETAG_VERSION_POLL_SECONDS", "1"))
+
+# Sem leituras por este tempo (segundos), o espelho para de reler o banco
+OCIOSO_ESPELHO = float(os.getenv("ETAG_VERSION_IDLE_SECONDS", "30"))
+
+# Marca, em session.info, que a transação incrementou a versão
+_MARCA_INCREMENTO = "versao_incrementada"
+
+
+def obter_versao(db: Session, nome: str = VERSAO_ODDS) -> int:
+    """Versão atual (0 se ainda não houve escrita)."""
+    versao = db.query(DataVersion.version).filter(DataVersion.name == nome).scalar()
+    return versao or 0
+
+
+async def obter_versao_async(db: AsyncSession, nome: str = VERSAO_ODDS) -> int:
+    """obter_versao com AsyncSession (DB_ASYNC=true)."""
+    versao = await db.scalar(select(DataVersion.version).where(DataVersion.name == nome))
+    return versao or 0
+
+
+def incrementar_versao(db: Session, nome: str = VERSAO_ODDS) -> None:
+    """
+    Incrementa a versão dentro da transação atual (não faz commit).
+    
+    Um único upsert: dois escritores que criam a linha ao mesmo tempo não
+    colidem na chave primária (o segundo espera o primeiro e incrementa).
+    """
+    stmt = insert_com_conflito(db)(DataVersion).values(name=nome, version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": DataVersion.version + 1}
+    ))
+    db.info[_MARCA_INCREMENTO] = True
+
+
+class EspelhoVersao:
+    """
+    Cópia em memória da versão das odds, relida do banco em segundo plano
+    enquanto há leituras recentes. atual() nunca acessa o banco.
+    """
+    
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        intervalo: float = INTERVALO_ESPELHO,
+        nome: str = VERSAO_ODDS,
+        ocioso: float = OCIOSO_ESPELHO
+    ):
+        self.session_factory = session_factory
+        self.intervalo = intervalo
+        self.nome = nome
+        self.ocioso = ocioso
+        self.versao: Optional[int] = None
+        self.ultimo_uso = 0.0
+        self.pausado = False
+        # Avança a cada invalidação: releitura iniciada antes dela é descartada
+        self._geracao = 0
+        self.releituras = 0
+        self.erros = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._acordar = threading.Event()
+    
+    def atual(self, registrar_uso: bool = True) -> Optional[int]:
+        """
+        Versão espelhada, ou None enquanto não foi lida, após um commit local
+        que a incrementou (até a próxima releitura) ou depois de um período
+        sem leituras.
+        
+        Args:
+            registrar_uso: Conta como leitura (mantém ou retoma a releitura
+                periódica). Verificações internas em segundo plano usam False
+        """
+        if registrar_uso:
+            self.ultimo_uso = time.monotonic()
+            if self._thread is None:
+                self._iniciar()
+            elif self.pausado:
+                self._acordar.set()
+        return self.versao
+    
+    def invalidar(self) -> None:
+        """
+        Descarta a cópia e pede uma releitura imediata.
+        """
+        self._geracao += 1
+        self.versao = None
+        self._acordar.set()
+    
+    def recarregar(self) -> None:
+        geracao = self._geracao
+        db = self.session_factory()
+        try:
+            versao = obter_versao(db, self.nome)
+        finally:
+            db.close()
+        if geracao == self._geracao:
+            self.versao = versao
+        self.releituras += 1
+    
+    def _iniciar(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="data-version", daemon=True)
+            self._thread.start()
+    
+    def _loop(self) -> None:
+        while True:
+            self._acordar.clear()
+            if time.monotonic() - self.ultimo_uso >= self.ocioso:
+                # Sem leituras: a cópia deixaria de acompanhar o banco
+                self._geracao += 1
+                self.versao = None
+                self.pausado = True
+                # Reavalia depois de marcar a pausa: uma leitura entre as duas
+                # verificações não fica sem acordar a thread
+                while time.monotonic() - self.ultimo_uso >= self.ocioso:
+                    self._acordar.wait()
+                    self._acordar.clear()
+                self.pausado = False
+            try:
+                self.recarregar()
+            except Exception as e:
+                self.versao = None
+                self.erros += 1
+                print(f"⚠️  Erro ao ler a versão das odds: {e}")
+            self._acordar.wait(timeout=self.intervalo)
+    
+    def estatisticas(self) -> dict:
+        return {
+            "version": self.versao,
+            "reloads": self.releituras,
+            "errors": self.erros,
+            "poll_seconds": self.intervalo,
+            "idle_seconds": self.ocioso,
+            "paused": self.pausado
+        }
+
+
+espelho_versao = EspelhoVersao()
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apos_commit(db: Session) -> None:
+    if db.info.pop(_MARCA_INCREMENTO, False):
+        espelho_versao.invalidar()
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _apos_rollback(db: Session) -> None:
+    db.info.pop(_MARCA_INCREMENTO, None)
@@ -0,0 +1,315 @@
+"""
+Ingestão assíncrona (write-behind) para /api/odds/scraper.
+
+Com INGESTION_MODE=queue o endpoint só valida o payload, coloca os registros
+numa fila limitada e responde 202 com um batch id. Uma thread grava a fila:
+junta os lotes pendentes em uma única transação (persistir_lote) e registra o
+status de cada lote. Com a fila cheia o endpoint responde 429 (backpressure).
+
+Falhas transitórias do banco (conexão, failover, lock, timeout do pool) não
+descartam lotes: o grupo é regravado com espera exponencial limitada
+(INGESTION_RETRY_MAX_SECONDS) até o banco responder. Enquanto isso a fila
+enche e o endpoint passa a responder 429. Só erros permanentes (integridade,
+dado inválido) marcam o lote como failed. No encerramento (parar) a fila
+deixa de esperar o banco: se ele ainda estiver indisponível, o grupo em
+gravação e os lotes restantes são marcados como failed.
+"""
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as TimeoutPool
+from models import SessionLocal
+from ingestion import persistir_lote, apos_gravar_odds
+
+MODO_INGESTAO = os.getenv("INGESTION_MODE", "sync")
+
+# Espera entre tentativas quando o banco está indisponível: dobra a cada falha até o teto (segundos)
+ESPERA_INICIAL = 1.0
+ESPERA_MAXIMA = float(os.getenv("INGESTION_RETRY_MAX_SECONDS", "30"))
+
+# Falhas transitórias seguidas antes de separar um grupo de lotes (um lote
+# grande demais para o statement_timeout não prende os outros)
+FALHAS_ANTES_DE_SEPARAR = 3
+
+
+def erro_transitorio(erro: Exception) -> bool:
+    """
+    Falha de conexão/disponibilidade do banco, que some ao tentar de novo.
+    """
+    if isinstance(erro, (OperationalError, InterfaceError, TimeoutPool)):
+        return True
+    return isinstance(erro, DBAPIError) and erro.connection_invalidated
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+class FilaIngestao:
+    """
+    Fila limitada de lotes com uma thread de gravação em segundo plano.
+    """
+    
+    def __init__(
+        self,
+        capacidade: int = 200,
+        max_lotes_por_transacao: int = 50,
+        max_registros_por_transacao: int = 20000,
+        retencao_status: int = 10000,
+        session_factory=SessionLocal
+    ):
+        self.fila = queue.Queue(maxsize=capacidade)
+        self.capacidade = capacidade
+        self.max_lotes_por_transacao = max_lotes_por_transacao
+        self.max_registros_por_transacao = max_registros_por_transacao
+        self.retencao_status = retencao_status
+        self.session_factory = session_factory
+        
+        self.status: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        
+        self.lotes_gravados = 0
+        self.lotes_com_falha = 0
+        self.lotes_rejeitados = 0
+        self.lotes_aguardando_banco = 0
+        self.falhas_transitorias = 0
+        self.ultimo_erro: Optional[str] = None
+        self.registros_gravados = 0
+        self.transacoes = 0
+        self.ultima_gravacao: Optional[float] = None
+        self.ultimo_atraso: Optional[float] = None
+    
+    def _iniciar(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+                self._thread.start()
+    
+    def _atualizar_status(self, batch_id: str, **campos) -> None:
+        with self._lock:
+            if batch_id in self.status:
+                self.status[batch_id].update(campos)
+    
+    def enfileirar(self, registros: List[Dict], erros: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Coloca um lote de registros normalizados na fila.
+        
+        Returns:
+            batch id, ou None se a fila estiver cheia
+        """
+        self._iniciar()
+        
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        recebido_em = time.time()
+        
+        with self._lock:
+            self.status[batch_id] = {
+                "batchId": batch_id,
+                "status": "queued",
+                "records": len(registros),
+                "errors": erros or None,
+                "receivedAt": _iso(recebido_em),
+                "writtenAt": None,
+            }
+            while len(self.status) > self.retencao_status:
+                self.status.popitem(last=False)
+        
+        try:
+            self.fila.put_nowait({"batch_id": batch_id, "registros": registros, "recebido_em": recebido_em})
+        except queue.Full:
+            with self._lock:
+                self.status.pop(batch_id, None)
+                self.lotes_rejeitados += 1
+            return None
+        
+        return batch_id
+    
+    def _loop(self) -> None:
+        while not (self._parar.is_set() and self.fila.empty()):
+            try:
+                primeiro = self.fila.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            # Junta o que já está na fila, até os limites da transação
+            lotes = [primeiro]
+            total = len(primeiro["registros"])
+            while len(lotes) < self.max_lotes_por_transacao and total < self.max_registros_por_transacao:
+                try:
+                    lote = self.fila.get_nowait()
+                except queue.Empty:
+                    break
+                lotes.append(lote)
+                total += len(lote["registros"])
+            
+            try:
+                self._gravar(lotes)
+            finally:
+                for _ in lotes:
+                    self.fila.task_done()
+    
+    def _gravar(self, lotes: List[Dict]) -> None:
+        falhas = 0
+        while True:
+            db = self.session_factory()
+            try:
+                registros = [registro for lote in lotes for registro in lote["registros"]]
+                resultado = persistir_lote(db, registros)
+                apos_gravar_odds(db, resultado["event_ids"])
+                db.commit()
+                erro = None
+            except Exception as e:
+                db.rollback()
+                erro = e
+            finally:
+                db.close()
+            
+            if erro is None:
+                if falhas:
+                    with self._lock:
+                        self.lotes_aguardando_banco -= len(lotes)
+                self._concluir(lotes)
+                return
+            
+            if not erro_transitorio(erro):
+                break
+            
+            if self._parar.is_set():
+                # Encerrando: não espera o banco voltar
+                if falhas:
+                    with self._lock:
+                        self.lotes_aguardando_banco -= len(lotes)
+                self._descartar(lotes, erro)
+                return
+            
+            # Banco fora do ar ou lento demais: o grupo continua pendente
+            falhas += 1
+            espera = min(ESPERA_MAXIMA, ESPERA_INICIAL * 2 ** (falhas - 1))
+            with self._lock:
+                self.falhas_transitorias += 1
+                self.ultimo_erro = str(erro)
+                if falhas == 1:
+                    self.lotes_aguardando_banco += len(lotes)
+            for lote in lotes:
+                self._atualizar_status(lote["batch_id"], status="retrying", attempts=falhas, writeError=str(erro))
+            print(f"⚠️  Banco indisponível ({len(lotes)} lote(s)), nova tentativa em {espera:.0f}s: {erro}")
+            
+            if len(lotes) > 1 and falhas >= FALHAS_ANTES_DE_SEPARAR:
+                with self._lock:
+                    self.lotes_aguardando_banco -= len(lotes)
+                for lote in lotes:
+                    self._gravar([lote])
+                return
+            # parar() interrompe a espera
+            self._parar.wait(espera)
+        
+        if falhas:
+            with self._lock:
+                self.lotes_aguardando_banco -= len(lotes)
+        
+        if len(lotes) > 1:
+            # Erro permanente: isola o lote com problema gravando um a um
+            for lote in lotes:
+                self._gravar([lote])
+            return
+        
+        print(f"❌ Erro ao gravar lote {lotes[0]['batch_id']}: {erro}")
+        with self._lock:
+            self.lotes_com_falha += 1
+            self.ultimo_erro = str(erro)
+        self._atualizar_status(lotes[0]["batch_id"], status="failed", writeError=str(erro), writtenAt=_iso(time.time()))
+    
+    def _descartar(self, lotes: List[Dict], erro: Exception) -> None:
+        """
+        Encerramento com o banco indisponível: marca como failed o grupo e os
+        lotes que ainda estão na fila.
+        """
+        pendentes = list(lotes)
+        while True:
+            try:
+                pendentes.append(self.fila.get_nowait())
+            except queue.Empty:
+                break
+            self.fila.task_done()
+        
+        registros = sum(len(lote["registros"]) for lote in pendentes)
+        print(f"❌ Encerrando com o banco indisponível: {len(pendentes)} lote(s) ({registros} registros) não gravados: {erro}")
+        
+        agora = _iso(time.time())
+        with self._lock:
+            self.lotes_com_falha += len(pendentes)
+            self.ultimo_erro = str(erro)
+        for lote in pendentes:
+            self._atualizar_status(
+                lote["batch_id"], status="failed", writeError=f"Encerrado com o banco indisponível: {erro}", writtenAt=agora
+            )
+    
+    def _concluir(self, lotes: List[Dict]) -> None:
+        agora = time.time()
+        with self._lock:
+            self.transacoes += 1
+            self.lotes_gravados += len(lotes)
+            self.registros_gravados += sum(len(lote["registros"]) for lote in lotes)
+            self.ultima_gravacao = agora
+            self.ultimo_atraso = agora - min(lote["recebido_em"] for lote in lotes)
+        
+        for lote in lotes:
+            self._atualizar_status(
+                lote["batch_id"], status="written", writtenAt=_iso(agora), coalescedWith=len(lotes), writeError=None
+            )
+    
+    def obter_status(self, batch_id: str) -> Optional[Dict]:
+        with self._lock:
+            status = self.status.get(batch_id)
+            return dict(status) if status else None
+    
+    def estatisticas(self) -> Dict:
+        """
+        Profundidade da fila, atraso (lag) e contadores da gravação.
+        """
+        with self.fila.mutex:
+            mais_antigo = self.fila.queue[0]["recebido_em"] if self.fila.queue else None
+        
+        agora = time.time()
+        with self._lock:
+            return {
+                "mode": MODO_INGESTAO,
+                "depth": self.fila.qsize(),
+                "capacity": self.capacidade,
+                "oldestQueuedSeconds": round(agora - mais_antigo, 3) if mais_antigo else 0.0,
+                "lastWriteLagSeconds": round(self.ultimo_atraso, 3) if self.ultimo_atraso is not None else None,
+                "lastWriteAt": _iso(self.ultima_gravacao) if self.ultima_gravacao else None,
+                "batchesWritten": self.lotes_gravados,
+                "batchesFailed": self.lotes_com_falha,
+                "batchesRejected": self.lotes_rejeitados,
+                "batchesWaitingForDatabase": self.lotes_aguardando_banco,
+                "transientErrors": self.falhas_transitorias,
+                "lastWriteError": self.ultimo_erro,
+                "recordsWritten": self.registros_gravados,
+                "transactions": self.transacoes,
+                "writerAlive": self._thread is not None and self._thread.is_alive(),
+            }
+    
+    def parar(self, timeout: float = 30.0) -> None:
+        """
+        Grava o que ainda está na fila e encerra a thread. Com o banco
+        indisponível não há nova tentativa: os lotes pendentes viram failed.
+        """
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+fila_ingestao = FilaIngestao(
+    capacidade=int(os.getenv("INGESTION_QUEUE_SIZE", "200")),
+    max_lotes_por_transacao=int(os.getenv("INGESTION_MAX_BATCHES_PER_TX", "50")),
+    max_registros_por_transacao=int(os.getenv("INGESTION_MAX_RECORDS_PER_TX", "20000"))
+)
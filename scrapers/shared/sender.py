@@ -3,16 +3,90 @@ Sender module for posting scraped odds data to external API.
 """
 import requests
 import logging
+import gzip
 import json
 import os
-from typing import List, Dict, Any
+import time
+import zlib
+from typing import List, Dict, Any, Iterable, Iterator
 from datetime import datetime
 
+try:
+    import orjson  # Optional: faster serialization, handles datetime natively
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard  # Optional: zstd request compression
+except ImportError:
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
 # Get API URL from environment variable or use default
 DEFAULT_API_URL = os.getenv("API_URL", "http://api:8000/api/odds/scraper")
 
+# Streaming NDJSON endpoint (records are written in rolling batches as they arrive)
+DEFAULT_STREAM_URL = os.getenv("API_STREAM_URL", DEFAULT_API_URL.replace("/api/odds/scraper", "/api/odds/stream"))
+
+# When "true", send_odds_to_api streams records to DEFAULT_STREAM_URL
+API_STREAMING = os.getenv("API_STREAMING", "false").lower() == "true"
+
+# Bytes of NDJSON buffered before a chunk is (compressed and) sent
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Retries when the API answers 429 (ingestion queue full)
+MAX_RETRIES_ON_BACKPRESSURE = int(os.getenv("API_MAX_RETRIES", "3"))
+
+# Request body compression: "gzip", "zstd" or "none"
+API_COMPRESSION = os.getenv("API_COMPRESSION", "gzip").lower()
+
+# Seconds an endpoint that rejected a compressed body (older deploy) gets plain JSON before compression is tried again
+COMPRESSION_RETRY_SECONDS = float(os.getenv("API_COMPRESSION_RETRY_SECONDS", "3600"))
+
+# Endpoint URL -> time (monotonic) until which it is sent uncompressed
+_compression_disabled_until: Dict[str, float] = {}
+
+
+def _compression_disabled(api_url: str) -> bool:
+    until = _compression_disabled_until.get(api_url)
+    if until is None:
+        return False
+    if time.monotonic() >= until:
+        del _compression_disabled_until[api_url]
+        return False
+    return True
+
+
+def _disable_compression(api_url: str) -> None:
+    _compression_disabled_until[api_url] = time.monotonic() + COMPRESSION_RETRY_SECONDS
+
+
+def _is_body_decode_error(response) -> bool:
+    """
+    True when a 400/422 means the API could not read the body as JSON
+    (compressed bytes reaching an API without request decompression), not that
+    a record failed field validation.
+    """
+    if response.status_code not in (400, 422):
+        return False
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        return False
+    if isinstance(detail, str):
+        # FastAPI: "There was an error parsing the body" (bytes that are not UTF-8 JSON)
+        return "parsing the body" in detail.lower() or "decode" in detail.lower()
+    if not isinstance(detail, list):
+        return False
+    return any(
+        isinstance(error, dict) and (
+            error.get("type") in ("json_invalid", "value_error.jsondecode")
+            or "decode" in str(error.get("msg", "")).lower()
+        )
+        for error in detail
+    )
+
 
 def _serialize_datetime(obj):
     """Helper function to serialize datetime objects to ISO format strings."""
@@ -21,6 +95,37 @@ def _serialize_datetime(obj):
     raise TypeError(f"Type {type(obj)} not serializable")
 
 
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    """Serialize the payload to JSON bytes (orjson when installed, else stdlib json)."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_serialize_datetime)
+    return json.dumps(payload, default=_serialize_datetime).encode("utf-8")
+
+
+def _compress(body: bytes, api_url: str):
+    """
+    Compress the request body according to API_COMPRESSION.
+    
+    Returns:
+        (body, Content-Encoding or None)
+    """
+    encoding = API_COMPRESSION
+    if _compression_disabled(api_url) or encoding in ("", "none", "identity"):
+        return body, None
+    
+    if encoding == "zstd":
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+        logger.warning("zstandard not installed, falling back to gzip")
+        encoding = "gzip"
+    
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6), "gzip"
+    
+    logger.warning(f"Unknown API_COMPRESSION '{API_COMPRESSION}', sending uncompressed")
+    return body, None
+
+
 def send_odds_to_api(odds_data: List[Dict[str, Any]], api_url: str = None) -> bool:
     """
     Send scraped odds data to the external API endpoint.
@@ -33,6 +138,8 @@ def send_odds_to_api(odds_data: List[Dict[str, Any]], api_url: str = None) -> bo
         bool: True if successful, False otherwise
     """
     if api_url is None:
+        if API_STREAMING:
+            return send_odds_stream(odds_data)
         api_url = DEFAULT_API_URL
     
     if not odds_data:
@@ -46,18 +153,51 @@ def send_odds_to_api(odds_data: List[Dict[str, Any]], api_url: str = None) -> bo
         payload = {"data": odds_data}
         
         # Serialize the data to JSON with datetime handling
-        json_data = json.dumps(payload, default=_serialize_datetime)
+        json_data = _dumps(payload)
+        body, content_encoding = _compress(json_data, api_url)
         
-        response = requests.post(
-            api_url,
-            data=json_data,
-            headers={"Content-Type": "application/json"},
-            timeout=10
+        headers = {"Content-Type": "application/json"}
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+        logger.info(
+            f"Payload size: {len(json_data)} bytes uncompressed, {len(body)} bytes sent "
+            f"({content_encoding or 'identity'}, {100 * len(body) / len(json_data):.1f}%)"
         )
         
+        for attempt in range(MAX_RETRIES_ON_BACKPRESSURE + 1):
+            response = requests.post(api_url, data=body, headers=headers, timeout=10)
+            
+            # API without request decompression: 415 (unsupported encoding) or a
+            # body parse/JSON decode error (compressed bytes read as JSON). Resend
+            # uncompressed; this endpoint stays uncompressed for a while.
+            # A 422 from field validation is a bad record and is not retried.
+            rejected_encoding = response.status_code == 415 or _is_body_decode_error(response)
+            if content_encoding and rejected_encoding:
+                _disable_compression(api_url)
+                logger.warning(
+                    f"API rejected {content_encoding} body ({response.status_code}), sending uncompressed "
+                    f"to {api_url} for the next {COMPRESSION_RETRY_SECONDS:.0f}s"
+                )
+                body, content_encoding = json_data, None
+                headers.pop("Content-Encoding")
+                response = requests.post(api_url, data=body, headers=headers, timeout=10)
+            
+            if response.status_code != 429 or attempt == MAX_RETRIES_ON_BACKPRESSURE:
+                break
+            
+            # Queue mode backpressure: wait as instructed by the API and retry
+            retry_after = float(response.headers.get("Retry-After", "1"))
+            logger.warning(f"API ingestion queue full, retrying in {retry_after}s")
+            time.sleep(retry_after)
+        
         response.raise_for_status()
         
-        logger.info(f"Successfully sent {len(odds_data)} odds records. Status: {response.status_code}")
+        # 202 = accepted by the API ingestion queue (written in background)
+        if response.status_code == 202:
+            batch_id = response.json().get("batchId")
+            logger.info(f"Queued {len(odds_data)} odds records. Batch: {batch_id}")
+        else:
+            logger.info(f"Successfully sent {len(odds_data)} odds records. Status: {response.status_code}")
         return True
         
     except requests.exceptions.Timeout:
@@ -75,5 +215,136 @@ def send_odds_to_api(odds_data: List[Dict[str, Any]], api_url: str = None) -> bo
         return False
 
 
+class _StreamCompressor:
+    """Incremental gzip/zstd compressor; each chunk is flushed so the API can process it on arrival."""
+    
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=3).compressobj()
+        else:
+            self._obj = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "zstd":
+            return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def _stream_encoding(api_url: str):
+    """Content-Encoding used by the streaming mode (same setting as API_COMPRESSION)."""
+    encoding = API_COMPRESSION
+    if _compression_disabled(api_url) or encoding in ("", "none", "identity"):
+        return None
+    if encoding == "zstd" and zstandard is None:
+        logger.warning("zstandard not installed, falling back to gzip")
+        return "gzip"
+    if encoding not in ("gzip", "zstd"):
+        logger.warning(f"Unknown API_COMPRESSION '{API_COMPRESSION}', sending uncompressed")
+        return None
+    return encoding
+
+
+def _ndjson_chunks(records: Iterable[Dict[str, Any]], encoding, stats: Dict[str, int]) -> Iterator[bytes]:
+    """Serialize records as NDJSON lines, yielding (compressed) chunks as records are produced."""
+    compressor = _StreamCompressor(encoding) if encoding else None
+    buffer = []
+    buffered = 0
+    
+    def emit(data: bytes) -> bytes:
+        stats["raw_bytes"] += len(data)
+        if compressor is not None:
+            data = compressor.compress(data)
+        stats["sent_bytes"] += len(data)
+        return data
+    
+    for record in records:
+        line = _dumps(record) + b"\n"
+        buffer.append(line)
+        buffered += len(line)
+        stats["records"] += 1
+        if buffered >= STREAM_CHUNK_SIZE:
+            yield emit(b"".join(buffer))
+            buffer, buffered = [], 0
+    
+    if buffer:
+        yield emit(b"".join(buffer))
+    if compressor is not None:
+        tail = compressor.finish()
+        stats["sent_bytes"] += len(tail)
+        yield tail
+
+
+def send_odds_stream(records: Iterable[Dict[str, Any]], api_url: str = None) -> bool:
+    """
+    Stream odds records to the API as NDJSON (chunked upload).
+    
+    Records are serialized as they are yielded, so a collector generator can
+    feed the upload while it is still scraping, and the API writes them in
+    rolling batches. The body cannot be replayed, so there are no retries.
+    
+    Args:
+        records: Iterable (e.g. a generator) of odds dictionaries
+        api_url: Streaming endpoint URL (default: from env var API_STREAM_URL)
+    
+    Returns:
+        bool: True if the API processed the stream without errors, False otherwise
+    """
+    if api_url is None:
+        api_url = DEFAULT_STREAM_URL
+    
+    encoding = _stream_encoding(api_url)
+    headers = {"Content-Type": "application/x-ndjson"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    stats = {"records": 0, "raw_bytes": 0, "sent_bytes": 0}
+    
+    try:
+        logger.info(f"Streaming odds records to {api_url}")
+        response = requests.post(
+            api_url,
+            data=_ndjson_chunks(records, encoding, stats),
+            headers=headers,
+            timeout=(10, 300)
+        )
+        
+        if stats["raw_bytes"]:
+            logger.info(
+                f"Stream size: {stats['raw_bytes']} bytes uncompressed, {stats['sent_bytes']} bytes sent "
+                f"({encoding or 'identity'}, {100 * stats['sent_bytes'] / stats['raw_bytes']:.1f}%)"
+            )
+        
+        response.raise_for_status()
+        summary = response.json()
+        logger.info(
+            f"Streamed {stats['records']} odds records in {summary.get('batches')} batches: "
+            f"{summary.get('saved')} saved, {summary.get('updated')} updated, {summary.get('errorCount')} errors"
+        )
+        if summary.get("errors"):
+            logger.warning(f"Stream errors (first {len(summary['errors'])}): {summary['errors'][:5]}")
+        
+        if stats["records"] == 0:
+            logger.warning("No odds data to send")
+            return False
+        return bool(summary.get("success"))
+        
+    except requests.exceptions.Timeout:
+        logger.error(f"Timeout while streaming data to {api_url}")
+        return False
+        
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to stream data to {api_url}: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            logger.error(f"Response status: {e.response.status_code}, body: {e.response.text}")
+        return False
+        
+    except Exception as e:
+        logger.error(f"Unexpected error streaming data: {e}")
+        return False
+
+
 # Alias for backward compatibility
 send_to_api = send_odds_to_api